@@ -0,0 +1,142 @@
+"""Hot database size over a year of service, with and without the archival job.
+
+Two databases receive the same ``--per-day`` comandas a day, each with
+three orders of three items, a kitchen ticket per order, a payment and the
+stock movements of its items, all closed and synced by the end of the day.
+One of them runs the generated ``archive`` job after every day (retention:
+closed for more than 90 days). Every ``--report`` days the hot row counts,
+the hot file size and the time of that day's archive run are printed.
+
+Deleted pages go to the freelist and are reused by the next day's inserts,
+so the archived database stops growing once the first graphs move, without
+a VACUUM.
+
+Usage: ``python benchmarks/bench_archive.py [--days 360] [--per-day 150] [--report 60]``
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN, _database, _import_package
+
+START = datetime(2024, 1, 1, 23, 0)
+
+
+def _day(conn: sqlite3.Connection, day: int, per_day: int) -> None:
+    closed_at = (START + timedelta(days=day)).strftime("%Y-%m-%d %H:%M:%S.%f")
+    conn.execute("BEGIN")
+    for _ in range(per_day):
+        comanda = str(uuid.uuid4())
+        conn.execute(
+            "INSERT INTO comanda (id, status, closed_at) VALUES (?, 'closed', ?)",
+            (comanda, closed_at),
+        )
+        conn.execute(
+            "INSERT INTO payment (comanda_id, method, amount_cents) VALUES (?, 'card', 8100)",
+            (comanda,),
+        )
+        for _ in range(3):
+            order = conn.execute(
+                'INSERT INTO "order" (comanda_id, origin, status)'
+                " VALUES (?, 'table', 'delivered')",
+                (comanda,),
+            ).lastrowid
+            ticket = conn.execute(
+                "INSERT INTO kitchen_ticket (order_id, status) VALUES (?, 'delivered')", (order,)
+            ).lastrowid
+            for n in range(3):
+                item = conn.execute(
+                    "INSERT INTO order_item (order_id, item_id, quantity, unit_price_cents)"
+                    " VALUES (?, ?, 1, 900)",
+                    (order, n + 1),
+                ).lastrowid
+                conn.execute(
+                    "INSERT INTO kitchen_ticket_item (ticket_id, order_item_id) VALUES (?, ?)",
+                    (ticket, item),
+                )
+                conn.execute(
+                    "INSERT INTO stock_movement"
+                    " (product_id, quantity, movement_type, related_order_item)"
+                    " VALUES (?, 1, 'out', ?)",
+                    (n + 1, item),
+                )
+    # The day's changes have reached the server.
+    for table in ("comanda", "order", "order_item"):
+        conn.execute(f'UPDATE "{table}" SET dirty = 0 WHERE dirty = 1')
+    conn.execute("COMMIT")
+
+
+def _open(sql_dir: Path, path: Path) -> sqlite3.Connection:
+    _database(sql_dir, path).close()
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("BEGIN")
+    for n in range(1, 4):
+        conn.execute("INSERT INTO product (id, name) VALUES (?, ?)", (n, f"Insumo {n}"))
+        conn.execute(
+            "INSERT INTO item (id, name, item_type) VALUES (?, ?, 'dish')", (n, f"Prato {n}")
+        )
+    conn.execute("COMMIT")
+    return conn
+
+
+def _size(conn: sqlite3.Connection) -> float:
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    return pages * conn.execute("PRAGMA page_size").fetchone()[0] / 2**20
+
+
+def _rows(conn: sqlite3.Connection, table: str) -> int:
+    return conn.execute(f'SELECT COUNT(*) FROM main."{table}"').fetchone()[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=360)
+    parser.add_argument("--per-day", type=int, default=150)
+    parser.add_argument("--report", type=int, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        models = _import_package(root / "out" / "python")
+        archive = importlib.import_module(f"{models.__name__}.archive")
+        sql_dir = root / "out" / "sql"
+        plain = _open(sql_dir, root / "plain.db")
+        hot = _open(sql_dir, root / "hot.db")
+        archive.attach(hot, root / "cold.db")
+
+        print(f"{args.per_day} comandas a day, retention {archive.JOBS['Comanda'].days} days")
+        print(
+            f"{'day':>5}{'comandas':>11}{'order items':>13}{'MiB':>8}"
+            f"{'hot comandas':>14}{'order items':>13}{'MiB':>8}{'archive s':>11}"
+        )
+        for day in range(1, args.days + 1):
+            _day(plain, day, args.per_day)
+            _day(hot, day, args.per_day)
+            started = time.perf_counter()
+            archive.archive(hot, now=START + timedelta(days=day, hours=1))
+            seconds = time.perf_counter() - started
+            if day % args.report == 0:
+                print(
+                    f"{day:>5}{_rows(plain, 'comanda'):>11,}{_rows(plain, 'order_item'):>13,}"
+                    f"{_size(plain):>8.1f}{_rows(hot, 'comanda'):>14,}"
+                    f"{_rows(hot, 'order_item'):>13,}{_size(hot):>8.1f}{seconds:>11.3f}"
+                )
+        plain.close()
+        hot.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Comanda totals: summing the order items on every read versus derived columns.
+
+``--comandas`` comandas each hold two orders of ``--items`` items in total.
+A screen refresh reads the subtotal of ``--reads`` random comandas:
+
+* ``aggregate`` - joins ``order`` and ``order_item`` and sums the lines;
+* ``derived`` - reads ``comanda.subtotal_cents``, kept by the triggers.
+
+The cost on the write side is timed by loading the same items into a
+database with and without the derived-column triggers, and
+:func:`derived.verify` / :func:`derived.rebuild` are timed on the result.
+
+Usage: ``python benchmarks/bench_derived.py [--comandas 2000] [--items 50] [--reads 1000]``
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN, _database, _import_package
+
+AGGREGATE_SQL = (
+    'SELECT SUM(COALESCE(i."total_cents", i."quantity" * i."unit_price_cents"))'
+    ' FROM "order" o JOIN "order_item" i ON i."order_id" = o."id"'
+    ' WHERE o."comanda_id" = ? AND o."status" <> \'cancelled\''
+)
+DERIVED_SQL = 'SELECT "subtotal_cents" FROM "comanda" WHERE "id" = ?'
+
+
+def _load(conn: sqlite3.Connection, comandas: int, items: int) -> float:
+    """Insert the comandas, orders and items; returns the seconds spent on the items."""
+    with conn:
+        conn.executemany(
+            'INSERT INTO "comanda" ("id", "status") VALUES (?, \'open\')',
+            [(f"c{n}",) for n in range(comandas)],
+        )
+        conn.executemany(
+            'INSERT INTO "order" ("id", "comanda_id", "origin", "status")'
+            " VALUES (?, ?, 'table', 'open')",
+            [(n + 1, f"c{n // 2}") for n in range(comandas * 2)],
+        )
+    lines = [
+        (1 + (n % (comandas * 2)), 1 + n % 4, 250 + n % 1000) for n in range(comandas * items)
+    ]
+    start = time.perf_counter()
+    with conn:
+        conn.executemany(
+            'INSERT INTO "order_item" ("order_id", "item_id", "quantity", "unit_price_cents")'
+            " VALUES (?, 1, ?, ?)",
+            lines,
+        )
+    return time.perf_counter() - start
+
+
+def _reads(conn: sqlite3.Connection, sql: str, keys: list) -> tuple:
+    start = time.perf_counter()
+    total = sum(conn.execute(sql, (key,)).fetchone()[0] or 0 for key in keys)
+    return time.perf_counter() - start, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comandas", type=int, default=2_000)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--reads", type=int, default=1_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        derived = importlib.import_module(
+            f"{_import_package(root / 'out' / 'python').__name__}.derived"
+        )
+        sql_dir = root / "out" / "sql"
+
+        plain = _database(sql_dir, root / "plain.db")
+        for (name,) in plain.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+            " AND (name LIKE 'trg_order_total_cents_%' OR name LIKE 'trg_comanda_subtotal_%')"
+        ).fetchall():
+            plain.execute(f'DROP TRIGGER "{name}"')
+        untriggered = _load(plain, args.comandas, args.items)
+
+        conn = _database(sql_dir, root / "derived.db")
+        triggered = _load(conn, args.comandas, args.items)
+        keys = [f"c{random.randrange(args.comandas)}" for _ in range(args.reads)]
+        aggregate, expected = _reads(conn, AGGREGATE_SQL, keys)
+        stored, total = _reads(conn, DERIVED_SQL, keys)
+        assert total == expected
+
+        start = time.perf_counter()
+        assert set(derived.verify(conn).values()) == {0}
+        verify = time.perf_counter() - start
+        conn.execute('UPDATE "order" SET "total_cents" = NULL')
+        conn.execute('UPDATE "comanda" SET "subtotal_cents" = NULL')
+        start = time.perf_counter()
+        with conn:
+            derived.rebuild(conn)
+        rebuild = time.perf_counter() - start
+        conn.close()
+        plain.close()
+
+    rows = args.comandas * args.items
+    print(f"{args.comandas:,} comandas, {rows:,} order items, {args.reads:,} subtotal reads")
+    print(f"{'read':<22}{'ms':>9}{'µs/read':>10}")
+    for name, seconds in (("aggregate", aggregate), ("derived", stored)):
+        print(f"{name:<22}{seconds * 1000:>9.1f}{seconds * 1e6 / args.reads:>10.1f}")
+    print(f"{'write / maintenance':<22}{'ms':>9}{'rows/s':>10}")
+    for name, seconds in (
+        ("insert, no triggers", untriggered),
+        ("insert, triggers", triggered),
+    ):
+        print(f"{name:<22}{seconds * 1000:>9.1f}{rows / seconds:>10,.0f}")
+    print(f"{'verify':<22}{verify * 1000:>9.1f}")
+    print(f"{'rebuild':<22}{rebuild * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Write throughput of concurrent POS terminals with and without the generated engine.
+
+Each terminal is a thread that commits small transactions, each one order
+with a few order items. The threads run against:
+
+* ``stock`` - one plain ``sqlite3`` connection per terminal with the
+  library defaults (rollback journal, ``synchronous=FULL``);
+* ``pragmas`` - one :func:`engine.connect` connection per terminal (WAL,
+  ``synchronous=NORMAL``, ...) and ``BEGIN IMMEDIATE`` transactions;
+* ``pool`` - every terminal writes through the single serialized writer of
+  :class:`engine.ConnectionPool` and reads through its reader set.
+
+Usage: ``python benchmarks/bench_engine.py [--terminals 4] [--orders 300]``
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN, _database, _import_package
+
+ORDER_SQL = 'INSERT INTO "order" (comanda_id, origin, status) VALUES (?, \'table\', \'open\')'
+ITEM_SQL = (
+    'INSERT INTO "order_item" (order_id, item_id, quantity, unit_price_cents)'
+    " VALUES (?, ?, 1, 1200)"
+)
+COUNT_SQL = 'SELECT COUNT(*) FROM "order_item" WHERE order_id = ?'
+
+
+def _prepare(sql_dir: Path, path: Path, terminals: int) -> None:
+    """Schema plus the comandas and items the orders reference (FKs are enforced)."""
+    conn = _database(sql_dir, path)
+    with conn:
+        conn.executemany(
+            'INSERT INTO "comanda" (id, status) VALUES (?, \'open\')',
+            [(f"comanda-{terminal}",) for terminal in range(terminals)],
+        )
+        conn.executemany(
+            'INSERT INTO "item" (id, name, item_type) VALUES (?, ?, \'dish\')',
+            [(item, f"item-{item}") for item in range(1, 4)],
+        )
+    conn.close()
+
+
+def _write_order(conn: sqlite3.Connection, terminal: int) -> int:
+    order_id = conn.execute(ORDER_SQL, (f"comanda-{terminal}",)).lastrowid
+    conn.executemany(ITEM_SQL, [(order_id, item) for item in range(1, 4)])
+    return order_id
+
+
+def _run(terminals: int, work) -> float:
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(terminals)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terminals", type=int, default=4)
+    parser.add_argument("--orders", type=int, default=300, help="orders per terminal")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        models = _import_package(root / "out" / "python")
+        engine = importlib.import_module(f"{models.__name__}.engine")
+        sql_dir = root / "out" / "sql"
+        timings = {}
+
+        stock_db = root / "stock.db"
+        _prepare(sql_dir, stock_db, args.terminals)
+
+        def stock(terminal: int) -> None:
+            conn = sqlite3.connect(stock_db, timeout=30)
+            for _ in range(args.orders):
+                with conn:
+                    order_id = _write_order(conn, terminal)
+                conn.execute(COUNT_SQL, (order_id,)).fetchone()
+            conn.close()
+
+        timings["stock"] = _run(args.terminals, stock)
+
+        tuned_db = root / "pragmas.db"
+        _prepare(sql_dir, tuned_db, args.terminals)
+
+        def pragmas(terminal: int) -> None:
+            conn = engine.connect(tuned_db)
+            for _ in range(args.orders):
+                with engine.transaction(conn):
+                    order_id = _write_order(conn, terminal)
+                conn.execute(COUNT_SQL, (order_id,)).fetchone()
+            conn.close()
+
+        timings["pragmas"] = _run(args.terminals, pragmas)
+
+        pool_db = root / "pool.db"
+        _prepare(sql_dir, pool_db, args.terminals)
+        with engine.ConnectionPool(pool_db, readers=args.terminals) as pool:
+
+            def pooled(terminal: int) -> None:
+                for _ in range(args.orders):
+                    with pool.writer() as conn:
+                        order_id = _write_order(conn, terminal)
+                    with pool.reader() as conn:
+                        conn.execute(COUNT_SQL, (order_id,)).fetchone()
+
+            timings["pool"] = _run(args.terminals, pooled)
+
+    total = args.terminals * args.orders
+    print(f"{args.terminals} terminals x {args.orders} orders (1 order + 3 items each)")
+    print(f"{'setup':<9}{'seconds':>9}{'orders/s':>10}")
+    for name, seconds in timings.items():
+        print(f"{name:<9}{seconds:>9.3f}{total / seconds:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Event store throughput: appends per transaction size, full versus incremental replay.
+
+``append_events`` writes ``--events`` ``ItemAdded`` events into a WAL database
+opened with the generated ``engine.connect``, committing every 1, 50 and 500
+events. A projection summing quantities per order is then rebuilt from the
+first event and, after another 1% of events arrive, resumed from its
+checkpoint.
+
+Usage: ``python benchmarks/bench_events.py [--events 100000]``
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import tempfile
+import time
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN, _database, _import_package
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        models = _import_package(root / "out" / "python")
+        engine = importlib.import_module(f"{models.__name__}.engine")
+        events = importlib.import_module(f"{models.__name__}.events")
+        stream = [events.ItemAdded(n, n // 4, n % 250, 1 + n % 3) for n in range(args.events)]
+
+        appends = {}
+        for batch_size in (1, 50, 500):
+            path = root / f"append-{batch_size}.db"
+            _database(root / "out" / "sql", path).close()
+            conn = engine.connect(path)
+            # One event per transaction is slow; time a slice of the stream.
+            count = min(args.events, 5_000) if batch_size == 1 else args.events
+            start = time.perf_counter()
+            events.append_events(conn, stream[:count], batch_size=batch_size)
+            appends[batch_size] = count / (time.perf_counter() - start)
+            conn.close()
+
+        conn = engine.connect(root / "append-500.db")
+        conn.execute("CREATE TABLE order_size (order_id INTEGER PRIMARY KEY, items INTEGER)")
+
+        class OrderSizes(events.Projection):
+            name = "order_sizes"
+
+            def on_ItemAdded(self, conn, stored):
+                conn.execute(
+                    "INSERT INTO order_size VALUES (?, ?) ON CONFLICT (order_id)"
+                    " DO UPDATE SET items = items + excluded.items",
+                    (stored.event.order_id, stored.event.quantity),
+                )
+
+            def reset(self, conn):
+                conn.execute("DELETE FROM order_size")
+
+        start = time.perf_counter()
+        rebuilt = events.replay(conn, OrderSizes(), rebuild=True)
+        full = time.perf_counter() - start
+        events.append_events(conn, stream[: args.events // 100])
+        start = time.perf_counter()
+        resumed = events.replay(conn, OrderSizes())
+        incremental = time.perf_counter() - start
+        conn.close()
+
+    print(f"{args.events:,} ItemAdded events")
+    for batch_size, rate in appends.items():
+        print(f"append, {batch_size:>3} per transaction {rate:>12,.0f} events/s")
+    print(f"replay from scratch  {rebuilt:>9,} events {full * 1000:>9.1f} ms")
+    print(f"replay from checkpoint {resumed:>7,} events {incremental * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Time every stage of the generator on synthetic domains, as JSON to compare commits.
+
+For each ``--entities`` scale, a domain with ``--attributes`` columns per
+entity is built by ``synthetic.build_domain``. The ``--relations``,
+``--enums``, ``--decimals`` and ``--composite`` options set its shares.
+The domain is then timed through:
+
+* ``load`` - ``DomainLoader.load`` with the domain cache off;
+* ``render`` - every planned artifact, per ``Generator.render_*`` kind,
+  through the Jinja templates and through the fallback ``render_*_content``
+  functions (after one untimed pass that compiles the templates);
+* ``write`` - writing the rendered files into empty directories;
+* ``ddl`` - applying ``sql/schema.sql`` to a new SQLite file;
+* ``generate`` - the whole non-incremental ``generate()`` call.
+
+Every figure is the median of ``--repeat`` runs, in seconds. The JSON report
+goes to stdout, or to ``--output``, and a summary table goes to stderr.
+``--compare before.json`` adds a table of the ratios to an earlier report.
+
+Usage: ``python benchmarks/bench_generator.py [--entities 10 100 1000] [--attributes 12]
+[--output after.json] [--compare before.json]``
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from botecopro_meta.generator import (
+    DomainLoader,
+    Generator,
+    generate,
+    plan_artifacts,
+    write_file,
+)
+
+from synthetic import write_domain
+
+ROOT = Path(__file__).resolve().parents[1]
+TEMPLATES = ROOT / "src" / "botecopro_meta" / "templates"
+STAGES = ("load", "write", "ddl", "generate")
+
+
+def _median(func: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def _render_times(generator: Generator, artifacts, repeat: int) -> Dict[str, float]:
+    by_kind: Dict[str, list] = defaultdict(list)
+    for artifact in artifacts:
+        by_kind[artifact.kind].append(artifact)
+    return {
+        kind: _median(
+            lambda planned=planned: [generator.render(a.kind, *a.args) for a in planned], repeat
+        )
+        for kind, planned in sorted(by_kind.items())
+    }
+
+
+def bench_scale(root: Path, entities: int, args: argparse.Namespace) -> Dict:
+    shares = {
+        "relations": args.relations,
+        "enums": args.enums,
+        "decimals": args.decimals,
+        "composite": args.composite,
+    }
+    domain_path = write_domain(
+        root / f"domain-{entities}.yaml", entities, args.attributes, args.seed, **shares
+    )
+    load = _median(lambda: DomainLoader(domain_path, cache=False).load(), args.repeat)
+    domain = DomainLoader(domain_path, cache=False).load()
+
+    jinja = Generator(TEMPLATES)
+    fallback = Generator(TEMPLATES)
+    fallback.templated = False
+    artifacts = plan_artifacts(domain, jinja.template_hashes())
+    outputs = {a.path: jinja.render(a.kind, *a.args) for a in artifacts}
+    mismatched = sorted(
+        a.path for a in artifacts if fallback.render(a.kind, *a.args) != outputs[a.path]
+    )
+    jinja_times = _render_times(jinja, artifacts, args.repeat)
+    fallback_times = _render_times(fallback, artifacts, args.repeat)
+    counts: Dict[str, int] = defaultdict(int)
+    for artifact in artifacts:
+        counts[artifact.kind] += 1
+
+    runs = iter(range(10**9))
+
+    def write() -> None:
+        target = root / f"write-{entities}-{next(runs)}"
+        for relative in {Path(path).parent for path in outputs}:
+            (target / relative).mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        for path, content in outputs.items():
+            write_file(target / path, content)
+        write.elapsed.append(time.perf_counter() - started)
+
+    write.elapsed = []
+    for _ in range(args.repeat):
+        write()
+
+    schema = outputs["sql/schema.sql"]
+
+    def ddl() -> None:
+        conn = sqlite3.connect(root / f"ddl-{entities}-{next(runs)}.db")
+        conn.executescript(schema)
+        conn.close()
+
+    return {
+        "entities": entities,
+        "attributes": args.attributes,
+        "shares": shares,
+        "artifacts": len(artifacts),
+        "bytes": sum(len(content.encode("utf-8")) for content in outputs.values()),
+        "load": load,
+        "render": {
+            kind: {
+                "artifacts": counts[kind],
+                "jinja": jinja_times[kind],
+                "fallback": fallback_times[kind],
+            }
+            for kind in jinja_times
+        },
+        "render_total": {
+            "jinja": sum(jinja_times.values()),
+            "fallback": sum(fallback_times.values()),
+        },
+        "fallback_mismatches": mismatched,
+        "write": statistics.median(write.elapsed),
+        "ddl": _median(ddl, args.repeat),
+        "generate": _median(
+            lambda: generate(domain_path, root / f"gen-{entities}-{next(runs)}", incremental=False),
+            args.repeat,
+        ),
+    }
+
+
+def _environment() -> Dict:
+    def git(*command: str) -> str:
+        try:
+            return subprocess.run(
+                ["git", *command], cwd=ROOT, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    try:
+        import jinja2
+
+        jinja_version = jinja2.__version__
+    except ImportError:
+        jinja_version = None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "jinja2": jinja_version,
+        "platform": platform.platform(),
+        "taken_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _summary(results: List[Dict]) -> str:
+    lines = [
+        f"{'entities':>9}{'artifacts':>10}{'load s':>9}{'jinja s':>9}{'fallback s':>11}"
+        f"{'write s':>9}{'ddl s':>8}{'generate s':>11}"
+    ]
+    for result in results:
+        lines.append(
+            f"{result['entities']:>9,}{result['artifacts']:>10,}{result['load']:>9.3f}"
+            f"{result['render_total']['jinja']:>9.3f}{result['render_total']['fallback']:>11.3f}"
+            f"{result['write']:>9.3f}{result['ddl']:>8.3f}{result['generate']:>11.3f}"
+        )
+    return "\n".join(lines)
+
+
+def _comparison(before: Dict, after: Dict) -> str:
+    """Ratio after/before of every stage, per scale present in both reports."""
+    earlier = {result["entities"]: result for result in before["results"]}
+    lines = [f"{'entities':>9}" + "".join(f"{stage:>10}" for stage in ("render",) + STAGES)]
+    for result in after["results"]:
+        old = earlier.get(result["entities"])
+        if old is None:
+            continue
+        ratios = [result["render_total"]["jinja"] / old["render_total"]["jinja"]]
+        ratios += [result[stage] / old[stage] for stage in STAGES]
+        lines.append(f"{result['entities']:>9,}" + "".join(f"{r:>9.2f}x" for r in ratios))
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--attributes", type=int, default=12)
+    parser.add_argument("--relations", type=float, default=0.15)
+    parser.add_argument("--enums", type=float, default=0.15)
+    parser.add_argument("--decimals", type=float, default=0.1)
+    parser.add_argument("--composite", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON report here")
+    parser.add_argument("--compare", type=Path, default=None, help="Earlier JSON report")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [bench_scale(Path(tmp), entities, args) for entities in args.entities]
+    report = {"environment": _environment(), "repeat": args.repeat, "results": results}
+
+    document = json.dumps(report, indent=2)
+    if args.output is None:
+        print(document)
+    else:
+        args.output.write_text(document + "\n")
+    print(_summary(results), file=sys.stderr)
+    if args.compare is not None:
+        print(_comparison(json.loads(args.compare.read_text()), report), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""CSV import of ``Product`` rows: ORM constructors versus the generated validators.
+
+A CSV file of ``--rows`` products, one in fifty of them invalid, is loaded
+into a fresh database twice:
+
+* ``orm`` - each row is checked value by value against the attribute types
+  and becomes a ``Product`` model, committed with one session at the end;
+* ``import`` - :func:`validation.import_file` checks ``--chunk-size`` rows
+  column by column and inserts each chunk with ``executemany``.
+
+Each path runs once timed and once under ``tracemalloc`` for its peak
+Python memory, which grows with the file for the ORM and stays at about
+one chunk for the import.
+
+Usage: ``python benchmarks/bench_import.py [--rows 100000] [--chunk-size 10000]``
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from botecopro_meta.generator import DomainLoader, generate
+from botecopro_meta.validation import import_file
+
+from bench_repositories import DOMAIN, _database, _import_package
+
+_BOOLEANS = {"true": True, "false": False, "1": True, "0": False}
+
+
+def _write_csv(path: Path, rows: int) -> None:
+    with path.open("w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(
+            ["name", "description", "cost_price_cents", "stock_minimum", "unit", "active"]
+        )
+        for n in range(rows):
+            cost = "n/a" if n % 50 == 7 else str(100 + n % 9000)
+            writer.writerow(
+                [f"Produto {n}", "", cost, f"{n % 40 / 4}", "un", "true" if n % 9 else "false"]
+            )
+
+
+def _orm_value(attr, value: str):
+    if attr.base_type == "int":
+        return int(value)
+    if attr.base_type == "float":
+        return float(value)
+    if attr.base_type == "bool":
+        return _BOOLEANS[value.lower()]
+    return value
+
+
+def _orm_import(models, domain, path: Path, database: Path) -> int:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    product = models.Product
+    attributes = {attr.name: attr for attr in domain.entity("Product").attributes}
+    engine = create_engine(f"sqlite:///{database}")
+    inserted = 0
+    with Session(engine) as session, path.open(newline="") as handle:
+        for row in csv.DictReader(handle):
+            try:
+                values = {
+                    name: _orm_value(attributes[name], value)
+                    for name, value in row.items()
+                    if value != ""
+                }
+            except (KeyError, ValueError):
+                continue
+            session.add(product(**values))
+            inserted += 1
+        session.commit()
+    engine.dispose()
+    return inserted
+
+
+def _bulk_import(domain, path: Path, database: Path, chunk_size: int) -> int:
+    conn = sqlite3.connect(database, isolation_level=None)
+    result = import_file(
+        conn, domain, "Product", path, rejects_path=path.with_suffix(".bad"), chunk_size=chunk_size
+    )
+    conn.close()
+    return result.inserted
+
+
+def _measure(run, database: Path, sql_dir: Path) -> tuple:
+    """Seconds of an untraced run and peak MiB of a traced one."""
+    timings = []
+    for traced in (False, True):
+        _database(sql_dir, database).close()
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        inserted = run(database)
+        timings.append(time.perf_counter() - start)
+        peak = tracemalloc.get_traced_memory()[1] if traced else 0
+        tracemalloc.stop()
+        database.unlink()
+    return inserted, timings[0], peak / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        models = _import_package(root / "out" / "python")
+        domain = DomainLoader(DOMAIN).load()
+        sql_dir = root / "out" / "sql"
+        source = root / "products.csv"
+        _write_csv(source, args.rows)
+        results = {
+            "orm": _measure(
+                lambda db: _orm_import(models, domain, source, db), root / "orm.db", sql_dir
+            ),
+            "import": _measure(
+                lambda db: _bulk_import(domain, source, db, args.chunk_size),
+                root / "bulk.db",
+                sql_dir,
+            ),
+        }
+
+    print(f"{args.rows:,} Product rows from CSV, chunks of {args.chunk_size:,}")
+    print(f"{'path':<8}{'inserted':>10}{'s':>8}{'rows/s':>10}{'peak MiB':>10}")
+    for name, (inserted, seconds, peak) in results.items():
+        print(f"{name:<8}{inserted:>10,}{seconds:>8.2f}{args.rows / seconds:>10,.0f}{peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
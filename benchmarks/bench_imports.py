@@ -0,0 +1,98 @@
+"""Import time of the generator and of the generated package, eager versus lazy.
+
+Each case runs in a fresh interpreter under ``-X importtime`` and adds up
+the cumulative time of the top-level imports its statement triggers:
+
+* ``generator`` - ``import botecopro_meta.generator``, whose YAML, Jinja
+  and executor imports are deferred to the first generation;
+* ``eager`` / ``lazy`` - importing the package generated from the shipped
+  domain with ``targets.python.lazy_imports`` off and on;
+* ``+ OrderItem`` - the same import followed by one model access, which
+  under the lazy package loads that model and the models it references.
+
+The median of ``--runs`` interpreters is reported.
+
+Usage: ``python benchmarks/bench_imports.py [--runs 7]``
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import yaml
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+MARKER = "--bench-imports--"
+
+
+def _import_ms(statement: str, path: Path) -> float:
+    """Milliseconds spent in the imports ``statement`` triggers, from ``-X importtime``."""
+    code = f"import sys; sys.stderr.write({MARKER!r} + '\\n'); {statement}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=path,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join((str(path), str(SRC)))},
+    )
+    lines = result.stderr.split(MARKER, 1)[1].splitlines()
+    total = 0
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  ") and cumulative.strip().isdigit():
+            total += int(cumulative)
+    return total / 1000
+
+
+def _median_ms(statement: str, path: Path, runs: int) -> float:
+    return statistics.median(_import_ms(statement, path) for _ in range(runs))
+
+
+def _generate(root: Path, name: str, lazy: bool) -> None:
+    data = yaml.safe_load(DOMAIN.read_text())
+    domain = next(iter(data.values()))
+    domain.setdefault("targets", {}).setdefault("python", {})["lazy_imports"] = lazy
+    source = root / f"{name}.yaml"
+    source.write_text(yaml.safe_dump(data, sort_keys=False))
+    generate(source, root / name, incremental=False)
+    (root / name / "__init__.py").write_text("")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _generate(root, "eager", lazy=False)
+        _generate(root, "lazy", lazy=True)
+        results = {
+            "generator": _median_ms("import botecopro_meta.generator", root, args.runs),
+        }
+        for name in ("eager", "lazy"):
+            results[name] = _median_ms(f"import {name}.python", root, args.runs)
+            results[f"{name} + OrderItem"] = _median_ms(
+                f"import {name}.python; {name}.python.OrderItem", root, args.runs
+            )
+
+    print(f"median of {args.runs} interpreters, -X importtime")
+    print(f"{'case':<20}{'ms':>8}")
+    for name, ms in results.items():
+        print(f"{name:<20}{ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
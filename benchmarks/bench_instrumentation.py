@@ -0,0 +1,134 @@
+"""Hot-path cost of the generated ``instrumentation`` module.
+
+Four workloads run against the same file database, plain and with
+``instrument(engine)`` attached:
+
+* ``core`` - a one-row ``SELECT`` on an open Core connection, the cheapest
+  statement there is, so the difference is the listeners' cost per statement;
+* ``get`` - ``Session.get`` of a ``Category`` by key, in a fresh session, so
+  every call issues one ``SELECT``;
+* ``screen`` - a comanda with its orders and order items (three statements);
+* ``write`` - a committed order of three order items.
+
+Each workload is timed ``--rounds`` times alternating plain and instrumented
+runs; the best round of each is reported.
+
+Usage: ``python benchmarks/bench_instrumentation.py [--ops 5000] [--rounds 5]``
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN, _database, _import_package
+
+
+def _prepare(sql_dir: Path, path: Path) -> str:
+    conn = _database(sql_dir, path)
+    key = str(uuid.uuid4())
+    with conn:
+        conn.execute("INSERT INTO category (id, name) VALUES (1, 'Bebidas')")
+        conn.execute("INSERT INTO item (id, name, item_type) VALUES (1, 'Chopp', 'drink')")
+        conn.execute("INSERT INTO comanda (id, status) VALUES (?, 'open')", (key,))
+        for _ in range(4):
+            order = conn.execute(
+                "INSERT INTO \"order\" (comanda_id, origin, status) VALUES (?, 'table', 'open')",
+                (key,),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO order_item (order_id, item_id, quantity, unit_price_cents)"
+                " VALUES (?, 1, 1, 900)",
+                [(order,)] * 3,
+            )
+    conn.close()
+    return key
+
+
+def _workloads(models, engine, Session, key: str):
+    connection = engine.connect()
+    screen = (
+        select(models.Comanda)
+        .where(models.Comanda.id == key)
+        .options(selectinload(models.Comanda.orders).selectinload(models.Order.order_items))
+    )
+
+    def core() -> None:
+        connection.exec_driver_sql("SELECT name FROM category WHERE id = 1").all()
+
+    def get() -> None:
+        with Session() as session:
+            session.get(models.Category, 1)
+
+    def load_screen() -> None:
+        with Session() as session:
+            session.scalars(screen).one()
+
+    def write() -> None:
+        with Session() as session:
+            order = models.Order(comanda_id=key, origin="table", status="open")
+            session.add(order)
+            session.flush()
+            session.add_all(
+                models.OrderItem(order_id=order.id, item_id=1, quantity=1, unit_price_cents=900)
+                for _ in range(3)
+            )
+            session.commit()
+
+    return {"core": core, "get": get, "screen": load_screen, "write": write}
+
+
+def _timed(func, ops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(ops):
+        func()
+    return (time.perf_counter() - started) / ops
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        models = _import_package(root / "out" / "python")
+        engine_module = importlib.import_module(f"{models.__name__}.engine")
+        instrumentation = importlib.import_module(f"{models.__name__}.instrumentation")
+        key = _prepare(root / "out" / "sql", root / "bench.db")
+        engine = engine_module.create_engine(root / "bench.db")
+        Session = engine_module.session_factory(engine)
+        stats = instrumentation.Instrumentation(engine)
+
+        print(f"{'workload':<10}{'plain µs':>10}{'instrumented µs':>17}{'overhead':>10}")
+        for name, func in _workloads(models, engine, Session, key).items():
+            func()  # warm the statement caches
+            plain, instrumented = [], []
+            for _ in range(args.rounds):
+                plain.append(_timed(func, args.ops))
+                with stats:
+                    instrumented.append(_timed(func, args.ops))
+            base, measured = min(plain), min(instrumented)
+            print(
+                f"{name:<10}{base * 1e6:>10.1f}{measured * 1e6:>17.1f}"
+                f"{(measured / base - 1) * 100:>9.1f}%"
+            )
+        statements = sum(
+            kind["count"] for kinds in stats.snapshot().values() for kind in kinds.values()
+        )
+        print(f"{statements:,} statements recorded")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
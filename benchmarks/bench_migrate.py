@@ -0,0 +1,101 @@
+"""Applying domain changes to a populated device database.
+
+Fills ``order_item`` with ``--rows`` rows, then applies three edits of the
+``OrderItem`` entity to a fresh copy of that database each:
+
+* ``add column`` - a new nullable attribute, planned as ``ADD COLUMN``;
+* ``new index`` - a declared index; the table is left alone;
+* ``rebuild`` - a changed default, which SQLite can only apply by copying
+  the table (and re-creating its indexes).
+
+Usage: ``python benchmarks/bench_migrate.py [--rows 200000]``
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from botecopro_meta.generator import DomainLoader, deferred_columns, render_schema_content
+from botecopro_meta.migrate import plan_migration, read_schema
+
+from bench_repositories import DOMAIN, _rows
+
+
+def _add_column(entity: dict) -> None:
+    entity["attributes"]["voided_reason"] = {"type": "string", "nullable": True}
+
+
+def _new_index(entity: dict) -> None:
+    entity["indexes"] = [{"columns": ["unit_price_cents"]}]
+
+
+def _rebuild(entity: dict) -> None:
+    entity["attributes"]["quantity"]["default"] = 2
+
+
+EDITS = {"add column": _add_column, "new index": _new_index, "rebuild": _rebuild}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    base = yaml.safe_load(DOMAIN.read_text())
+    domain = DomainLoader(DOMAIN).load()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        seed = root / "seed.db"
+        conn = sqlite3.connect(seed)
+        conn.executescript(
+            render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+        )
+        with conn:
+            conn.execute('INSERT INTO "comanda" (id, status) VALUES (\'c-1\', \'open\')')
+            conn.executemany(
+                'INSERT INTO "order" (comanda_id, origin, status)'
+                " VALUES ('c-1', 'table', 'open')",
+                [()] * (args.rows // 4 + 1),
+            )
+            conn.executemany(
+                'INSERT INTO "item" (name, item_type) VALUES (?, \'dish\')',
+                [(f"item-{n}",) for n in range(250)],
+            )
+            conn.executemany(
+                'INSERT INTO "order_item"'
+                " (order_id, item_id, quantity, unit_price_cents, total_cents)"
+                " VALUES (:order_id, :item_id, :quantity, :unit_price_cents, :total_cents)",
+                _rows(args.rows),
+            )
+        conn.close()
+
+        print(f"{args.rows} order_item rows")
+        print(f"{'edit':<12}{'plan':>10}{'apply ms':>10}")
+        for name, edit in EDITS.items():
+            data = copy.deepcopy(base)
+            edit(data["botecopro_domain"]["entities"]["OrderItem"])
+            target_path = root / f"{name.replace(' ', '_')}.yaml"
+            target_path.write_text(yaml.safe_dump(data, sort_keys=False))
+            target = DomainLoader(target_path, cache=False).load()
+
+            database = root / f"{name.replace(' ', '_')}.db"
+            shutil.copy(seed, database)
+            conn = sqlite3.connect(database)
+            migration = plan_migration(read_schema(conn), target)
+            kind = migration.tables[0].action if migration.tables else "index"
+            start = time.perf_counter()
+            migration.apply(conn)
+            elapsed = time.perf_counter() - start
+            conn.close()
+            print(f"{name:<12}{kind:>10}{elapsed * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
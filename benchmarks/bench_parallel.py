@@ -0,0 +1,52 @@
+"""Compare serial and parallel ``generate()`` on a synthetic 1,000-entity domain.
+
+Usage: ``python benchmarks/bench_parallel.py [--entities 1000] [--jobs 1 2 4 8]``
+"""
+from __future__ import annotations
+
+import argparse
+import filecmp
+import tempfile
+import time
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+from synthetic import write_domain
+
+
+def _identical(left: Path, right: Path) -> bool:
+    comparison = filecmp.dircmp(left, right)
+    if comparison.left_only or comparison.right_only or comparison.diff_files:
+        return False
+    return all(
+        _identical(left / sub, right / sub) for sub in comparison.common_dirs
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=1000)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        domain_path = write_domain(root / "domain.yaml", args.entities)
+        baseline = None
+        print(f"{'jobs':>4}  {'seconds':>8}  {'speedup':>7}  identical")
+        for jobs in args.jobs:
+            out = root / f"out-{jobs}"
+            start = time.perf_counter()
+            generate(domain_path, out, incremental=False, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline = (elapsed, out)
+            same = _identical(baseline[1] / "python", out / "python") and _identical(
+                baseline[1] / "sql", out / "sql"
+            )
+            print(f"{jobs:>4}  {elapsed:>8.3f}  {baseline[0] / elapsed:>7.2f}  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Read throughput and memory of generated records versus ORM objects.
+
+Loads ``Comanda`` rows (enum, UUID and datetime columns) through the bulk
+repository, then reads all of them back three ways: plain ``sqlite3``
+tuples, the generated ``ComandaRecord`` row factory, and the ORM model.
+Memory is what ``tracemalloc`` still sees allocated while the result list
+is alive, divided by the row count.
+
+Usage: ``python benchmarks/bench_records.py [--rows 50000]``
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import importlib
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN, _database, _import_package
+
+
+def _measure(load, runs: int = 3):
+    """Best wall time of ``runs`` loads plus bytes held by one loaded result."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = load()
+        best = min(best, time.perf_counter() - start)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = load()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return best, held, len(result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        models = _import_package(root / "out" / "python")
+        comandas = importlib.import_module(f"{models.__name__}.repositories.comanda")
+        database = root / "records.db"
+        conn = _database(root / "out" / "sql", database)
+        opened = datetime(2024, 1, 1, 18)
+        with conn:
+            comandas.insert_many(
+                conn,
+                (
+                    {
+                        "id": uuid.uuid4(),
+                        "status": ("open", "closed", "cancelled")[n % 3],
+                        "opened_at": opened + timedelta(minutes=n),
+                        "total_cents": n % 9000,
+                        "last_modified": opened + timedelta(minutes=n),
+                    }
+                    for n in range(args.rows)
+                ),
+            )
+
+        engine = create_engine(f"sqlite:///{database}")
+
+        def orm_load():
+            with Session(engine) as session:
+                return session.scalars(select(models.Comanda)).all()
+
+        results = {
+            "tuples": _measure(lambda: conn.execute(comandas.SELECT_SQL).fetchall()),
+            "records": _measure(lambda: comandas.fetch_all(conn)),
+            "orm": _measure(orm_load),
+        }
+        conn.close()
+        engine.dispose()
+
+    print(f"{args.rows} Comanda rows")
+    print(f"{'path':<8}{'rows/s':>12}{'bytes/row':>11}")
+    for name, (seconds, held, count) in results.items():
+        print(f"{name:<8}{count / seconds:>12,.0f}{held / count:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
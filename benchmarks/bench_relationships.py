@@ -0,0 +1,115 @@
+"""Statements and time to load an order screen, lazy defaults versus ``relations.yaml``.
+
+The screen walks one comanda's orders with their items and menu items, the
+kitchen tickets of each order with their items, and the payments with their
+splits. With the generated defaults every collection is loaded on access,
+one ``SELECT`` per parent row; ``db-meta/relations.yaml`` loads them with
+``selectin`` (and menu items ``joined``), so the count stays flat.
+
+Usage: ``python benchmarks/bench_relationships.py [--orders 2 8 32 128] [--repeat 50]``
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN, _database, _import_package
+
+RELATIONS = DOMAIN.parents[1] / "relations.yaml"
+
+
+def _fill(conn, orders: int) -> str:
+    conn.execute("INSERT INTO item (id, name, item_type) VALUES (1, 'Chopp', 'drink')")
+    conn.execute("INSERT INTO item (id, name, item_type) VALUES (2, 'Pastel', 'dish')")
+    key = str(uuid.uuid4())
+    conn.execute("INSERT INTO comanda (id, status) VALUES (?, 'open')", (key,))
+    payment = conn.execute(
+        "INSERT INTO payment (comanda_id, method, amount_cents) VALUES (?, 'pix', 1800)", (key,)
+    ).lastrowid
+    conn.execute("INSERT INTO payment_split (payment_id, amount_cents) VALUES (?, 900)", (payment,))
+    for _ in range(orders):
+        order = conn.execute(
+            "INSERT INTO \"order\" (comanda_id, origin, status) VALUES (?, 'table', 'open')",
+            (key,),
+        ).lastrowid
+        ticket = conn.execute(
+            "INSERT INTO kitchen_ticket (order_id, status) VALUES (?, 'new')", (order,)
+        ).lastrowid
+        for item in (1, 1, 2):
+            line = conn.execute(
+                "INSERT INTO order_item (order_id, item_id, quantity, unit_price_cents)"
+                " VALUES (?, ?, 1, 900)",
+                (order, item),
+            ).lastrowid
+            conn.execute(
+                "INSERT INTO kitchen_ticket_item (ticket_id, order_item_id) VALUES (?, ?)",
+                (ticket, line),
+            )
+    conn.commit()
+    return key
+
+
+def _screen(comanda, names) -> list:
+    order_items, ticket_items, splits = names
+    lines = []
+    for order in comanda.orders:
+        lines += [(line.item.name, line.quantity) for line in getattr(order, order_items)]
+        for ticket in order.kitchen_tickets:
+            lines += [line.order_item_id for line in getattr(ticket, ticket_items)]
+    for payment in comanda.payments:
+        lines += [split.amount_cents for split in getattr(payment, splits)]
+    return lines
+
+
+def bench(root: Path, sources, name: str, names, orders: int, repeat: int):
+    output_dir = root / name
+    generate(sources, output_dir, incremental=False)
+    models = _import_package(output_dir / "python", f"bench_{name}")
+    engine_module = importlib.import_module(f"{models.__name__}.engine")
+    testing = importlib.import_module(f"{models.__name__}.testing")
+    database = root / f"{name}-{orders}.db"
+    key = _fill(_database(output_dir / "sql", database), orders)
+    engine = engine_module.create_engine(database)
+    Session = engine_module.session_factory(engine)
+    with Session() as session:
+        with testing.count_statements(session) as log:
+            _screen(session.get(models.Comanda, key), names)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with Session() as session:
+            _screen(session.get(models.Comanda, key), names)
+    seconds = (time.perf_counter() - started) / repeat
+    engine.dispose()
+    return len(log), seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=[2, 8, 32, 128])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    variants = (
+        ("lazy", [DOMAIN], ("order_items", "kitchen_ticket_items", "payment_splits")),
+        ("relations", [DOMAIN, RELATIONS], ("items", "items", "splits")),
+    )
+    print(f"{'orders':>7}{'lazy stmts':>12}{'ms':>9}{'relations stmts':>17}{'ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for orders in args.orders:
+            row = f"{orders:>7}"
+            for name, sources, names in variants:
+                statements, seconds = bench(
+                    Path(tmp), sources, f"{name}_{orders}", names, orders, args.repeat
+                )
+                row += f"{statements:>{12 if name == 'lazy' else 17},}{seconds * 1000:>9.2f}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
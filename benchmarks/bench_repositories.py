@@ -0,0 +1,136 @@
+"""Generated bulk repositories versus the ORM unit of work for ``OrderItem`` rows.
+
+Both paths write the same rows into a file database created from the
+generated DDL, read them back by primary key and delete them again.
+
+Usage: ``python benchmarks/bench_repositories.py [--rows 100000]``
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+ROOT = Path(__file__).resolve().parents[1]
+DOMAIN = ROOT / "db-meta" / "tables" / "001_domain.yaml"
+
+
+def _import_package(python_dir: Path, name: str = "bench_models"):
+    spec = importlib.util.spec_from_file_location(
+        name, python_dir / "__init__.py", submodule_search_locations=[str(python_dir)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _rows(count: int) -> list:
+    return [
+        {
+            "order_id": n // 4 + 1,
+            "item_id": n % 250 + 1,
+            "quantity": n % 3 + 1,
+            "unit_price_cents": 1200 + n % 500,
+            "total_cents": 1200 + n % 500,
+        }
+        for n in range(count)
+    ]
+
+
+def _database(sql_dir: Path, path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript((sql_dir / "schema.sql").read_text())
+    return conn
+
+
+def _timed(label: str, results: dict, func) -> None:
+    start = time.perf_counter()
+    func()
+    results[label] = time.perf_counter() - start
+
+
+def bench_repository(models, sql_dir: Path, path: Path, rows: list) -> dict:
+    repo = importlib.import_module(f"{models.__name__}.repositories.order_item")
+    conn = _database(sql_dir, path)
+    keys = range(1, len(rows) + 1)
+    results: dict = {}
+
+    def insert() -> None:
+        with conn:
+            repo.insert_many(conn, rows)
+
+    def delete() -> None:
+        with conn:
+            repo.delete_many(conn, keys)
+
+    _timed("insert", results, insert)
+    _timed("get", results, lambda: repo.get_many(conn, keys))
+    _timed("delete", results, delete)
+    conn.close()
+    return results
+
+
+def bench_orm(models, sql_dir: Path, path: Path, rows: list) -> dict:
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+
+    _database(sql_dir, path).close()
+    engine = create_engine(f"sqlite:///{path}")
+    order_item = models.OrderItem
+    keys = list(range(1, len(rows) + 1))
+    results: dict = {}
+
+    def insert() -> None:
+        with Session(engine) as session:
+            session.add_all(order_item(**row) for row in rows)
+            session.commit()
+
+    def get() -> None:
+        with Session(engine) as session:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                session.scalars(select(order_item).where(order_item.id.in_(chunk))).all()
+
+    def delete() -> None:
+        with Session(engine) as session:
+            for item in session.scalars(select(order_item)):
+                session.delete(item)
+            session.commit()
+
+    _timed("insert", results, insert)
+    _timed("get", results, get)
+    _timed("delete", results, delete)
+    engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        models = _import_package(root / "out" / "python")
+        rows = _rows(args.rows)
+        sql_dir = root / "out" / "sql"
+        orm = bench_orm(models, sql_dir, root / "orm.db", rows)
+        bulk = bench_repository(models, sql_dir, root / "bulk.db", rows)
+
+    print(f"{args.rows} OrderItem rows")
+    print(f"{'step':<8}{'orm s':>9}{'bulk s':>9}{'speedup':>9}")
+    for step in ("insert", "get", "delete"):
+        print(f"{step:<8}{orm[step]:>9.3f}{bulk[step]:>9.3f}{orm[step] / bulk[step]:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
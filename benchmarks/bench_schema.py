@@ -0,0 +1,57 @@
+"""Provisioning a fresh database: per-table scripts versus the schema bundle.
+
+``per-table`` runs every ``sql/<table>.sql`` in name order, so each
+``CREATE`` statement commits on its own; ``bundle`` runs ``sql/schema.sql``,
+one ``BEGIN ... COMMIT``. Each database is a new file on disk.
+
+Usage: ``python benchmarks/bench_schema.py [--runs 20]``
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN
+
+
+def _best(runs: int, root: Path, name: str, scripts) -> float:
+    best = float("inf")
+    for run in range(runs):
+        conn = sqlite3.connect(root / f"{name}-{run}.db")
+        start = time.perf_counter()
+        for script in scripts:
+            conn.executescript(script)
+        best = min(best, time.perf_counter() - start)
+        conn.close()
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        sql_dir = root / "out" / "sql"
+        tables = [
+            path.read_text() for path in sorted(sql_dir.glob("*.sql")) if path.name != "schema.sql"
+        ]
+        timings = {
+            "per-table": _best(args.runs, root, "per-table", tables),
+            "bundle": _best(args.runs, root, "bundle", [(sql_dir / "schema.sql").read_text()]),
+        }
+
+    print(f"{len(tables)} tables, best of {args.runs} runs")
+    for name, seconds in timings.items():
+        print(f"{name:<10}{seconds * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
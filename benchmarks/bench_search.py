@@ -0,0 +1,129 @@
+"""Counter lookups on a product catalogue: ``LIKE '%...%'`` versus the FTS5 index.
+
+A catalogue of ``--rows`` products with names drawn from a small
+vocabulary is loaded twice, once with the full-text triggers dropped, to
+time what maintaining the index costs on insert. Each lookup is then
+typed one keystroke at a time and every prefix is queried:
+
+* ``like`` - ``name LIKE '%word%'`` for every typed word, first 20 by name;
+* ``fts all`` - :func:`search.search` ranking every match by bm25;
+* ``fts`` - :func:`search.search` with its default bound of 1000 ranked
+  candidates, which only matters for broad prefixes such as ``ca``.
+
+Latencies are reported per keystroke as the median and 95th percentile,
+together with the time :func:`search.rebuild` takes on the full table.
+
+Usage: ``python benchmarks/bench_search.py [--rows 500000]``
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN, _database, _import_package
+
+KINDS = [
+    "Cerveja", "Chopp", "Cachaça", "Vinho", "Suco", "Refrigerante", "Água", "Porção",
+    "Pastel", "Bolinho", "Caipirinha", "Drink", "Petisco", "Espeto", "Torresmo", "Linguiça",
+]
+QUALIFIERS = [
+    "Pilsen", "IPA", "Weiss", "Artesanal", "Ouro", "Prata", "Tinto", "Branco", "Laranja",
+    "Limão", "Maracujá", "Queijo", "Carne", "Frango", "Calabresa", "Mandioca", "Mineira",
+    "Gelada", "Premium", "Especial", "Long Neck", "Lata", "Garrafa", "Dose", "Jarra",
+]
+# Lookups typed at the counter, from common to rare words.
+LOOKUPS = ["cerveja ipa", "caipirinha limao", "bolinho queijo", "maracuja", "torresmo 17"]
+
+
+def _catalogue(rows: int) -> list:
+    rng = random.Random(0)
+    return [
+        (
+            f"{rng.choice(KINDS)} {rng.choice(QUALIFIERS)} {rng.choice(QUALIFIERS)} {n}",
+            rng.choice(["", "garrafa 600ml", "porção para dois", "dose 50ml"]) or None,
+        )
+        for n in range(rows)
+    ]
+
+
+def _load(conn, catalogue: list) -> float:
+    start = time.perf_counter()
+    with conn:
+        conn.executemany('INSERT INTO "product" ("name", "description") VALUES (?, ?)', catalogue)
+    return time.perf_counter() - start
+
+
+def _keystrokes() -> list:
+    return [lookup[:end] for lookup in LOOKUPS for end in range(2, len(lookup) + 1)]
+
+
+def _like(conn, text: str) -> list:
+    words = text.split()
+    where = " AND ".join('"name" LIKE ?' for _ in words)
+    return conn.execute(
+        f'SELECT "id", "name", "description" FROM "product" WHERE {where}'
+        ' ORDER BY "name" LIMIT 20',
+        [f"%{word}%" for word in words],
+    ).fetchall()
+
+
+def _latencies(query, texts: list) -> list:
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        query(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        models = _import_package(root / "out" / "python")
+        search = importlib.import_module(f"{models.__name__}.search")
+        sql_dir = root / "out" / "sql"
+        catalogue = _catalogue(args.rows)
+
+        plain = _database(sql_dir, root / "plain.db")
+        for name in ("insert", "update", "delete"):
+            plain.execute(f"DROP TRIGGER trg_product_search_{name}")
+        load_plain = _load(plain, catalogue)
+        plain.close()
+
+        conn = _database(sql_dir, root / "search.db")
+        load_indexed = _load(conn, catalogue)
+        texts = _keystrokes()
+        like = _latencies(lambda text: _like(conn, text), texts)
+        exhaustive = _latencies(
+            lambda text: search.search(conn, "product", text, candidates=args.rows), texts
+        )
+        fts = _latencies(lambda text: search.search(conn, "product", text), texts)
+        start = time.perf_counter()
+        with conn:
+            search.rebuild(conn, ["product"])
+        rebuild = time.perf_counter() - start
+        conn.close()
+
+    print(f"{args.rows:,} products, {len(texts)} keystrokes over {len(LOOKUPS)} lookups")
+    print(f"load without index {load_plain:.2f} s, with index {load_indexed:.2f} s")
+    print(f"rebuild {rebuild:.2f} s")
+    print(f"{'query':<8}{'median ms':>11}{'p95 ms':>9}{'max ms':>9}")
+    for name, timings in (("like", like), ("fts all", exhaustive), ("fts", fts)):
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        print(f"{name:<8}{statistics.median(timings):>11.2f}{p95:>9.2f}{max(timings):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
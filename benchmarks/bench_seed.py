@@ -0,0 +1,64 @@
+"""Synthetic data: seeding throughput and peak Python memory by scale.
+
+The domain schema is created in a fresh database file per scale and
+:func:`seeding.seed` fills it, once timed and once under ``tracemalloc``
+(which slows it down several times) for the peak Python memory. The peak
+follows ``--batch-size``, not the scale: rows are generated lazily and
+only one batch is held at a time.
+
+Usage: ``python benchmarks/bench_seed.py [--scales 1000 10000 50000] [--batch-size 10000]``
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from botecopro_meta.generator import DomainLoader, deferred_columns, render_schema_content
+from botecopro_meta.seeding import seed
+
+from bench_repositories import DOMAIN
+
+
+def _run(path: Path, scale: int, batch_size: int, traced: bool) -> tuple:
+    domain = DomainLoader(DOMAIN).load()
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.executescript(
+        render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+    )
+    conn.execute("PRAGMA synchronous = OFF")
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    written = seed(conn, domain, scale, batch_size=batch_size)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if traced else 0
+    tracemalloc.stop()
+    conn.close()
+    path.unlink()
+    return sum(written.values()), seconds, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'scale':>8}{'rows':>12}{'s':>8}{'rows/s':>10}{'peak MiB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            path = Path(tmp) / "seed.db"
+            rows, seconds, _ = _run(path, scale, args.batch_size, traced=False)
+            peak = _run(path, scale, args.batch_size, traced=True)[2]
+            print(
+                f"{scale:>8,}{rows:>12,}{seconds:>8.1f}{rows / seconds:>10,.0f}"
+                f"{peak / 2**20:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
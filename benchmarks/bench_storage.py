@@ -0,0 +1,122 @@
+"""On-disk size of order-heavy data under each SQLite storage profile.
+
+Generates the DDL for every profile, loads the same synthetic comandas,
+orders, order items and item/product links into a fresh database per profile
+and reports table and index bytes from the ``dbstat`` virtual table.
+
+Usage: ``python benchmarks/bench_storage.py [--comandas 20000]``
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+from botecopro_meta.storage import PROFILES
+
+ROOT = Path(__file__).resolve().parents[1]
+DOMAIN = ROOT / "db-meta" / "tables" / "001_domain.yaml"
+EPOCH = datetime(1970, 1, 1)
+TABLES = ("comanda", "order", "order_item", "item_product")
+
+
+def _encoders(profile):
+    if profile.uuid == "blob":
+        encode_uuid = lambda value: value.bytes  # noqa: E731
+    else:
+        encode_uuid = str
+    if profile.datetime == "epoch":
+        encode_dt = lambda value: (value - EPOCH) // timedelta(milliseconds=1)  # noqa: E731
+    else:
+        encode_dt = lambda value: value.isoformat(sep=" ")  # noqa: E731
+    return encode_uuid, encode_dt
+
+
+def _load(conn: sqlite3.Connection, profile, comandas: int, seed: int) -> None:
+    rng = random.Random(seed)
+    encode_uuid, encode_dt = _encoders(profile)
+    start = datetime(2024, 1, 1)
+    order_id = 0
+    with conn:
+        for _ in range(comandas):
+            comanda_id = encode_uuid(uuid.UUID(int=rng.getrandbits(128), version=4))
+            opened = start + timedelta(seconds=rng.randrange(365 * 86400))
+            conn.execute(
+                'INSERT INTO "comanda" (id, status, opened_at, closed_at, total_cents,'
+                " last_modified) VALUES (?, 'closed', ?, ?, ?, ?)",
+                (
+                    comanda_id,
+                    encode_dt(opened),
+                    encode_dt(opened + timedelta(hours=2)),
+                    rng.randrange(1000, 50000),
+                    encode_dt(opened + timedelta(hours=2)),
+                ),
+            )
+            for _ in range(rng.randint(1, 3)):
+                order_id += 1
+                created = encode_dt(opened + timedelta(minutes=rng.randrange(120)))
+                conn.execute(
+                    'INSERT INTO "order" (id, comanda_id, origin, status, created_at,'
+                    " last_modified) VALUES (?, ?, 'table', 'delivered', ?, ?)",
+                    (order_id, comanda_id, created, created),
+                )
+                conn.executemany(
+                    'INSERT INTO "order_item" (order_id, item_id, quantity,'
+                    " unit_price_cents, total_cents, last_modified)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (order_id, rng.randrange(1, 500), 1, 1200, 1200, created)
+                        for _ in range(rng.randint(1, 5))
+                    ],
+                )
+        conn.executemany(
+            'INSERT INTO "item_product" (item_id, product_id, quantity) VALUES (?, ?, ?)',
+            [(item, product, 1.0) for item in range(1, 501) for product in range(1, 21)],
+        )
+
+
+def _sizes(conn: sqlite3.Connection) -> dict:
+    rows = conn.execute(
+        "SELECT s.name, m.type, m.tbl_name, SUM(s.pgsize)"
+        " FROM dbstat AS s JOIN sqlite_schema AS m ON m.name = s.name"
+        " GROUP BY s.name"
+    ).fetchall()
+    sizes = {table: {"table": 0, "indexes": 0} for table in TABLES}
+    for _, kind, table, size in rows:
+        if table in sizes:
+            sizes[table]["table" if kind == "table" else "indexes"] += size
+    return sizes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comandas", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        print(f"{'profile':<10}{'table':<14}{'data KiB':>10}{'index KiB':>11}")
+        for name, profile in PROFILES.items():
+            output_dir = root / name
+            generate(DOMAIN, output_dir, incremental=False, storage=name)
+            conn = sqlite3.connect(root / f"{name}.db")
+            conn.executescript((output_dir / "sql" / "schema.sql").read_text())
+            _load(conn, profile, args.comandas, args.seed)
+            conn.execute("VACUUM")
+            for table, size in _sizes(conn).items():
+                print(
+                    f"{name:<10}{table:<14}{size['table'] / 1024:>10.0f}"
+                    f"{size['indexes'] / 1024:>11.0f}"
+                )
+            print(f"{name:<10}{'file':<14}{(root / f'{name}.db').stat().st_size / 1024:>10.0f}")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Shipping a day's edits to a peer: whole-table resend versus delta sync.
+
+A tablet holds ``--rows`` products already mirrored on the counter, then
+edits ``--edited`` of them. The two strategies bring the counter up to date:
+
+* ``full`` - read every row and upsert all of them on the counter;
+* ``delta`` - :func:`sync.changes` streams only the dirty rows in keyset
+  batches, :func:`sync.apply_changes` upserts them (last writer wins) and
+  :func:`sync.acknowledge` clears the dirty flags on the tablet.
+
+Payload bytes are the JSON encoding of the rows that would go over the wire.
+
+Usage: ``python benchmarks/bench_sync.py [--rows 100000] [--edited 1000]``
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+
+from bench_repositories import DOMAIN, _database, _import_package
+
+STAMP = "2024-01-01 08:00:00.000000"
+
+
+def _devices(sql_dir: Path, root: Path, rows: int, edited: int, sync):
+    """A tablet with ``edited`` dirty products and a counter holding the clean copies."""
+    tablet = _database(sql_dir, root / "tablet.db")
+    counter = _database(sql_dir, root / "counter.db")
+    products = [
+        (n, f"product-{n}", f"description of product {n}", 100 + n % 900, STAMP)
+        for n in range(1, rows + 1)
+    ]
+    insert = (
+        'INSERT INTO "product" (id, name, description, cost_price_cents, last_modified)'
+        " VALUES (?, ?, ?, ?, ?)"
+    )
+    for conn in (tablet, counter):
+        with conn:
+            conn.executemany(insert, products)
+    with tablet:
+        tablet.executemany(
+            'UPDATE "product" SET cost_price_cents = cost_price_cents + 10 WHERE id = ?',
+            [(n,) for n in range(1, rows + 1, max(rows // edited, 1))][:edited],
+        )
+    return tablet, counter
+
+
+def _full(tablet: sqlite3.Connection, counter: sqlite3.Connection, sync) -> tuple:
+    spec = sync.TABLES["product"]
+    rows = tablet.execute(spec.select_sql.format("1").replace(" LIMIT ?", "")).fetchall()
+    with counter:
+        sync.apply_changes(counter, "product", rows)
+    return len(rows), len(json.dumps(rows))
+
+
+def _delta(tablet: sqlite3.Connection, counter: sqlite3.Connection, sync) -> tuple:
+    count = size = 0
+    for batch in sync.changes(tablet, "product"):
+        with counter:
+            sync.apply_changes(counter, "product", batch)
+        with tablet:
+            sync.acknowledge(tablet, "product", batch)
+        count += len(batch)
+        size += len(json.dumps(batch))
+    return count, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--edited", type=int, default=1_000)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(DOMAIN, root / "out", incremental=False)
+        models = _import_package(root / "out" / "python")
+        sync = importlib.import_module(f"{models.__name__}.sync")
+        for name, strategy in (("full", _full), ("delta", _delta)):
+            run = root / name
+            run.mkdir()
+            tablet, counter = _devices(root / "out" / "sql", run, args.rows, args.edited, sync)
+            start = time.perf_counter()
+            shipped, size = strategy(tablet, counter, sync)
+            results[name] = (time.perf_counter() - start, shipped, size)
+            tablet.close()
+            counter.close()
+
+    print(f"{args.rows:,} products, {args.edited:,} edited on the tablet")
+    print(f"{'strategy':<9}{'ms':>9}{'rows':>10}{'payload KiB':>13}")
+    for name, (seconds, shipped, size) in results.items():
+        print(f"{name:<9}{seconds * 1000:>9.1f}{shipped:>10,}{size / 1024:>13,.0f}")
+
+
+if __name__ == "__main__":
+    main()
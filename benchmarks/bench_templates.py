@@ -0,0 +1,68 @@
+"""Cold-start cost of one generation with and without the template bytecode cache.
+
+Each sample runs ``generate()`` in a fresh interpreter so the Jinja parse and
+compile step is paid again unless the on-disk bytecode cache is warm.
+
+Usage: ``python benchmarks/bench_templates.py [--runs 5]``
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DOMAIN = ROOT / "db-meta" / "tables" / "001_domain.yaml"
+
+SCRIPT = """
+import time
+start = time.perf_counter()
+from pathlib import Path
+from botecopro_meta.generator import generate
+generate(Path({domain!r}), Path({out!r}), incremental=False)
+print(time.perf_counter() - start)
+"""
+
+
+def _run(cache_dir: Path, out: Path) -> float:
+    env = dict(os.environ, BOTECOPRO_META_CACHE_DIR=str(cache_dir))
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(ROOT / "src"), env.get("PYTHONPATH")])
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(domain=str(DOMAIN), out=str(out))],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        cold = [
+            _run(root / f"cold-{run}", root / f"out-cold-{run}") for run in range(args.runs)
+        ]
+        warm_cache = root / "warm"
+        _run(warm_cache, root / "prime")
+        warm = [_run(warm_cache, root / f"out-warm-{run}") for run in range(args.runs)]
+
+    cold_ms = statistics.median(cold) * 1000
+    warm_ms = statistics.median(warm) * 1000
+    print(f"cold (empty bytecode cache): {cold_ms:8.1f} ms")
+    print(f"warm (cached bytecode):      {warm_ms:8.1f} ms")
+    print(f"saved per cold start:        {cold_ms - warm_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
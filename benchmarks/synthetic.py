@@ -0,0 +1,132 @@
+"""Build synthetic BotecoPro-style domains for benchmarks."""
+from __future__ import annotations
+
+import random
+from fractions import Fraction
+from itertools import count, islice
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import yaml
+
+ENUMS = {
+    "SyntheticStatus": ["open", "closed", "cancelled"],
+    "SyntheticKind": ["dish", "drink", "article"],
+}
+
+SCALAR_TYPES = ["int", "string", "float", "bool", "timestamp", "money_cents"]
+
+
+def _spread(shares: Dict[str, float]) -> Iterator[str]:
+    """Endless slots, each a key of ``shares`` or ``""``, spread evenly.
+
+    A key claims a slot whenever its running total reaches a whole one, so a
+    share of 0.2 takes slots 4, 9, 14 ... Claims landing on a taken slot
+    wait for the next free one. The pattern never depends on the seed, and
+    small shares still show up when the slots run across many entities.
+    """
+    steps = {key: Fraction(share).limit_denominator(1000) for key, share in shares.items()}
+    pending: List[str] = []
+    for slot in count():
+        for key, step in steps.items():
+            if int((slot + 1) * step) > int(slot * step):
+                pending.append(key)
+        yield pending.pop(0) if pending else ""
+
+
+def build_domain(
+    entities: int,
+    attributes: int = 8,
+    seed: int = 0,
+    *,
+    relations: float = 0.0,
+    enums: float = 0.2,
+    decimals: float = 0.0,
+    composite: float = 0.0,
+) -> Dict:
+    """Return a domain mapping with ``entities`` entities of ``attributes`` columns.
+
+    Every entity after the first relates to a random earlier one through
+    ``parent_id``. Across the remaining attributes of the whole domain, the
+    ``relations``, ``enums`` and ``decimals`` shares become extra relations,
+    enums and decimals, and the rest cycle through the scalar types. A
+    ``composite`` share of the entities after the first is keyed by
+    ``(parent_id, line)`` instead of ``id``; relations only ever target
+    entities keyed by ``id``.
+    """
+    rng = random.Random(seed)
+    shares = {"relation": relations, "enum": enums, "decimal": decimals}
+    columns = _spread({kind: share for kind, share in shares.items() if share})
+    keys = _spread({"composite": composite})
+    scalars = count()
+    raw_entities: Dict[str, Dict] = {}
+    targets: List[str] = []
+    for index in range(entities):
+        name = f"Entity{index:05d}"
+        is_composite = bool(index and next(keys))
+        attrs: Dict[str, Dict] = {}
+        if not is_composite:
+            attrs["id"] = {"type": "int", "primary_key": True, "autoincrement": True}
+        if index:
+            attrs["parent_id"] = {
+                "type": "relation",
+                "target": rng.choice(targets),
+                "target_field": "id",
+                "nullable": not is_composite,
+            }
+        if is_composite:
+            attrs["parent_id"]["primary_key"] = True
+            attrs["line"] = {"type": "int", "primary_key": True}
+        for column, kind in enumerate(islice(columns, max(0, attributes - len(attrs)))):
+            if kind == "enum":
+                attrs[f"status_{column}"] = {
+                    "type": "enum",
+                    "enum": rng.choice(sorted(ENUMS)),
+                    "nullable": False,
+                }
+            elif kind == "relation" and targets:
+                attrs[f"ref_{column}"] = {
+                    "type": "relation",
+                    "target": rng.choice(targets),
+                    "target_field": "id",
+                    "nullable": True,
+                }
+            elif kind == "decimal":
+                attrs[f"amount_{column}"] = {
+                    "type": "decimal",
+                    "precision": 12,
+                    "scale": 2,
+                    "nullable": True,
+                }
+            else:
+                attrs[f"field_{column}"] = {
+                    "type": SCALAR_TYPES[next(scalars) % len(SCALAR_TYPES)],
+                    "nullable": True,
+                }
+        raw_entities[name] = {
+            "storage": {"table": f"entity_{index:05d}"},
+            "attributes": attrs,
+            "methods": [],
+        }
+        if not is_composite:
+            targets.append(name)
+    return {
+        "synthetic_domain": {
+            "version": 1.0,
+            "types": {
+                "money_cents": {"base": "int"},
+                "timestamp": {"base": "datetime"},
+            },
+            "enums": ENUMS,
+            "entities": raw_entities,
+        }
+    }
+
+
+def write_domain(
+    path: Path, entities: int, attributes: int = 8, seed: int = 0, **shares: float
+) -> Path:
+    """Write :func:`build_domain` to ``path``; ``shares`` are its keyword options."""
+    domain = build_domain(entities, attributes, seed, **shares)
+    path.write_text(yaml.safe_dump(domain, sort_keys=False))
+    return path
@@ -0,0 +1,393 @@
+"""Hot/cold archival of closed object graphs into an attached database.
+
+The domain's ``retention`` section names root entities and when their rows
+have served their purpose on the device::
+
+    retention:
+      Comanda:
+        where: "status IN ('closed', 'cancelled')"
+        age: closed_at          # datetime column of the root
+        days: 90
+        detach: [StockMovement]
+        batch_size: 500         # roots per transaction
+
+Each root takes along every row that references it down the foreign keys
+(``Comanda`` -> ``Order``, ``Invoice``, ``Payment`` -> ``OrderItem``, ...),
+so a graph leaves the hot tables whole and foreign keys stay satisfied.
+Entities whose rows must stay hot although they point into the graph are
+listed under ``detach``: their relation has to be nullable and is cleared
+when the graph moves. A member feeding a derived column outside the graph
+(``StockMovement`` -> ``product.stock_current``) would change that column
+when deleted, so it has to be detached; append-only entities cannot be
+archived at all.
+
+The generator emits ``sql/archive.sql``, the archive tables (same columns
+and keys, no foreign keys or triggers) for a database attached as
+``archive`` plus a TEMP ``<table>_all`` view per archived table for
+reporting over hot and archived rows, and the ``archive`` module running
+the job in batches.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from types import ModuleType
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .ddl import column_definition, table_options
+from .metamodel import DomainDefinition, DomainIndex, EntityDefinition, RetentionDefinition
+
+SCHEMA = "archive"
+BATCH_SIZE = 500
+VIEW_SUFFIX = "_all"
+
+_OPTIONS = ("where", "age", "days", "detach", "batch_size")
+
+
+def _positive(value: object) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def _graph(
+    root: EntityDefinition, detach: Sequence[str], index: DomainIndex
+) -> Tuple[str, ...]:
+    """Entities moved with ``root``, in foreign key order, root first."""
+    members = {root.name}
+    pending = [root.name]
+    while pending:
+        parent = index.entities[pending.pop(0)]
+        for ref in index.referenced_by[parent.name]:
+            where = f"{root.name}: {ref.entity}.{ref.attribute}"
+            if ref.entity == parent.name:
+                raise ValueError(f"{where} references its own table, which cannot be archived")
+            key = parent.primary_key
+            if len(key) != 1 or ref.target_field != key[0].name:
+                raise ValueError(f"{where} must reference the single primary key of {parent.name}")
+            if ref.entity in detach:
+                if not index.attributes[(ref.entity, ref.attribute)].nullable:
+                    raise ValueError(f"{where} must be nullable to be detached")
+                continue
+            if ref.entity not in members:
+                members.add(ref.entity)
+                pending.append(ref.entity)
+    order = tuple(entity.name for entity in index.fk_order if entity.name in members)
+    if order[0] != root.name:
+        raise ValueError(f"{root.name}: the archived graph has a foreign key cycle")
+    return order
+
+
+def resolve_retention(
+    raw: Dict, entities: Tuple[EntityDefinition, ...]
+) -> Tuple[RetentionDefinition, ...]:
+    """Retention rules of the ``retention`` section with the graph each one moves."""
+    index = DomainIndex(entities)
+    rules = []
+    for name, details in (raw or {}).items():
+        details = details or {}
+        root = index.entities.get(name)
+        if root is None:
+            raise ValueError(f"retention: unknown entity {name!r}")
+        unknown = sorted(set(details) - set(_OPTIONS))
+        if unknown:
+            raise ValueError(f"{name}: unknown retention option {unknown[0]!r}")
+        age, days = details.get("age"), details.get("days")
+        if details.get("where") is None and age is None:
+            raise ValueError(f"{name}: retention needs where or age")
+        if (age is None) != (days is None):
+            raise ValueError(f"{name}: retention age and days go together")
+        if age is not None:
+            attr = index.attributes.get((name, age))
+            if attr is None or attr.base_type not in ("datetime", "timestamp"):
+                raise ValueError(f"{name}: retention age must be a datetime column, got {age!r}")
+            if not _positive(days):
+                raise ValueError(f"{name}: retention days must be a positive integer")
+        batch_size = details.get("batch_size", BATCH_SIZE)
+        if not _positive(batch_size):
+            raise ValueError(f"{name}: retention batch_size must be a positive integer")
+        detach = tuple(details.get("detach") or ())
+        for entity in detach:
+            if entity not in index.entities:
+                raise ValueError(f"{name}: cannot detach unknown entity {entity!r}")
+        members = _graph(root, detach, index)
+        for entity in detach:
+            if entity in members or not any(
+                ref.target in members for ref in index.references[entity]
+            ):
+                raise ValueError(f"{name}: {entity} does not reference the archived graph")
+            if index.entities[entity].append_only:
+                raise ValueError(f"{name}: {entity} is append-only and cannot be detached")
+        for member in members:
+            entity = index.entities[member]
+            if entity.append_only:
+                raise ValueError(f"{name}: {member} is append-only and cannot be archived")
+            if len(entity.primary_key) != 1:
+                raise ValueError(f"{name}: {member} needs a single-column primary key")
+            for derived in entity.feeds:
+                if index.tables[derived.table].name not in members:
+                    raise ValueError(
+                        f"{name}: {member} feeds {derived.table}.{derived.column} outside"
+                        " the archived graph; list it under detach"
+                    )
+        rules.append(
+            RetentionDefinition(
+                root=name,
+                members=members,
+                where=details.get("where"),
+                age=age,
+                days=days,
+                detach=detach,
+                batch_size=batch_size,
+            )
+        )
+    return tuple(rules)
+
+
+def retained_entities(domain: DomainDefinition) -> List[EntityDefinition]:
+    """Entities archived or detached by a retention rule, in foreign key order."""
+    names = {name for rule in domain.retention for name in (*rule.members, *rule.detach)}
+    return [entity for entity in domain.fk_order() if entity.name in names]
+
+
+def _archived(
+    retention: Sequence[RetentionDefinition], entities: Sequence[EntityDefinition]
+) -> List[EntityDefinition]:
+    names = {member for rule in retention for member in rule.members}
+    return [entity for entity in entities if entity.name in names]
+
+
+def _columns(entity: EntityDefinition) -> str:
+    return ", ".join(f'"{attr.name}"' for attr in entity.attributes)
+
+
+def archive_tables(
+    retention: Sequence[RetentionDefinition], entities: Sequence[EntityDefinition]
+) -> List[str]:
+    """``CREATE TABLE`` statements of the archive, one per archived table."""
+    statements = []
+    for entity in _archived(retention, entities):
+        pk_columns = [attr.name for attr in entity.primary_key]
+        # Archived keys are copied, never assigned, so AUTOINCREMENT has nothing to do.
+        columns = [
+            column_definition(attr, pk_columns).replace(" AUTOINCREMENT", "")
+            for attr in entity.attributes
+        ]
+        statements.append(
+            f'CREATE TABLE IF NOT EXISTS "{SCHEMA}"."{entity.table}" (\n  '
+            + ",\n  ".join(columns)
+            + f"\n){table_options(entity)};"
+        )
+    return statements
+
+
+def archive_indexes(
+    retention: Sequence[RetentionDefinition], entities: Sequence[EntityDefinition]
+) -> List[str]:
+    """Plain copies of the archived tables' indexes, for reporting.
+
+    Partial indexes serve hot-path filters (open comandas) and sync indexes
+    serve the delta sweep, neither of which reads the archive; uniqueness
+    was already enforced on the hot side.
+    """
+    statements = []
+    for entity in _archived(retention, entities):
+        for index in entity.indexes:
+            if index.where or index.origin == "sync":
+                continue
+            columns = ", ".join(f'"{column}"' for column in index.columns)
+            statements.append(
+                f'CREATE INDEX IF NOT EXISTS "{SCHEMA}"."{index.name}" '
+                f'ON "{entity.table}" ({columns});'
+            )
+    return statements
+
+
+def archive_views(
+    retention: Sequence[RetentionDefinition], entities: Sequence[EntityDefinition]
+) -> List[str]:
+    """TEMP views ``<table>_all``: hot rows followed by archived ones."""
+    return [
+        f'CREATE TEMP VIEW IF NOT EXISTS "{entity.table}{VIEW_SUFFIX}" AS'
+        f' SELECT {_columns(entity)} FROM main."{entity.table}"'
+        f' UNION ALL SELECT {_columns(entity)} FROM "{SCHEMA}"."{entity.table}";'
+        for entity in _archived(retention, entities)
+    ]
+
+
+@dataclass(frozen=True, slots=True)
+class ArchiveStep:
+    """One table of an archived graph and the statements moving its rows."""
+
+    table: str
+    keys: str  # temp table of the keys in the batch, with the root each belongs to
+    select_sql: str
+    dirty_sql: Optional[str]  # records roots holding unsynced rows of this table as skipped
+    copy_sql: str
+    uncopy_sql: str  # drops archive copies of rows that stay hot after all
+    delete_sql: str
+
+
+@dataclass(frozen=True, slots=True)
+class ArchiveJob:
+    """Statements of one retention rule in the generated ``archive`` module."""
+
+    name: str
+    table: str
+    days: Optional[int]
+    epoch: bool  # the age column is stored as epoch milliseconds
+    batch_size: int
+    setup_sql: Tuple[str, ...]
+    recheck_sql: str
+    skip_sql: str
+    steps: Tuple[ArchiveStep, ...]
+    detach_sql: Tuple[str, ...]
+
+
+def _keys(entity: EntityDefinition) -> str:
+    return f"_archive_{entity.table}"
+
+
+def _step(
+    entity: EntityDefinition, parents: List[Tuple[str, EntityDefinition]], skipped: str
+) -> ArchiveStep:
+    key = entity.primary_key[0].name
+    keys = f'temp."{_keys(entity)}"'
+    table = f'main."{entity.table}"'
+    selects = [
+        f'SELECT m."{key}", k."root" FROM temp."{_keys(parent)}" AS k'
+        f' JOIN {table} AS m ON m."{attribute}" = k."key"'
+        for attribute, parent in parents
+    ]
+    dirty = None
+    if entity.sync and entity.sync.dirty:
+        dirty = (
+            f'INSERT OR IGNORE INTO temp."{skipped}" ("key") SELECT k."root" FROM {keys} AS k'
+            f' JOIN {table} AS m ON m."{key}" = k."key" WHERE m."{entity.sync.dirty}" = 1'
+        )
+    return ArchiveStep(
+        table=entity.table,
+        keys=_keys(entity),
+        select_sql=f'INSERT OR IGNORE INTO {keys} ("key", "root") ' + " UNION ALL ".join(selects),
+        dirty_sql=dirty,
+        copy_sql=(
+            f'INSERT OR REPLACE INTO "{SCHEMA}"."{entity.table}" ({_columns(entity)})'
+            f' SELECT {_columns(entity)} FROM {table} WHERE "{key}" IN (SELECT "key" FROM {keys})'
+        ),
+        uncopy_sql=(
+            f'DELETE FROM "{SCHEMA}"."{entity.table}" WHERE "{key}" IN'
+            f' (SELECT "key" FROM temp."{_keys(entity)}_copied" EXCEPT SELECT "key" FROM {keys})'
+        ),
+        delete_sql=f'DELETE FROM {table} WHERE "{key}" IN (SELECT "key" FROM {keys})',
+    )
+
+
+def archive_jobs(
+    retention: Sequence[RetentionDefinition], entities: Sequence[EntityDefinition]
+) -> Tuple[ArchiveJob, ...]:
+    """Batch statements of every retention rule."""
+    index = DomainIndex(tuple(entities))
+    jobs = []
+    for rule in retention:
+        root = index.entities[rule.root]
+        members = [index.entities[name] for name in rule.members]
+        key = root.primary_key[0].name
+        skipped = f"{_keys(root)}_skipped"
+        conditions = []
+        if rule.where:
+            conditions.append(f"({rule.where})")
+        if rule.age:
+            conditions.append(f'"{rule.age}" < :cutoff')
+        if root.sync and root.sync.dirty:
+            conditions.append(f'"{root.sync.dirty}" = 0')
+        eligible = " AND ".join(conditions)
+        insert = f'INSERT INTO temp."{_keys(root)}" ("key", "root") SELECT "{key}", "{key}"'
+        # Dirty roots are never selected; skipped ones stay out until the next run.
+        steps = [
+            replace(
+                _step(root, [], skipped),
+                select_sql=(
+                    f'{insert} FROM main."{root.table}" WHERE {eligible}'
+                    f' AND "{key}" NOT IN (SELECT "key" FROM temp."{skipped}") LIMIT :batch_size'
+                ),
+                dirty_sql=None,
+            )
+        ]
+        for member in members[1:]:
+            parents = [
+                (ref.attribute, index.entities[ref.target])
+                for ref in index.references[member.name]
+                if ref.target in rule.members
+            ]
+            steps.append(_step(member, parents, skipped))
+        detach = []
+        for name in rule.detach:
+            for ref in index.references[name]:
+                if ref.target in rule.members:
+                    target = index.entities[ref.target]
+                    detach.append(
+                        f'UPDATE main."{index.entities[name].table}" SET "{ref.attribute}" = NULL'
+                        f' WHERE "{ref.attribute}" IN (SELECT "key" FROM temp."{_keys(target)}")'
+                    )
+        # Dropped rather than emptied: DDL does not open a transaction of its own.
+        setup = [
+            f'DROP TABLE IF EXISTS temp."{skipped}"',
+            f'CREATE TEMP TABLE "{skipped}" ("key" PRIMARY KEY)',
+        ]
+        for member in members:
+            setup.append(
+                f'CREATE TEMP TABLE IF NOT EXISTS "{_keys(member)}" ("key" PRIMARY KEY, "root")'
+            )
+            setup.append(
+                f'CREATE TEMP TABLE IF NOT EXISTS "{_keys(member)}_copied" ("key" PRIMARY KEY)'
+            )
+        age = index.attributes[(root.name, rule.age)] if rule.age else None
+        jobs.append(
+            ArchiveJob(
+                name=rule.root,
+                table=root.table,
+                days=rule.days,
+                epoch=age is not None and age.sqlalchemy_type == "column_types.EpochMillis",
+                batch_size=rule.batch_size,
+                setup_sql=tuple(setup),
+                recheck_sql=(
+                    f'{insert} FROM main."{root.table}" WHERE "{key}" IN'
+                    f' (SELECT "key" FROM temp."{_keys(root)}_copied") AND {eligible}'
+                ),
+                skip_sql=(
+                    f'DELETE FROM temp."{_keys(root)}" WHERE "key" IN'
+                    f' (SELECT "key" FROM temp."{skipped}")'
+                ),
+                steps=tuple(steps),
+                detach_sql=tuple(detach),
+            )
+        )
+    return tuple(jobs)
+
+
+def load_archive(domain: DomainDefinition) -> ModuleType:
+    """The generated ``archive`` module of ``domain``, executed from its rendered source."""
+    from .generator import render_archive_content, render_converters_content
+    from .validation import _module
+
+    if not domain.retention:
+        raise ValueError(f"{domain.name} declares no retention")
+    package = "_botecopro_archive"
+    _module(package)
+    _module(f"{package}.converters", render_converters_content())
+    return _module(
+        f"{package}.archive",
+        render_archive_content(domain.name, domain.retention, retained_entities(domain)),
+    )
+
+
+__all__ = [
+    "BATCH_SIZE",
+    "SCHEMA",
+    "ArchiveJob",
+    "ArchiveStep",
+    "archive_indexes",
+    "archive_jobs",
+    "archive_tables",
+    "archive_views",
+    "load_archive",
+    "resolve_retention",
+    "retained_entities",
+]
@@ -0,0 +1,27 @@
+"""Location of the on-disk caches shared by the loader and the generator."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+CACHE_DIR_ENV = "BOTECOPRO_META_CACHE_DIR"
+
+
+def cache_root() -> Path:
+    """Cache root: ``$BOTECOPRO_META_CACHE_DIR``, else the XDG cache directory."""
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return Path(override)
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg) if xdg else Path.home() / ".cache"
+    return base / "botecopro-meta"
+
+
+def cache_dir(*parts: str) -> Path:
+    """Return (and create) a sub-directory of the cache root."""
+    path = cache_root().joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+__all__ = ["CACHE_DIR_ENV", "cache_dir", "cache_root"]
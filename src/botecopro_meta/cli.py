@@ -0,0 +1,426 @@
+"""``botecopro-meta`` command line with one sub-command per tool."""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .generator import PROFILES, add_generate_arguments, generate
+
+
+def _generate(args: argparse.Namespace) -> None:
+    generate(
+        args.input,
+        args.out,
+        incremental=not args.force,
+        jobs=args.jobs,
+        storage=args.storage_profile,
+    )
+
+
+def _watch(args: argparse.Namespace) -> None:
+    from .watch import Watcher
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    Watcher(
+        args.input,
+        args.out,
+        jobs=args.jobs,
+        interval=args.interval,
+        storage=args.storage_profile,
+    ).run()
+
+
+def _migrate(args: argparse.Namespace) -> None:
+    import sqlite3
+
+    from .generator import DomainLoader
+    from .migrate import domain_schema, plan_migration, read_schema
+
+    if args.apply and args.database is None:
+        raise SystemExit("--apply needs --database")
+    domain = DomainLoader(args.to, storage=args.storage_profile).load()
+    conn = None
+    if args.database is not None:
+        conn = sqlite3.connect(args.database)
+        current = read_schema(conn)
+    else:
+        current = domain_schema(DomainLoader(args.source, storage=args.storage_profile).load())
+    try:
+        migration = plan_migration(current, domain)
+        if args.out is not None:
+            args.out.write_text(migration.script())
+        elif not args.apply:
+            sys.stdout.write(migration.script())
+        if args.apply:
+            migration.apply(conn)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _plans(args: argparse.Namespace) -> None:
+    from .generator import DomainLoader
+    from .plans import check_plans, format_report
+
+    domain = DomainLoader(args.input, storage=args.storage_profile).load()
+    results = check_plans(domain, rows=args.rows, repeat=args.repeat, entities=args.entity)
+    sys.stdout.write(format_report(results))
+    if any(result.failed for result in results):
+        raise SystemExit(1)
+
+
+def _seed(args: argparse.Namespace) -> None:
+    import sqlite3
+    import time
+
+    from .generator import DomainLoader, deferred_columns, render_schema_content
+    from .seeding import seed
+
+    domain = DomainLoader(args.input, storage=args.storage_profile).load()
+    conn = sqlite3.connect(args.database, isolation_level=None)
+    try:
+        conn.executescript(
+            render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+        )
+        # Rows can be regenerated, so the load does not wait for the disk.
+        conn.execute("PRAGMA synchronous = OFF")
+        started = time.perf_counter()
+        written = seed(
+            conn,
+            domain,
+            args.scale,
+            batch_size=args.batch_size,
+            random_seed=args.random_seed,
+        )
+        seconds = time.perf_counter() - started
+    finally:
+        conn.close()
+    for table, rows in written.items():
+        sys.stdout.write(f"{table:<24}{rows:>12,}\n")
+    total = sum(written.values())
+    sys.stdout.write(f"{total:,} rows in {seconds:.1f} s ({total / seconds:,.0f} rows/s)\n")
+
+
+def _import(args: argparse.Namespace) -> None:
+    import sqlite3
+    import time
+
+    from .generator import DomainLoader
+    from .validation import import_file
+
+    domain = DomainLoader(args.input, storage=args.storage_profile).load()
+    if args.entity not in domain.index.entities:
+        raise SystemExit(f"unknown entity {args.entity!r}")
+    rejects = args.rejects or args.file.with_name(args.file.name + ".rejected.jsonl")
+    conn = sqlite3.connect(args.database, isolation_level=None)
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+        started = time.perf_counter()
+        result = import_file(
+            conn,
+            domain,
+            args.entity,
+            args.file,
+            rejects_path=rejects,
+            chunk_size=args.chunk_size,
+            format=args.format,
+        )
+        seconds = time.perf_counter() - started
+    finally:
+        conn.close()
+    sys.stdout.write(
+        f"{result.read:,} rows read, {result.inserted:,} inserted, {result.rejected:,} rejected"
+        f" in {seconds:.1f} s ({result.read / max(seconds, 1e-9):,.0f} rows/s)\n"
+    )
+    if result.rejected:
+        sys.stdout.write(f"rejected rows written to {rejects}\n")
+
+
+def _reindex(args: argparse.Namespace) -> None:
+    import sqlite3
+    import time
+
+    from .generator import DomainLoader
+    from .search import reindex
+
+    domain = DomainLoader(args.input, storage=args.storage_profile).load()
+    for name in args.entity or ():
+        if name not in domain.index.entities:
+            raise SystemExit(f"unknown entity {name!r}")
+    conn = sqlite3.connect(args.database, isolation_level=None)
+    try:
+        started = time.perf_counter()
+        conn.execute("BEGIN")
+        try:
+            indexed = reindex(conn, domain, args.entity)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        seconds = time.perf_counter() - started
+    except ValueError as error:
+        raise SystemExit(str(error)) from None
+    finally:
+        conn.close()
+    for table, rows in indexed.items():
+        sys.stdout.write(f"{table:<24}{rows:>12,}\n")
+    sys.stdout.write(f"{len(indexed)} index(es) rebuilt in {seconds:.1f} s\n")
+
+
+def _archive(args: argparse.Namespace) -> None:
+    import sqlite3
+    import time
+
+    from .archive import load_archive
+    from .generator import DomainLoader
+
+    domain = DomainLoader(args.input, storage=args.storage_profile).load()
+    try:
+        module = load_archive(domain)
+    except ValueError as error:
+        raise SystemExit(str(error)) from None
+    for name in args.entity or ():
+        if name not in module.JOBS:
+            raise SystemExit(f"no retention rule for {name!r}")
+    conn = sqlite3.connect(args.database, isolation_level=None)
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+        module.attach(conn, args.archive)
+        started = time.perf_counter()
+        moved = module.archive(conn, args.entity, batch_size=args.batch_size)
+        seconds = time.perf_counter() - started
+    finally:
+        conn.close()
+    for table, rows in moved.items():
+        sys.stdout.write(f"{table:<24}{rows:>12,}\n")
+    sys.stdout.write(f"{sum(moved.values()):,} row(s) archived in {seconds:.1f} s\n")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="botecopro-meta", description="BotecoPro domain tooling"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="Generate models and DDL")
+    add_generate_arguments(generate_parser)
+    generate_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the manifest and re-render every artifact",
+    )
+    generate_parser.set_defaults(handler=_generate)
+
+    watch_parser = commands.add_parser(
+        "watch", help="Regenerate affected entities whenever the domain changes"
+    )
+    add_generate_arguments(watch_parser)
+    watch_parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.1,
+        help="Seconds between checks of the domain files",
+    )
+    watch_parser.set_defaults(handler=_watch)
+
+    migrate_parser = commands.add_parser(
+        "migrate", help="Plan the SQL that brings a schema up to a domain"
+    )
+    migrate_parser.add_argument(
+        "--to",
+        type=Path,
+        nargs="+",
+        required=True,
+        help="Target domain YAML file(s) or directories",
+    )
+    current = migrate_parser.add_mutually_exclusive_group(required=True)
+    current.add_argument(
+        "--from",
+        dest="source",
+        type=Path,
+        nargs="+",
+        help="Previous domain YAML file(s) or directories",
+    )
+    current.add_argument("--database", type=Path, help="Existing SQLite database file")
+    migrate_parser.add_argument(
+        "--storage-profile",
+        choices=sorted(PROFILES),
+        default=None,
+        help="SQLite storage profile for both domains",
+    )
+    migrate_parser.add_argument(
+        "--out", "-o", type=Path, default=None, help="Write the script here instead of stdout"
+    )
+    migrate_parser.add_argument(
+        "--apply", action="store_true", help="Run the migration on --database"
+    )
+    migrate_parser.set_defaults(handler=_migrate)
+
+    plans_parser = commands.add_parser(
+        "plans", help="Check the query plans of the schema on synthetic rows"
+    )
+    plans_parser.add_argument(
+        "--input",
+        "-i",
+        type=Path,
+        nargs="+",
+        required=True,
+        help="Domain YAML file(s) or directories of YAML files",
+    )
+    plans_parser.add_argument(
+        "--storage-profile",
+        choices=sorted(PROFILES),
+        default=None,
+        help="SQLite storage profile; overrides targets.sql.storage in the domain",
+    )
+    plans_parser.add_argument(
+        "--rows", type=int, default=1000, help="Synthetic rows per table"
+    )
+    plans_parser.add_argument(
+        "--repeat", type=int, default=10, help="Runs of each query to average"
+    )
+    plans_parser.add_argument(
+        "--entity", action="append", default=None, help="Only this entity (repeatable)"
+    )
+    plans_parser.set_defaults(handler=_plans)
+
+    seed_parser = commands.add_parser(
+        "seed", help="Fill a database with synthetic rows for load testing"
+    )
+    seed_parser.add_argument(
+        "--input",
+        "-i",
+        type=Path,
+        nargs="+",
+        required=True,
+        help="Domain YAML file(s) or directories of YAML files",
+    )
+    seed_parser.add_argument(
+        "--database", type=Path, required=True, help="SQLite database file (created if missing)"
+    )
+    seed_parser.add_argument(
+        "--scale",
+        type=int,
+        required=True,
+        help="Rows of a weight-1 entity; others get scale times their seed.weight",
+    )
+    seed_parser.add_argument(
+        "--storage-profile",
+        choices=sorted(PROFILES),
+        default=None,
+        help="SQLite storage profile; overrides targets.sql.storage in the domain",
+    )
+    seed_parser.add_argument(
+        "--batch-size", type=int, default=50_000, help="Rows per executemany call"
+    )
+    seed_parser.add_argument(
+        "--random-seed", type=int, default=0, help="Seed of the value generator"
+    )
+    seed_parser.set_defaults(handler=_seed)
+
+    import_parser = commands.add_parser(
+        "import", help="Validate a CSV or JSONL file and bulk-insert its rows"
+    )
+    import_parser.add_argument("entity", help="Entity the rows belong to, e.g. Product")
+    import_parser.add_argument("file", type=Path, help="CSV (with a header) or JSONL file")
+    import_parser.add_argument(
+        "--input",
+        "-i",
+        type=Path,
+        nargs="+",
+        required=True,
+        help="Domain YAML file(s) or directories of YAML files",
+    )
+    import_parser.add_argument(
+        "--database", type=Path, required=True, help="SQLite database holding the schema"
+    )
+    import_parser.add_argument(
+        "--rejects",
+        type=Path,
+        default=None,
+        help="JSONL file for rejected rows (default: FILE.rejected.jsonl)",
+    )
+    import_parser.add_argument(
+        "--format", choices=["csv", "jsonl"], default=None, help="File format (default: by suffix)"
+    )
+    import_parser.add_argument(
+        "--chunk-size", type=int, default=10_000, help="Rows validated and inserted per transaction"
+    )
+    import_parser.add_argument(
+        "--storage-profile",
+        choices=sorted(PROFILES),
+        default=None,
+        help="SQLite storage profile; overrides targets.sql.storage in the domain",
+    )
+    import_parser.set_defaults(handler=_import)
+
+    reindex_parser = commands.add_parser(
+        "reindex", help="Create missing full-text indexes and rebuild them from their tables"
+    )
+    reindex_parser.add_argument(
+        "--input",
+        "-i",
+        type=Path,
+        nargs="+",
+        required=True,
+        help="Domain YAML file(s) or directories of YAML files",
+    )
+    reindex_parser.add_argument(
+        "--database", type=Path, required=True, help="SQLite database holding the tables"
+    )
+    reindex_parser.add_argument(
+        "--entity", action="append", default=None, help="Only this entity (repeatable)"
+    )
+    reindex_parser.add_argument(
+        "--storage-profile",
+        choices=sorted(PROFILES),
+        default=None,
+        help="SQLite storage profile; overrides targets.sql.storage in the domain",
+    )
+    reindex_parser.set_defaults(handler=_reindex)
+
+    archive_parser = commands.add_parser(
+        "archive", help="Move object graphs past their retention into an archive database"
+    )
+    archive_parser.add_argument(
+        "--input",
+        "-i",
+        type=Path,
+        nargs="+",
+        required=True,
+        help="Domain YAML file(s) or directories of YAML files",
+    )
+    archive_parser.add_argument(
+        "--database", type=Path, required=True, help="SQLite database holding the hot tables"
+    )
+    archive_parser.add_argument(
+        "--archive",
+        type=Path,
+        required=True,
+        help="SQLite archive database, created on first use",
+    )
+    archive_parser.add_argument(
+        "--entity", action="append", default=None, help="Only this retention root (repeatable)"
+    )
+    archive_parser.add_argument(
+        "--batch-size", type=int, default=None, help="Roots per transaction (default: per rule)"
+    )
+    archive_parser.add_argument(
+        "--storage-profile",
+        choices=sorted(PROFILES),
+        default=None,
+        help="SQLite storage profile; overrides targets.sql.storage in the domain",
+    )
+    archive_parser.set_defaults(handler=_archive)
+    return parser
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+__all__ = ["build_parser", "main"]
@@ -0,0 +1,105 @@
+"""SQLite DDL of the domain's tables: columns, tables, indexes and triggers.
+
+Shared by the SQL renderers in :mod:`.generator`, the migration planner and
+the archive, so every path creates a table the same way. Triggers come as
+``(name, statement)`` pairs; callers that only run them take the statements.
+"""
+from __future__ import annotations
+
+from typing import Collection, List, Sequence, Tuple
+
+from .derived import derived_triggers
+from .events import append_only_triggers
+from .metamodel import AttributeDefinition, EntityDefinition
+from .search import search_triggers
+from .sync import sync_triggers
+
+
+def table_options(entity: EntityDefinition) -> str:
+    """``WITHOUT ROWID`` / ``STRICT`` suffix of ``entity``'s ``CREATE TABLE``."""
+    options = []
+    if entity.without_rowid:
+        options.append("WITHOUT ROWID")
+    if entity.strict:
+        options.append("STRICT")
+    return " " + ", ".join(options) if options else ""
+
+
+def column_definition(attr: AttributeDefinition, pk_columns: Sequence[str]) -> str:
+    """Column definition of ``attr`` in a table keyed by ``pk_columns``."""
+    col_name = f'"{attr.name}"'
+    col = f"{col_name} {attr.sqlite_type}"
+    if attr.enum_values:
+        allowed = ", ".join([f"'{v}'" for v in attr.enum_values])
+        col += f" CHECK ({col_name} IN ({allowed}))"
+    if attr.primary_key and attr.autoincrement and len(pk_columns) == 1:
+        col = f"{col_name} INTEGER PRIMARY KEY AUTOINCREMENT"
+    elif attr.primary_key:
+        col += " NOT NULL"
+        if len(pk_columns) == 1:
+            col += " PRIMARY KEY"
+    if not attr.primary_key and not attr.nullable:
+        col += " NOT NULL"
+    if attr.raw.get("default") is not None:
+        default_val = attr.raw.get("default")
+        if isinstance(default_val, str):
+            default_literal = f"'{default_val}'"
+        elif isinstance(default_val, bool):
+            default_literal = "1" if default_val else "0"
+        else:
+            default_literal = str(default_val)
+        col += f" DEFAULT {default_literal}"
+    return col
+
+
+def create_table(entity: EntityDefinition, deferred: Collection[str] = ()) -> str:
+    """``CREATE TABLE`` statement of ``entity``; ``deferred`` references are deferrable."""
+    pk_columns = [attr.name for attr in entity.attributes if attr.primary_key]
+    column_defs = [column_definition(attr, pk_columns) for attr in entity.attributes]
+
+    if len(pk_columns) > 1:
+        quoted_pk = ", ".join([f'"{name}"' for name in pk_columns])
+        column_defs.append(f"PRIMARY KEY({quoted_pk})")
+
+    for fk in [attr for attr in entity.attributes if attr.relation]:
+        clause = f"FOREIGN KEY (\"{fk.name}\") REFERENCES \"{fk.relation[0]}\"(\"{fk.relation[1]}\")"
+        if fk.name in deferred:
+            clause += " DEFERRABLE INITIALLY DEFERRED"
+        column_defs.append(clause)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{entity.table}" (\n  '
+        + ",\n  ".join(column_defs)
+        + f"\n){table_options(entity)};"
+    )
+
+
+def create_indexes(entity: EntityDefinition) -> List[str]:
+    """``CREATE INDEX`` statements of ``entity``, in declaration order."""
+    statements = []
+    for idx in entity.indexes:
+        unique = "UNIQUE " if idx.unique else ""
+        cols = ", ".join([f'"{c}"' for c in idx.columns])
+        where = f" WHERE {idx.where}" if idx.where else ""
+        statements.append(
+            f'CREATE {unique}INDEX IF NOT EXISTS {idx.name} ON "{entity.table}" ({cols}){where};'
+        )
+    return statements
+
+
+def create_triggers(entity: EntityDefinition) -> List[Tuple[str, str]]:
+    """``(name, CREATE TRIGGER statement)`` pairs of every trigger on ``entity``."""
+    return (
+        sync_triggers(entity)
+        + append_only_triggers(entity)
+        + derived_triggers(entity)
+        + search_triggers(entity)
+    )
+
+
+__all__ = [
+    "column_definition",
+    "create_indexes",
+    "create_table",
+    "create_triggers",
+    "table_options",
+]
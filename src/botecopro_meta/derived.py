@@ -0,0 +1,279 @@
+"""Derived columns kept up to date by SQLite triggers.
+
+An attribute declares where its value comes from with ``derived``::
+
+    stock_current:
+      type: float
+      derived:
+        from: StockMovement
+        sum: "CASE movement_type WHEN 'out' THEN -quantity ELSE quantity END"
+
+``sum`` takes an SQL expression over the source row's columns, ``count:
+true`` counts rows and ``latest`` takes the value of the newest row by
+``order_by`` (the source's primary key by default). ``where`` filters the
+source rows, and ``via`` names the source's relation attribute pointing at
+this entity when there is more than one.
+
+Sums and counts are maintained incrementally: inserting a source row adds
+its contribution to the parent row, deleting it subtracts it and an update
+does both, so reading a total costs one row lookup however many rows feed
+it. ``latest`` re-reads the newest row through the relation index. Update
+triggers only fire when a column the value depends on changes, and a
+derived column may itself feed another one (``OrderItem`` -> ``Order`` ->
+``Comanda``). The generated ``derived`` module recomputes every column from
+scratch to verify or rebuild it.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .metamodel import DerivedDefinition, EntityDefinition
+
+FUNCTIONS = ("sum", "count", "latest")
+
+# Quoted literals and identifiers are matched whole so that only bare names are bound.
+_TOKEN = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|[A-Za-z_][A-Za-z0-9_]*")
+
+
+def _names(expression: Optional[str], columns: Iterable[str]) -> Set[str]:
+    columns = set(columns)
+    return {token for token in _TOKEN.findall(expression or "") if token in columns}
+
+
+def _bind(expression: str, columns: Iterable[str], row: str) -> str:
+    """``expression`` with every bare source column qualified by ``row``."""
+    columns = set(columns)
+
+    def qualify(match: "re.Match[str]") -> str:
+        token = match.group(0)
+        return f'{row}."{token}"' if token in columns else token
+
+    return _TOKEN.sub(qualify, expression)
+
+
+def _declaration(
+    entity: EntityDefinition, name: str, spec: Dict, sources: Dict[str, EntityDefinition]
+) -> DerivedDefinition:
+    where = f"{entity.name}.{name}"
+    functions = [function for function in FUNCTIONS if spec.get(function) not in (None, False)]
+    if len(functions) != 1:
+        raise ValueError(f"{where}: derived needs exactly one of {', '.join(FUNCTIONS)}")
+    function = functions[0]
+    source = sources.get(spec.get("from"))
+    if source is None:
+        raise ValueError(f"{where}: derived from unknown entity {spec.get('from')!r}")
+    relations = [
+        attr for attr in source.foreign_keys if attr.relation[0] == entity.table
+    ]
+    if spec.get("via") is not None:
+        relations = [attr for attr in relations if attr.name == spec["via"]]
+    if len(relations) != 1:
+        raise ValueError(
+            f"{where}: {source.name} needs exactly one relation to {entity.name}; set via"
+        )
+    columns = [attr.name for attr in source.attributes]
+    order_by = spec.get("order_by")
+    if function == "latest":
+        if order_by is None:
+            if len(source.primary_key) != 1:
+                raise ValueError(f"{where}: latest needs order_by")
+            order_by = source.primary_key[0].name
+        if order_by not in columns:
+            raise ValueError(f"{where}: {source.name} has no column {order_by!r}")
+    value = None if function == "count" else str(spec[function])
+    for expression in (value, spec.get("where")):
+        if expression is not None and not _names(expression, columns):
+            raise ValueError(f"{where}: {expression!r} uses no column of {source.name}")
+    return DerivedDefinition(
+        table=entity.table,
+        column=name,
+        function=function,
+        source=source.name,
+        source_table=source.table,
+        via=relations[0].name,
+        key=relations[0].relation[1],
+        value=value,
+        where=spec.get("where"),
+        order_by=order_by if function == "latest" else None,
+    )
+
+
+def resolve_derived(
+    entities: Tuple[EntityDefinition, ...], raw_entities: Dict[str, Dict]
+) -> Tuple[EntityDefinition, ...]:
+    """``entities`` with their ``derived`` columns and the ``feeds`` of their sources."""
+    by_name = {entity.name: entity for entity in entities}
+    declared: Dict[str, List[DerivedDefinition]] = {}
+    feeds: Dict[str, List[DerivedDefinition]] = {}
+    for entity in entities:
+        attributes = raw_entities.get(entity.name, {}).get("attributes", {})
+        for attr in entity.attributes:
+            spec = (attributes.get(attr.name) or {}).get("derived")
+            if not spec:
+                continue
+            if attr.primary_key or attr.relation:
+                raise ValueError(f"{entity.name}.{attr.name}: key columns cannot be derived")
+            definition = _declaration(entity, attr.name, spec, by_name)
+            declared.setdefault(entity.name, []).append(definition)
+            feeds.setdefault(definition.source, []).append(definition)
+    if not declared:
+        return entities
+    return tuple(
+        replace(
+            entity,
+            derived=tuple(declared.get(entity.name, ())),
+            feeds=tuple(feeds.get(entity.name, ())),
+        )
+        for entity in entities
+    )
+
+
+def _contribution(derived: DerivedDefinition, columns: List[str], row: str) -> str:
+    value = "1" if derived.value is None else _bind(derived.value, columns, row)
+    if derived.where:
+        value = f"CASE WHEN {_bind(derived.where, columns, row)} THEN {value} END"
+    return f"COALESCE({value}, 0)"
+
+
+def _newest(derived: DerivedDefinition, columns: List[str], parent: str) -> str:
+    """Subquery picking the value of the newest source row of ``parent``."""
+    source = f'"{derived.source_table}"'
+    filters = [f'{source}."{derived.via}" = {parent}']
+    if derived.where:
+        filters.append(f"({_bind(derived.where, columns, source)})")
+    return (
+        f"(SELECT {_bind(derived.value, columns, source)} FROM {source}"
+        f" WHERE {' AND '.join(filters)}"
+        f' ORDER BY {source}."{derived.order_by}" DESC LIMIT 1)'
+    )
+
+
+def derived_triggers(entity: EntityDefinition) -> List[Tuple[str, str]]:
+    """``(name, CREATE TRIGGER statement)`` pairs on ``entity`` maintaining the columns it feeds."""
+    columns = [attr.name for attr in entity.attributes]
+    statements: List[Tuple[str, str]] = []
+    for derived in entity.feeds:
+        target = f'"{derived.table}"'
+        column = f'"{derived.column}"'
+        match = f'"{derived.key}" = {{}}."{derived.via}"'
+        name = f"trg_{derived.table}_{derived.column}"
+        on = f'ON "{entity.table}"'
+        watched = sorted(
+            _names(derived.value, columns)
+            | _names(derived.where, columns)
+            | {derived.via}
+            | ({derived.order_by} if derived.order_by else set())
+        )
+        update_of = "AFTER UPDATE OF {} {}".format(
+            ", ".join(f'"{watched_column}"' for watched_column in watched), on
+        )
+        if derived.function == "latest":
+
+            def refresh(row: str) -> str:
+                newest = _newest(derived, columns, f'{row}."{derived.via}"')
+                return f"  UPDATE {target} SET {column} = {newest} WHERE {match.format(row)};"
+
+            statements += [
+                (
+                    f"{name}_insert",
+                    f"CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT {on}\n"
+                    f"BEGIN\n{refresh('NEW')}\nEND;",
+                ),
+                (
+                    f"{name}_update",
+                    f"CREATE TRIGGER IF NOT EXISTS {name}_update {update_of}\n"
+                    f"BEGIN\n{refresh('OLD')}\n{refresh('NEW')}\nEND;",
+                ),
+                (
+                    f"{name}_delete",
+                    f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE {on}\n"
+                    f"BEGIN\n{refresh('OLD')}\nEND;",
+                ),
+            ]
+            continue
+        new, old = _contribution(derived, columns, "NEW"), _contribution(derived, columns, "OLD")
+        add = f"  UPDATE {target} SET {column} = COALESCE({column}, 0) + {new}"
+        subtract = f"  UPDATE {target} SET {column} = COALESCE({column}, 0) - {old}"
+        statements += [
+            (
+                f"{name}_insert",
+                f"CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT {on}\n"
+                f"BEGIN\n{add} WHERE {match.format('NEW')};\nEND;",
+            ),
+            (
+                f"{name}_update",
+                f"CREATE TRIGGER IF NOT EXISTS {name}_update {update_of}\n"
+                f'WHEN OLD."{derived.via}" IS NOT NEW."{derived.via}" OR {old} IS NOT {new}\n'
+                f"BEGIN\n{subtract} WHERE {match.format('OLD')};\n"
+                f"{add} WHERE {match.format('NEW')};\nEND;",
+            ),
+            (
+                f"{name}_delete",
+                f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE {on}\n"
+                f"BEGIN\n{subtract} WHERE {match.format('OLD')};\nEND;",
+            ),
+        ]
+    return statements
+
+
+@dataclass(frozen=True, slots=True)
+class DerivedSpec:
+    """Recomputation SQL for one column of the generated ``derived`` module."""
+
+    name: str  # "<table>.<column>"
+    function: str
+    source: str
+    verify_sql: str
+    rebuild_sql: str
+
+
+def derived_spec(derived: DerivedDefinition, source: EntityDefinition) -> DerivedSpec:
+    """Verify and rebuild statements for ``derived``, whose rows come from ``source``."""
+    columns = [attr.name for attr in source.attributes]
+    target = f'"{derived.table}"'
+    parent = f'{target}."{derived.key}"'
+    stored = f'{target}."{derived.column}"'
+    if derived.function == "latest":
+        expected = _newest(derived, columns, parent)
+        differs = f"{stored} IS NOT {expected}"
+    else:
+        rows = f'"{derived.source_table}"'
+        expected = (
+            f"(SELECT COALESCE(SUM({_contribution(derived, columns, rows)}), 0) FROM {rows}"
+            f' WHERE {rows}."{derived.via}" = {parent})'
+        )
+        # Sums of REAL values kept incrementally drift in the last bits.
+        differs = f"ABS(COALESCE({stored}, 0) - {expected}) > 1e-6"
+    return DerivedSpec(
+        name=f"{derived.table}.{derived.column}",
+        function=derived.function,
+        source=derived.source_table,
+        verify_sql=f"SELECT COUNT(*) FROM {target} WHERE {differs}",
+        rebuild_sql=f'UPDATE {target} SET "{derived.column}" = {expected} WHERE {differs}',
+    )
+
+
+def derived_specs(entities: Sequence[EntityDefinition]) -> List[DerivedSpec]:
+    """Specs of every derived column of ``entities``, given in foreign key order.
+
+    Referencing tables come first, so a column that feeds another one
+    (``order.total_cents`` into ``comanda.subtotal_cents``) is rebuilt before it.
+    """
+    by_name = {entity.name: entity for entity in entities}
+    return [
+        derived_spec(derived, by_name[derived.source])
+        for entity in reversed(entities)
+        for derived in entity.derived
+    ]
+
+
+__all__ = [
+    "FUNCTIONS",
+    "DerivedSpec",
+    "derived_spec",
+    "derived_specs",
+    "derived_triggers",
+    "resolve_derived",
+]
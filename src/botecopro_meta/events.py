@@ -0,0 +1,255 @@
+"""Append-only event store for the domain ``events`` section.
+
+A domain declaring events gets two more entities, built from the raw YAML
+below like any other so they follow the storage profile and land in the
+schema bundle, the migrations and the repositories:
+
+* ``DomainEvent`` (``domain_event``) - one row per event: an AUTOINCREMENT
+  ``sequence`` that only grows, the event's UUID, its type, the aggregate
+  it belongs to and the payload as a JSON array in field order. Triggers
+  reject every ``UPDATE`` and ``DELETE``.
+* ``ProjectionCheckpoint`` (``projection_checkpoint``) - the last sequence
+  each projection has applied, plus an optional JSON snapshot of its state.
+
+``metadata.event_store: false`` leaves both out. Each event names its
+``aggregate`` entity; the payload field holding the aggregate's id is
+``aggregate_key``, or the snake-cased aggregate name plus ``_id`` (``OrderItem``
+-> ``order_item_id``) when the payload has it.
+"""
+from __future__ import annotations
+
+import keyword
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .metamodel import AttributeDefinition, EntityDefinition, EventDefinition
+from .repositories import _annotation, _decoder, _encoder
+
+BATCH_SIZE = 500
+
+EVENT_STORE = "DomainEvent"
+CHECKPOINT = "ProjectionCheckpoint"
+
+EVENT_STORE_ENTITIES: Dict[str, Dict] = {
+    EVENT_STORE: {
+        "storage": {"table": "domain_event"},
+        "append_only": True,
+        "auto_indexes": False,
+        # Synthetic payloads would not decode; seed events through append_events.
+        "seed": {"weight": 0},
+        "attributes": {
+            "sequence": {"type": "int", "primary_key": True, "autoincrement": True},
+            "event_id": {"type": "uuid", "required": True},
+            "event_type": {"type": "string", "required": True},
+            "aggregate_id": {"type": "string"},
+            "occurred_at": {"type": "datetime", "required": True},
+            "payload": {"type": "text", "required": True},
+        },
+        # ``sequence`` is the rowid, so the aggregate index is already in event order.
+        "indexes": [
+            {"name": "idx_domain_event_event_id", "columns": ["event_id"], "unique": True},
+            {
+                "name": "idx_domain_event_aggregate",
+                "columns": ["aggregate_id"],
+                "where": '"aggregate_id" IS NOT NULL',
+            },
+        ],
+    },
+    CHECKPOINT: {
+        "storage": {"table": "projection_checkpoint"},
+        "auto_indexes": False,
+        "seed": {"weight": 0},
+        "attributes": {
+            "projection": {"type": "string", "primary_key": True},
+            "sequence": {"type": "int", "required": True},
+            "state": {"type": "text"},
+            "updated_at": {"type": "datetime", "required": True},
+        },
+    },
+}
+
+
+def event_store_entities(
+    entities: Dict[str, Dict], events: Dict, metadata: Dict
+) -> Dict[str, Dict]:
+    """Raw definitions of the event store entities ``entities`` should gain."""
+    if not events or metadata.get("event_store", True) is False:
+        return {}
+    for name in EVENT_STORE_ENTITIES:
+        if name in entities:
+            raise ValueError(f"entity {name!r} is reserved for the event store")
+    return EVENT_STORE_ENTITIES
+
+
+def aggregate_key(name: str, details: Dict, entities: Dict[str, Dict]) -> Optional[str]:
+    """Payload field of event ``name`` that holds its aggregate's id."""
+    aggregate = details.get("aggregate")
+    payload = details.get("payload") or {}
+    if aggregate is not None and aggregate not in entities:
+        raise ValueError(f"event {name!r}: unknown aggregate {aggregate!r}")
+    key = details.get("aggregate_key")
+    if key is not None:
+        if key not in payload:
+            raise ValueError(f"event {name!r}: aggregate_key {key!r} is not a payload field")
+        return key
+    if aggregate is None:
+        return None
+    default = re.sub(r"(?<!^)(?=[A-Z])", "_", aggregate).lower() + "_id"
+    return default if default in payload else None
+
+
+def append_only_triggers(entity: EntityDefinition) -> List[Tuple[str, str]]:
+    """``(name, CREATE TRIGGER statement)`` pairs refusing updates and deletes on ``entity``."""
+    if not entity.append_only:
+        return []
+    table = entity.table
+    triggers = []
+    for action in ("UPDATE", "DELETE"):
+        name = f"trg_{table}_no_{action.lower()}"
+        triggers.append(
+            (
+                name,
+                f'CREATE TRIGGER IF NOT EXISTS {name} BEFORE {action} ON "{table}"\n'
+                f"BEGIN\n  SELECT RAISE(ABORT, '{table} is append-only');\nEND;",
+            )
+        )
+    return triggers
+
+
+def _identifier(name: str) -> str:
+    return f"{name}_" if keyword.iskeyword(name) else name
+
+
+def _json_encoder(attr: AttributeDefinition, value: str) -> str:
+    if attr.base_type == "uuid":
+        return f"converters.uuid_to_text({value})"
+    if attr.base_type in ("datetime", "timestamp"):
+        return f"converters.datetime_to_text({value})"
+    if attr.base_type == "decimal":
+        return f"None if {value} is None else str({value})"
+    return value
+
+
+def _json_decoder(attr: AttributeDefinition, value: str) -> str:
+    if attr.enum:
+        if attr.nullable:
+            return f"None if {value} is None else enums.{attr.enum}({value})"
+        return f"enums.{attr.enum}({value})"
+    if attr.base_type == "uuid":
+        return f"converters.text_to_uuid({value})"
+    if attr.base_type in ("datetime", "timestamp"):
+        return f"converters.text_to_datetime({value})"
+    if attr.base_type == "decimal":
+        return f"converters.number_to_decimal({value})"
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class EventSpec:
+    """Fields and payload codecs of one generated event class."""
+
+    fields: Tuple[Tuple[str, str], ...]
+    encoders: Tuple[str, ...]
+    decoders: Tuple[str, ...]
+    aggregate_id: str
+
+
+def event_spec(event: EventDefinition) -> EventSpec:
+    """Class fields, JSON payload codecs and aggregate id expression of ``event``."""
+    names = {attr.name: _identifier(attr.name) for attr in event.payload}
+    aggregate_id = "None"
+    if event.aggregate_key is not None:
+        value = f"self.{names[event.aggregate_key]}"
+        key = next(attr for attr in event.payload if attr.name == event.aggregate_key)
+        aggregate_id = f"str({value})"
+        if key.nullable:
+            aggregate_id = f"None if {value} is None else {aggregate_id}"
+    return EventSpec(
+        fields=tuple((names[attr.name], _annotation(attr)) for attr in event.payload),
+        encoders=tuple(_json_encoder(attr, f"self.{names[attr.name]}") for attr in event.payload),
+        decoders=tuple(
+            _json_decoder(attr, f"values[{position}]")
+            for position, attr in enumerate(event.payload)
+        ),
+        aggregate_id=aggregate_id,
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class EventStoreSpec:
+    """SQL and column codecs of the generated ``events`` module."""
+
+    append_sql: str
+    select_sql: str
+    checkpoint_sql: str
+    save_checkpoint_sql: str
+    clear_checkpoint_sql: str
+    new_event_id: str
+    encode_time: str
+    decode_event_id: str
+    decode_time: str
+    imports: Tuple[str, ...]
+
+
+def event_store_spec(
+    store: EntityDefinition, checkpoint: EntityDefinition, events: Tuple[EventDefinition, ...]
+) -> EventStoreSpec:
+    """Statements over the event store tables and codecs for their stored values."""
+    column = {attr.name: attr for attr in store.attributes}
+    table = f'"{store.table}"'
+    codecs = (
+        _encoder(column["event_id"], "uuid4()"),
+        _encoder(column["occurred_at"], "value"),
+        _decoder(column["event_id"], "row[1]"),
+        _decoder(column["occurred_at"], "row[4]"),
+    )
+    specs = [event_spec(event) for event in events]
+    code = " ".join(
+        codecs
+        + tuple(
+            part
+            for spec in specs
+            for part in spec.encoders + spec.decoders + tuple(a for _, a in spec.fields)
+        )
+    )
+    return EventStoreSpec(
+        append_sql=(
+            f'INSERT INTO {table} ("event_id", "event_type", "aggregate_id", "occurred_at",'
+            ' "payload") VALUES (?, ?, ?, ?, ?)'
+        ),
+        select_sql=(
+            'SELECT "sequence", "event_id", "event_type", "aggregate_id", "occurred_at",'
+            f' "payload" FROM {table} WHERE "sequence" > ?{{}} ORDER BY "sequence" LIMIT ?'
+        ),
+        checkpoint_sql=(
+            f'SELECT "sequence", "state" FROM "{checkpoint.table}" WHERE "projection" = ?'
+        ),
+        save_checkpoint_sql=(
+            f'INSERT INTO "{checkpoint.table}" ("projection", "sequence", "state", "updated_at")'
+            ' VALUES (?, ?, ?, ?) ON CONFLICT ("projection") DO UPDATE SET'
+            ' "sequence" = excluded."sequence", "state" = excluded."state",'
+            ' "updated_at" = excluded."updated_at"'
+        ),
+        clear_checkpoint_sql=f'DELETE FROM "{checkpoint.table}" WHERE "projection" = ?',
+        new_event_id=codecs[0],
+        encode_time=codecs[1],
+        decode_event_id=codecs[2],
+        decode_time=codecs[3],
+        imports=tuple(module for module in ("converters", "enums") if f"{module}." in code),
+    )
+
+
+__all__ = [
+    "BATCH_SIZE",
+    "CHECKPOINT",
+    "EVENT_STORE",
+    "EVENT_STORE_ENTITIES",
+    "EventSpec",
+    "EventStoreSpec",
+    "aggregate_key",
+    "append_only_triggers",
+    "event_spec",
+    "event_store_spec",
+    "event_store_entities",
+]
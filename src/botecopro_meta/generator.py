@@ -2,22 +2,75 @@
 from __future__ import annotations
 
 import argparse
-from dataclasses import dataclass, field
+import importlib.util
+import os
+import pickle
+from dataclasses import dataclass, replace
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Collection,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import sys
 
+from .archive import (
+    ArchiveStep,
+    archive_indexes,
+    archive_jobs,
+    archive_tables,
+    archive_views,
+    resolve_retention,
+    retained_entities,
+)
+from .cache import cache_dir
+from .ddl import create_indexes, create_table, create_triggers
+from .derived import derived_specs, resolve_derived
+from .events import (
+    BATCH_SIZE as EVENT_BATCH_SIZE,
+    CHECKPOINT,
+    EVENT_STORE,
+    aggregate_key,
+    event_spec,
+    event_store_entities,
+    event_store_spec,
+)
+from .indexes import declared_indexes, infer_indexes
+from .plans import declared_queries
+from .seeding import seed_weight
+from .relations import relationship_lines, resolve_relationships
+from .repositories import repository_spec
+from .search import resolve_search, search_spec, search_tables
+from .storage import PROFILES, resolve_pragmas, resolve_profile
+from .sync import BATCH_SIZE, resolve_sync, sync_spec
+from .validation import validator_spec
+from .metamodel import (
+    AttributeDefinition,
+    DomainDefinition,
+    EntityDefinition,
+    EnumDefinition,
+    EventDefinition,
+    RetentionDefinition,
+)
+from .manifest import Manifest, fingerprint, hash_bytes, hash_file, package_fingerprint
+
 sys.path.insert(0, "/usr/lib/python3/dist-packages")
 
-import yaml
+# PyYAML and Jinja are imported on first use: a run served from the domain
+# cache and the manifest needs neither, and the fallback renderers need no
+# Jinja at all.
+JINJA_AVAILABLE = importlib.util.find_spec("jinja2") is not None
 
-try:
-    from jinja2 import Environment, FileSystemLoader, select_autoescape
-except ImportError:  # pragma: no cover - fallback renderer handles templates
-    Environment = None
-    FileSystemLoader = None
-    select_autoescape = None
+if TYPE_CHECKING:
+    import jinja2
 
 BASE_TYPES = {
     "int": {"python": "int", "sqlalchemy": "Integer", "sqlite": "INTEGER"},
@@ -44,89 +97,200 @@ BASE_TYPES = {
 }
 
 
-@dataclass
-class EnumDefinition:
-    """Represents an enumeration defined in the domain."""
+DomainSource = Union[Path, str, Sequence[Union[Path, str]]]
 
-    name: str
-    values: List[str]
 
+DOMAIN_SECTIONS = (
+    "entities",
+    "enums",
+    "types",
+    "events",
+    "relations",
+    "retention",
+    "metadata",
+    "targets",
+)
 
-@dataclass
-class AttributeDefinition:
-    """Resolved attribute including type metadata for templates."""
-
-    name: str
-    raw: Dict
-    base_type: str
-    python_type: str
-    sqlalchemy_type: str
-    sqlite_type: str
-    nullable: bool = True
-    primary_key: bool = False
-    autoincrement: bool = False
-    default: Optional[str] = None
-    enum: Optional[str] = None
-    enum_values: Optional[List[str]] = None
-    relation: Optional[Tuple[str, str]] = None  # (table, field)
-    precision: Optional[int] = None
-    scale: Optional[int] = None
 
+@lru_cache(maxsize=None)
+def _yaml_loader() -> Tuple[object, type]:
+    import yaml
 
-@dataclass
-class EntityDefinition:
-    """Entity and its attributes after resolution."""
+    try:
+        from yaml import CSafeLoader as loader
+    except ImportError:  # pragma: no cover - libyaml not compiled in
+        from yaml import SafeLoader as loader
+    return yaml, loader
 
-    name: str
-    table: str
-    attributes: List[AttributeDefinition]
-    indexes: List[Dict] = field(default_factory=list)
-    methods: List[str] = field(default_factory=list)
 
+def _parse_yaml(content: bytes) -> Dict:
+    yaml, loader = _yaml_loader()
+    return yaml.load(content, Loader=loader) or {}
 
-@dataclass
-class DomainDefinition:
-    """Full domain definition including enums and entities."""
 
-    name: str
-    enums: Dict[str, EnumDefinition]
-    entities: List[EntityDefinition]
-    custom_types: Dict[str, Dict]
+def _python_flag(python_target: Dict, option: str) -> bool:
+    value = python_target.get(option, False)
+    if not isinstance(value, bool):
+        raise ValueError(f"targets.python.{option} must be true or false, got {value!r}")
+    return value
+
+
+def _split_document(data: Dict) -> Tuple[Optional[str], Dict]:
+    """Return ``(domain name, sections)`` for one YAML document.
+
+    Documents are either wrapped in a single domain key, bare sections
+    (``entities:``, ``enums:`` ...) or a bare ``name: [values]`` enum map such
+    as ``db-meta/enums.yaml``.
+    """
+    if data and all(isinstance(value, list) for value in data.values()):
+        return None, {"enums": data}
+    if len(data) == 1:
+        name, body = next(iter(data.items()))
+        if isinstance(body, dict) and name not in DOMAIN_SECTIONS:
+            return name, body
+    return None, data
 
 
 class DomainLoader:
-    """Load domain YAML into rich definitions."""
+    """Load domain YAML into rich definitions.
+
+    ``domain_path`` may be a YAML file, a directory of YAML files, or a list
+    of either; the documents are parsed concurrently and merged in path
+    order. Resolved domains are cached on disk keyed by the content hash of
+    every source, so repeated loads only read and hash the files.
+    """
 
-    def __init__(self, domain_path: Path):
+    def __init__(
+        self,
+        domain_path: DomainSource,
+        *,
+        cache: bool = True,
+        storage: Optional[object] = None,
+    ):
         self.domain_path = domain_path
+        self.cache = cache
+        self.storage = storage
+
+    def sources(self) -> List[Path]:
+        paths = (
+            [self.domain_path]
+            if isinstance(self.domain_path, (str, Path))
+            else list(self.domain_path)
+        )
+        files: List[Path] = []
+        for path in map(Path, paths):
+            if path.is_dir():
+                files.extend(sorted(path.glob("*.yaml")))
+            else:
+                files.append(path)
+        return files
+
+    def source_hash(self) -> str:
+        """Hash of every source file's name and content."""
+        return fingerprint(
+            [(path.name, hash_file(path)) for path in self.sources()]
+        )
 
     def load(self) -> DomainDefinition:
-        data = yaml.safe_load(self.domain_path.read_text())
-        if len(data) == 1 and "entities" not in next(iter(data.values())):
-            domain_name, domain_data = next(iter(data.items()))
-        elif len(data) == 1:
-            domain_name, domain_data = next(iter(data.items()))
+        sources = self.sources()
+        contents = [path.read_bytes() for path in sources]
+        cache_path = None
+        if self.cache:
+            key = fingerprint(
+                package_fingerprint(),
+                [(path.name, hash_bytes(content)) for path, content in zip(sources, contents)],
+                self.storage,
+            )
+            cache_path = cache_dir("domains") / f"{key}.pickle"
+            try:
+                with cache_path.open("rb") as handle:
+                    return pickle.load(handle)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                pass
+
+        if len(contents) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=min(len(contents), os.cpu_count() or 1)) as pool:
+                documents = list(pool.map(_parse_yaml, contents))
         else:
-            domain_name, domain_data = "domain", data
-
+            documents = [_parse_yaml(content) for content in contents]
+        domain = self._resolve(*self._merge(sources, documents))
+
+        if cache_path is not None:
+            partial = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with partial.open("wb") as handle:
+                pickle.dump(domain, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(partial, cache_path)
+        return domain
+
+    def _merge(self, sources: List[Path], documents: List[Dict]) -> Tuple[str, Dict]:
+        domain_name: Optional[str] = None
+        merged: Dict = {}
+        for source, document in zip(sources, documents):
+            name, body = _split_document(document)
+            domain_name = domain_name or name
+            for key, value in body.items():
+                if key not in DOMAIN_SECTIONS or key not in merged:
+                    merged.setdefault(key, value)
+                    continue
+                for item, details in value.items():
+                    if item in merged[key] and merged[key][item] != details:
+                        raise ValueError(
+                            f"{key}: {item!r} in {source} conflicts with an earlier definition"
+                        )
+                    merged[key][item] = details
+        return domain_name or "domain", merged
+
+    def _resolve(self, domain_name: str, domain_data: Dict) -> DomainDefinition:
         enums = {
-            name: EnumDefinition(name=name, values=values)
+            name: EnumDefinition(name=name, values=tuple(values))
             for name, values in domain_data.get("enums", {}).items()
         }
         custom_types = domain_data.get("types", {})
 
+        self._metadata: Dict = domain_data.get("metadata", {}) or {}
+        raw_events = domain_data.get("events", {}) or {}
         raw_entities = domain_data.get("entities", {})
+        raw_entities = {
+            **raw_entities,
+            **event_store_entities(raw_entities, raw_events, self._metadata),
+        }
         entity_defs: Dict[str, Dict] = {
             name: details for name, details in raw_entities.items()
         }
 
-        entities = [
+        self._relation_types: Dict[Tuple[str, str], str] = {}
+        targets = domain_data.get("targets", {}) or {}
+        self._storage = resolve_profile(
+            self.storage
+            if self.storage is not None
+            else (targets.get("sql") or {}).get("storage")
+        )
+        entities = tuple(
             self._build_entity(name, details, entity_defs, custom_types, enums)
             for name, details in raw_entities.items()
-        ]
+        )
+        entities = resolve_derived(entities, entity_defs)
+        entities = resolve_relationships(entities, domain_data.get("relations"))
+        events = tuple(
+            self._build_event(name, details or {}, entity_defs, custom_types, enums)
+            for name, details in raw_events.items()
+        )
 
         return DomainDefinition(
-            name=domain_name, enums=enums, entities=entities, custom_types=custom_types
+            name=domain_name,
+            enums=enums,
+            entities=entities,
+            custom_types=custom_types,
+            metadata=self._metadata,
+            targets=targets,
+            storage=self._storage,
+            pragmas=resolve_pragmas((targets.get("python") or {}).get("pragmas")),
+            events=events,
+            retention=resolve_retention(domain_data.get("retention"), entities),
+            lazy_imports=_python_flag(targets.get("python") or {}, "lazy_imports"),
+            instrumentation=_python_flag(targets.get("python") or {}, "instrumentation"),
         )
 
     def _resolve_base_type(self, attr: Dict, custom_types: Dict) -> str:
@@ -154,9 +318,13 @@ class DomainLoader:
         target = attr.get("target")
         target_field = attr.get("target_field", "id")
         target_entity = entities.get(target, {})
-        target_attr = target_entity.get("attributes", {}).get(target_field, {"type": "int"})
-        resolved_base = self._resolve_base_type(target_attr, custom_types)
-        resolved = self._build_attribute(
+        key = (target, target_field)
+        resolved_base = self._relation_types.get(key)
+        if resolved_base is None:
+            target_attr = target_entity.get("attributes", {}).get(target_field, {"type": "int"})
+            resolved_base = self._resolve_base_type(target_attr, custom_types)
+            self._relation_types[key] = resolved_base
+        return self._build_attribute(
             name,
             {
                 "type": resolved_base,
@@ -165,12 +333,11 @@ class DomainLoader:
             },
             custom_types,
             enums,
+            relation=(
+                target_entity.get("storage", {}).get("table", str(target).lower()),
+                target_field,
+            ),
         )
-        resolved.relation = (
-            target_entity.get("storage", {}).get("table", target),
-            target_field,
-        )
-        return resolved
 
     def _build_attribute(
         self,
@@ -178,6 +345,7 @@ class DomainLoader:
         attr: Dict,
         custom_types: Dict,
         enums: Dict[str, EnumDefinition],
+        relation: Optional[Tuple[str, str]] = None,
     ) -> AttributeDefinition:
         base_type = self._resolve_base_type(attr, custom_types)
         default_val = attr.get("default")
@@ -209,6 +377,7 @@ class DomainLoader:
             autoincrement=autoincrement,
             enum=enum_name,
             enum_values=enum_values,
+            relation=relation,
             precision=precision,
             scale=scale,
         )
@@ -232,12 +401,55 @@ class DomainLoader:
                 )
             else:
                 attrs.append(self._build_attribute(attr_name, attr, custom_types, enums))
-        return EntityDefinition(
+        pk_attrs = [attr for attr in attrs if attr.primary_key]
+        entity = EntityDefinition(
             name=name,
             table=table,
-            attributes=attrs,
-            indexes=details.get("indexes", []),
-            methods=details.get("methods", []),
+            attributes=tuple(attrs),
+            methods=tuple(details.get("methods", [])),
+            strict=self._storage.strict,
+            append_only=bool(details.get("append_only")),
+            without_rowid=(
+                self._storage.without_rowid
+                and len(pk_attrs) > 1
+                and not any(attr.autoincrement for attr in pk_attrs)
+            ),
+        )
+        declared = declared_indexes(table, details.get("indexes", []))
+        return replace(
+            entity,
+            indexes=infer_indexes(entity, details, self._metadata, declared),
+            sync=resolve_sync(
+                entity, details, self._metadata, epoch=self._storage.datetime == "epoch"
+            ),
+            queries=declared_queries(name, details.get("queries")),
+            seed_weight=seed_weight(details),
+            search=resolve_search(entity, details),
+        )
+
+    def _build_event(
+        self,
+        name: str,
+        details: Dict,
+        entities: Dict[str, Dict],
+        custom_types: Dict,
+        enums: Dict[str, EnumDefinition],
+    ) -> EventDefinition:
+        payload = []
+        for field_name, spec in (details.get("payload") or {}).items():
+            if not str(field_name).isidentifier():
+                raise ValueError(f"event {name!r}: invalid payload field {field_name!r}")
+            # Payload fields are required unless declared nullable.
+            payload.append(
+                self._build_attribute(
+                    field_name, {"required": True, **(spec or {})}, custom_types, enums
+                )
+            )
+        return EventDefinition(
+            name=name,
+            payload=tuple(payload),
+            aggregate=details.get("aggregate"),
+            aggregate_key=aggregate_key(name, details, entities),
         )
 
     def _python_type(self, base_type: str) -> str:
@@ -246,6 +458,9 @@ class DomainLoader:
         return "str"
 
     def _sqlalchemy_type(self, base_type: str, precision: Optional[int], scale: Optional[int]) -> str:
+        override = self._storage.sqlalchemy_type(base_type)
+        if override:
+            return override
         if base_type == "decimal":
             p = precision or 12
             s = scale or 2
@@ -253,6 +468,9 @@ class DomainLoader:
         return BASE_TYPES.get(base_type, BASE_TYPES["string"])["sqlalchemy"]
 
     def _sqlite_type(self, base_type: str, precision: Optional[int], scale: Optional[int]) -> str:
+        override = self._storage.sqlite_type(base_type)
+        if override:
+            return override
         if base_type == "decimal":
             p = precision or 12
             s = scale or 2
@@ -274,7 +492,7 @@ def render_python_model_content(entity: EntityDefinition) -> str:
         f'"""SQLAlchemy model for {entity.name}."""',
         "from __future__ import annotations",
         "",
-        "from typing import Optional",
+        "from typing import List, Optional",
         "from datetime import datetime",
         "from decimal import Decimal",
         "from uuid import UUID",
@@ -285,15 +503,19 @@ def render_python_model_content(entity: EntityDefinition) -> str:
         "    DateTime,",
         "    Float,",
         "    ForeignKey,",
+        "    Index,",
         "    Integer,",
         "    Numeric,",
         "    String,",
         "    Text,",
         "    Enum as SAEnum,",
+        "    text,",
         ")",
+        "from sqlalchemy.orm import Mapped, WriteOnlyMapped, relationship",
         "",
         "from .base import Base",
-        "from . import enums",
+        "from . import column_types, enums",
+        "",
         "",
         f"class {entity.name}(Base):",
         f"    \"\"\"{entity.name} table mapped to {entity.table}.\"\"\"",
@@ -302,9 +524,27 @@ def render_python_model_content(entity: EntityDefinition) -> str:
         "",
     ]
 
+    # STRICT is left to the SQL DDL: SQLAlchemy emits VARCHAR/DATETIME/NUMERIC,
+    # which STRICT tables reject, so create_all() only mirrors WITHOUT ROWID.
+    if entity.indexes or entity.without_rowid:
+        lines.append("    __table_args__ = (")
+        for idx in entity.indexes:
+            index_parts = [f'"{idx.name}"'] + [f'"{c}"' for c in idx.columns]
+            if idx.unique:
+                index_parts.append("unique=True")
+            if idx.where:
+                index_parts.append(f"sqlite_where=text({idx.where!r})")
+            lines.append(f"        Index({', '.join(index_parts)}),")
+        if entity.without_rowid:
+            lines.append('        {"sqlite_with_rowid": False},')
+        lines.append("    )")
+        lines.append("")
+
     for attr in entity.attributes:
         column_type = (
-            f"SAEnum(enums.{attr.enum})" if attr.enum else attr.sqlalchemy_type
+            f"SAEnum(enums.{attr.enum}, values_callable=enums.enum_values)"
+            if attr.enum
+            else attr.sqlalchemy_type
         )
         column_parts = [column_type]
         if attr.relation:
@@ -323,6 +563,10 @@ def render_python_model_content(entity: EntityDefinition) -> str:
         )
         lines.append("")
 
+    for relationship in relationship_lines(entity):
+        lines.append(relationship)
+        lines.append("")
+
     if entity.methods:
         for method in entity.methods:
             lines.append(f"    def {method}(self) -> None:")
@@ -339,6 +583,13 @@ def render_enums_content(enums: Dict[str, EnumDefinition]) -> str:
         "from __future__ import annotations",
         "",
         "from enum import Enum",
+        "from typing import List, Type",
+        "",
+        "",
+        "def enum_values(enum: Type[Enum]) -> List[str]:",
+        '    """Member values, so SQLAlchemy stores ``"open"`` rather than ``"OPEN"``."""',
+        "    return [member.value for member in enum]",
+        "",
         "",
     ]
     for enum in enums.values():
@@ -359,12 +610,256 @@ def render_base_content() -> str:
     return (
         '"""SQLAlchemy declarative base for generated models."""\n'
         "from __future__ import annotations\n\n"
+        "from importlib import import_module\n\n"
+        "from sqlalchemy import event\n"
         "from sqlalchemy.orm import declarative_base\n\n"
-        "Base = declarative_base()\n"
+        "Base = declarative_base()\n\n\n"
+        '@event.listens_for(Base, "before_configured")\n'
+        "def _load_models(*args: object) -> None:\n"
+        '    """Import every model before relationships, which name them as strings, resolve.\n\n'
+        "    A lazily imported package only loads the models that were asked for; a\n"
+        "    package importing all of them eagerly has no ``load_models`` to call.\n"
+        '    """\n'
+        "    if __package__:\n"
+        '        load_models = getattr(import_module(__package__), "load_models", None)\n'
+        "        if load_models is not None:\n"
+        "            load_models()\n"
     )
 
 
-def render_init_content(entities: List[EntityDefinition]) -> str:
+def render_converters_content() -> str:
+    return (
+        '"""Value converters shared by the ORM column types and raw sqlite3 code."""\n'
+        "from __future__ import annotations\n\n"
+        "from datetime import datetime, timedelta, timezone\n"
+        "from decimal import Decimal\n"
+        "from typing import Optional, Union\n"
+        "from uuid import UUID\n\n"
+        "EPOCH = datetime(1970, 1, 1)\n"
+        "MILLISECOND = timedelta(milliseconds=1)\n"
+        'DATETIME_TEXT = "%Y-%m-%d %H:%M:%S.%f"\n\n\n'
+        "def uuid_to_blob(value: Union[UUID, str, bytes, None]) -> Optional[bytes]:\n"
+        '    """16-byte form of a UUID given as ``UUID``, text or bytes."""\n'
+        "    if value is None or isinstance(value, bytes):\n"
+        "        return value\n"
+        "    if not isinstance(value, UUID):\n"
+        "        value = UUID(str(value))\n"
+        "    return value.bytes\n\n\n"
+        "def blob_to_uuid(value: Optional[bytes]) -> Optional[UUID]:\n"
+        "    return None if value is None else UUID(bytes=bytes(value))\n\n\n"
+        "def datetime_to_epoch_ms(value: Optional[datetime]) -> Optional[int]:\n"
+        '    """Milliseconds since the Unix epoch; naive datetimes are taken as UTC."""\n'
+        "    if value is None:\n"
+        "        return None\n"
+        "    if value.tzinfo is not None:\n"
+        "        value = value.astimezone(timezone.utc).replace(tzinfo=None)\n"
+        "    return (value - EPOCH) // MILLISECOND\n\n\n"
+        "def epoch_ms_to_datetime(value: Optional[int]) -> Optional[datetime]:\n"
+        '    """Naive UTC datetime for milliseconds since the Unix epoch."""\n'
+        "    return None if value is None else EPOCH + value * MILLISECOND\n\n\n"
+        "def uuid_to_text(value: Union[UUID, str, None]) -> Optional[str]:\n"
+        "    return None if value is None else str(value)\n\n\n"
+        "def text_to_uuid(value: Optional[str]) -> Optional[UUID]:\n"
+        "    return None if value is None else UUID(value)\n\n\n"
+        "def datetime_to_text(value: Optional[datetime]) -> Optional[str]:\n"
+        '    """Text layout SQLAlchemy uses for ``DateTime`` columns on SQLite."""\n'
+        "    return None if value is None else value.strftime(DATETIME_TEXT)\n\n\n"
+        "def text_to_datetime(value: Optional[str]) -> Optional[datetime]:\n"
+        "    return None if value is None else datetime.fromisoformat(value)\n\n\n"
+        "def decimal_to_float(value: Union[Decimal, float, None]) -> Optional[float]:\n"
+        "    return None if value is None else float(value)\n\n\n"
+        "def number_to_decimal(value: Union[float, int, str, None]) -> Optional[Decimal]:\n"
+        "    return None if value is None else Decimal(str(value))\n\n\n"
+        "def int_to_bool(value: Optional[int]) -> Optional[bool]:\n"
+        "    return None if value is None else bool(value)\n"
+    )
+
+
+def render_column_types_content() -> str:
+    return (
+        '"""SQLAlchemy column types backing the compact SQLite storage profile."""\n'
+        "from __future__ import annotations\n\n"
+        "from sqlalchemy import Integer, LargeBinary\n"
+        "from sqlalchemy.types import TypeDecorator\n\n"
+        "from .converters import (\n"
+        "    blob_to_uuid,\n"
+        "    datetime_to_epoch_ms,\n"
+        "    epoch_ms_to_datetime,\n"
+        "    uuid_to_blob,\n"
+        ")\n\n\n"
+        "class UUIDBlob(TypeDecorator):\n"
+        '    """UUID stored as its 16 raw bytes; values load as ``uuid.UUID``."""\n\n'
+        "    impl = LargeBinary\n"
+        "    cache_ok = True\n\n"
+        "    def process_bind_param(self, value, dialect):\n"
+        "        return uuid_to_blob(value)\n\n"
+        "    def process_result_value(self, value, dialect):\n"
+        "        return blob_to_uuid(value)\n\n\n"
+        "class EpochMillis(TypeDecorator):\n"
+        '    """Datetime stored as integer milliseconds since the Unix epoch (UTC)."""\n\n'
+        "    impl = Integer\n"
+        "    cache_ok = True\n\n"
+        "    def process_bind_param(self, value, dialect):\n"
+        "        return datetime_to_epoch_ms(value)\n\n"
+        "    def process_result_value(self, value, dialect):\n"
+        "        return epoch_ms_to_datetime(value)\n"
+    )
+
+
+def render_engine_content(pragmas: Dict[str, object]) -> str:
+    head = (
+        '"""Tuned SQLite connections for the generated models.\n\n'
+        "Every connection opened here runs ``PRAGMAS`` first. ``ConnectionPool`` keeps\n"
+        "a set of read-only connections plus a single writer guarded by a lock:\n"
+        "SQLite admits one writer at a time, so queueing writes in-process avoids\n"
+        "``SQLITE_BUSY`` retries while WAL lets readers proceed alongside.\n"
+        '"""\n'
+        "from __future__ import annotations\n\n"
+        "import sqlite3\n"
+        "import threading\n"
+        "from contextlib import contextmanager\n"
+        "from pathlib import Path\n"
+        "from queue import Empty, LifoQueue\n"
+        "from typing import Any, Dict, Iterator, Optional, Union\n\n"
+        "from sqlalchemy import create_engine as sa_create_engine, event\n"
+        "from sqlalchemy.engine import Engine\n"
+        "from sqlalchemy.orm import Session, sessionmaker\n\n"
+        "PRAGMAS: Dict[str, Any] = {\n"
+    )
+    entries = "".join(
+        f'    "{name}": "{value}",\n'
+        if isinstance(value, str)
+        else f'    "{name}": {value},\n'
+        for name, value in pragmas.items()
+    )
+    tail = (
+        "}\n"
+        "# Persistent per database file; set by writers only.\n"
+        'WRITER_ONLY_PRAGMAS = ("journal_mode",)\n\n\n'
+        "def apply_pragmas(\n"
+        "    conn: Any, pragmas: Optional[Dict[str, Any]] = None, *, readonly: bool = False\n"
+        ") -> None:\n"
+        '    """Run ``PRAGMA name = value`` for each entry of ``pragmas`` (default ``PRAGMAS``)."""\n'
+        "    cursor = conn.cursor()\n"
+        "    for name, value in (PRAGMAS if pragmas is None else pragmas).items():\n"
+        "        if readonly and name in WRITER_ONLY_PRAGMAS:\n"
+        "            continue\n"
+        '        cursor.execute(f"PRAGMA {name} = {value}")\n'
+        "    if readonly:\n"
+        '        cursor.execute("PRAGMA query_only = ON")\n'
+        "    cursor.close()\n\n\n"
+        "def connect(\n"
+        "    database: Union[str, Path],\n"
+        "    *,\n"
+        "    readonly: bool = False,\n"
+        "    pragmas: Optional[Dict[str, Any]] = None,\n"
+        ") -> sqlite3.Connection:\n"
+        '    """Open an autocommit ``sqlite3`` connection with the PRAGMAs applied.\n\n'
+        "    Transactions are explicit: use :func:`transaction`. The connection may be\n"
+        "    handed between threads, but only one at a time.\n"
+        '    """\n'
+        "    conn = sqlite3.connect(str(database), isolation_level=None, check_same_thread=False)\n"
+        "    apply_pragmas(conn, pragmas, readonly=readonly)\n"
+        "    return conn\n\n\n"
+        "@contextmanager\n"
+        "def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:\n"
+        '    """Run a block of bulk work as one ``BEGIN IMMEDIATE`` transaction.\n\n'
+        "    Commits when the block succeeds and rolls back when it raises. Taking the\n"
+        "    write lock up front means the transaction never fails half way through\n"
+        "    because another connection started writing first.\n"
+        '    """\n'
+        '    conn.execute("BEGIN IMMEDIATE")\n'
+        "    try:\n"
+        "        yield conn\n"
+        "    except BaseException:\n"
+        '        conn.execute("ROLLBACK")\n'
+        "        raise\n"
+        '    conn.execute("COMMIT")\n\n\n'
+        "class ConnectionPool:\n"
+        '    """Read-only connections shared between threads and one serialized writer."""\n\n'
+        "    def __init__(\n"
+        "        self,\n"
+        "        database: Union[str, Path],\n"
+        "        *,\n"
+        "        readers: int = 4,\n"
+        "        pragmas: Optional[Dict[str, Any]] = None,\n"
+        "    ):\n"
+        "        self.database = str(database)\n"
+        "        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)\n"
+        "        self.size = max(1, readers)\n"
+        "        self._writer = connect(self.database, pragmas=self.pragmas)\n"
+        "        self._write_lock = threading.Lock()\n"
+        "        self._idle: LifoQueue = LifoQueue()\n"
+        "        self._opened: list = []\n"
+        "        self._open_lock = threading.Lock()\n\n"
+        "    def _checkout(self) -> sqlite3.Connection:\n"
+        "        try:\n"
+        "            return self._idle.get_nowait()\n"
+        "        except Empty:\n"
+        "            pass\n"
+        "        with self._open_lock:\n"
+        "            if len(self._opened) < self.size:\n"
+        "                conn = connect(self.database, readonly=True, pragmas=self.pragmas)\n"
+        "                self._opened.append(conn)\n"
+        "                return conn\n"
+        "        return self._idle.get()\n\n"
+        "    @contextmanager\n"
+        "    def reader(self) -> Iterator[sqlite3.Connection]:\n"
+        '        """Borrow a read-only connection; blocks while all ``readers`` are in use."""\n'
+        "        conn = self._checkout()\n"
+        "        try:\n"
+        "            yield conn\n"
+        "        finally:\n"
+        "            self._idle.put(conn)\n\n"
+        "    @contextmanager\n"
+        "    def writer(self) -> Iterator[sqlite3.Connection]:\n"
+        '        """The writer connection inside one transaction; other writers wait their turn."""\n'
+        "        with self._write_lock:\n"
+        "            with transaction(self._writer) as conn:\n"
+        "                yield conn\n\n"
+        "    def close(self) -> None:\n"
+        "        with self._write_lock:\n"
+        "            self._writer.close()\n"
+        "        with self._open_lock:\n"
+        "            for conn in self._opened:\n"
+        "                conn.close()\n"
+        "            self._opened.clear()\n\n"
+        '    def __enter__(self) -> "ConnectionPool":\n'
+        "        return self\n\n"
+        "    def __exit__(self, *exc_info: Any) -> None:\n"
+        "        self.close()\n\n\n"
+        "def create_engine(\n"
+        "    database: Union[str, Path],\n"
+        "    *,\n"
+        "    pragmas: Optional[Dict[str, Any]] = None,\n"
+        "    **kwargs: Any,\n"
+        ") -> Engine:\n"
+        '    """SQLAlchemy engine for ``database`` that applies the PRAGMAs on every connection."""\n'
+        '    engine = sa_create_engine(f"sqlite:///{database}", **kwargs)\n\n'
+        '    @event.listens_for(engine, "connect")\n'
+        "    def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:\n"
+        "        apply_pragmas(dbapi_connection, pragmas)\n\n"
+        "    return engine\n\n\n"
+        "def session_factory(engine: Engine, **kwargs: Any) -> sessionmaker:\n"
+        '    """``sessionmaker`` bound to ``engine``; objects stay usable after commit."""\n'
+        '    kwargs.setdefault("expire_on_commit", False)\n'
+        "    return sessionmaker(engine, class_=Session, **kwargs)\n\n\n"
+        "__all__ = [\n"
+        '    "PRAGMAS",\n'
+        '    "ConnectionPool",\n'
+        '    "apply_pragmas",\n'
+        '    "connect",\n'
+        '    "create_engine",\n'
+        '    "session_factory",\n'
+        '    "transaction",\n'
+        "]\n"
+    )
+    return head + entries + tail
+
+
+def render_init_content(entities: Sequence[EntityDefinition], lazy: bool = False) -> str:
+    if lazy:
+        return _render_lazy_init_content(entities)
     lines = [
         '"""Auto-generated package containing SQLAlchemy models."""',
         "from __future__ import annotations",
@@ -385,85 +880,2167 @@ def render_init_content(entities: List[EntityDefinition]) -> str:
     return "\n".join(lines)
 
 
-def render_sql_content(entity: EntityDefinition) -> str:
-    pk_columns = [attr.name for attr in entity.attributes if attr.primary_key]
-    quoted_table = f'"{entity.table}"'
+def _model_references(
+    entities: Sequence[EntityDefinition],
+) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Per model, the other models its foreign keys point at, in declaration order."""
+    names = {entity.table: entity.name for entity in entities}
+    references = []
+    for entity in entities:
+        targets = [names.get(attr.relation[0]) for attr in entity.foreign_keys]
+        targets = tuple(
+            dict.fromkeys(target for target in targets if target and target != entity.name)
+        )
+        if targets:
+            references.append((entity.name, targets))
+    return references
+
+
+def _render_lazy_init_content(entities: Sequence[EntityDefinition]) -> str:
+    lines = [
+        '"""Auto-generated package containing SQLAlchemy models, imported on first access.',
+        "",
+        "``from <package> import Order`` imports only the module defining ``Order``,",
+        "so tools touching one table (or only the sqlite3 repositories) do not pay",
+        "for every model and SQLAlchemy's ORM at startup. ``MODELS`` maps each model",
+        "to its module. Call ``load_models()`` before relying on ``Base.metadata``",
+        "listing every table, e.g. for ``Base.metadata.create_all()``. Relationships",
+        "name their models as strings, so the first query or instance, which",
+        "configures the mappers, imports every model.",
+        '"""',
+        "from __future__ import annotations",
+        "",
+        "from importlib import import_module",
+        "from typing import TYPE_CHECKING, Any, List",
+        "",
+        "if TYPE_CHECKING:",
+        "    from . import enums",
+        "    from .base import Base",
+    ]
+    lines.extend(f"    from .{entity.table} import {entity.name}" for entity in entities)
+    lines += ["", "MODELS = {"]
+    lines.extend(f'    "{entity.name}": "{entity.table}",' for entity in entities)
+    lines += [
+        "}",
+        "# Models whose tables a model's foreign keys point at, imported along with it",
+        "# so that the metadata can resolve them.",
+        "REFERENCES = {",
+    ]
+    for name, targets in _model_references(entities):
+        quoted = "".join(f'"{target}", ' for target in targets).rstrip(" ")
+        lines.append(f'    "{name}": ({quoted}),')
+    lines += [
+        "}",
+        "",
+        "",
+        "def __getattr__(name: str) -> Any:",
+        '    if name == "enums":',
+        '        value = import_module(".enums", __name__)',
+        '    elif name == "Base":',
+        '        value = import_module(".base", __name__).Base',
+        "    elif name in MODELS:",
+        '        value = getattr(import_module(f".{MODELS[name]}", __name__), name)',
+        "    else:",
+        '        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")',
+        "    globals()[name] = value",
+        "    for target in REFERENCES.get(name, ()):",
+        "        if target not in globals():",
+        "            __getattr__(target)",
+        "    return value",
+        "",
+        "",
+        "def __dir__() -> List[str]:",
+        "    return sorted(set(globals()) | set(__all__))",
+        "",
+        "",
+        "def load_models() -> Any:",
+        '    """Import every model and return ``Base``, whose metadata then lists every table."""',
+        "    for name in MODELS:",
+        "        __getattr__(name)",
+        '    return __getattr__("Base")',
+        "",
+        "",
+        "__all__ = [",
+        '    "Base",',
+        '    "MODELS",',
+        '    "REFERENCES",',
+        '    "enums",',
+        '    "load_models",',
+    ]
+    lines.extend(f'    "{entity.name}",' for entity in entities)
+    lines += ["]", ""]
+    return "\n".join(lines)
+
+
+def render_repository_content(entity: EntityDefinition) -> str:
+    spec = repository_spec(entity)
+    record = f"{entity.name}Record"
+    has_key = bool(spec.primary_key)
+    typing_names = ["Any", "Iterable"]
+    if has_key:
+        typing_names.append("Iterator")
+    typing_names += ["List", "Mapping", "NamedTuple", "Optional", "Sequence"]
+    lines = [
+        f'"""Bulk sqlite3 repository and read records for {entity.name} rows in {entity.table}."""',
+        "from __future__ import annotations",
+        "",
+        "import sqlite3",
+        "from datetime import datetime",
+        "from decimal import Decimal",
+        f"from typing import {', '.join(typing_names)}",
+        "from uuid import UUID",
+        "",
+    ]
+    if spec.imports:
+        lines.append(f"from .. import {', '.join(spec.imports)}")
+        lines.append("")
+    lines.append(f'TABLE = "{entity.table}"')
+    lines.append("COLUMNS = (")
+    lines.extend(f'    "{column}",' for column in spec.columns)
+    lines.append(")")
+    lines.append(f"PRIMARY_KEY = {spec.primary_key_literal}")
+    lines.append(f"CHUNK_SIZE = {spec.chunk_size}")
+    lines.append("")
+    lines.append(f"SELECT_SQL = {spec.select_sql!r}")
+    lines.append(f"INSERT_SQL = {spec.insert_sql!r}")
+    if spec.upsert_sql:
+        lines.append(f"UPSERT_SQL = {spec.upsert_sql!r}")
+    if has_key:
+        lines.append(f"DELETE_SQL = {spec.delete_sql!r}")
+        lines.append(f"KEY_FILTER = {spec.key_filter!r}")
+        lines.append(f"KEY_PLACEHOLDER = {spec.key_placeholder!r}")
+    lines += [
+        "",
+        "",
+        f"class {record}(NamedTuple):",
+        f'    """Read-only {entity.table} row; fields follow ``COLUMNS``."""',
+        "",
+    ]
+    lines.extend(f"    {name}: {annotation}" for name, annotation in spec.fields)
+    lines += [
+        "",
+        "",
+        "_new_record = tuple.__new__",
+        "",
+        "",
+        f"def row_factory(cursor: sqlite3.Cursor, row: Sequence[Any]) -> {record}:",
+        '    """``sqlite3`` row factory decoding a ``SELECT_SQL`` row into a record."""',
+        "    return _new_record(",
+        f"        {record},",
+        "        (",
+    ]
+    lines.extend(f"            {decoder}," for decoder in spec.decoders)
+    lines += ["        ),", "    )", "", ""]
+    lines += ["def _params(row: Mapping[str, Any]) -> tuple:", "    return ("]
+    lines.extend(f"        {param}," for param in spec.params)
+    lines += ["    )", "", ""]
+    if has_key:
+        lines += [
+            "def _key(key: Any) -> tuple:",
+            f"    return {spec.key_literal}",
+            "",
+            "",
+            "def _key_filter(count: int) -> str:",
+            '    return KEY_FILTER.format(", ".join([KEY_PLACEHOLDER] * count))',
+            "",
+            "",
+            "def _chunks(keys: Iterable[Any]) -> Iterator[List[Any]]:",
+            "    keys = list(keys)",
+            "    for start in range(0, len(keys), CHUNK_SIZE):",
+            "        yield keys[start : start + CHUNK_SIZE]",
+            "",
+            "",
+        ]
+    lines += [
+        "def fetch_all(",
+        '    conn: sqlite3.Connection, where: str = "", params: Sequence[Any] = ()',
+        f") -> List[{record}]:",
+        '    """Records matching ``where`` (e.g. ``\'"status" = ?\'``), or every row."""',
+        "    cursor = conn.cursor()",
+        "    cursor.row_factory = row_factory",
+        '    sql = f"{SELECT_SQL} WHERE {where}" if where else SELECT_SQL',
+        "    return cursor.execute(sql, params).fetchall()",
+        "",
+        "",
+        "def insert_many(conn: sqlite3.Connection, rows: Iterable[Mapping[str, Any]]) -> int:",
+        '    """Insert ``rows`` (mappings keyed by column name) with one ``executemany``.',
+        "",
+        "    Missing optional columns take their default or NULL. The caller owns the",
+        "    transaction. Returns the number of rows inserted.",
+        '    """',
+        "    cursor = conn.cursor()",
+        "    cursor.executemany(INSERT_SQL, map(_params, rows))",
+        "    return cursor.rowcount",
+        "",
+        "",
+    ]
+    if spec.upsert_sql:
+        lines += [
+            "def upsert_many(conn: sqlite3.Connection, rows: Iterable[Mapping[str, Any]]) -> int:",
+            '    """Insert ``rows``, updating the stored row on a primary key or unique conflict."""',
+            "    cursor = conn.cursor()",
+            "    cursor.executemany(UPSERT_SQL, map(_params, rows))",
+            "    return cursor.rowcount",
+            "",
+            "",
+        ]
+    if has_key:
+        lines += [
+            f"def get_many(conn: sqlite3.Connection, keys: Iterable[Any]) -> List[{record}]:",
+            '    """Records whose primary key is in ``keys``, queried ``CHUNK_SIZE`` keys at a time.',
+            "",
+            "    Composite keys are tuples in ``PRIMARY_KEY`` order. Records come back in",
+            "    storage order and unknown keys are skipped.",
+            '    """',
+            "    cursor = conn.cursor()",
+            "    cursor.row_factory = row_factory",
+            f"    found: List[{record}] = []",
+            "    for chunk in _chunks(keys):",
+            "        params = [value for key in chunk for value in _key(key)]",
+            "        cursor.execute(SELECT_SQL + _key_filter(len(chunk)), params)",
+            "        found.extend(cursor.fetchall())",
+            "    return found",
+            "",
+            "",
+            "def delete_many(conn: sqlite3.Connection, keys: Iterable[Any]) -> int:",
+            '    """Delete the rows whose primary key is in ``keys``; returns how many went."""',
+            "    cursor = conn.cursor()",
+            "    deleted = 0",
+            "    for chunk in _chunks(keys):",
+            "        params = [value for key in chunk for value in _key(key)]",
+            "        cursor.execute(DELETE_SQL + _key_filter(len(chunk)), params)",
+            "        deleted += cursor.rowcount",
+            "    return deleted",
+            "",
+            "",
+        ]
+    exported = ["COLUMNS", "PRIMARY_KEY", "SELECT_SQL", "TABLE", record]
+    if has_key:
+        exported += ["delete_many"]
+    exported.append("fetch_all")
+    if has_key:
+        exported.append("get_many")
+    exported += ["insert_many", "row_factory"]
+    if spec.upsert_sql:
+        exported.append("upsert_many")
+    lines.append("__all__ = [")
+    lines.extend(f'    "{name}",' for name in exported)
+    lines.append("]")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def render_repositories_init_content(entities: Sequence[EntityDefinition]) -> str:
+    lines = [
+        '"""Bulk sqlite3 repositories, one module per table."""',
+        "from __future__ import annotations",
+        "",
+    ]
+    for entity in entities:
+        lines.append(f"from . import {entity.table}")
+    lines.append("")
+    lines.append("__all__ = [")
+    for entity in entities:
+        lines.append(f'    "{entity.table}",')
+    lines.append("]")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def render_testing_content() -> str:
+    return (
+        '"""Statement counting for tests that guard against N+1 query regressions.\n'
+        "\n"
+        "Load a screen inside ``count_statements`` and assert on the number of\n"
+        "statements it took, which stays flat while every relationship the screen\n"
+        "walks is loaded eagerly::\n"
+        "\n"
+        "    with max_statements(session, 6) as log:\n"
+        "        comanda = session.get(Comanda, key)\n"
+        "        render(comanda.orders, comanda.payments)\n"
+        "\n"
+        "Both accept an Engine, a Connection or a Session bound to an engine.\n"
+        '"""\n'
+        "from __future__ import annotations\n"
+        "\n"
+        "from contextlib import contextmanager\n"
+        "from typing import Any, Iterator, List, Tuple\n"
+        "\n"
+        "from sqlalchemy import event\n"
+        "from sqlalchemy.engine import Connection, Engine\n"
+        "\n"
+        "\n"
+        "class StatementLog(List[Tuple[str, Any]]):\n"
+        '    """``(statement, parameters)`` of every statement executed, in order."""\n'
+        "\n"
+        "    @property\n"
+        "    def statements(self) -> List[str]:\n"
+        "        return [statement for statement, _ in self]\n"
+        "\n"
+        "    def __str__(self) -> str:\n"
+        '        return "\\n".join(f"{n}: {statement}" for n, statement in enumerate(self.statements, 1))\n'
+        "\n"
+        "\n"
+        "def _engine(bind: Any) -> Engine:\n"
+        "    if isinstance(bind, Connection):\n"
+        "        return bind.engine\n"
+        "    if not isinstance(bind, Engine):\n"
+        "        bind = bind.get_bind()\n"
+        "    return bind.engine if isinstance(bind, Connection) else bind\n"
+        "\n"
+        "\n"
+        "@contextmanager\n"
+        "def count_statements(bind: Any) -> Iterator[StatementLog]:\n"
+        '    """Record the statements the engine behind ``bind`` executes within the block."""\n'
+        "    log = StatementLog()\n"
+        "\n"
+        "    def record(conn, cursor, statement, parameters, context, executemany) -> None:\n"
+        "        log.append((statement, parameters))\n"
+        "\n"
+        "    engine = _engine(bind)\n"
+        '    event.listen(engine, "before_cursor_execute", record)\n'
+        "    try:\n"
+        "        yield log\n"
+        "    finally:\n"
+        '        event.remove(engine, "before_cursor_execute", record)\n'
+        "\n"
+        "\n"
+        "@contextmanager\n"
+        "def max_statements(bind: Any, limit: int) -> Iterator[StatementLog]:\n"
+        '    """``count_statements``, failing if the block executed more than ``limit`` statements."""\n'
+        "    with count_statements(bind) as log:\n"
+        "        yield log\n"
+        "    if len(log) > limit:\n"
+        '        raise AssertionError(f"{len(log)} statements executed, at most {limit} expected:\\n{log}")\n'
+    )
+
+
+def render_validation_content() -> str:
+    return (
+        '"""Column-wise row validation and streaming CSV/JSONL imports.\n\n'
+        "Every ``validators/<table>.py`` module lists a ``Column`` per insertable\n"
+        "column with the check for its type. ``validate`` runs each check down a\n"
+        "whole column of a batch before moving to the next one, so the per-type work\n"
+        "is chosen once per column rather than once per value. A check returns the\n"
+        "stored form of a value (e.g. a UUID as text or a 16-byte blob, following\n"
+        "the storage profile) or raises ``ValueError``. Empty strings count as\n"
+        "missing, so CSV files need no special NULL marker.\n\n"
+        "``import_file`` streams a file through a validator ``chunk_size`` rows at\n"
+        "a time: the valid rows of each chunk are inserted in one transaction and\n"
+        "the rejected ones are appended to a JSONL file with their line number and\n"
+        "errors. Memory therefore depends on the chunk size, not on the file size.\n"
+        '"""\n'
+        "from __future__ import annotations\n\n"
+        "import csv\n"
+        "import json\n"
+        "import sqlite3\n"
+        "from datetime import datetime\n"
+        "from decimal import Decimal, InvalidOperation\n"
+        "from itertools import islice\n"
+        "from pathlib import Path\n"
+        "from types import ModuleType\n"
+        "from typing import (\n"
+        "    IO,\n"
+        "    Any,\n"
+        "    Callable,\n"
+        "    Dict,\n"
+        "    Iterable,\n"
+        "    Iterator,\n"
+        "    List,\n"
+        "    Mapping,\n"
+        "    NamedTuple,\n"
+        "    Optional,\n"
+        "    Sequence,\n"
+        "    Tuple,\n"
+        "    Union,\n"
+        ")\n"
+        "from uuid import UUID\n\n"
+        "from . import converters\n\n"
+        "CHUNK_SIZE = 10_000\n"
+        'FORMATS = ("csv", "jsonl")\n\n'
+        '_TRUE = frozenset(("1", "true", "t", "yes", "y"))\n'
+        '_FALSE = frozenset(("0", "false", "f", "no", "n"))\n\n\n'
+        "class Column(NamedTuple):\n"
+        '    """Insertable column: the check of its values and what a missing value becomes."""\n\n'
+        "    name: str\n"
+        "    check: Callable[[Any], Any]\n"
+        "    required: bool = False\n"
+        "    default: Any = None\n\n\n"
+        "class Rejected(NamedTuple):\n"
+        '    """Input row refused by validation or by a constraint, with its line number."""\n\n'
+        "    line: int\n"
+        "    row: Any\n"
+        "    errors: Tuple[str, ...]\n\n\n"
+        "class ImportResult(NamedTuple):\n"
+        "    read: int\n"
+        "    inserted: int\n"
+        "    rejected: int\n\n\n"
+        "def integer(value: Any) -> int:\n"
+        "    if isinstance(value, int) and not isinstance(value, bool):\n"
+        "        return value\n"
+        "    if isinstance(value, str):\n"
+        "        try:\n"
+        "            return int(value)\n"
+        "        except ValueError:\n"
+        "            pass\n"
+        "    elif isinstance(value, float) and value.is_integer():\n"
+        "        return int(value)\n"
+        '    raise ValueError(f"expected an integer, got {value!r}")\n\n\n'
+        "def number(value: Any) -> float:\n"
+        "    if isinstance(value, (int, float)) and not isinstance(value, bool):\n"
+        "        return float(value)\n"
+        "    if isinstance(value, str):\n"
+        "        try:\n"
+        "            return float(value)\n"
+        "        except ValueError:\n"
+        "            pass\n"
+        '    raise ValueError(f"expected a number, got {value!r}")\n\n\n'
+        "def boolean(value: Any) -> int:\n"
+        "    if isinstance(value, bool):\n"
+        "        return int(value)\n"
+        "    if isinstance(value, int) and value in (0, 1):\n"
+        "        return value\n"
+        "    if isinstance(value, str):\n"
+        "        lowered = value.strip().lower()\n"
+        "        if lowered in _TRUE:\n"
+        "            return 1\n"
+        "        if lowered in _FALSE:\n"
+        "            return 0\n"
+        '    raise ValueError(f"expected a boolean, got {value!r}")\n\n\n'
+        "def text(value: Any) -> str:\n"
+        "    if isinstance(value, str):\n"
+        "        return value\n"
+        "    if isinstance(value, (int, float)) and not isinstance(value, bool):\n"
+        "        return str(value)\n"
+        '    raise ValueError(f"expected text, got {value!r}")\n\n\n'
+        "def decimal(precision: int, scale: int) -> Callable[[Any], float]:\n"
+        '    """Check for ``NUMERIC(precision, scale)``: at most ``scale`` decimal places\n'
+        '    and ``precision - scale`` integer digits."""\n'
+        "    whole = precision - scale\n\n"
+        "    def check(value: Any) -> float:\n"
+        "        if isinstance(value, bool):\n"
+        '            raise ValueError(f"expected a decimal, got {value!r}")\n'
+        "        try:\n"
+        "            number = Decimal(value if isinstance(value, str) else str(value))\n"
+        "        except (InvalidOperation, TypeError):\n"
+        '            raise ValueError(f"expected a decimal, got {value!r}") from None\n'
+        "        if not number.is_finite():\n"
+        '            raise ValueError(f"expected a decimal, got {value!r}")\n'
+        "        _, digits, exponent = number.normalize().as_tuple()\n"
+        "        if -exponent > scale:\n"
+        '            raise ValueError(f"{value!r} has more than {scale} decimal places")\n'
+        "        if len(digits) + exponent > whole:\n"
+        '            raise ValueError(f"{value!r} does not fit NUMERIC({precision},{scale})")\n'
+        "        return float(number)\n\n"
+        "    return check\n\n\n"
+        "def choice(values: Sequence[str]) -> Callable[[Any], str]:\n"
+        "    allowed = frozenset(values)\n\n"
+        "    def check(value: Any) -> str:\n"
+        "        if isinstance(value, str) and value in allowed:\n"
+        "            return value\n"
+        "        raise ValueError(f\"{value!r} is not one of {', '.join(values)}\")\n\n"
+        "    return check\n\n\n"
+        "def _uuid(value: Any) -> UUID:\n"
+        "    if isinstance(value, UUID):\n"
+        "        return value\n"
+        "    if isinstance(value, str):\n"
+        "        try:\n"
+        "            return UUID(value)\n"
+        "        except ValueError:\n"
+        "            pass\n"
+        '    raise ValueError(f"expected a UUID, got {value!r}")\n\n\n'
+        "def uuid_text(value: Any) -> str:\n"
+        "    return str(_uuid(value))\n\n\n"
+        "def uuid_blob(value: Any) -> bytes:\n"
+        "    return _uuid(value).bytes\n\n\n"
+        "def _datetime(value: Any) -> datetime:\n"
+        "    if isinstance(value, datetime):\n"
+        "        return value\n"
+        "    if isinstance(value, str):\n"
+        "        try:\n"
+        "            return datetime.fromisoformat(value)\n"
+        "        except ValueError:\n"
+        "            pass\n"
+        '    raise ValueError(f"expected an ISO 8601 datetime, got {value!r}")\n\n\n'
+        "def datetime_text(value: Any) -> str:\n"
+        "    return converters.datetime_to_text(_datetime(value))\n\n\n"
+        "def datetime_epoch(value: Any) -> int:\n"
+        "    return converters.datetime_to_epoch_ms(_datetime(value))\n\n\n"
+        "def validate(\n"
+        "    columns: Sequence[Column], rows: Sequence[Mapping[str, Any]]\n"
+        ") -> Tuple[List[tuple], Dict[int, List[str]]]:\n"
+        '    """Check ``rows`` (mappings keyed by column name) one column at a time.\n\n'
+        "    Returns the stored values of the valid rows, in ``columns`` order, and\n"
+        "    the errors of the other rows keyed by their position in ``rows``.\n"
+        '    """\n'
+        "    errors: Dict[int, List[str]] = {}\n"
+        "    known = {column.name for column in columns}\n"
+        "    for position, row in enumerate(rows):\n"
+        "        unknown = row.keys() - known\n"
+        "        if unknown:\n"
+        '            errors[position] = [f"{name}: unknown column" for name in sorted(map(str, unknown))]\n'
+        "    stored = []\n"
+        "    for name, check, required, default in columns:\n"
+        "        values: List[Any] = []\n"
+        "        append = values.append\n"
+        "        for position, row in enumerate(rows):\n"
+        "            value = row.get(name)\n"
+        '            if value is None or value == "":\n'
+        "                if required:\n"
+        '                    errors.setdefault(position, []).append(f"{name}: required")\n'
+        "                append(default)\n"
+        "                continue\n"
+        "            try:\n"
+        "                append(check(value))\n"
+        "            except (TypeError, ValueError) as error:\n"
+        '                errors.setdefault(position, []).append(f"{name}: {error}")\n'
+        "                append(None)\n"
+        "        stored.append(values)\n"
+        "    valid = [values for position, values in enumerate(zip(*stored)) if position not in errors]\n"
+        "    return valid, errors\n\n\n"
+        "def read_rows(\n"
+        "    path: Union[str, Path], format: Optional[str] = None\n"
+        ") -> Iterator[Tuple[int, Any]]:\n"
+        '    """Rows of a CSV or JSONL file with their line numbers, read lazily.\n\n'
+        "    ``format`` defaults to the file suffix (``.ndjson`` reads as JSONL). A\n"
+        "    JSONL line that is not a JSON object is yielded as its text, which\n"
+        "    ``import_rows`` rejects.\n"
+        '    """\n'
+        "    path = Path(path)\n"
+        "    if format is None:\n"
+        "        suffix = path.suffix[1:].lower()\n"
+        '        format = "jsonl" if suffix == "ndjson" else suffix\n'
+        "    if format not in FORMATS:\n"
+        "        raise ValueError(f\"{path}: unknown format {format!r}; use one of {', '.join(FORMATS)}\")\n"
+        '    with path.open(newline="", encoding="utf-8") as handle:\n'
+        '        if format == "csv":\n'
+        "            reader = csv.DictReader(handle)\n"
+        "            for row in reader:\n"
+        "                yield reader.line_num, row\n"
+        "            return\n"
+        "        for line, content in enumerate(handle, 1):\n"
+        "            if not content.strip():\n"
+        "                continue\n"
+        "            try:\n"
+        "                row = json.loads(content)\n"
+        "            except ValueError:\n"
+        "                row = None\n"
+        '            yield line, row if isinstance(row, dict) else content.rstrip("\\r\\n")\n\n\n'
+        "def _insert(\n"
+        "    conn: sqlite3.Connection,\n"
+        "    sql: str,\n"
+        "    rows: List[Tuple[int, Mapping[str, Any], tuple]],\n"
+        "    rejected: List[Rejected],\n"
+        ") -> int:\n"
+        '    conn.execute("BEGIN")\n'
+        "    try:\n"
+        "        try:\n"
+        "            conn.executemany(sql, [values for _, _, values in rows])\n"
+        "            inserted = len(rows)\n"
+        "        except sqlite3.IntegrityError:\n"
+        "            # A failed constraint only aborts its own statement, so the chunk\n"
+        "            # is replayed row by row to keep the good rows and report the rest.\n"
+        '            conn.execute("ROLLBACK")\n'
+        '            conn.execute("BEGIN")\n'
+        "            inserted = 0\n"
+        "            for line, row, values in rows:\n"
+        "                try:\n"
+        "                    conn.execute(sql, values)\n"
+        "                    inserted += 1\n"
+        "                except sqlite3.IntegrityError as error:\n"
+        "                    rejected.append(Rejected(line, row, (str(error),)))\n"
+        '        conn.execute("COMMIT")\n'
+        "    except BaseException:\n"
+        "        if conn.in_transaction:\n"
+        '            conn.execute("ROLLBACK")\n'
+        "        raise\n"
+        "    return inserted\n\n\n"
+        "def import_rows(\n"
+        "    conn: sqlite3.Connection,\n"
+        "    validator: ModuleType,\n"
+        "    rows: Iterable[Tuple[int, Any]],\n"
+        "    rejects: Optional[IO[str]] = None,\n"
+        "    *,\n"
+        "    chunk_size: int = CHUNK_SIZE,\n"
+        ") -> ImportResult:\n"
+        '    """Validate and insert ``(line, row)`` pairs ``chunk_size`` at a time.\n\n'
+        "    Each chunk is inserted in its own transaction, so ``conn`` must not be\n"
+        "    inside one. Rejected rows are written to ``rejects`` as JSON lines.\n"
+        '    """\n'
+        "    rows = iter(rows)\n"
+        "    read = inserted = rejected = 0\n"
+        "    while True:\n"
+        "        chunk = list(islice(rows, chunk_size))\n"
+        "        if not chunk:\n"
+        "            break\n"
+        "        read += len(chunk)\n"
+        "        refused = [\n"
+        '            Rejected(line, row, ("not a JSON object",)) for line, row in chunk if isinstance(row, str)\n'
+        "        ]\n"
+        "        parsed = [(line, row) for line, row in chunk if not isinstance(row, str)]\n"
+        "        valid, errors = validator.validate([row for _, row in parsed])\n"
+        "        refused.extend(\n"
+        "            Rejected(parsed[position][0], parsed[position][1], tuple(messages))\n"
+        "            for position, messages in errors.items()\n"
+        "        )\n"
+        "        accepted = [pair for position, pair in enumerate(parsed) if position not in errors]\n"
+        "        inserted += _insert(\n"
+        "            conn,\n"
+        "            validator.INSERT_SQL,\n"
+        "            [(line, row, values) for (line, row), values in zip(accepted, valid)],\n"
+        "            refused,\n"
+        "        )\n"
+        "        rejected += len(refused)\n"
+        "        if rejects is not None:\n"
+        "            for entry in sorted(refused, key=lambda entry: entry.line):\n"
+        '                rejects.write(json.dumps(entry._asdict(), default=str) + "\\n")\n'
+        "    return ImportResult(read, inserted, rejected)\n\n\n"
+        "def import_file(\n"
+        "    conn: sqlite3.Connection,\n"
+        "    validator: ModuleType,\n"
+        "    path: Union[str, Path],\n"
+        "    *,\n"
+        "    rejects_path: Optional[Union[str, Path]] = None,\n"
+        "    chunk_size: int = CHUNK_SIZE,\n"
+        "    format: Optional[str] = None,\n"
+        ") -> ImportResult:\n"
+        '    """Stream ``path`` through ``validator`` into its table.\n\n'
+        "    Rejected rows go to ``rejects_path`` (``<path>.rejected.jsonl`` by\n"
+        "    default), which is only kept when something was rejected.\n"
+        '    """\n'
+        "    path = Path(path)\n"
+        '    rejects_path = Path(rejects_path or path.with_name(path.name + ".rejected.jsonl"))\n'
+        '    with rejects_path.open("w", encoding="utf-8") as rejects:\n'
+        "        result = import_rows(\n"
+        "            conn, validator, read_rows(path, format), rejects, chunk_size=chunk_size\n"
+        "        )\n"
+        "    if not result.rejected:\n"
+        "        rejects_path.unlink()\n"
+        "    return result\n\n\n"
+        "__all__ = [\n"
+        '    "CHUNK_SIZE",\n'
+        '    "Column",\n'
+        '    "FORMATS",\n'
+        '    "ImportResult",\n'
+        '    "Rejected",\n'
+        '    "boolean",\n'
+        '    "choice",\n'
+        '    "datetime_epoch",\n'
+        '    "datetime_text",\n'
+        '    "decimal",\n'
+        '    "import_file",\n'
+        '    "import_rows",\n'
+        '    "integer",\n'
+        '    "number",\n'
+        '    "read_rows",\n'
+        '    "text",\n'
+        '    "uuid_blob",\n'
+        '    "uuid_text",\n'
+        '    "validate",\n'
+        "]\n"
+    )
+
+
+def render_validator_content(entity: EntityDefinition) -> str:
+    spec = validator_spec(entity)
+    lines = [
+        f'"""Column-wise validation of {entity.name} rows for bulk imports into {entity.table}."""',
+        "from __future__ import annotations",
+        "",
+        "from typing import Any, Dict, List, Mapping, Sequence, Tuple",
+        "",
+        "from .. import validation",
+        "",
+        f'TABLE = "{entity.table}"',
+        "COLUMNS = (",
+    ]
+    lines.extend(f"    {column}," for column in spec.columns)
+    lines += [
+        ")",
+        f"INSERT_SQL = {spec.insert_sql!r}",
+        "",
+        "",
+        "def validate(rows: Sequence[Mapping[str, Any]]) -> Tuple[List[tuple], Dict[int, List[str]]]:",
+        '    """Stored values of the valid ``rows``, in ``COLUMNS`` order, and the errors of the rest."""',
+        "    return validation.validate(COLUMNS, rows)",
+        "",
+        "",
+        '__all__ = ["COLUMNS", "INSERT_SQL", "TABLE", "validate"]',
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def render_validators_init_content(entities: Sequence[EntityDefinition]) -> str:
+    lines = [
+        '"""Column-wise validators for bulk imports, one module per table."""',
+        "from __future__ import annotations",
+        "",
+    ]
+    for entity in entities:
+        lines.append(f"from . import {entity.table}")
+    lines.append("")
+    lines.append("__all__ = [")
+    for entity in entities:
+        lines.append(f'    "{entity.table}",')
+    lines.append("]")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def render_instrumentation_content(entities: Sequence[EntityDefinition]) -> str:
+    head = (
+        '"""Per-entity statement statistics for engines serving the generated models.\n'
+        "\n"
+        "``instrument(engine)`` attaches engine and ORM listeners that aggregate, for\n"
+        "each entity and statement kind (``select``, ``insert``, ``update``,\n"
+        "``delete`` or ``other``):\n"
+        "\n"
+        "- ``count``, ``total_ms`` and ``p95_ms``: statements and their latency;\n"
+        "- ``rows``: rows written by DML, and instances loaded or refreshed by ORM\n"
+        "  queries (rows fetched through Core are not counted). The driver reports\n"
+        "  the rows of a ``RETURNING`` statement only as they are fetched, so those\n"
+        "  count one per execution, which is what the ORM's inserts into\n"
+        "  autoincrement keys issue;\n"
+        "- ``lock_wait_ms``: time spent waiting for SQLite's write lock.\n"
+        "\n"
+        "Statements are attributed to the table they read or write first; tables\n"
+        "without a model keep their name. Latencies go into fixed-size histograms of\n"
+        "``BUCKETS`` counters, four per power of two microseconds, so recording one\n"
+        "is a few integer operations and ``p95_ms`` is the upper bound of its bucket,\n"
+        "at most 25% above the true value.\n"
+        "\n"
+        "The first write of a transaction takes the write lock. While instrumented,\n"
+        "that write is preceded by ``BEGIN IMMEDIATE`` instead of the sqlite3 module's\n"
+        "implicit ``BEGIN``, and the time it takes is the lock wait, kept out of the\n"
+        "write's own latency.\n"
+        '"""\n'
+        "from __future__ import annotations\n"
+        "\n"
+        "import json\n"
+        "import re\n"
+        "import threading\n"
+        "import time\n"
+        "from pathlib import Path\n"
+        "from typing import Any, Dict, List, Optional, Tuple, Union\n"
+        "\n"
+        "from sqlalchemy import event\n"
+        "from sqlalchemy.engine import Engine\n"
+        "\n"
+        "from .base import Base\n"
+        "\n"
+        "TABLES: Dict[str, str] = {\n"
+    )
+    tail = (
+        "}\n"
+        'KINDS = ("select", "insert", "update", "delete")\n'
+        'WRITES = ("insert", "update", "delete")\n'
+        "BUCKETS = 128\n"
+        "# Distinct statement strings remembered with their target; expanded IN lists\n"
+        "# make new ones, so the cache is cleared when it grows past this.\n"
+        "MAX_STATEMENTS = 4096\n"
+        "\n"
+        '_TABLE = re.compile(r\'\\b(?:FROM|INTO|UPDATE)\\s+(?:\\w+\\.)?(?:"([^"]+)"|(\\w+))\', re.IGNORECASE)\n'
+        '_RETURNING = re.compile(r"\\bRETURNING\\b", re.IGNORECASE)\n'
+        "\n"
+        "\n"
+        "def _bucket(micros: int) -> int:\n"
+        '    """Histogram bucket of a latency in microseconds."""\n'
+        "    if micros < 4:\n"
+        "        return micros\n"
+        "    bits = micros.bit_length()\n"
+        "    return min(BUCKETS - 1, (bits - 2) * 4 + (micros >> (bits - 3)) - 4)\n"
+        "\n"
+        "\n"
+        "def _upper(bucket: int) -> int:\n"
+        '    """Exclusive upper bound, in microseconds, of ``bucket``."""\n'
+        "    if bucket < 4:\n"
+        "        return bucket + 1\n"
+        "    return (bucket % 4 + 5) << (bucket // 4 - 1)\n"
+        "\n"
+        "\n"
+        "def _target(statement: str) -> Tuple[str, str, bool]:\n"
+        '    """``(entity, kind, returning)`` of a statement, from its keywords and first table."""\n'
+        "    words = statement.split(None, 1)\n"
+        '    kind = words[0].lower() if words else ""\n'
+        "    match = _TABLE.search(statement)\n"
+        '    table = (match.group(1) or match.group(2)) if match else "-"\n'
+        "    returning = _RETURNING.search(statement) is not None\n"
+        '    return TABLES.get(table, table), kind if kind in KINDS else "other", returning\n'
+        "\n"
+        "\n"
+        "class Stats:\n"
+        '    """Aggregates of one entity and statement kind."""\n'
+        "\n"
+        '    __slots__ = ("count", "total", "rows", "lock_wait", "histogram")\n'
+        "\n"
+        "    def __init__(self) -> None:\n"
+        "        self.count = 0\n"
+        "        self.total = 0.0\n"
+        "        self.rows = 0\n"
+        "        self.lock_wait = 0.0\n"
+        "        self.histogram: List[int] = [0] * BUCKETS\n"
+        "\n"
+        "    def percentile(self, fraction: float) -> float:\n"
+        '        """Latency in seconds below which ``fraction`` of the statements completed."""\n'
+        "        if not self.count:\n"
+        "            return 0.0\n"
+        "        rank = fraction * self.count\n"
+        "        seen = 0\n"
+        "        for bucket, hits in enumerate(self.histogram):\n"
+        "            seen += hits\n"
+        "            if seen >= rank:\n"
+        "                break\n"
+        "        return _upper(bucket) / 1e6\n"
+        "\n"
+        "    def as_dict(self) -> Dict[str, float]:\n"
+        "        return {\n"
+        '            "count": self.count,\n'
+        '            "total_ms": round(self.total * 1e3, 3),\n'
+        '            "p95_ms": round(self.percentile(0.95) * 1e3, 3),\n'
+        '            "rows": self.rows,\n'
+        '            "lock_wait_ms": round(self.lock_wait * 1e3, 3),\n'
+        "        }\n"
+        "\n"
+        "\n"
+        "class Instrumentation:\n"
+        '    """Statement statistics of one engine, per entity and statement kind."""\n'
+        "\n"
+        "    def __init__(self, engine: Engine):\n"
+        "        self.engine = engine\n"
+        "        self._stats: Dict[Tuple[str, str], Stats] = {}\n"
+        "        self._targets: Dict[str, Tuple[str, str, bool]] = {}\n"
+        "        self._lock = threading.Lock()\n"
+        "        self._attached = False\n"
+        "\n"
+        "    def _listeners(self) -> List[Tuple[Any, str, Any]]:\n"
+        "        # The dialect's execute hooks time the cursor call itself; unlike the\n"
+        "        # connection's cursor events they cost nothing per connection checkout.\n"
+        "        return [\n"
+        '            (self.engine, "do_execute", self._execute),\n'
+        '            (self.engine, "do_executemany", self._executemany),\n'
+        '            (self.engine, "do_execute_no_params", self._execute_no_params),\n'
+        '            (Base, "load", self._load),\n'
+        '            (Base, "refresh", self._refresh),\n'
+        "        ]\n"
+        "\n"
+        '    def attach(self) -> "Instrumentation":\n'
+        "        if not self._attached:\n"
+        "            for target, name, listener in self._listeners():\n"
+        "                event.listen(target, name, listener, propagate=target is Base)\n"
+        "            self._attached = True\n"
+        "        return self\n"
+        "\n"
+        "    def detach(self) -> None:\n"
+        "        if self._attached:\n"
+        "            for target, name, listener in self._listeners():\n"
+        "                event.remove(target, name, listener)\n"
+        "            self._attached = False\n"
+        "\n"
+        "    def _stat(self, entity: str, kind: str) -> Stats:\n"
+        "        stats = self._stats.get((entity, kind))\n"
+        "        if stats is None:\n"
+        "            stats = self._stats[(entity, kind)] = Stats()\n"
+        "        return stats\n"
+        "\n"
+        "    def _record(self, execute: Any, cursor: Any, statement: str, *args: Any) -> bool:\n"
+        "        target = self._targets.get(statement)\n"
+        "        if target is None:\n"
+        "            if len(self._targets) >= MAX_STATEMENTS:\n"
+        "                self._targets.clear()\n"
+        "            target = self._targets[statement] = _target(statement)\n"
+        "        entity, kind, returning = target\n"
+        "        lock_wait = 0.0\n"
+        "        if kind in WRITES:\n"
+        "            raw = cursor.connection\n"
+        "            if not raw.in_transaction and raw.isolation_level is not None:\n"
+        "                started = time.perf_counter()\n"
+        '                cursor.execute("BEGIN IMMEDIATE")\n'
+        "                lock_wait = time.perf_counter() - started\n"
+        "        started = time.perf_counter()\n"
+        "        execute(statement, *args)\n"
+        "        elapsed = time.perf_counter() - started\n"
+        "        bucket = _bucket(int(elapsed * 1e6))\n"
+        "        rows = max(cursor.rowcount, 1 if returning else 0) if kind in WRITES else 0\n"
+        "        with self._lock:\n"
+        "            stats = self._stat(entity, kind)\n"
+        "            stats.count += 1\n"
+        "            stats.total += elapsed\n"
+        "            stats.histogram[bucket] += 1\n"
+        "            stats.lock_wait += lock_wait\n"
+        "            stats.rows += rows\n"
+        "        return True\n"
+        "\n"
+        "    def _execute(self, cursor: Any, statement: str, parameters: Any, context: Any) -> bool:\n"
+        "        return self._record(cursor.execute, cursor, statement, parameters)\n"
+        "\n"
+        "    def _executemany(self, cursor: Any, statement: str, parameters: Any, context: Any) -> bool:\n"
+        "        return self._record(cursor.executemany, cursor, statement, parameters)\n"
+        "\n"
+        "    def _execute_no_params(self, cursor: Any, statement: str, context: Any) -> bool:\n"
+        "        return self._record(cursor.execute, cursor, statement)\n"
+        "\n"
+        "    def _load(self, target: Any, context: Any) -> None:\n"
+        "        bind = context.session.bind\n"
+        "        if bind is None or bind.engine is self.engine:\n"
+        "            with self._lock:\n"
+        '                self._stat(type(target).__name__, "select").rows += 1\n'
+        "\n"
+        "    def _refresh(self, target: Any, context: Any, attrs: Any) -> None:\n"
+        "        self._load(target, context)\n"
+        "\n"
+        "    def snapshot(self, *, reset: bool = False) -> Dict[str, Dict[str, Dict[str, float]]]:\n"
+        '        """``{entity: {kind: stats}}``, entities spending the most time first."""\n'
+        "        with self._lock:\n"
+        "            rows = [\n"
+        "                (entity, kind, stats.as_dict()) for (entity, kind), stats in self._stats.items()\n"
+        "            ]\n"
+        "            if reset:\n"
+        "                self._stats.clear()\n"
+        "        spent: Dict[str, float] = {}\n"
+        "        for entity, _, stats in rows:\n"
+        '            spent[entity] = spent.get(entity, 0.0) + stats["total_ms"] + stats["lock_wait_ms"]\n'
+        "        snapshot: Dict[str, Dict[str, Dict[str, float]]] = {}\n"
+        "        for entity, kind, stats in sorted(rows, key=lambda row: (-spent[row[0]], row[0], row[1])):\n"
+        "            snapshot.setdefault(entity, {})[kind] = stats\n"
+        "        return snapshot\n"
+        "\n"
+        "    def reset(self) -> None:\n"
+        '        """Drop every aggregate; listeners stay attached."""\n'
+        "        with self._lock:\n"
+        "            self._stats.clear()\n"
+        "\n"
+        "    def dump(self, path: Optional[Union[str, Path]] = None, *, reset: bool = False) -> str:\n"
+        '        """The snapshot as JSON, also written to ``path`` when given."""\n'
+        "        document = json.dumps(\n"
+        "            {\n"
+        '                "database": self.engine.url.database,\n'
+        '                "taken_at": time.time(),\n'
+        '                "entities": self.snapshot(reset=reset),\n'
+        "            },\n"
+        "            indent=2,\n"
+        "        )\n"
+        "        if path is not None:\n"
+        '            Path(path).write_text(document + "\\n")\n'
+        "        return document\n"
+        "\n"
+        '    def __enter__(self) -> "Instrumentation":\n'
+        "        return self.attach()\n"
+        "\n"
+        "    def __exit__(self, *exc_info: Any) -> None:\n"
+        "        self.detach()\n"
+        "\n"
+        "\n"
+        "def instrument(engine: Engine) -> Instrumentation:\n"
+        '    """Start collecting statistics for ``engine``; ``detach()`` the result to stop."""\n'
+        "    return Instrumentation(engine).attach()\n"
+        "\n"
+        "\n"
+        '__all__ = ["BUCKETS", "TABLES", "Instrumentation", "Stats", "instrument"]\n'
+    )
+    tables = "".join(f'    "{entity.table}": "{entity.name}",\n' for entity in entities)
+    return head + tables + tail
+
+
+def render_sql_content(entity: EntityDefinition, deferred: Collection[str] = ()) -> str:
     lines = [
         f"-- Auto-generated SQLite DDL for {entity.table}",
-        f"CREATE TABLE IF NOT EXISTS {quoted_table} (",
+        create_table(entity, deferred),
     ]
-    column_defs: List[str] = []
-    for attr in entity.attributes:
-        col_name = f'"{attr.name}"'
-        col = f"{col_name} {attr.sqlite_type}"
-        if attr.enum_values:
-            allowed = ", ".join([f"'{v}'" for v in attr.enum_values])
-            col += f" CHECK ({col_name} IN ({allowed}))"
-        if attr.primary_key and attr.autoincrement and len(pk_columns) == 1:
-            col = f"{col_name} INTEGER PRIMARY KEY AUTOINCREMENT"
-        elif attr.primary_key:
-            col += " NOT NULL"
-        if not attr.primary_key and not attr.nullable:
-            col += " NOT NULL"
-        if attr.raw.get("default") is not None:
-            default_val = attr.raw.get("default")
-            if isinstance(default_val, str):
-                default_literal = f"'{default_val}'"
-            elif isinstance(default_val, bool):
-                default_literal = "1" if default_val else "0"
-            else:
-                default_literal = str(default_val)
-            col += f" DEFAULT {default_literal}"
-        column_defs.append(col)
-
-    lines.append("  " + ",\n  ".join(column_defs))
-    if len(pk_columns) > 1:
-        quoted_pk = ", ".join([f'"{name}"' for name in pk_columns])
-        lines.append(f"  ,PRIMARY KEY({quoted_pk})")
-
-    fk_attrs = [attr for attr in entity.attributes if attr.relation]
-    if fk_attrs:
-        for fk in fk_attrs:
-            lines.append(
-                f"  ,FOREIGN KEY (\"{fk.name}\") REFERENCES \"{fk.relation[0]}\"(\"{fk.relation[1]}\")"
-            )
-    lines.append(");")
+    if entity.indexes:
+        lines.append("-- Indexes")
+        lines.extend(create_indexes(entity))
+    if entity.search:
+        lines.append("-- Full-text search")
+        lines.extend(search_tables(entity))
+    triggers = [statement for _, statement in create_triggers(entity)]
+    if triggers:
+        lines.append("-- Triggers")
+        lines.extend(triggers)
+    return "\n".join(lines) + "\n"
 
-    for idx_num, idx in enumerate(entity.indexes, start=1):
-        unique = "UNIQUE " if idx.get("unique") else ""
-        cols = ",".join([f'"{c}"' for c in idx["columns"]])
-        lines.append(
-            f"CREATE {unique}INDEX IF NOT EXISTS idx_{entity.table}_{idx_num} ON {quoted_table} ({cols});"
-        )
 
+def render_schema_content(
+    name: str,
+    entities: Sequence[EntityDefinition],
+    deferred: Dict[str, Tuple[str, ...]],
+) -> str:
+    lines = [
+        f"-- Auto-generated SQLite schema for {name}",
+        "-- Tables in foreign key order, then indexes and triggers, in one transaction.",
+        "-- Foreign keys closing a cycle are DEFERRABLE INITIALLY DEFERRED.",
+        "BEGIN;",
+    ]
+    for entity in entities:
+        lines += ["", create_table(entity, deferred.get(entity.name, ()))]
+    if any(entity.indexes for entity in entities):
+        lines += ["", "-- Indexes"]
+        for entity in entities:
+            lines.extend(create_indexes(entity))
+    searches = [statement for entity in entities for statement in search_tables(entity)]
+    if searches:
+        lines += ["", "-- Full-text search"]
+        lines.extend(searches)
+    triggers = [trigger for entity in entities for _, trigger in create_triggers(entity)]
+    if triggers:
+        lines += ["", "-- Triggers"]
+        lines.extend(triggers)
+    lines.append("COMMIT;")
+    return "\n".join(lines) + "\n"
+
+
+def _schema_literal(schema: str) -> str:
+    """``schema`` escaped for the body of a triple-quoted Python string."""
+    return schema.replace("\\", "\\\\").replace('"""', '\\"""')
+
+
+def render_sync_content(entities: Sequence[EntityDefinition]) -> str:
+    head = (
+        '"""Delta sync for the offline-first tables.\n'
+        "\n"
+        "Triggers stamp every local insert or update and flag the row dirty.\n"
+        ":func:`changes` streams a table's dirty rows in ``(stamp, primary key)``\n"
+        "order, :func:`acknowledge` clears the flag once the peer has stored them and\n"
+        ":func:`apply_changes` merges a peer's rows, keeping whichever version carries\n"
+        "the newer stamp. Rows travel as tuples of stored values in ``columns`` order;\n"
+        "the dirty flag is not sent.\n"
+        '"""\n'
+        "from __future__ import annotations\n"
+        "\n"
+        "import sqlite3\n"
+        "from typing import Any, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple\n"
+        "\n"
+    )
+    table_class = (
+        "\n"
+        "\n"
+        "\n"
+        "class SyncTable(NamedTuple):\n"
+        '    """Wire columns and SQL used to sync one table."""\n'
+        "\n"
+        "    columns: Tuple[str, ...]\n"
+        "    key: Tuple[int, ...]  # positions of the stamp and primary key in ``columns``\n"
+        "    select_sql: str\n"
+        "    pending_filter: Optional[str]\n"
+        "    since_filter: str\n"
+        "    after_filter: str\n"
+        "    clean_sql: Optional[str]\n"
+        "    upsert_sql: str\n"
+        "\n"
+        "\n"
+        "# Foreign key order: apply parent tables before the tables referencing them.\n"
+    )
+    tail = (
+        "}\n"
+        "\n"
+        "\n"
+        "def changes(\n"
+        "    conn: sqlite3.Connection,\n"
+        "    table: str,\n"
+        "    *,\n"
+        "    since: Any = None,\n"
+        "    batch_size: int = BATCH_SIZE,\n"
+        ") -> Iterator[List[tuple]]:\n"
+        '    """Batches of rows to send, oldest stamp first.\n'
+        "\n"
+        "    Yields the dirty rows, or with ``since`` (a stored stamp value) every row\n"
+        "    stamped after it. Each batch is fetched by keyset from the last row of the\n"
+        "    previous one, so reading deep into a table costs the same as its start\n"
+        "    and acknowledging a batch does not shift the next one.\n"
+        '    """\n'
+        "    spec = TABLES[table]\n"
+        "    if since is None:\n"
+        "        if spec.pending_filter is None:\n"
+        '            raise ValueError(f"{table} has no dirty flag; pass since")\n'
+        "        where, params = spec.pending_filter, ()\n"
+        "    else:\n"
+        "        where, params = spec.since_filter, (since,)\n"
+        "    sql = spec.select_sql.format(where)\n"
+        '    after = spec.select_sql.format(f"{where} AND {spec.after_filter}")\n'
+        "    rows = conn.execute(sql, (*params, batch_size)).fetchall()\n"
+        "    while rows:\n"
+        "        yield rows\n"
+        "        if len(rows) < batch_size:\n"
+        "            return\n"
+        "        last = rows[-1]\n"
+        "        rows = conn.execute(\n"
+        "            after, (*params, *(last[i] for i in spec.key), batch_size)\n"
+        "        ).fetchall()\n"
+        "\n"
+        "\n"
+        "def acknowledge(conn: sqlite3.Connection, table: str, rows: Iterable[Sequence[Any]]) -> int:\n"
+        '    """Clear the dirty flag of sent ``rows`` unless they changed again since.\n'
+        "\n"
+        "    The caller owns the transaction. Returns the number of rows marked clean.\n"
+        '    """\n'
+        "    spec = TABLES[table]\n"
+        "    if spec.clean_sql is None:\n"
+        "        return 0\n"
+        "    stamp, *key = spec.key\n"
+        "    cursor = conn.cursor()\n"
+        "    cursor.executemany(\n"
+        "        spec.clean_sql, ((*(row[i] for i in key), row[stamp]) for row in rows)\n"
+        "    )\n"
+        "    return cursor.rowcount\n"
+        "\n"
+        "\n"
+        "def apply_changes(conn: sqlite3.Connection, table: str, rows: Iterable[Sequence[Any]]) -> int:\n"
+        '    """Upsert a peer\'s ``rows``; a stored row only yields to a newer stamp.\n'
+        "\n"
+        "    Applied rows are stored clean. The caller owns the transaction. Returns\n"
+        "    the number of rows inserted or updated.\n"
+        '    """\n'
+        "    cursor = conn.cursor()\n"
+        "    cursor.executemany(TABLES[table].upsert_sql, rows)\n"
+        "    return cursor.rowcount\n"
+        "\n"
+        "\n"
+        '__all__ = ["BATCH_SIZE", "TABLES", "SyncTable", "acknowledge", "apply_changes", "changes"]\n'
+    )
+    lines = [f"{head}BATCH_SIZE = {BATCH_SIZE}{table_class}TABLES = {{"]
+    for entity in entities:
+        spec = sync_spec(entity)
+        lines.append(f'    "{entity.table}": SyncTable(')
+        lines.append("        columns=(")
+        lines.extend(f'            "{column}",' for column in spec.columns)
+        lines.append("        ),")
+        lines.append(f"        key={spec.key!r},")
+        for name in (
+            "select_sql",
+            "pending_filter",
+            "since_filter",
+            "after_filter",
+            "clean_sql",
+            "upsert_sql",
+        ):
+            lines.append(f"        {name}={getattr(spec, name)!r},")
+        lines.append("    ),")
+    return "\n".join(lines) + "\n" + tail
+
+
+def render_events_content(
+    events: Sequence[EventDefinition],
+    store: EntityDefinition,
+    checkpoint: EntityDefinition,
+) -> str:
+    spec = event_store_spec(store, checkpoint, tuple(events))
+    head = (
+        '"""Append-only event store and projection replay for the domain events.\n'
+        "\n"
+        "Every event of the domain is an immutable ``NamedTuple``. :func:`append_events`\n"
+        "stores events in ``domain_event``, one ``executemany`` and one transaction per\n"
+        "batch, under a ``sequence`` that only grows; the payload is a JSON array in\n"
+        "field order. :func:`read_events` streams them back in sequence order, and\n"
+        ":func:`replay` feeds them to a :class:`Projection`. The projection's position,\n"
+        "and optionally a snapshot of its state, is saved in ``projection_checkpoint``\n"
+        "in the same transaction as each batch, so a restarted replay resumes after\n"
+        "the last committed batch.\n"
+        '"""\n'
+        "from __future__ import annotations\n"
+        "\n"
+        "import json\n"
+        "import sqlite3\n"
+        "from contextlib import contextmanager\n"
+        "from datetime import datetime, timezone\n"
+        "from decimal import Decimal\n"
+        "from typing import (\n"
+        "    Any,\n"
+        "    Dict,\n"
+        "    Iterable,\n"
+        "    Iterator,\n"
+        "    List,\n"
+        "    NamedTuple,\n"
+        "    Optional,\n"
+        "    Sequence,\n"
+        "    Tuple,\n"
+        "    Type,\n"
+        "    Union,\n"
+        ")\n"
+        "from uuid import UUID, uuid4\n"
+        "\n"
+    )
+    stored = (
+        "\n"
+        "\n"
+        "class StoredEvent(NamedTuple):\n"
+        '    """An event read back from the store with its envelope."""\n'
+        "\n"
+        "    sequence: int\n"
+        "    event_id: UUID\n"
+        "    occurred_at: datetime\n"
+        "    aggregate_id: Optional[str]\n"
+        "    event: Event\n"
+        "\n"
+        "\n"
+        "def _stored_time(value: datetime) -> Any:\n"
+        "    return "
+    )
+    stored_event = (
+        "\n"
+        "\n"
+        "def _stored_event(row: Sequence[Any]) -> StoredEvent:\n"
+        "    return StoredEvent(\n"
+        "        row[0],\n"
+    )
+    row3 = (
+        "        row[3],\n"
+        "        EVENT_TYPES[row[2]]._from_payload(json.loads(row[5])),\n"
+        "    )\n"
+        "\n"
+        "\n"
+        "def _utcnow() -> datetime:\n"
+        "    return datetime.now(timezone.utc).replace(tzinfo=None)\n"
+        "\n"
+        "\n"
+        "@contextmanager\n"
+        "def _batch(conn: sqlite3.Connection, own: bool) -> Iterator[None]:\n"
+        '    """One ``BEGIN IMMEDIATE`` transaction, unless the caller already owns one."""\n'
+        "    if not own:\n"
+        "        yield\n"
+        "        return\n"
+        '    conn.execute("BEGIN IMMEDIATE")\n'
+        "    try:\n"
+        "        yield\n"
+        "    except BaseException:\n"
+        '        conn.execute("ROLLBACK")\n'
+        "        raise\n"
+        '    conn.execute("COMMIT")\n'
+        "\n"
+        "\n"
+        "def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:\n"
+        "    chunk: List[Any] = []\n"
+        "    for item in items:\n"
+        "        chunk.append(item)\n"
+        "        if len(chunk) == size:\n"
+        "            yield chunk\n"
+        "            chunk = []\n"
+        "    if chunk:\n"
+        "        yield chunk\n"
+        "\n"
+        "\n"
+        "def append_events(\n"
+        "    conn: sqlite3.Connection,\n"
+        "    events: Iterable[Event],\n"
+        "    *,\n"
+        "    occurred_at: Optional[datetime] = None,\n"
+        "    batch_size: int = BATCH_SIZE,\n"
+        ") -> int:\n"
+        '    """Store ``events`` in order and return the sequence of the last one (0 if none).\n'
+        "\n"
+        "    Each batch of ``batch_size`` events is written with one ``executemany`` in\n"
+        "    its own ``BEGIN IMMEDIATE`` transaction; when ``conn`` is already inside\n"
+        "    a transaction the caller owns it and nothing is committed here. Events get\n"
+        "    a fresh UUID and ``occurred_at`` (naive UTC, default now).\n"
+        '    """\n'
+        "    when = _stored_time(occurred_at or _utcnow())\n"
+        "    own = not conn.in_transaction\n"
+        "    cursor = conn.cursor()\n"
+        "    last = 0\n"
+        "    for chunk in _chunks(events, batch_size):\n"
+        "        rows = [\n"
+        "            (\n"
+    )
+    body = (
+        "                type(event).__name__,\n"
+        "                event._aggregate_id(),\n"
+        "                when,\n"
+        '                json.dumps(event._payload(), separators=(",", ":")),\n'
+        "            )\n"
+        "            for event in chunk\n"
+        "        ]\n"
+        "        with _batch(conn, own):\n"
+        "            cursor.executemany(APPEND_SQL, rows)\n"
+        '            last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]\n'
+        "    return last\n"
+        "\n"
+        "\n"
+        "def read_events(\n"
+        "    conn: sqlite3.Connection,\n"
+        "    *,\n"
+        "    after: int = 0,\n"
+        "    types: Optional[Iterable[Union[str, Type[Event]]]] = None,\n"
+        "    aggregate_id: Optional[str] = None,\n"
+        "    batch_size: int = BATCH_SIZE,\n"
+        ") -> Iterator[List[StoredEvent]]:\n"
+        '    """Batches of stored events with a sequence above ``after``, oldest first.\n'
+        "\n"
+        "    ``types`` (event classes or names) and ``aggregate_id`` narrow the stream.\n"
+        "    Each batch starts after the last sequence of the previous one, so events\n"
+        "    appended while reading are picked up and nothing is read twice.\n"
+        '    """\n'
+        '    where, params = "", []\n'
+        "    if types is not None:\n"
+        "        names = [name if isinstance(name, str) else name.__name__ for name in types]\n"
+        "        where += f' AND \"event_type\" IN ({\", \".join(\"?\" * len(names))})'\n"
+        "        params += names\n"
+        "    if aggregate_id is not None:\n"
+        "        where += ' AND \"aggregate_id\" = ?'\n"
+        "        params.append(aggregate_id)\n"
+        "    sql = SELECT_SQL.format(where)\n"
+        "    while True:\n"
+        "        rows = conn.execute(sql, (after, *params, batch_size)).fetchall()\n"
+        "        if not rows:\n"
+        "            return\n"
+        "        yield [_stored_event(row) for row in rows]\n"
+        "        if len(rows) < batch_size:\n"
+        "            return\n"
+        "        after = rows[-1][0]\n"
+        "\n"
+        "\n"
+        "class Projection:\n"
+        '    """Read model rebuilt from the event store by :func:`replay`.\n'
+        "\n"
+        "    Subclasses set ``name`` (the checkpoint key) and define ``on_<Event>``\n"
+        "    handlers taking ``(conn, stored)``; only handled event types are read.\n"
+        "    Handlers run inside the batch transaction. A projection holding state in\n"
+        "    memory returns it from :meth:`snapshot` as JSON-ready data and gets it\n"
+        "    back in :meth:`restore` when a replay resumes.\n"
+        '    """\n'
+        "\n"
+        '    name = ""\n'
+        "\n"
+        "    def handled(self) -> List[str]:\n"
+        '        return [name for name in EVENT_TYPES if callable(getattr(self, f"on_{name}", None))]\n'
+        "\n"
+        "    def apply(self, conn: sqlite3.Connection, stored: StoredEvent) -> None:\n"
+        '        getattr(self, f"on_{type(stored.event).__name__}")(conn, stored)\n'
+        "\n"
+        "    def reset(self, conn: sqlite3.Connection) -> None:\n"
+        '        """Clear the projected rows before a full rebuild."""\n'
+        "\n"
+        "    def snapshot(self) -> Any:\n"
+        "        return None\n"
+        "\n"
+        "    def restore(self, state: Any) -> None:\n"
+        '        """Take back the state saved by :meth:`snapshot`."""\n'
+        "\n"
+        "\n"
+        "def checkpoint(conn: sqlite3.Connection, name: str) -> Tuple[int, Any]:\n"
+        '    """Last applied sequence and snapshot of projection ``name`` (``(0, None)`` if new)."""\n'
+        "    row = conn.execute(CHECKPOINT_SQL, (name,)).fetchone()\n"
+        "    if row is None:\n"
+        "        return 0, None\n"
+        "    return row[0], None if row[1] is None else json.loads(row[1])\n"
+        "\n"
+        "\n"
+        "def replay(\n"
+        "    conn: sqlite3.Connection,\n"
+        "    projection: Projection,\n"
+        "    *,\n"
+        "    rebuild: bool = False,\n"
+        "    batch_size: int = BATCH_SIZE,\n"
+        ") -> int:\n"
+        '    """Apply the events ``projection`` has not seen yet; returns how many were applied.\n'
+        "\n"
+        "    Resumes after the saved checkpoint, restoring the saved snapshot, unless\n"
+        "    ``rebuild`` is set: then the projection is reset and replayed from the\n"
+        "    first event. Each batch and its checkpoint commit together.\n"
+        '    """\n'
+        "    own = not conn.in_transaction\n"
+        "    if rebuild:\n"
+        "        with _batch(conn, own):\n"
+        "            projection.reset(conn)\n"
+        "            conn.execute(CLEAR_CHECKPOINT_SQL, (projection.name,))\n"
+        "        after = 0\n"
+        "    else:\n"
+        "        after, state = checkpoint(conn, projection.name)\n"
+        "        if state is not None:\n"
+        "            projection.restore(state)\n"
+        "    applied = 0\n"
+        "    for chunk in read_events(\n"
+        "        conn, after=after, types=projection.handled(), batch_size=batch_size\n"
+        "    ):\n"
+        "        with _batch(conn, own):\n"
+        "            for stored in chunk:\n"
+        "                projection.apply(conn, stored)\n"
+        "            state = projection.snapshot()\n"
+        "            conn.execute(\n"
+        "                SAVE_CHECKPOINT_SQL,\n"
+        "                (\n"
+        "                    projection.name,\n"
+        "                    chunk[-1].sequence,\n"
+        '                    None if state is None else json.dumps(state, separators=(",", ":")),\n'
+        "                    _stored_time(_utcnow()),\n"
+        "                ),\n"
+        "            )\n"
+        "        applied += len(chunk)\n"
+        "    return applied\n"
+        "\n"
+        "\n"
+        "__all__ = [\n"
+        '    "BATCH_SIZE",\n'
+        '    "EVENT_TYPES",\n'
+    )
+    tail = (
+        '    "Event",\n'
+        '    "Projection",\n'
+        '    "StoredEvent",\n'
+        '    "append_events",\n'
+        '    "checkpoint",\n'
+        '    "read_events",\n'
+        '    "replay",\n'
+        "]\n"
+    )
+
+    parts = [head]
+    if spec.imports:
+        parts.append(f"from . import {', '.join(spec.imports)}\n\n")
+    parts.append(f"BATCH_SIZE = {EVENT_BATCH_SIZE}\n\n")
+    for name in (
+        "append_sql",
+        "select_sql",
+        "checkpoint_sql",
+        "save_checkpoint_sql",
+        "clear_checkpoint_sql",
+    ):
+        parts.append(f"{name.upper()} = {getattr(spec, name)!r}\n")
+    for event in events:
+        fields = event_spec(event)
+        on = f" on the {event.aggregate} aggregate" if event.aggregate else ""
+        parts.append(f'\n\nclass {event.name}(NamedTuple):\n    """``{event.name}``{on}."""\n')
+        if fields.fields:
+            parts.append("\n")
+            parts.extend(f"    {name}: {annotation}\n" for name, annotation in fields.fields)
+        parts.append(
+            "\n"
+            "    def _aggregate_id(self) -> Optional[str]:\n"
+            f"        return {fields.aggregate_id}\n"
+            "\n"
+            "    def _payload(self) -> list:\n"
+            "        return [\n"
+        )
+        parts.extend(f"            {encoder},\n" for encoder in fields.encoders)
+        parts.append(
+            "        ]\n"
+            "\n"
+            "    @classmethod\n"
+            f'    def _from_payload(cls, values: Sequence[Any]) -> "{event.name}":\n'
+            "        return cls(\n"
+        )
+        parts.extend(f"            {decoder},\n" for decoder in fields.decoders)
+        parts.append("        )\n")
+    parts.append("\n\nEVENT_TYPES: Dict[str, type] = {\n")
+    parts.extend(f'    "{event.name}": {event.name},\n' for event in events)
+    parts.append("}\n\nEvent = Union[\n")
+    parts.extend(f"    {event.name},\n" for event in events)
+    parts += [
+        "]\n",
+        stored,
+        f"{spec.encode_time}\n",
+        stored_event,
+        f"        {spec.decode_event_id},\n        {spec.decode_time},\n",
+        row3,
+        f"                {spec.new_event_id},\n",
+        body,
+    ]
+    parts.extend(f'    "{event.name}",\n' for event in events)
+    parts.append(tail)
+    return "".join(parts)
+
+
+def render_derived_content(entities: Sequence[EntityDefinition]) -> str:
+    head = (
+        '"""Verify and rebuild the derived columns kept by triggers.\n'
+        "\n"
+        "Triggers keep each derived column current as the rows feeding it are\n"
+        "inserted, updated or deleted, so reading a total is a single row lookup.\n"
+        ":func:`verify` recomputes every column from scratch and counts the rows\n"
+        "whose stored value disagrees; :func:`rebuild` rewrites just those rows,\n"
+        "for instance after a bulk load or restoring a backup taken with older\n"
+        "triggers.\n"
+        '"""\n'
+        "from __future__ import annotations\n"
+        "\n"
+        "import sqlite3\n"
+        "from typing import Dict, Iterable, List, NamedTuple, Optional\n"
+        "\n"
+        "\n"
+        "class DerivedColumn(NamedTuple):\n"
+        '    """How one derived column is recomputed from its source rows."""\n'
+        "\n"
+        '    name: str  # "<table>.<column>"\n'
+        "    function: str  # sum | count | latest\n"
+        "    source: str\n"
+        "    verify_sql: str\n"
+        "    rebuild_sql: str\n"
+        "\n"
+        "\n"
+        "# Columns feeding another derived column come before it.\n"
+        "COLUMNS: Dict[str, DerivedColumn] = {\n"
+    )
+    tail = (
+        "}\n"
+        "\n"
+        "\n"
+        "def _selected(columns: Optional[Iterable[str]]) -> List[DerivedColumn]:\n"
+        "    if columns is None:\n"
+        "        return list(COLUMNS.values())\n"
+        "    wanted = set(columns)\n"
+        "    unknown = wanted - set(COLUMNS)\n"
+        "    if unknown:\n"
+        "        raise KeyError(f\"not derived: {', '.join(sorted(unknown))}\")\n"
+        "    return [column for name, column in COLUMNS.items() if name in wanted]\n"
+        "\n"
+        "\n"
+        "def verify(conn: sqlite3.Connection, columns: Optional[Iterable[str]] = None) -> Dict[str, int]:\n"
+        '    """Rows whose stored value differs from a full recomputation, per column."""\n'
+        "    return {\n"
+        "        column.name: conn.execute(column.verify_sql).fetchone()[0]\n"
+        "        for column in _selected(columns)\n"
+        "    }\n"
+        "\n"
+        "\n"
+        "def rebuild(conn: sqlite3.Connection, columns: Optional[Iterable[str]] = None) -> Dict[str, int]:\n"
+        '    """Recompute ``columns`` (all by default); returns the rows rewritten per column.\n'
+        "\n"
+        "    Only rows holding a wrong value are written, and a column is rebuilt\n"
+        "    after the columns feeding it. The caller owns the transaction.\n"
+        '    """\n'
+        "    cursor = conn.cursor()\n"
+        "    rewritten = {}\n"
+        "    for column in _selected(columns):\n"
+        "        cursor.execute(column.rebuild_sql)\n"
+        "        rewritten[column.name] = cursor.rowcount\n"
+        "    return rewritten\n"
+        "\n"
+        "\n"
+        '__all__ = ["COLUMNS", "DerivedColumn", "rebuild", "verify"]\n'
+    )
+    lines = [head.rstrip("\n")]
+    for spec in derived_specs(entities):
+        lines.append(f'    "{spec.name}": DerivedColumn(')
+        for name in ("name", "function", "source", "verify_sql", "rebuild_sql"):
+            lines.append(f"        {name}={getattr(spec, name)!r},")
+        lines.append("    ),")
+    return "\n".join(lines) + "\n" + tail
+
+
+def render_search_content(entities: Sequence[EntityDefinition]) -> str:
+    head = (
+        '"""Ranked prefix search over the full-text indexes of searchable attributes.\n'
+        "\n"
+        "Each searchable table has an external-content FTS5 index, ``<table>_search``,\n"
+        "kept in step by triggers. :func:`search` turns what was typed at the counter\n"
+        "into a query matching the start of every word, so ``cerv pil`` finds\n"
+        '"Cerveja Pilsen" after each keystroke without scanning the table. Hits\n'
+        "come best first by bm25; when more than ``candidates`` rows match, only the\n"
+        "newest of them are ranked, so a keystroke costs about the same on a large\n"
+        "catalogue as on a small one. :func:`verify` checks an index against its\n"
+        "table and :func:`rebuild` re-indexes it, for instance after restoring a\n"
+        "backup taken without the triggers.\n"
+        '"""\n'
+        "from __future__ import annotations\n"
+        "\n"
+        "import re\n"
+        "import sqlite3\n"
+        "from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple\n"
+        "\n"
+        "LIMIT = 20\n"
+        "CANDIDATES = 1000\n"
+        "\n"
+        '_WORD = re.compile(r"\\w+")\n'
+        "\n"
+        "\n"
+        "class SearchIndex(NamedTuple):\n"
+        '    """Full-text index of one table and the statements run against it."""\n'
+        "\n"
+        "    table: str\n"
+        "    index: str\n"
+        "    key: str\n"
+        "    columns: Tuple[str, ...]\n"
+        "    search_sql: str\n"
+        "    rebuild_sql: str\n"
+        "    check_sql: str\n"
+        "\n"
+        "\n"
+        "INDEXES: Dict[str, SearchIndex] = {\n"
+    )
+    tail = (
+        "}\n"
+        "\n"
+        "\n"
+        "def match_query(text: str, prefix: bool = True) -> Optional[str]:\n"
+        '    """FTS5 query matching every word of ``text``, as a prefix by default.\n'
+        "\n"
+        "    Words are quoted, so operators and punctuation in ``text`` are searched\n"
+        "    as plain text rather than parsed. ``None`` when ``text`` has no word.\n"
+        '    """\n'
+        '    suffix = "*" if prefix else ""\n'
+        '    terms = [f\'"{word}"{suffix}\' for word in _WORD.findall(text)]\n'
+        '    return " ".join(terms) if terms else None\n'
+        "\n"
+        "\n"
+        "def search(\n"
+        "    conn: sqlite3.Connection,\n"
+        "    table: str,\n"
+        "    text: str,\n"
+        "    *,\n"
+        "    limit: int = LIMIT,\n"
+        "    prefix: bool = True,\n"
+        "    candidates: int = CANDIDATES,\n"
+        ") -> List[tuple]:\n"
+        '    """``(key, *columns)`` of the rows of ``table`` matching ``text``, best first.\n'
+        "\n"
+        "    The ranking is exact when at most ``candidates`` rows match.\n"
+        '    """\n'
+        "    index = INDEXES[table]\n"
+        "    query = match_query(text, prefix)\n"
+        "    if query is None:\n"
+        "        return []\n"
+        '    parameters = {"query": query, "limit": limit, "candidates": max(candidates, limit)}\n'
+        "    return conn.execute(index.search_sql, parameters).fetchall()\n"
+        "\n"
+        "\n"
+        "def _selected(tables: Optional[Iterable[str]]) -> List[SearchIndex]:\n"
+        "    if tables is None:\n"
+        "        return list(INDEXES.values())\n"
+        "    wanted = set(tables)\n"
+        "    unknown = wanted - set(INDEXES)\n"
+        "    if unknown:\n"
+        '        raise KeyError(f"not searchable: {\', \'.join(sorted(unknown))}")\n'
+        "    return [index for name, index in INDEXES.items() if name in wanted]\n"
+        "\n"
+        "\n"
+        "def verify(conn: sqlite3.Connection, tables: Optional[Iterable[str]] = None) -> Dict[str, bool]:\n"
+        '    """Whether each index matches the rows of its table."""\n'
+        "    results = {}\n"
+        "    for index in _selected(tables):\n"
+        "        try:\n"
+        "            conn.execute(index.check_sql)\n"
+        "        except sqlite3.DatabaseError:\n"
+        "            results[index.table] = False\n"
+        "        else:\n"
+        "            results[index.table] = True\n"
+        "    return results\n"
+        "\n"
+        "\n"
+        "def rebuild(conn: sqlite3.Connection, tables: Optional[Iterable[str]] = None) -> None:\n"
+        '    """Re-index ``tables`` (all by default) from their rows; the caller owns the transaction."""\n'
+        "    for index in _selected(tables):\n"
+        "        conn.execute(index.rebuild_sql)\n"
+        "\n"
+        "\n"
+        "__all__ = [\n"
+        '    "CANDIDATES",\n'
+        '    "INDEXES",\n'
+        '    "LIMIT",\n'
+        '    "SearchIndex",\n'
+        '    "match_query",\n'
+        '    "rebuild",\n'
+        '    "search",\n'
+        '    "verify",\n'
+        "]\n"
+    )
+    lines = [head.rstrip("\n")]
+    for spec in map(search_spec, entities):
+        lines.append(f'    "{spec.table}": SearchIndex(')
+        for name in ("table", "index", "key"):
+            lines.append(f"        {name}={getattr(spec, name)!r},")
+        lines.append(f"        columns={spec.columns!r},")
+        for name in ("search_sql", "rebuild_sql", "check_sql"):
+            lines.append(f"        {name}={getattr(spec, name)!r},")
+        lines.append("    ),")
+    return "\n".join(lines) + "\n" + tail
+
+
+def render_archive_sql_content(
+    name: str,
+    retention: Sequence[RetentionDefinition],
+    entities: Sequence[EntityDefinition],
+) -> str:
+    lines = [
+        f"-- Auto-generated SQLite archive schema for {name}",
+        '-- Run with the archive database attached as "archive". Tables mirror the',
+        "-- archived hot tables without foreign keys or triggers.",
+        "BEGIN;",
+    ]
+    for statement in archive_tables(retention, entities):
+        lines += ["", statement]
+    indexes = archive_indexes(retention, entities)
+    if indexes:
+        lines += ["", "-- Indexes"]
+        lines.extend(indexes)
+    lines += [
+        "COMMIT;",
+        "",
+        "-- Hot and archived rows together, for reporting (TEMP: once per connection)",
+    ]
+    lines.extend(archive_views(retention, entities))
     return "\n".join(lines) + "\n"
 
 
+def render_archive_content(
+    name: str,
+    retention: Sequence[RetentionDefinition],
+    entities: Sequence[EntityDefinition],
+) -> str:
+    head = (
+        '"""Move closed object graphs from the hot tables into an attached archive database.\n'
+        "\n"
+        "Each job picks up to ``batch_size`` roots matching its retention rule, for\n"
+        "instance comandas closed more than 90 days ago, gathers every row that\n"
+        "references them down the foreign keys and moves the whole graph, so the\n"
+        "hot tables stay the size of the recent activity. Graphs holding rows not\n"
+        "yet synced (``dirty``) stay hot until they are. Rows of detached entities\n"
+        "stay hot too, their reference into the graph cleared.\n"
+        "\n"
+        "A batch copies the graph into the archive and commits before a second\n"
+        "transaction gathers it again, copies it once more with ``INSERT OR\n"
+        "REPLACE`` and deletes it from the hot tables. In WAL mode SQLite commits\n"
+        "the two files one at a time, so this order is what guarantees that no row\n"
+        "leaves the hot database before it is safely in the archive; a run stopped\n"
+        "halfway is finished by the next one.\n"
+        "\n"
+        ":func:`attach` attaches the archive file and creates its tables and the\n"
+        "``<table>_all`` TEMP views, hot rows followed by archived ones.\n"
+        '"""\n'
+        "from __future__ import annotations\n"
+        "\n"
+        "import sqlite3\n"
+        "from contextlib import contextmanager\n"
+        "from datetime import datetime, timedelta, timezone\n"
+        "from pathlib import Path\n"
+        "from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union\n"
+        "\n"
+        "from . import converters\n"
+        "\n"
+        'SCHEMA = "archive"\n'
+        "\n"
+        "\n"
+        "class Step(NamedTuple):\n"
+        '    """One table of an archived graph and the statements moving its rows."""\n'
+        "\n"
+        "    table: str\n"
+        "    keys: str\n"
+        "    select_sql: str\n"
+        "    dirty_sql: Optional[str]\n"
+        "    copy_sql: str\n"
+        "    uncopy_sql: str\n"
+        "    delete_sql: str\n"
+        "\n"
+        "\n"
+        "class Job(NamedTuple):\n"
+        '    """Retention rule of one root entity; ``steps`` in foreign key order, root first."""\n'
+        "\n"
+        "    name: str\n"
+        "    table: str\n"
+        "    days: Optional[int]\n"
+        "    epoch: bool\n"
+        "    batch_size: int\n"
+        "    setup_sql: Tuple[str, ...]\n"
+        "    recheck_sql: str\n"
+        "    skip_sql: str\n"
+        "    steps: Tuple[Step, ...]\n"
+        "    detach_sql: Tuple[str, ...]\n"
+        "\n"
+        "\n"
+        'ARCHIVE_SQL = """\\\n'
+    )
+    middle = (
+        '"""\n'
+        "\n"
+        "JOBS: Dict[str, Job] = {\n"
+    )
+    tail = (
+        "}\n"
+        "\n"
+        "\n"
+        "def attach(conn: sqlite3.Connection, path: Union[str, Path]) -> None:\n"
+        '    """Attach ``path`` as the archive and create its tables and the union views.\n'
+        "\n"
+        "    ``conn`` must not be inside a transaction. The views are TEMP views, so\n"
+        "    each connection reporting over archived rows attaches the archive itself.\n"
+        '    """\n'
+        '    conn.execute(f\'ATTACH DATABASE ? AS "{SCHEMA}"\', (str(path),))\n'
+        "    conn.executescript(ARCHIVE_SQL)\n"
+        "\n"
+        "\n"
+        "def cutoff(job: Job, now: Optional[datetime] = None) -> Optional[Union[str, int]]:\n"
+        '    """Stored value of the age column below which ``job``\'s roots are archived."""\n'
+        "    if job.days is None:\n"
+        "        return None\n"
+        "    moment = now or datetime.now(timezone.utc)\n"
+        "    if moment.tzinfo is not None:\n"
+        "        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)\n"
+        "    moment -= timedelta(days=job.days)\n"
+        "    if job.epoch:\n"
+        "        return converters.datetime_to_epoch_ms(moment)\n"
+        "    return converters.datetime_to_text(moment)\n"
+        "\n"
+        "\n"
+        "@contextmanager\n"
+        "def _transaction(conn: sqlite3.Connection) -> Iterator[None]:\n"
+        "    # IMMEDIATE takes the write lock up front, so the app's writers wait\n"
+        "    # for the batch instead of failing it halfway.\n"
+        '    conn.execute("BEGIN IMMEDIATE")\n'
+        "    try:\n"
+        "        yield\n"
+        "    except BaseException:\n"
+        '        conn.execute("ROLLBACK")\n'
+        "        raise\n"
+        '    conn.execute("COMMIT")\n'
+        "\n"
+        "\n"
+        "def _clear(conn: sqlite3.Connection, table: str) -> None:\n"
+        '    conn.execute(f\'DELETE FROM temp."{table}"\')\n'
+        "\n"
+        "\n"
+        "def _gather(conn: sqlite3.Connection, job: Job) -> None:\n"
+        '    """Fill the member keys from the root keys, dropping graphs with dirty rows."""\n'
+        "    while True:\n"
+        "        for step in job.steps[1:]:\n"
+        "            _clear(conn, step.keys)\n"
+        "            conn.execute(step.select_sql)\n"
+        "        skipped = sum(\n"
+        "            conn.execute(step.dirty_sql).rowcount for step in job.steps if step.dirty_sql\n"
+        "        )\n"
+        "        if not skipped:\n"
+        "            return\n"
+        "        conn.execute(job.skip_sql)\n"
+        "\n"
+        "\n"
+        "def _batch(conn: sqlite3.Connection, job: Job, parameters: Dict) -> Optional[Dict[str, int]]:\n"
+        '    """Move one batch of graphs and return the rows moved; ``None`` once none is left."""\n'
+        "    root = job.steps[0]\n"
+        "    with _transaction(conn):\n"
+        "        for step in job.steps:\n"
+        "            _clear(conn, step.keys)\n"
+        "        if not conn.execute(root.select_sql, parameters).rowcount:\n"
+        "            return None\n"
+        "        _gather(conn, job)\n"
+        "        for step in job.steps:\n"
+        "            conn.execute(step.copy_sql)\n"
+        "    with _transaction(conn):\n"
+        "        # Writers may have changed the graphs since the copy: gather them again\n"
+        "        # from the roots that still qualify and drop copies of rows staying hot.\n"
+        "        for step in job.steps:\n"
+        '            _clear(conn, f"{step.keys}_copied")\n'
+        "            conn.execute(\n"
+        '                f\'INSERT INTO temp."{step.keys}_copied" SELECT "key" FROM temp."{step.keys}"\'\n'
+        "            )\n"
+        "            _clear(conn, step.keys)\n"
+        "        conn.execute(job.recheck_sql, parameters)\n"
+        "        _gather(conn, job)\n"
+        "        moved = {step.table: conn.execute(step.copy_sql).rowcount for step in job.steps}\n"
+        "        for step in job.steps:\n"
+        "            conn.execute(step.uncopy_sql)\n"
+        "        for statement in job.detach_sql:\n"
+        "            conn.execute(statement)\n"
+        "        for step in reversed(job.steps):\n"
+        "            conn.execute(step.delete_sql)\n"
+        "    return moved\n"
+        "\n"
+        "\n"
+        "def _selected(names: Optional[Iterable[str]]) -> List[Job]:\n"
+        "    if names is None:\n"
+        "        return list(JOBS.values())\n"
+        "    wanted = set(names)\n"
+        "    unknown = wanted - set(JOBS)\n"
+        "    if unknown:\n"
+        '        raise KeyError(f"no retention rule: {\', \'.join(sorted(unknown))}")\n'
+        "    return [job for name, job in JOBS.items() if name in wanted]\n"
+        "\n"
+        "\n"
+        "def archive(\n"
+        "    conn: sqlite3.Connection,\n"
+        "    jobs: Optional[Iterable[str]] = None,\n"
+        "    *,\n"
+        "    now: Optional[datetime] = None,\n"
+        "    batch_size: Optional[int] = None,\n"
+        ") -> Dict[str, int]:\n"
+        '    """Run ``jobs`` (every retention rule by default) until no graph is left to move.\n'
+        "\n"
+        "    Returns the rows moved per table. Each batch commits on its own, so\n"
+        "    ``conn`` must not be inside a transaction and the archive must be\n"
+        "    attached. ``now`` fixes the moment ages are measured from.\n"
+        '    """\n'
+        "    moved: Dict[str, int] = {}\n"
+        "    for job in _selected(jobs):\n"
+        "        for statement in job.setup_sql:\n"
+        "            conn.execute(statement)\n"
+        '        parameters = {"cutoff": cutoff(job, now), "batch_size": batch_size or job.batch_size}\n'
+        "        while True:\n"
+        "            counts = _batch(conn, job, parameters)\n"
+        "            if counts is None:\n"
+        "                break\n"
+        "            for table, rows in counts.items():\n"
+        "                moved[table] = moved.get(table, 0) + rows\n"
+        "    return moved\n"
+        "\n"
+        "\n"
+        "__all__ = [\n"
+        '    "ARCHIVE_SQL",\n'
+        '    "JOBS",\n'
+        '    "SCHEMA",\n'
+        '    "Job",\n'
+        '    "Step",\n'
+        '    "archive",\n'
+        '    "attach",\n'
+        '    "cutoff",\n'
+        "]\n"
+    )
+    parts = [head, _schema_literal(render_archive_sql_content(name, retention, entities)), middle]
+    for job in archive_jobs(retention, entities):
+        parts.append(f'    "{job.name}": Job(\n')
+        for field in ("name", "table", "days", "epoch", "batch_size"):
+            parts.append(f"        {field}={getattr(job, field)!r},\n")
+        parts.append("        setup_sql=(\n")
+        parts.extend(f"            {statement!r},\n" for statement in job.setup_sql)
+        parts.append("        ),\n")
+        parts.append(f"        recheck_sql={job.recheck_sql!r},\n")
+        parts.append(f"        skip_sql={job.skip_sql!r},\n")
+        parts.append("        steps=(\n")
+        for step in job.steps:
+            parts.append("            Step(\n")
+            for field in ArchiveStep.__slots__:
+                parts.append(f"                {field}={getattr(step, field)!r},\n")
+            parts.append("            ),\n")
+        parts.append("        ),\n")
+        parts.append("        detach_sql=(\n")
+        parts.extend(f"            {statement!r},\n" for statement in job.detach_sql)
+        parts.append("        ),\n")
+        parts.append("    ),\n")
+    return "".join(parts) + tail
+
+
+def render_schema_module_content(
+    name: str,
+    entities: Sequence[EntityDefinition],
+    deferred: Dict[str, Tuple[str, ...]],
+) -> str:
+    tables = "".join(f'    "{entity.table}",\n' for entity in entities)
+    schema = _schema_literal(render_schema_content(name, entities, deferred))
+    return (
+        '"""SQLite schema for the generated models, applied as one transaction."""\n'
+        "from __future__ import annotations\n"
+        "\n"
+        "import sqlite3\n"
+        "\n"
+        "# Foreign key order: every table follows the tables it references.\n"
+        "TABLES = (\n"
+        f"{tables}"
+        ")\n"
+        'SCHEMA_SQL = """\\\n'
+        f'{schema}"""\n'
+        "\n"
+        "\n"
+        "def apply_schema(conn: sqlite3.Connection) -> None:\n"
+        '    """Create every table and index of the domain with one ``executescript``.\n'
+        "\n"
+        "    The script runs between ``BEGIN`` and ``COMMIT``, so a fresh database is\n"
+        "    provisioned in a single transaction; ``IF NOT EXISTS`` makes a second run\n"
+        "    a no-op. A transaction already open on ``conn`` is committed first.\n"
+        '    """\n'
+        "    try:\n"
+        "        conn.executescript(SCHEMA_SQL)\n"
+        "    except sqlite3.Error:\n"
+        "        if conn.in_transaction:\n"
+        "            conn.rollback()\n"
+        "        raise\n"
+        "\n"
+        "\n"
+        '__all__ = ["SCHEMA_SQL", "TABLES", "apply_schema"]\n'
+    )
+
+
+_ENVIRONMENTS: Dict[Tuple[str, bool], "jinja2.Environment"] = {}
+
+
+def _template_environment(templates_path: str, bytecode_cache: bool) -> "jinja2.Environment":
+    """Shared Jinja environment per template directory.
+
+    Compiled templates stay in memory for the life of the process, and with
+    ``bytecode_cache`` their code objects are also stored on disk, keyed by
+    template name and checked against the source hash, so a cold process
+    skips the parse and compile steps.
+    """
+    key = (templates_path, bytecode_cache)
+    env = _ENVIRONMENTS.get(key)
+    if env is None:
+        from jinja2 import (
+            Environment,
+            FileSystemBytecodeCache,
+            FileSystemLoader,
+            select_autoescape,
+        )
+
+        env = Environment(
+            loader=FileSystemLoader(templates_path),
+            autoescape=select_autoescape(disabled_extensions=(".j2",)),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True,
+            bytecode_cache=(
+                FileSystemBytecodeCache(str(cache_dir("templates")))
+                if bytecode_cache
+                else None
+            ),
+        )
+        _ENVIRONMENTS[key] = env
+    return env
+
+
 class Generator:
     """Render Python models and SQLite DDL using templates."""
 
-    def __init__(self, templates_path: Path):
-        if Environment is not None:
-            self.env = Environment(
-                loader=FileSystemLoader(str(templates_path)),
-                autoescape=select_autoescape(disabled_extensions=(".j2",)),
-                trim_blocks=True,
-                lstrip_blocks=True,
-            )
-        else:
-            self.env = None
+    TEMPLATES = {
+        "python": "python_model.j2",
+        "sql": "sqlite_table.j2",
+        "enums": "python_enums.j2",
+        "init": "python_init.j2",
+        "base": "python_base.j2",
+        "converters": "python_converters.j2",
+        "column_types": "python_column_types.j2",
+        "repository": "python_repository.j2",
+        "repositories": "python_repositories_init.j2",
+        "engine": "python_engine.j2",
+        "schema": "sqlite_schema.j2",
+        "schema_module": "python_schema.j2",
+        "sync": "python_sync.j2",
+        "events": "python_events.j2",
+        "derived": "python_derived.j2",
+        "search": "python_search.j2",
+        "archive": "python_archive.j2",
+        "archive_sql": "sqlite_archive.j2",
+        "validation": "python_validation.j2",
+        "testing": "python_testing.j2",
+        "instrumentation": "python_instrumentation.j2",
+        "validator": "python_validator.j2",
+        "validators": "python_validators_init.j2",
+        # Macros shared by the table and schema templates; never rendered alone.
+        "ddl": "sqlite_ddl.j2",
+    }
+
+    def __init__(self, templates_path: Path, *, bytecode_cache: bool = True):
+        self.templates_path = templates_path
+        self.bytecode_cache = bytecode_cache
+        # Whether templates (rather than the fallback renderers) produce the output.
+        self.templated = JINJA_AVAILABLE
+
+    @cached_property
+    def env(self) -> Optional["jinja2.Environment"]:
+        """Jinja environment, created (and Jinja imported) on the first render."""
+        if not self.templated:
+            return None
+        return _template_environment(str(self.templates_path), self.bytecode_cache)
 
     def render_python(self, entity: EntityDefinition, enums: Dict[str, EnumDefinition]) -> str:
         if self.env:
             template = self.env.get_template("python_model.j2")
-            return template.render(entity=entity, enums=enums)
+            return template.render(
+                entity=entity, enums=enums, relationships=relationship_lines(entity)
+            )
         return render_python_model_content(entity)
 
-    def render_sql(self, entity: EntityDefinition) -> str:
+    def render_sql(self, entity: EntityDefinition, deferred: Collection[str] = ()) -> str:
         if self.env:
             template = self.env.get_template("sqlite_table.j2")
-            return template.render(entity=entity)
-        return render_sql_content(entity)
+            return template.render(
+                entity=entity,
+                deferred=deferred,
+                searches=search_tables(entity),
+                triggers=[statement for _, statement in create_triggers(entity)],
+            )
+        return render_sql_content(entity, deferred)
+
+    def render_schema(
+        self,
+        name: str,
+        entities: Sequence[EntityDefinition],
+        deferred: Dict[str, Tuple[str, ...]],
+    ) -> str:
+        if self.env:
+            template = self.env.get_template("sqlite_schema.j2")
+            return template.render(
+                name=name,
+                entities=entities,
+                deferred=deferred,
+                searches=[statement for entity in entities for statement in search_tables(entity)],
+                triggers=[
+                    trigger for entity in entities for _, trigger in create_triggers(entity)
+                ],
+            )
+        return render_schema_content(name, entities, deferred)
+
+    def render_sync(self, entities: Sequence[EntityDefinition]) -> str:
+        if self.env:
+            template = self.env.get_template("python_sync.j2")
+            return template.render(
+                specs=[(entity, sync_spec(entity)) for entity in entities],
+                batch_size=BATCH_SIZE,
+            )
+        return render_sync_content(entities)
+
+    def render_events(
+        self,
+        events: Sequence[EventDefinition],
+        store: EntityDefinition,
+        checkpoint: EntityDefinition,
+    ) -> str:
+        if self.env:
+            template = self.env.get_template("python_events.j2")
+            return template.render(
+                events=[(event, event_spec(event)) for event in events],
+                store=event_store_spec(store, checkpoint, tuple(events)),
+                batch_size=EVENT_BATCH_SIZE,
+            )
+        return render_events_content(events, store, checkpoint)
+
+    def render_derived(self, entities: Sequence[EntityDefinition]) -> str:
+        if self.env:
+            template = self.env.get_template("python_derived.j2")
+            return template.render(specs=derived_specs(entities))
+        return render_derived_content(entities)
+
+    def render_search(self, entities: Sequence[EntityDefinition]) -> str:
+        if self.env:
+            template = self.env.get_template("python_search.j2")
+            return template.render(specs=[search_spec(entity) for entity in entities])
+        return render_search_content(entities)
+
+    def render_archive_sql(
+        self,
+        name: str,
+        retention: Sequence[RetentionDefinition],
+        entities: Sequence[EntityDefinition],
+    ) -> str:
+        if self.env:
+            template = self.env.get_template("sqlite_archive.j2")
+            return template.render(
+                name=name,
+                tables=archive_tables(retention, entities),
+                indexes=archive_indexes(retention, entities),
+                views=archive_views(retention, entities),
+            )
+        return render_archive_sql_content(name, retention, entities)
+
+    def render_archive(
+        self,
+        name: str,
+        retention: Sequence[RetentionDefinition],
+        entities: Sequence[EntityDefinition],
+    ) -> str:
+        if self.env:
+            template = self.env.get_template("python_archive.j2")
+            return template.render(
+                schema_literal=_schema_literal(self.render_archive_sql(name, retention, entities)),
+                jobs=archive_jobs(retention, entities),
+            )
+        return render_archive_content(name, retention, entities)
+
+    def render_schema_module(
+        self,
+        name: str,
+        entities: Sequence[EntityDefinition],
+        deferred: Dict[str, Tuple[str, ...]],
+    ) -> str:
+        if self.env:
+            template = self.env.get_template("python_schema.j2")
+            return template.render(
+                entities=entities,
+                schema_literal=_schema_literal(self.render_schema(name, entities, deferred)),
+            )
+        return render_schema_module_content(name, entities, deferred)
 
     def render_enums(self, enums: Dict[str, EnumDefinition]) -> str:
         if self.env:
@@ -471,11 +3048,13 @@ class Generator:
             return template.render(enums=enums)
         return render_enums_content(enums)
 
-    def render_init(self, entities: List[EntityDefinition]) -> str:
+    def render_init(self, entities: Sequence[EntityDefinition], lazy: bool = False) -> str:
         if self.env:
             template = self.env.get_template("python_init.j2")
-            return template.render(entities=entities)
-        return render_init_content(entities)
+            return template.render(
+                entities=entities, lazy=lazy, references=_model_references(entities)
+            )
+        return render_init_content(entities, lazy)
 
     def render_base(self) -> str:
         if self.env:
@@ -483,46 +3062,515 @@ class Generator:
             return template.render()
         return render_base_content()
 
+    def render_converters(self) -> str:
+        if self.env:
+            template = self.env.get_template("python_converters.j2")
+            return template.render()
+        return render_converters_content()
+
+    def render_column_types(self) -> str:
+        if self.env:
+            template = self.env.get_template("python_column_types.j2")
+            return template.render()
+        return render_column_types_content()
+
+    def render_repository(self, entity: EntityDefinition) -> str:
+        if self.env:
+            template = self.env.get_template("python_repository.j2")
+            return template.render(entity=entity, spec=repository_spec(entity))
+        return render_repository_content(entity)
+
+    def render_repositories(self, entities: Sequence[EntityDefinition]) -> str:
+        if self.env:
+            template = self.env.get_template("python_repositories_init.j2")
+            return template.render(entities=entities)
+        return render_repositories_init_content(entities)
+
+    def render_testing(self) -> str:
+        if self.env:
+            template = self.env.get_template("python_testing.j2")
+            return template.render()
+        return render_testing_content()
+
+    def render_validation(self) -> str:
+        if self.env:
+            template = self.env.get_template("python_validation.j2")
+            return template.render()
+        return render_validation_content()
+
+    def render_validator(self, entity: EntityDefinition) -> str:
+        if self.env:
+            template = self.env.get_template("python_validator.j2")
+            return template.render(entity=entity, spec=validator_spec(entity))
+        return render_validator_content(entity)
+
+    def render_validators(self, entities: Sequence[EntityDefinition]) -> str:
+        if self.env:
+            template = self.env.get_template("python_validators_init.j2")
+            return template.render(entities=entities)
+        return render_validators_init_content(entities)
+
+    def render_instrumentation(self, entities: Sequence[EntityDefinition]) -> str:
+        if self.env:
+            template = self.env.get_template("python_instrumentation.j2")
+            return template.render(entities=entities)
+        return render_instrumentation_content(entities)
+
+    def render_engine(self, pragmas: Dict[str, object]) -> str:
+        if self.env:
+            template = self.env.get_template("python_engine.j2")
+            return template.render(pragmas=pragmas)
+        return render_engine_content(pragmas)
+
+    def render(self, kind: str, *args) -> str:
+        """Dispatch to ``render_<kind>``; used by the artifact plan."""
+        return getattr(self, f"render_{kind}")(*args)
+
+    def template_hashes(self) -> Dict[str, str]:
+        """Content hash per template; the fallback renderer hashes as one unit."""
+        if not self.templated:
+            return {kind: "fallback" for kind in self.TEMPLATES}
+        return {
+            kind: hash_file(self.templates_path / name)
+            for kind, name in self.TEMPLATES.items()
+        }
+
+
+@dataclass
+class Artifact:
+    """One output file, the render call producing it and its inputs hash."""
+
+    path: str
+    kind: str
+    args: Tuple
+    inputs: str
+    entity: Optional[str] = None
+
+
+def deferred_columns(domain: DomainDefinition) -> Dict[str, Tuple[str, ...]]:
+    """Relation attributes per entity whose foreign key is declared deferrable."""
+    deferred: Dict[str, Tuple[str, ...]] = {}
+    for reference in domain.deferred_references():
+        deferred[reference.entity] = deferred.get(reference.entity, ()) + (reference.attribute,)
+    return deferred
+
+
+def plan_artifacts(
+    domain: DomainDefinition,
+    template_hashes: Dict[str, str],
+    entity_hashes: Optional[Dict[str, str]] = None,
+) -> List[Artifact]:
+    """List every output of ``generate`` keyed by the hash of its inputs.
+
+    Entity hashes are taken over the resolved definition, so they already cover
+    the enum values an entity uses and the relation targets it resolves.
+    """
+    if entity_hashes is None:
+        entity_hashes = {entity.name: fingerprint(entity) for entity in domain.entities}
+    deferred = deferred_columns(domain)
+    ddl_hash = template_hashes["ddl"]
+    artifacts = [
+        Artifact("python/base.py", "base", (), template_hashes["base"]),
+        Artifact("python/converters.py", "converters", (), template_hashes["converters"]),
+        Artifact("python/column_types.py", "column_types", (), template_hashes["column_types"]),
+        Artifact("python/validation.py", "validation", (), template_hashes["validation"]),
+        Artifact("python/testing.py", "testing", (), template_hashes["testing"]),
+        Artifact(
+            "python/engine.py",
+            "engine",
+            (domain.pragmas,),
+            fingerprint(template_hashes["engine"], domain.pragmas),
+        ),
+        Artifact(
+            "python/enums.py",
+            "enums",
+            (domain.enums,),
+            fingerprint(template_hashes["enums"], domain.enums),
+        ),
+    ]
+    for entity in domain.entities:
+        entity_hash = entity_hashes[entity.name]
+        artifacts.append(
+            Artifact(
+                f"python/{entity.table}.py",
+                "python",
+                (entity, domain.enums),
+                fingerprint(template_hashes["python"], entity_hash),
+                entity.name,
+            )
+        )
+        artifacts.append(
+            Artifact(
+                f"python/repositories/{entity.table}.py",
+                "repository",
+                (entity,),
+                fingerprint(template_hashes["repository"], entity_hash),
+                entity.name,
+            )
+        )
+        artifacts.append(
+            Artifact(
+                f"python/validators/{entity.table}.py",
+                "validator",
+                (entity,),
+                fingerprint(template_hashes["validator"], entity_hash),
+                entity.name,
+            )
+        )
+        artifacts.append(
+            Artifact(
+                f"sql/{entity.table}.sql",
+                "sql",
+                (entity, deferred.get(entity.name, ())),
+                fingerprint(
+                    template_hashes["sql"], ddl_hash, entity_hash, deferred.get(entity.name)
+                ),
+                entity.name,
+            )
+        )
+    tables = [(entity.name, entity.table) for entity in domain.entities]
+    artifacts.append(
+        Artifact(
+            "python/__init__.py",
+            "init",
+            (domain.entities, domain.lazy_imports),
+            fingerprint(template_hashes["init"], tables, domain.lazy_imports),
+        )
+    )
+    artifacts.append(
+        Artifact(
+            "python/repositories/__init__.py",
+            "repositories",
+            (domain.entities,),
+            fingerprint(template_hashes["repositories"], tables),
+        )
+    )
+    artifacts.append(
+        Artifact(
+            "python/validators/__init__.py",
+            "validators",
+            (domain.entities,),
+            fingerprint(template_hashes["validators"], tables),
+        )
+    )
+    if domain.instrumentation:
+        artifacts.append(
+            Artifact(
+                "python/instrumentation.py",
+                "instrumentation",
+                (domain.entities,),
+                fingerprint(template_hashes["instrumentation"], tables),
+            )
+        )
+    ordered = domain.fk_order()
+    schema_args = (domain.name, ordered, deferred)
+    schema_inputs = fingerprint(
+        ddl_hash,
+        domain.name,
+        [entity_hashes[entity.name] for entity in ordered],
+        sorted(deferred.items()),
+    )
+    synced = [entity for entity in ordered if entity.sync is not None]
+    artifacts.append(
+        Artifact(
+            "python/sync.py",
+            "sync",
+            (synced,),
+            fingerprint(
+                template_hashes["sync"], [entity_hashes[entity.name] for entity in synced]
+            ),
+        )
+    )
+    if domain.events and EVENT_STORE in domain.index.entities:
+        store = domain.entity(EVENT_STORE)
+        checkpoint = domain.entity(CHECKPOINT)
+        artifacts.append(
+            Artifact(
+                "python/events.py",
+                "events",
+                (domain.events, store, checkpoint),
+                fingerprint(
+                    template_hashes["events"],
+                    domain.events,
+                    entity_hashes[store.name],
+                    entity_hashes[checkpoint.name],
+                ),
+            )
+        )
+    involved = [entity for entity in ordered if entity.derived or entity.feeds]
+    if involved:
+        artifacts.append(
+            Artifact(
+                "python/derived.py",
+                "derived",
+                (involved,),
+                fingerprint(
+                    template_hashes["derived"], [entity_hashes[entity.name] for entity in involved]
+                ),
+            )
+        )
+    searchable = [entity for entity in ordered if entity.search]
+    if searchable:
+        artifacts.append(
+            Artifact(
+                "python/search.py",
+                "search",
+                (searchable,),
+                fingerprint(
+                    template_hashes["search"],
+                    [entity_hashes[entity.name] for entity in searchable],
+                ),
+            )
+        )
+    if domain.retention:
+        archive_args = (domain.name, domain.retention, retained_entities(domain))
+        archive_inputs = fingerprint(
+            domain.name,
+            domain.retention,
+            [entity_hashes[entity.name] for entity in archive_args[2]],
+        )
+        artifacts.append(
+            Artifact(
+                "sql/archive.sql",
+                "archive_sql",
+                archive_args,
+                fingerprint(template_hashes["archive_sql"], archive_inputs),
+            )
+        )
+        artifacts.append(
+            Artifact(
+                "python/archive.py",
+                "archive",
+                archive_args,
+                fingerprint(
+                    template_hashes["archive"], template_hashes["archive_sql"], archive_inputs
+                ),
+            )
+        )
+    artifacts.append(
+        Artifact(
+            "sql/schema.sql",
+            "schema",
+            schema_args,
+            fingerprint(template_hashes["schema"], schema_inputs),
+        )
+    )
+    artifacts.append(
+        Artifact(
+            "python/schema.py",
+            "schema_module",
+            schema_args,
+            fingerprint(template_hashes["schema_module"], template_hashes["schema"], schema_inputs),
+        )
+    )
+    return artifacts
+
 
 def write_file(path: Path, content: str) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(content)
 
 
-def generate(domain_path: Path, output_dir: Path) -> None:
-    loader = DomainLoader(domain_path)
-    domain = loader.load()
+def write_if_changed(path: Path, content: str) -> bool:
+    """Write ``content`` unless the file already holds it; keeps mtimes stable."""
+    try:
+        if path.read_bytes() == content.encode("utf-8"):
+            return False
+    except OSError:
+        pass
+    write_file(path, content)
+    return True
 
-    generator = Generator(Path(__file__).parent / "templates")
 
-    python_dir = output_dir / "python"
-    sql_dir = output_dir / "sql"
-    python_dir.mkdir(parents=True, exist_ok=True)
-    sql_dir.mkdir(parents=True, exist_ok=True)
+_worker_generator: Optional["Generator"] = None
 
-    write_file(python_dir / "base.py", generator.render_base())
-    write_file(python_dir / "enums.py", generator.render_enums(domain.enums))
 
-    for entity in domain.entities:
-        write_file(
-            python_dir / f"{entity.table}.py",
-            generator.render_python(entity, domain.enums),
-        )
-        write_file(sql_dir / f"{entity.table}.sql", generator.render_sql(entity))
+def _init_worker(templates_path: Path) -> None:
+    global _worker_generator
+    _worker_generator = Generator(templates_path)
+
+
+def _render_and_write(output_dir: Path, artifact: Artifact) -> bool:
+    content = _worker_generator.render(artifact.kind, *artifact.args)
+    return write_if_changed(output_dir / artifact.path, content)
 
-    write_file(python_dir / "__init__.py", generator.render_init(domain.entities))
+
+def _resolve_jobs(jobs: Optional[int]) -> int:
+    if not jobs:
+        return os.cpu_count() or 1
+    return max(1, jobs)
+
+
+def generate(
+    domain_path: DomainSource,
+    output_dir: Path,
+    *,
+    incremental: bool = True,
+    jobs: Optional[int] = 1,
+    storage: Optional[str] = None,
+) -> None:
+    """Render models and DDL for ``domain_path`` into ``output_dir``.
+
+    With ``incremental`` (the default) a manifest stored in the output directory
+    records the hash of every input; artifacts whose inputs are unchanged and
+    whose files are intact are skipped, and outputs of removed entities are
+    deleted. A run where nothing changed only hashes inputs and stats outputs.
+
+    ``jobs`` renders and writes per-entity artifacts in that many worker
+    processes (``0`` or ``None`` uses every CPU). Output is identical to a
+    serial run; package-level files are always rendered in this process.
+
+    ``storage`` overrides the domain's ``targets.sql.storage`` profile
+    (``default``, ``strict`` or ``compact``, see :mod:`botecopro_meta.storage`).
+    """
+    loader = DomainLoader(domain_path, storage=storage)
+    generator = Generator(Path(__file__).parent / "templates")
+    previous = Manifest.load(output_dir) if incremental else Manifest()
+
+    manifest = Manifest(
+        domain=loader.source_hash(),
+        generator=fingerprint(package_fingerprint(), generator.templated),
+        options=fingerprint({"storage": storage}),
+        templates=generator.template_hashes(),
+    )
+    if (
+        previous.domain == manifest.domain
+        and previous.generator == manifest.generator
+        and previous.options == manifest.options
+        and previous.templates == manifest.templates
+        and previous.is_up_to_date(output_dir)
+    ):
+        return
+
+    domain = loader.load()
+    manifest.entities = {entity.name: fingerprint(entity) for entity in domain.entities}
+    render_artifacts(domain, output_dir, generator, manifest, previous, jobs=jobs)
+    manifest.save(output_dir)
+
+
+def render_artifacts(
+    domain: DomainDefinition,
+    output_dir: Path,
+    generator: Generator,
+    manifest: Manifest,
+    previous: Manifest,
+    *,
+    jobs: Optional[int] = 1,
+    entities: Optional[Collection[str]] = None,
+) -> List[str]:
+    """Render every artifact of ``domain`` that ``previous`` cannot vouch for.
+
+    ``manifest`` must carry the hashes of the current run; its outputs are
+    filled in and outputs that disappeared from the plan are deleted. When
+    ``entities`` is given, only those entities' artifacts are re-checked and
+    the rest are carried over from ``previous`` without touching the disk.
+    Returns the relative paths whose content actually changed.
+    """
+    (output_dir / "python").mkdir(parents=True, exist_ok=True)
+    (output_dir / "sql").mkdir(parents=True, exist_ok=True)
+
+    reuse = previous.generator == manifest.generator
+    pending: List[Artifact] = []
+    for artifact in plan_artifacts(domain, manifest.templates, manifest.entities):
+        trusted = (
+            entities is not None
+            and artifact.entity is not None
+            and artifact.entity not in entities
+            and artifact.path in previous.outputs
+        )
+        if reuse and trusted:
+            manifest.outputs[artifact.path] = previous.outputs[artifact.path]
+            continue
+        record = reuse and previous.reusable(output_dir, artifact.path, artifact.inputs)
+        if record:
+            manifest.outputs[artifact.path] = record
+        else:
+            pending.append(artifact)
+
+    written: List[str] = []
+    per_entity = [artifact for artifact in pending if artifact.entity is not None]
+    jobs = _resolve_jobs(jobs)
+    if jobs > 1 and len(per_entity) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunksize = max(1, len(per_entity) // (jobs * 4))
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(generator.templates_path,),
+        ) as executor:
+            results = executor.map(
+                _render_and_write,
+                [output_dir] * len(per_entity),
+                per_entity,
+                chunksize=chunksize,
+            )
+            written.extend(
+                artifact.path for artifact, changed in zip(per_entity, results) if changed
+            )
+        rendered = {artifact.path for artifact in per_entity}
+    else:
+        rendered = set()
+
+    for artifact in pending:
+        if artifact.path not in rendered:
+            content = generator.render(artifact.kind, *artifact.args)
+            if write_if_changed(output_dir / artifact.path, content):
+                written.append(artifact.path)
+        manifest.record(output_dir, artifact.path, artifact.inputs)
+
+    for stale in sorted(previous.outputs.keys() - manifest.outputs.keys()):
+        (output_dir / stale).unlink(missing_ok=True)
+
+    return sorted(written)
+
+
+def add_generate_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the options shared by ``boteco-generate`` and ``botecopro-meta``."""
+    parser.add_argument(
+        "--input",
+        "-i",
+        type=Path,
+        nargs="+",
+        required=True,
+        help="Domain YAML file(s) or directories of YAML files",
+    )
+    parser.add_argument("--out", "-o", type=Path, required=True, help="Output directory")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Worker processes for per-entity rendering (0 uses every CPU)",
+    )
+    parser.add_argument(
+        "--storage-profile",
+        choices=sorted(PROFILES),
+        default=None,
+        help="SQLite storage profile; overrides targets.sql.storage in the domain",
+    )
 
 
 def parse_args(argv: Optional[Iterable[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="BotecoPro domain generator")
-    parser.add_argument("--input", "-i", type=Path, required=True, help="Path to domain YAML file")
-    parser.add_argument("--out", "-o", type=Path, required=True, help="Output directory")
+    add_generate_arguments(parser)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the manifest and re-render every artifact",
+    )
     return parser.parse_args(argv)
 
 
 def main(argv: Optional[Iterable[str]] = None) -> None:
     args = parse_args(argv)
-    generate(args.input, args.out)
+    generate(
+        args.input,
+        args.out,
+        incremental=not args.force,
+        jobs=args.jobs,
+        storage=args.storage_profile,
+    )
 
 
-__all__ = ["generate", "main", "DomainLoader", "Generator"]
+__all__ = ["generate", "main", "render_artifacts", "DomainLoader", "Generator"]
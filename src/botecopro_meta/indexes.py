@@ -0,0 +1,105 @@
+"""Index advisor deriving indexes from relations and offline-sync columns.
+
+Declared ``indexes`` are kept as written. On top of them every relation
+column gets an index, and entities carrying the domain ``sync_fields`` get
+an index on the modification stamp plus a partial index per dirty flag,
+for example ``(last_modified, id) WHERE dirty = 1``. Inferred indexes that
+a declared index or the primary key already covers are dropped.
+
+The advisor is controlled with ``auto_indexes`` in ``metadata`` (domain
+default) or on an entity: ``false`` disables it, or a mapping such as
+``{foreign_keys: true, sync: false}`` selects the rules. A relation
+attribute with ``index: false`` is skipped.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .metamodel import AttributeDefinition, EntityDefinition, IndexDefinition
+
+RULES = ("foreign_keys", "sync")
+
+
+def _rules(setting: object, inherited: Dict[str, bool]) -> Dict[str, bool]:
+    if setting is None:
+        return dict(inherited)
+    if isinstance(setting, bool):
+        return {rule: setting for rule in RULES}
+    if isinstance(setting, dict):
+        return {rule: bool(setting.get(rule, inherited[rule])) for rule in RULES}
+    raise ValueError(f"auto_indexes must be a boolean or a mapping, got {setting!r}")
+
+
+def advisor_rules(entity_raw: Dict, metadata: Dict) -> Dict[str, bool]:
+    """Effective advisor rules for one entity."""
+    domain_rules = _rules(metadata.get("auto_indexes"), {rule: True for rule in RULES})
+    return _rules(entity_raw.get("auto_indexes"), domain_rules)
+
+
+def declared_indexes(table: str, raw_indexes: Sequence[Dict]) -> List[IndexDefinition]:
+    return [
+        IndexDefinition(
+            name=idx.get("name", f"idx_{table}_{number}"),
+            columns=tuple(idx["columns"]),
+            unique=bool(idx.get("unique")),
+            where=idx.get("where"),
+        )
+        for number, idx in enumerate(raw_indexes, start=1)
+    ]
+
+
+def _covered(columns: Tuple[str, ...], where: Optional[str], existing: List[Tuple]) -> bool:
+    return any(
+        cols[: len(columns)] == columns and cond == where
+        for cols, cond in existing
+    )
+
+
+def _candidate(
+    table: str, columns: Tuple[str, ...], where: Optional[str], origin: str, suffix: str = ""
+) -> IndexDefinition:
+    name = f"idx_{table}_{suffix or '_'.join(columns)}"
+    return IndexDefinition(name=name, columns=columns, where=where, origin=origin)
+
+
+def infer_indexes(
+    entity: EntityDefinition,
+    entity_raw: Dict,
+    metadata: Dict,
+    declared: Sequence[IndexDefinition] = (),
+) -> Tuple[IndexDefinition, ...]:
+    """Return ``declared`` followed by the inferred indexes ``entity`` lacks."""
+    rules = advisor_rules(entity_raw, metadata)
+    pk = tuple(attr.name for attr in entity.attributes if attr.primary_key)
+    # The primary key (or rowid alias) is an index on its leading columns.
+    existing = [(pk, None)] if pk else []
+    existing.extend((idx.columns, idx.where) for idx in declared)
+
+    inferred: List[IndexDefinition] = []
+
+    def add(candidate: IndexDefinition) -> None:
+        if _covered(candidate.columns, candidate.where, existing):
+            return
+        existing.append((candidate.columns, candidate.where))
+        inferred.append(candidate)
+
+    if rules["foreign_keys"]:
+        for attr in entity.attributes:
+            if attr.relation and attr.raw.get("index", True) is not False:
+                add(_candidate(entity.table, (attr.name,), None, "foreign_key"))
+
+    if rules["sync"]:
+        by_name: Dict[str, AttributeDefinition] = {a.name: a for a in entity.attributes}
+        sync_fields = [by_name[name] for name in metadata.get("sync_fields", []) if name in by_name]
+        stamp = next((a.name for a in sync_fields if a.base_type == "datetime"), None)
+        flags = [a.name for a in sync_fields if a.base_type == "bool"]
+        if stamp:
+            add(_candidate(entity.table, (stamp, *pk), None, "sync", stamp))
+        for flag in flags:
+            key = (stamp, *pk) if stamp else pk or (flag,)
+            add(_candidate(entity.table, key, f'"{flag}" = 1', "sync", flag))
+
+    return tuple(declared) + tuple(inferred)
+
+
+__all__ = ["advisor_rules", "declared_indexes", "infer_indexes"]
@@ -0,0 +1,139 @@
+"""Content-hash manifest used to make generation incremental."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field, is_dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+MANIFEST_NAME = ".botecopro-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    return hash_bytes(path.read_bytes())
+
+
+def _plain(value: object) -> object:
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    return value
+
+
+def fingerprint(*parts: object) -> str:
+    """Stable hash of JSON-compatible values and dataclass instances."""
+    payload = json.dumps(
+        [_plain(part) for part in parts],
+        sort_keys=True,
+        default=repr,
+        separators=(",", ":"),
+    )
+    return hash_bytes(payload.encode("utf-8"))
+
+
+@lru_cache(maxsize=None)
+def package_fingerprint() -> str:
+    """Hash of the generator sources so code changes invalidate outputs."""
+    package_dir = Path(__file__).parent
+    digest = hashlib.sha256()
+    for source in sorted(package_dir.glob("*.py")):
+        digest.update(source.name.encode("utf-8"))
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+@dataclass
+class OutputRecord:
+    """Inputs hash and stat snapshot of one generated file."""
+
+    inputs: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class Manifest:
+    """Hashes of everything that went into the previous generation run."""
+
+    domain: str = ""
+    generator: str = ""
+    options: str = ""
+    templates: Dict[str, str] = field(default_factory=dict)
+    entities: Dict[str, str] = field(default_factory=dict)
+    outputs: Dict[str, OutputRecord] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, output_dir: Path) -> "Manifest":
+        """Read the manifest stored in ``output_dir``; empty when absent or stale."""
+        path = output_dir / MANIFEST_NAME
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return cls()
+        return cls(
+            domain=data.get("domain", ""),
+            generator=data.get("generator", ""),
+            options=data.get("options", ""),
+            templates=data.get("templates", {}),
+            entities=data.get("entities", {}),
+            outputs={
+                name: OutputRecord(**record)
+                for name, record in data.get("outputs", {}).items()
+            },
+        )
+
+    def save(self, output_dir: Path) -> None:
+        data = {"version": MANIFEST_VERSION, **asdict(self)}
+        path = output_dir / MANIFEST_NAME
+        path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+    def is_current(self, output_dir: Path, name: str) -> bool:
+        """Return True when ``name`` still has the size and mtime we recorded."""
+        record = self.outputs.get(name)
+        if record is None:
+            return False
+        try:
+            stat = os.stat(output_dir / name)
+        except OSError:
+            return False
+        return stat.st_size == record.size and stat.st_mtime_ns == record.mtime_ns
+
+    def is_up_to_date(self, output_dir: Path) -> bool:
+        return bool(self.outputs) and all(
+            self.is_current(output_dir, name) for name in self.outputs
+        )
+
+    def record(self, output_dir: Path, name: str, inputs: str) -> None:
+        stat = os.stat(output_dir / name)
+        self.outputs[name] = OutputRecord(
+            inputs=inputs, size=stat.st_size, mtime_ns=stat.st_mtime_ns
+        )
+
+    def reusable(self, output_dir: Path, name: str, inputs: str) -> Optional[OutputRecord]:
+        """Previous record for ``name`` if its inputs match and the file is intact."""
+        record = self.outputs.get(name)
+        if record is None or record.inputs != inputs:
+            return None
+        if not self.is_current(output_dir, name):
+            return None
+        return record
+
+
+__all__ = [
+    "MANIFEST_NAME",
+    "Manifest",
+    "OutputRecord",
+    "fingerprint",
+    "hash_bytes",
+    "hash_file",
+    "package_fingerprint",
+]
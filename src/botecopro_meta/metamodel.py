@@ -0,0 +1,323 @@
+"""Resolved domain definitions and the indexed query API over them."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Optional, Set, Tuple
+
+from .storage import StorageProfile
+
+
+@dataclass(frozen=True, slots=True)
+class EnumDefinition:
+    """Represents an enumeration defined in the domain."""
+
+    name: str
+    values: Tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class AttributeDefinition:
+    """Resolved attribute including type metadata for templates."""
+
+    name: str
+    raw: Dict
+    base_type: str
+    python_type: str
+    sqlalchemy_type: str
+    sqlite_type: str
+    nullable: bool = True
+    primary_key: bool = False
+    autoincrement: bool = False
+    default: Optional[str] = None
+    enum: Optional[str] = None
+    enum_values: Optional[Tuple[str, ...]] = None
+    relation: Optional[Tuple[str, str]] = None  # (table, field)
+    precision: Optional[int] = None
+    scale: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class IndexDefinition:
+    """Index on an entity table, declared in YAML or inferred by the advisor."""
+
+    name: str
+    columns: Tuple[str, ...]
+    unique: bool = False
+    where: Optional[str] = None
+    origin: str = "declared"  # declared | foreign_key | sync
+
+
+@dataclass(frozen=True, slots=True)
+class SyncDefinition:
+    """Offline-sync columns of an entity, picked from ``metadata.sync_fields``."""
+
+    stamp: str
+    dirty: Optional[str] = None
+    origin: Optional[str] = None
+    epoch: bool = False  # stamp stored as epoch milliseconds rather than text
+
+
+@dataclass(frozen=True, slots=True)
+class QueryDefinition:
+    """Query declared on an entity, checked against the schema by :mod:`.plans`."""
+
+    name: str
+    sql: str
+    params: Tuple[Tuple[str, object], ...] = ()  # named parameters not taken from a sample row
+    scan: bool = False  # a full table scan is expected and allowed
+
+
+@dataclass(frozen=True, slots=True)
+class DerivedDefinition:
+    """Column of ``table`` that triggers keep in step with the rows of ``source_table``."""
+
+    table: str
+    column: str
+    function: str  # sum | count | latest
+    source: str
+    source_table: str
+    via: str  # relation column of the source pointing at ``key``
+    key: str
+    value: Optional[str] = None  # SQL over the source row; None for count
+    where: Optional[str] = None
+    order_by: Optional[str] = None  # latest: source column picking the newest row
+
+
+@dataclass(frozen=True, slots=True)
+class SearchDefinition:
+    """FTS5 table indexing the ``searchable`` attributes of an entity."""
+
+    table: str  # "<entity table>_search"
+    content: str  # the entity table, read back by the external-content index
+    key: str  # integer primary key, used as the FTS rowid
+    columns: Tuple[str, ...]
+    tokenize: str
+    prefix: Tuple[int, ...] = ()  # prefix lengths with their own index
+
+
+@dataclass(frozen=True, slots=True)
+class RelationshipDefinition:
+    """ORM relationship pair generated from the relation attribute ``source.attribute``."""
+
+    source: str  # referencing entity
+    attribute: str
+    target: str  # referenced entity
+    name: str  # many-to-one attribute on the source
+    lazy: str
+    back_populates: str  # collection attribute on the target
+    back_lazy: str
+    ambiguous: bool = False  # several relations to the target, or a self-reference
+
+
+@dataclass(frozen=True, slots=True)
+class EntityDefinition:
+    """Entity and its attributes after resolution."""
+
+    name: str
+    table: str
+    attributes: Tuple[AttributeDefinition, ...]
+    indexes: Tuple[IndexDefinition, ...] = ()
+    methods: Tuple[str, ...] = ()
+    strict: bool = False
+    without_rowid: bool = False
+    sync: Optional[SyncDefinition] = None
+    append_only: bool = False
+    derived: Tuple[DerivedDefinition, ...] = ()  # columns of this entity kept by triggers
+    feeds: Tuple[DerivedDefinition, ...] = ()  # derived columns computed from this entity
+    queries: Tuple[QueryDefinition, ...] = ()
+    seed_weight: float = 1.0  # synthetic rows per unit of ``seed --scale``
+    search: Optional[SearchDefinition] = None
+    relationships: Tuple[RelationshipDefinition, ...] = ()  # many-to-one, from this entity
+    collections: Tuple[RelationshipDefinition, ...] = ()  # one-to-many, pointing at this entity
+
+    @property
+    def primary_key(self) -> Tuple[AttributeDefinition, ...]:
+        return tuple(attr for attr in self.attributes if attr.primary_key)
+
+    @property
+    def foreign_keys(self) -> Tuple[AttributeDefinition, ...]:
+        return tuple(attr for attr in self.attributes if attr.relation)
+
+
+@dataclass(frozen=True, slots=True)
+class EventDefinition:
+    """Domain event from the ``events`` section with its resolved payload."""
+
+    name: str
+    payload: Tuple[AttributeDefinition, ...]
+    aggregate: Optional[str] = None
+    aggregate_key: Optional[str] = None  # payload field identifying the aggregate
+
+
+@dataclass(frozen=True, slots=True)
+class RetentionDefinition:
+    """Object graphs rooted at ``root`` that the archival job moves out of the hot tables."""
+
+    root: str
+    members: Tuple[str, ...]  # entities moved together, in foreign key order, root first
+    where: Optional[str] = None  # SQL over the root's columns
+    age: Optional[str] = None  # datetime column of the root compared with ``days``
+    days: Optional[int] = None
+    detach: Tuple[str, ...] = ()  # entities left hot, their references into the graph cleared
+    batch_size: int = 500
+
+
+@dataclass(frozen=True, slots=True)
+class Reference:
+    """A relation attribute of ``entity`` pointing at ``target.target_field``."""
+
+    entity: str
+    attribute: str
+    target: str
+    target_field: str
+
+
+class DomainIndex:
+    """Lookup tables over a resolved domain, built once per definition."""
+
+    __slots__ = (
+        "entities",
+        "tables",
+        "attributes",
+        "references",
+        "referenced_by",
+        "fk_order",
+        "deferred",
+    )
+
+    def __init__(self, entities: Tuple[EntityDefinition, ...]):
+        self.entities: Dict[str, EntityDefinition] = {e.name: e for e in entities}
+        self.tables: Dict[str, EntityDefinition] = {e.table: e for e in entities}
+        self.attributes: Dict[Tuple[str, str], AttributeDefinition] = {
+            (entity.name, attr.name): attr
+            for entity in entities
+            for attr in entity.attributes
+        }
+        self.references: Dict[str, Tuple[Reference, ...]] = {}
+        self.referenced_by: Dict[str, Tuple[Reference, ...]] = {}
+        incoming: Dict[str, List[Reference]] = {e.name: [] for e in entities}
+        for entity in entities:
+            outgoing = []
+            for attr in entity.foreign_keys:
+                target = self.tables.get(attr.relation[0])
+                if target is None:
+                    continue
+                reference = Reference(entity.name, attr.name, target.name, attr.relation[1])
+                outgoing.append(reference)
+                incoming[target.name].append(reference)
+            self.references[entity.name] = tuple(outgoing)
+        self.referenced_by = {name: tuple(refs) for name, refs in incoming.items()}
+        self.fk_order, self.deferred = self._topological_order(entities)
+
+    def _topological_order(
+        self, entities: Tuple[EntityDefinition, ...]
+    ) -> Tuple[Tuple[EntityDefinition, ...], Tuple[Reference, ...]]:
+        """Order entities so referenced tables come first.
+
+        Ties keep declaration order. When only cycles remain, the earliest
+        declared entity is emitted next and its references to entities not
+        yet emitted are reported as ``deferred``. Self references never block.
+        """
+        pending = {
+            e.name: {
+                ref.target for ref in self.references[e.name] if ref.target != e.name
+            }
+            for e in entities
+        }
+        emitted: Set[str] = set()
+        order: List[EntityDefinition] = []
+        deferred: List[Reference] = []
+        remaining = [e.name for e in entities]
+        while remaining:
+            ready = next(
+                (name for name in remaining if pending[name] <= emitted), remaining[0]
+            )
+            deferred.extend(
+                ref
+                for ref in self.references[ready]
+                if ref.target != ready and ref.target not in emitted
+            )
+            remaining.remove(ready)
+            emitted.add(ready)
+            order.append(self.entities[ready])
+        return tuple(order), tuple(deferred)
+
+
+@dataclass(frozen=True)
+class DomainDefinition:
+    """Full domain definition including enums and entities."""
+
+    name: str
+    enums: Dict[str, EnumDefinition]
+    entities: Tuple[EntityDefinition, ...]
+    custom_types: Dict[str, Dict]
+    metadata: Dict = field(default_factory=dict)
+    targets: Dict = field(default_factory=dict)
+    storage: StorageProfile = field(default_factory=StorageProfile)
+    pragmas: Dict = field(default_factory=dict)
+    events: Tuple[EventDefinition, ...] = ()
+    retention: Tuple[RetentionDefinition, ...] = ()
+    lazy_imports: bool = False  # generated package imports models on first access
+    instrumentation: bool = False  # generate python/instrumentation.py
+
+    @cached_property
+    def index(self) -> DomainIndex:
+        return DomainIndex(self.entities)
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        state.pop("index", None)
+        return state
+
+    def entity(self, name: str) -> EntityDefinition:
+        """Entity called ``name``; raises ``KeyError`` when it does not exist."""
+        return self.index.entities[name]
+
+    def entity_for_table(self, table: str) -> EntityDefinition:
+        return self.index.tables[table]
+
+    def attribute(self, entity: str, name: str) -> AttributeDefinition:
+        return self.index.attributes[(entity, name)]
+
+    def primary_key(self, entity: str) -> Tuple[AttributeDefinition, ...]:
+        return self.index.entities[entity].primary_key
+
+    def references(self, entity: str) -> Tuple[Reference, ...]:
+        """Relations declared by ``entity``."""
+        return self.index.references[entity]
+
+    def referenced_by(
+        self, entity: str, target_field: Optional[str] = None
+    ) -> Tuple[Reference, ...]:
+        """Relations pointing at ``entity`` (optionally only at ``target_field``)."""
+        refs = self.index.referenced_by[entity]
+        if target_field is None:
+            return refs
+        return tuple(ref for ref in refs if ref.target_field == target_field)
+
+    def fk_order(self) -> Tuple[EntityDefinition, ...]:
+        """Entities with every referenced entity before its referrers."""
+        return self.index.fk_order
+
+    def deferred_references(self) -> Tuple[Reference, ...]:
+        """References that point forward in :meth:`fk_order` because of cycles."""
+        return self.index.deferred
+
+
+__all__ = [
+    "AttributeDefinition",
+    "DerivedDefinition",
+    "DomainDefinition",
+    "DomainIndex",
+    "EntityDefinition",
+    "EnumDefinition",
+    "EventDefinition",
+    "IndexDefinition",
+    "QueryDefinition",
+    "Reference",
+    "RelationshipDefinition",
+    "RetentionDefinition",
+    "SearchDefinition",
+    "SyncDefinition",
+]
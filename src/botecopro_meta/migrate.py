@@ -0,0 +1,463 @@
+"""Diff two SQLite schemas and plan the smallest migration between them.
+
+Both sides are read the same way, from ``PRAGMA table_info``,
+``foreign_key_list``, ``table_list`` and ``index_info`` plus the stored DDL
+for enum ``CHECK`` clauses and index definitions. A live database
+is read directly; a domain is first applied to an in-memory database. The
+plan then prefers, per table:
+
+* ``ALTER TABLE ... ADD COLUMN`` for new columns SQLite can append (not
+  part of the primary key, nullable or with a default, a ``NULL`` default
+  for references);
+* ``ALTER TABLE ... DROP COLUMN`` for removed columns that are neither key
+  nor reference columns;
+* the create-copy-drop-rename rebuild for everything else (changed types,
+  nullability, defaults, enum values, keys, references, table options).
+
+Index changes never rebuild a table: obsolete indexes are dropped before
+the table changes and new ones are created in a second transaction.
+Triggers, which a rebuild drops along with its table, are re-created with
+the table changes. So are triggers on other tables whose body names a
+replaced table (derived columns): SQLite will not rename the staging table
+while such a trigger points at a table that is gone. Full-text indexes
+(FTS5 virtual tables, whose shadow tables are left out of the comparison)
+are re-created and rebuilt from their content table when their definition
+changes.
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from .ddl import column_definition, create_indexes, create_table, create_triggers
+from .generator import deferred_columns, render_schema_content
+from .metamodel import DomainDefinition, EntityDefinition
+from .search import search_spec, search_tables
+
+_CHECK = re.compile(r'"([^"]+)" [A-Z]+ (CHECK \("[^"]+" IN \([^)]*\)\))')
+REBUILD_SUFFIX = "__migrating"
+
+
+@dataclass(frozen=True)
+class ColumnShape:
+    """One column as SQLite reports it."""
+
+    name: str
+    type: str
+    notnull: bool
+    default: Optional[str]
+    pk: int
+    check: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class IndexShape:
+    """An explicitly created index; ``sql`` is the statement SQLite stored."""
+
+    name: str
+    table: str
+    columns: Tuple[str, ...]
+    sql: str
+
+
+@dataclass(frozen=True)
+class TriggerShape:
+    """A trigger; ``sql`` is the statement SQLite stored."""
+
+    name: str
+    table: str
+    sql: str
+
+
+@dataclass(frozen=True)
+class VirtualTableShape:
+    """A virtual table such as a full-text index; ``sql`` is the statement SQLite stored."""
+
+    name: str
+    sql: str
+
+
+@dataclass(frozen=True)
+class TableShape:
+    """Columns, references and options of one table."""
+
+    name: str
+    columns: Tuple[ColumnShape, ...]
+    foreign_keys: FrozenSet[Tuple[str, str, str]]  # (column, table, target column)
+    strict: bool = False
+    without_rowid: bool = False
+
+    def column(self, name: str) -> Optional[ColumnShape]:
+        return next((column for column in self.columns if column.name == name), None)
+
+    def references(self, column: str) -> FrozenSet[Tuple[str, str, str]]:
+        return frozenset(fk for fk in self.foreign_keys if fk[0] == column)
+
+
+@dataclass(frozen=True)
+class SchemaShape:
+    """Every user table, index and trigger of a database, keyed by name."""
+
+    tables: Dict[str, TableShape]
+    indexes: Dict[str, IndexShape]
+    triggers: Dict[str, TriggerShape] = field(default_factory=dict)
+    virtual_tables: Dict[str, VirtualTableShape] = field(default_factory=dict)
+
+
+def read_schema(conn: sqlite3.Connection) -> SchemaShape:
+    """Shape of the tables, indexes and triggers in ``conn`` (SQLite internals excluded)."""
+    tables: Dict[str, TableShape] = {}
+    indexes: Dict[str, IndexShape] = {}
+    virtual_tables: Dict[str, VirtualTableShape] = {}
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' "
+        "AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' ORDER BY rowid"
+    ).fetchall()
+    for table, sql in rows:
+        _, _, kind, _, without_rowid, strict = conn.execute(
+            f'PRAGMA table_list("{table}")'
+        ).fetchone()
+        if kind == "virtual":
+            virtual_tables[table] = VirtualTableShape(table, sql)
+        if kind != "table":  # virtual tables and the shadow tables backing them
+            continue
+        checks = dict(_CHECK.findall(sql or ""))
+        columns = tuple(
+            ColumnShape(name, type_.upper(), bool(notnull), default, pk, checks.get(name))
+            for _, name, type_, notnull, default, pk in conn.execute(
+                f'PRAGMA table_info("{table}")'
+            )
+        )
+        foreign_keys = frozenset(
+            (row[3], row[2], row[4])
+            for row in conn.execute(f'PRAGMA foreign_key_list("{table}")')
+        )
+        tables[table] = TableShape(
+            table, columns, foreign_keys, bool(strict), bool(without_rowid)
+        )
+    # Automatic indexes (primary keys, UNIQUE constraints) have no stored SQL.
+    for name, table, sql in conn.execute(
+        "SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'index' "
+        "AND sql IS NOT NULL ORDER BY rowid"
+    ).fetchall():
+        columns = tuple(row[2] for row in conn.execute(f'PRAGMA index_info("{name}")'))
+        indexes[name] = IndexShape(name, table, columns, sql)
+    triggers = {
+        name: TriggerShape(name, table, sql)
+        for name, table, sql in conn.execute(
+            "SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY rowid"
+        )
+    }
+    return SchemaShape(tables, indexes, triggers, virtual_tables)
+
+
+def domain_schema(domain: DomainDefinition) -> SchemaShape:
+    """Shape of the schema ``domain`` generates, read back from ``:memory:``."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.executescript(
+            render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+        )
+        return read_schema(conn)
+    finally:
+        conn.close()
+
+
+@dataclass
+class TableChange:
+    """Statements migrating one table, and why they were chosen."""
+
+    table: str
+    action: str  # create | alter | rebuild | drop
+    reason: str
+    statements: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Migration:
+    """Ordered plan: index and trigger drops, table changes, then their creation."""
+
+    drop_indexes: List[str] = field(default_factory=list)
+    tables: List[TableChange] = field(default_factory=list)
+    search: List[str] = field(default_factory=list)  # full-text index drops, creates, rebuilds
+    create_indexes: List[str] = field(default_factory=list)
+    drop_triggers: List[str] = field(default_factory=list)
+    create_triggers: List[str] = field(default_factory=list)
+
+    @property
+    def rebuilds(self) -> bool:
+        return any(change.action in ("rebuild", "drop") for change in self.tables)
+
+    def __bool__(self) -> bool:
+        return bool(self._structure() or self.create_indexes)
+
+    def _structure(self) -> List[str]:
+        """Statements of the first transaction; triggers are cheap, so they go here too."""
+        return (
+            self.drop_indexes
+            + self.drop_triggers
+            + [statement for change in self.tables for statement in change.statements]
+            + self.search
+            + self.create_triggers
+        )
+
+    def script(self) -> str:
+        """The plan as a SQL script for ``sqlite3`` or ``executescript``."""
+        if not self:
+            return "-- Schema is up to date\n"
+        lines: List[str] = []
+        if self.rebuilds:
+            lines.append("PRAGMA foreign_keys = OFF;")
+        if self._structure():
+            lines.append("BEGIN;")
+            lines.extend(self.drop_indexes + self.drop_triggers)
+            for change in self.tables:
+                lines.append(f'-- {change.action} "{change.table}": {change.reason}')
+                lines.extend(change.statements)
+            if self.search:
+                lines.append("-- Full-text search")
+                lines.extend(self.search)
+            if self.create_triggers:
+                lines.append("-- Triggers")
+                lines.extend(self.create_triggers)
+            lines.append("COMMIT;")
+        if self.create_indexes:
+            lines.append("-- Indexes")
+            lines.append("BEGIN;")
+            lines.extend(self.create_indexes)
+            lines.append("COMMIT;")
+        if self.rebuilds:
+            lines.append("PRAGMA foreign_keys = ON;")
+        return "\n".join(lines) + "\n"
+
+    def apply(self, conn: sqlite3.Connection) -> None:
+        """Run the plan on ``conn``; a rebuilt table with broken references rolls it back.
+
+        Foreign key enforcement is switched off around rebuilds, as the
+        SQLite rebuild procedure requires, and restored afterwards.
+        """
+        (enforced,) = conn.execute("PRAGMA foreign_keys").fetchone()
+        if self.rebuilds:
+            conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            if self._structure():
+                self._run(
+                    conn,
+                    self._structure(),
+                    check=[change.table for change in self.tables if change.action == "rebuild"],
+                )
+            if self.create_indexes:
+                self._run(conn, self.create_indexes)
+        finally:
+            conn.execute(f"PRAGMA foreign_keys = {enforced}")
+
+    @staticmethod
+    def _run(conn: sqlite3.Connection, statements: List[str], check: Sequence[str] = ()) -> None:
+        conn.execute("BEGIN")
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            for table in check:
+                broken = conn.execute(f'PRAGMA foreign_key_check("{table}")').fetchall()
+                if broken:
+                    raise sqlite3.IntegrityError(
+                        f'"{table}" has {len(broken)} broken reference(s) after the rebuild, '
+                        f"first: {broken[0]}"
+                    )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def _can_add(column: ColumnShape, table: TableShape) -> bool:
+    if column.pk:
+        return False
+    if column.notnull and column.default in (None, "NULL"):
+        return False
+    return not table.references(column.name) or column.default in (None, "NULL")
+
+
+def _can_drop(column: ColumnShape, table: TableShape) -> bool:
+    return not column.pk and not table.references(column.name)
+
+
+def _rebuild_reason(current: TableShape, target: TableShape) -> Optional[str]:
+    if (current.strict, current.without_rowid) != (target.strict, target.without_rowid):
+        return "table options changed"
+    for column in target.columns:
+        existing = current.column(column.name)
+        if existing is None:
+            if not _can_add(column, target):
+                return f'column "{column.name}" cannot be added with ALTER TABLE'
+        elif existing != column:
+            return f'column "{column.name}" changed'
+        elif current.references(column.name) != target.references(column.name):
+            return f'references of "{column.name}" changed'
+    for column in current.columns:
+        if target.column(column.name) is None and not _can_drop(column, current):
+            return f'column "{column.name}" cannot be dropped with ALTER TABLE'
+    return None
+
+
+def _add_column(entity: EntityDefinition, name: str, deferred: Tuple[str, ...]) -> str:
+    pk_columns = [attr.name for attr in entity.attributes if attr.primary_key]
+    attr = next(attr for attr in entity.attributes if attr.name == name)
+    definition = column_definition(attr, pk_columns)
+    if attr.relation:
+        definition += f' REFERENCES "{attr.relation[0]}"("{attr.relation[1]}")'
+        if name in deferred:
+            definition += " DEFERRABLE INITIALLY DEFERRED"
+    return f'ALTER TABLE "{entity.table}" ADD COLUMN {definition};'
+
+
+def _rebuild(
+    entity: EntityDefinition,
+    current: TableShape,
+    target: TableShape,
+    deferred: Tuple[str, ...],
+) -> List[str]:
+    for column in target.columns:
+        if current.column(column.name) is None and column.notnull and column.default is None:
+            raise ValueError(
+                f'{entity.table}.{column.name} is NOT NULL without a default; '
+                "existing rows need a value before it can be added"
+            )
+    table = entity.table
+    staging = table + REBUILD_SUFFIX
+    create = create_table(entity, deferred).replace(
+        f'CREATE TABLE IF NOT EXISTS "{table}"', f'CREATE TABLE "{staging}"', 1
+    )
+    names, values = [], []
+    for column in target.columns:
+        existing = current.column(column.name)
+        if existing is None:
+            continue
+        names.append(f'"{column.name}"')
+        if column.notnull and column.default is not None and not existing.notnull:
+            # Rows holding NULL take the new default instead of failing the copy.
+            values.append(f'COALESCE("{column.name}", {column.default})')
+        else:
+            values.append(f'"{column.name}"')
+    return [
+        create,
+        f'INSERT INTO "{staging}" ({", ".join(names)}) '
+        f'SELECT {", ".join(values)} FROM "{table}";',
+        f'DROP TABLE "{table}";',
+        f'ALTER TABLE "{staging}" RENAME TO "{table}";',
+    ]
+
+
+def plan_migration(current: SchemaShape, domain: DomainDefinition) -> Migration:
+    """Statements turning a database shaped like ``current`` into ``domain``'s schema."""
+    target = domain_schema(domain)
+    deferred = deferred_columns(domain)
+    migration = Migration()
+    replaced = set()
+
+    for entity in domain.fk_order():
+        table = entity.table
+        wanted = target.tables[table]
+        existing = current.tables.get(table)
+        columns = deferred.get(entity.name, ())
+        if existing is None:
+            migration.tables.append(
+                TableChange(table, "create", "new table", [create_table(entity, columns)])
+            )
+            replaced.add(table)
+            continue
+        reason = _rebuild_reason(existing, wanted)
+        if reason:
+            migration.tables.append(
+                TableChange(table, "rebuild", reason, _rebuild(entity, existing, wanted, columns))
+            )
+            replaced.add(table)
+            continue
+        statements = [
+            _add_column(entity, column.name, columns)
+            for column in wanted.columns
+            if existing.column(column.name) is None
+        ]
+        dropped = [
+            column.name for column in existing.columns if wanted.column(column.name) is None
+        ]
+        statements += [f'ALTER TABLE "{table}" DROP COLUMN "{name}";' for name in dropped]
+        if statements:
+            added = len(statements) - len(dropped)
+            migration.tables.append(
+                TableChange(
+                    table, "alter", f"{added} column(s) added, {len(dropped)} dropped", statements
+                )
+            )
+
+    for table in reversed(list(current.tables)):
+        if table not in target.tables:
+            migration.tables.append(
+                TableChange(table, "drop", "not in the domain", [f'DROP TABLE "{table}";'])
+            )
+            replaced.add(table)
+
+    for name, index in current.indexes.items():
+        if index.table in replaced:
+            continue
+        if target.indexes.get(name) != index:
+            migration.drop_indexes.append(f'DROP INDEX IF EXISTS "{name}";')
+    creates = {
+        name
+        for name, index in target.indexes.items()
+        if index.table in replaced or current.indexes.get(name) != index
+    }
+    for entity in domain.fk_order():
+        for statement, index in zip(create_indexes(entity), entity.indexes):
+            if index.name in creates:
+                migration.create_indexes.append(statement)
+
+    for name in current.virtual_tables:
+        if name not in target.virtual_tables:
+            migration.search.append(f'DROP TABLE IF EXISTS "{name}";')
+    for entity in domain.fk_order():
+        if entity.search is None:
+            continue
+        name = entity.search.table
+        existing = current.virtual_tables.get(name)
+        if existing == target.virtual_tables[name]:
+            continue
+        if existing is not None:
+            migration.search.append(f'DROP TABLE "{name}";')
+        migration.search += search_tables(entity) + [search_spec(entity).rebuild_sql + ";"]
+
+    def touches_replaced(trigger: TriggerShape) -> bool:
+        return trigger.table in replaced or any(f'"{table}"' in trigger.sql for table in replaced)
+
+    for name, trigger in current.triggers.items():
+        if trigger.table in replaced:
+            continue
+        if touches_replaced(trigger) or target.triggers.get(name) != trigger:
+            migration.drop_triggers.append(f'DROP TRIGGER IF EXISTS "{name}";')
+    creates = {
+        name
+        for name, trigger in target.triggers.items()
+        if touches_replaced(trigger) or current.triggers.get(name) != trigger
+    }
+    for entity in domain.fk_order():
+        for name, statement in create_triggers(entity):
+            if name in creates:
+                migration.create_triggers.append(statement)
+    return migration
+
+
+__all__ = [
+    "ColumnShape",
+    "IndexShape",
+    "Migration",
+    "SchemaShape",
+    "TableChange",
+    "TableShape",
+    "TriggerShape",
+    "VirtualTableShape",
+    "domain_schema",
+    "plan_migration",
+    "read_schema",
+]
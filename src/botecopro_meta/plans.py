@@ -0,0 +1,266 @@
+"""``EXPLAIN QUERY PLAN`` harness over the generated schema.
+
+The schema a domain generates is loaded into an in-memory database, every
+table gets ``rows`` synthetic rows from :mod:`.seeding` (``ANALYZE`` then
+gives the planner real statistics) and a workload is planned and timed per
+entity:
+
+* ``pk`` - lookup by primary key;
+* ``join`` - the rows of a parent joined to its children along each relation;
+* ``enum`` - a filter on each enum column;
+* ``sync`` - the dirty-row sweep of :mod:`.sync` (or the stamp sweep);
+* ``declared`` - the entity's ``queries`` from the YAML.
+
+Queries use named parameters, bound from a sample row of the entity's
+table, so ``WHERE "comanda_id" = :comanda_id`` always matches something.
+A declared query may fix parameters with ``params`` and allow a full scan
+with ``scan: true``::
+
+    queries:
+      open_comandas: 'SELECT * FROM "comanda" WHERE "status" = :status'
+      by_status: { sql: ..., params: { status: open } }
+
+Primary key, join, sync and declared queries are expected to use an index:
+a plan step reading a whole table (``SCAN <table>`` without an index) fails
+them. Enum filters are planned and timed but only reported.
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .metamodel import DomainDefinition, EntityDefinition, QueryDefinition
+from .seeding import seed
+
+ROWS = 1000
+REPEAT = 10
+KINDS = ("pk", "join", "enum", "sync", "declared")
+
+# String literals are matched whole so that a ":word" inside one is not a parameter.
+_PARAMETER = re.compile(r"'(?:[^']|'')*'|:([A-Za-z_][A-Za-z0-9_]*)")
+
+
+def declared_queries(entity: str, raw_queries: Optional[Dict]) -> Tuple[QueryDefinition, ...]:
+    """``queries`` of ``entity`` as written in the YAML."""
+    queries = []
+    for name, spec in (raw_queries or {}).items():
+        if isinstance(spec, str):
+            spec = {"sql": spec}
+        if not isinstance(spec, dict) or not spec.get("sql"):
+            raise ValueError(f"{entity}: query {name!r} needs sql")
+        queries.append(
+            QueryDefinition(
+                name=name,
+                sql=spec["sql"],
+                params=tuple((spec.get("params") or {}).items()),
+                scan=bool(spec.get("scan")),
+            )
+        )
+    return tuple(queries)
+
+
+@dataclass(frozen=True, slots=True)
+class WorkloadQuery:
+    """One query of the workload and whether it must be answered from an index."""
+
+    entity: str
+    kind: str
+    name: str
+    sql: str
+    params: Tuple[Tuple[str, object], ...] = ()
+    indexed: bool = True
+
+
+def _quoted(names: Iterable[str]) -> str:
+    return ", ".join(f'"{name}"' for name in names)
+
+
+def workload(entity: EntityDefinition) -> List[WorkloadQuery]:
+    """The generated and declared queries planned for ``entity``."""
+    table = f'"{entity.table}"'
+    queries = []
+    if entity.primary_key:
+        match = " AND ".join(f'"{attr.name}" = :{attr.name}' for attr in entity.primary_key)
+        queries.append(
+            WorkloadQuery(entity.name, "pk", "pk", f"SELECT * FROM {table} WHERE {match}")
+        )
+    for attr in entity.foreign_keys:
+        parent, key = attr.relation
+        queries.append(
+            WorkloadQuery(
+                entity.name,
+                "join",
+                attr.name,
+                f'SELECT c.* FROM "{parent}" AS p JOIN {table} AS c'
+                f' ON c."{attr.name}" = p."{key}" WHERE p."{key}" = :{attr.name}',
+                indexed=attr.raw.get("index", True) is not False,
+            )
+        )
+    for attr in entity.attributes:
+        if attr.enum:
+            queries.append(
+                WorkloadQuery(
+                    entity.name,
+                    "enum",
+                    attr.name,
+                    f'SELECT * FROM {table} WHERE "{attr.name}" = :{attr.name}',
+                    indexed=False,
+                )
+            )
+    sync = entity.sync
+    if sync is not None:
+        if sync.dirty:
+            where = f'"{sync.dirty}" = 1'
+        else:
+            where = f'"{sync.stamp}" > :{sync.stamp}'
+        order = [sync.stamp, *(attr.name for attr in entity.primary_key)]
+        queries.append(
+            WorkloadQuery(
+                entity.name,
+                "sync",
+                "sweep",
+                f"SELECT * FROM {table} WHERE {where} ORDER BY {_quoted(order)} LIMIT 500",
+            )
+        )
+    queries.extend(
+        WorkloadQuery(
+            entity.name, "declared", query.name, query.sql, query.params, indexed=not query.scan
+        )
+        for query in entity.queries
+    )
+    return queries
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: object = ()) -> Tuple[str, ...]:
+    """Detail column of ``EXPLAIN QUERY PLAN`` for ``sql``, one entry per step."""
+    return tuple(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def table_scans(plan: Sequence[str]) -> Tuple[str, ...]:
+    """Steps of ``plan`` reading a whole table rather than an index."""
+    return tuple(
+        step
+        for step in plan
+        if step.startswith("SCAN ") and "INDEX" not in step and step != "SCAN CONSTANT ROW"
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class PlanResult:
+    """Plan and mean run time of one workload query."""
+
+    query: WorkloadQuery
+    plan: Tuple[str, ...]
+    seconds: float
+    rows: int
+
+    @property
+    def scans(self) -> Tuple[str, ...]:
+        return table_scans(self.plan)
+
+    @property
+    def failed(self) -> bool:
+        return self.query.indexed and bool(self.scans)
+
+
+def _bindings(entity: EntityDefinition, query: WorkloadQuery, row: Dict) -> Dict[str, object]:
+    fixed = dict(query.params)
+    bindings = {}
+    for name in filter(None, _PARAMETER.findall(query.sql)):
+        if name in fixed:
+            bindings[name] = fixed[name]
+        elif name in row:
+            bindings[name] = row[name]
+        else:
+            raise ValueError(f"{entity.name}.{query.name}: no value for :{name}; set it in params")
+    return bindings
+
+
+def _sample_row(conn: sqlite3.Connection, entity: EntityDefinition) -> Dict[str, object]:
+    (count,) = conn.execute(f'SELECT COUNT(*) FROM "{entity.table}"').fetchone()
+    cursor = conn.execute(f'SELECT * FROM "{entity.table}" LIMIT 1 OFFSET ?', (count // 2,))
+    row = cursor.fetchone() or (None,) * len(cursor.description)
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def run_workload(
+    conn: sqlite3.Connection,
+    domain: DomainDefinition,
+    *,
+    repeat: int = REPEAT,
+    entities: Optional[Iterable[str]] = None,
+) -> List[PlanResult]:
+    """Plan and time the workload of each entity (all by default) on seeded ``conn``."""
+    wanted = None if entities is None else set(entities)
+    results = []
+    for entity in domain.fk_order():
+        if wanted is not None and entity.name not in wanted:
+            continue
+        row = _sample_row(conn, entity)
+        for query in workload(entity):
+            params = _bindings(entity, query, row)
+            try:
+                plan = explain(conn, query.sql, params)
+            except sqlite3.Error as error:
+                raise ValueError(f"{entity.name}.{query.name}: {error}") from error
+            start = time.perf_counter()
+            for _ in range(repeat):
+                found = len(conn.execute(query.sql, params).fetchall())
+            seconds = (time.perf_counter() - start) / max(repeat, 1)
+            results.append(PlanResult(query, plan, seconds, found))
+    return results
+
+
+def check_plans(
+    domain: DomainDefinition,
+    *,
+    rows: int = ROWS,
+    repeat: int = REPEAT,
+    entities: Optional[Iterable[str]] = None,
+) -> List[PlanResult]:
+    """Load ``domain``'s schema into ``:memory:``, seed it and run the workload."""
+    from .generator import deferred_columns, render_schema_content
+
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    try:
+        conn.executescript(
+            render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+        )
+        seed(conn, domain, rows, weighted=False)
+        conn.execute("ANALYZE")
+        return run_workload(conn, domain, repeat=repeat, entities=entities)
+    finally:
+        conn.close()
+
+
+def format_report(results: Sequence[PlanResult]) -> str:
+    """Results as a table: one line per query, plan steps that scan indented below."""
+    lines = [f"{'query':<44}{'kind':<10}{'µs':>9}{'rows':>7}  plan"]
+    for result in results:
+        query = result.query
+        status = "FAIL" if result.failed else ("scan" if result.scans else "ok")
+        lines.append(
+            f"{query.entity + '.' + query.name:<44}{query.kind:<10}"
+            f"{result.seconds * 1e6:>9.1f}{result.rows:>7}  {status}"
+        )
+        lines.extend(f"    {step}" for step in result.plan if result.failed)
+    failed = sum(result.failed for result in results)
+    lines.append(f"{len(results)} queries, {failed} failed")
+    return "\n".join(lines) + "\n"
+
+
+__all__ = [
+    "KINDS",
+    "PlanResult",
+    "WorkloadQuery",
+    "check_plans",
+    "declared_queries",
+    "explain",
+    "format_report",
+    "run_workload",
+    "table_scans",
+    "workload",
+]
@@ -0,0 +1,167 @@
+"""ORM relationships generated from relation attributes.
+
+Every relation attribute becomes a pair of ``relationship()`` attributes:
+a many-to-one on the referencing model (``OrderItem.order``) and a
+collection on the referenced one (``Order.order_items``), each populating
+the other. The ``relations`` section (``db-meta/relations.yaml``) names
+them and picks how each side loads::
+
+    relations:
+      OrderItem.order_id:
+        name: order              # default: the column without ``_id``, or
+                                 # the snake_case name of the target
+        lazy: select             # loading of OrderItem.order
+        back_populates: items    # default: plural of the referencing entity,
+                                 # prefixed with ``name`` when it has several
+                                 # relations to the same target
+        back_lazy: selectin      # loading of Order.items
+
+Strategies are SQLAlchemy's: ``select`` (the default, one query per
+access), ``selectin`` and ``joined`` (loaded with the parent, so a screen
+costs the same number of statements whatever the number of rows),
+``raise`` and ``raise_on_sql`` (access without an explicit loader option
+fails, catching N+1 loops in tests) and, for collections only,
+``write_only`` for histories too large to load at all.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import replace
+from typing import Dict, List, Tuple
+
+from .metamodel import DomainIndex, EntityDefinition, RelationshipDefinition
+
+STRATEGIES = ("select", "selectin", "joined", "raise", "raise_on_sql")
+COLLECTION_STRATEGIES = STRATEGIES + ("write_only",)
+DEFAULT_STRATEGY = "select"
+
+_OPTIONS = ("name", "lazy", "back_populates", "back_lazy")
+
+
+def _snake(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def _plural(name: str) -> str:
+    if name.endswith("y") and name[-2:-1] not in "aeiou":
+        return name[:-1] + "ies"
+    if name.endswith(("s", "x", "ch", "sh")):
+        return name + "es"
+    return name + "s"
+
+
+def _strategy(where: str, value: object, allowed: Tuple[str, ...]) -> str:
+    if value not in allowed:
+        raise ValueError(
+            f"{where}: loading strategy must be one of {', '.join(allowed)}, got {value!r}"
+        )
+    return str(value)
+
+
+def resolve_relationships(
+    entities: Tuple[EntityDefinition, ...], raw: Dict
+) -> Tuple[EntityDefinition, ...]:
+    """``entities`` with the relationship pair of every relation attribute."""
+    raw = dict(raw or {})
+    index = DomainIndex(entities)
+    owned: Dict[str, List[RelationshipDefinition]] = {}
+    collected: Dict[str, List[RelationshipDefinition]] = {}
+    for entity in entities:
+        targets = [ref.target for ref in index.references[entity.name]]
+        for ref in index.references[entity.name]:
+            where = f"relations: {entity.name}.{ref.attribute}"
+            options = raw.pop(f"{entity.name}.{ref.attribute}", None) or {}
+            unknown = sorted(set(options) - set(_OPTIONS))
+            if unknown:
+                raise ValueError(f"{where}: unknown option {unknown[0]!r}")
+            ambiguous = targets.count(ref.target) > 1 or ref.target == entity.name
+            # Several relations to one target each need their own attributes.
+            if ref.attribute.endswith("_id"):
+                default = ref.attribute[:-3]
+            elif ambiguous:
+                default = f"{ref.attribute}_{_snake(ref.target)}"
+            else:
+                default = _snake(ref.target)
+            name = str(options.get("name", default))
+            back_default = _plural(_snake(entity.name))
+            if ambiguous:
+                back_default = f"{name}_{back_default}"
+            definition = RelationshipDefinition(
+                source=entity.name,
+                attribute=ref.attribute,
+                target=ref.target,
+                name=name,
+                lazy=_strategy(where, options.get("lazy", DEFAULT_STRATEGY), STRATEGIES),
+                back_populates=str(options.get("back_populates", back_default)),
+                back_lazy=_strategy(
+                    where, options.get("back_lazy", DEFAULT_STRATEGY), COLLECTION_STRATEGIES
+                ),
+                ambiguous=ambiguous,
+            )
+            owned.setdefault(entity.name, []).append(definition)
+            collected.setdefault(ref.target, []).append(definition)
+    if raw:
+        name = next(iter(raw))
+        raise ValueError(f"relations: {name!r} is not a relation attribute of the domain")
+    for entity in entities:
+        taken = {attr.name for attr in entity.attributes}
+        names = [rel.name for rel in owned.get(entity.name, ())] + [
+            rel.back_populates for rel in collected.get(entity.name, ())
+        ]
+        for name in names:
+            if name in taken:
+                raise ValueError(
+                    f"relations: {entity.name}.{name} is already taken;"
+                    " set name or back_populates"
+                )
+            taken.add(name)
+    return tuple(
+        replace(
+            entity,
+            relationships=tuple(owned.get(entity.name, ())),
+            collections=tuple(collected.get(entity.name, ())),
+        )
+        for entity in entities
+    )
+
+
+def relationship_lines(entity: EntityDefinition) -> List[str]:
+    """Class-body source of ``entity``'s relationship attributes, many-to-one first."""
+    columns = {attr.name: attr for attr in entity.attributes}
+    lines = []
+    for rel in entity.relationships:
+        attr = columns[rel.attribute]
+        hint = f"Optional[{rel.target}]" if attr.nullable else rel.target
+        arguments = [f'"{rel.target}"']
+        if rel.ambiguous:
+            arguments.append(f"foreign_keys=[{rel.attribute}]")
+        if rel.target == rel.source:
+            arguments.append(f'remote_side="{rel.target}.{attr.relation[1]}"')
+        arguments += [f'back_populates="{rel.back_populates}"', f'lazy="{rel.lazy}"']
+        lines.append(
+            f"    {rel.name}: Mapped[{hint}] = relationship(\n"
+            f"        {', '.join(arguments)}\n    )"
+        )
+    for rel in entity.collections:
+        if rel.back_lazy == "write_only":
+            hint = f"WriteOnlyMapped[{rel.source}]"
+        else:
+            hint = f"Mapped[List[{rel.source}]]"
+        arguments = [f'"{rel.source}"']
+        if rel.ambiguous:
+            arguments.append(f'foreign_keys="[{rel.source}.{rel.attribute}]"')
+        arguments += [f'back_populates="{rel.name}"', f'lazy="{rel.back_lazy}"']
+        lines.append(
+            f"    {rel.back_populates}: {hint} = relationship(\n"
+            f"        {', '.join(arguments)}\n    )"
+        )
+    return lines
+
+
+__all__ = [
+    "COLLECTION_STRATEGIES",
+    "DEFAULT_STRATEGY",
+    "STRATEGIES",
+    "relationship_lines",
+    "resolve_relationships",
+]
@@ -0,0 +1,187 @@
+"""Statement text and value codecs for the generated bulk repositories.
+
+Every generated ``repositories/<table>.py`` module runs plain DB-API
+``executemany`` calls against SQL prepared here at generation time, so the
+hot path does no statement building or per-column type dispatch. Values are
+converted with the helpers of the generated ``converters`` module according
+to the column's storage (see :mod:`botecopro_meta.storage`).
+
+Reads bypass the ORM: a ``sqlite3`` row factory decodes each row of the
+column-ordered ``SELECT_SQL`` straight into a ``NamedTuple`` record, with
+enum columns turned into the generated ``enums`` classes.
+
+``upsert_many`` resolves conflicts on the primary key and on every unique
+index, updating all other columns from the incoming row. Entities without
+a primary key only get ``insert_many`` (and ``upsert_many`` when they have
+a unique index).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from .metamodel import AttributeDefinition, EntityDefinition
+
+CHUNK_SIZE = 500
+# Bound parameters allowed per statement by SQLite builds before 3.32.
+MAX_VARIABLES = 999
+
+
+@dataclass(frozen=True, slots=True)
+class RepositorySpec:
+    """Everything a repository module needs, rendered to Python source."""
+
+    columns: Tuple[str, ...]
+    primary_key: Tuple[str, ...]
+    primary_key_literal: str
+    insert_sql: str
+    upsert_sql: str
+    select_sql: str
+    delete_sql: str
+    key_filter: str
+    key_placeholder: str
+    params: Tuple[str, ...]
+    key_literal: str
+    chunk_size: int  # keys per get_many/delete_many statement
+    fields: Tuple[Tuple[str, str], ...]
+    decoders: Tuple[str, ...]
+    imports: Tuple[str, ...]
+
+
+def _quote(name: str) -> str:
+    return f'"{name}"'
+
+
+def _tuple_literal(items: Sequence[str]) -> str:
+    if len(items) == 1:
+        return f"({items[0]},)"
+    return f"({', '.join(items)})"
+
+
+def _encoder(attr: AttributeDefinition, value: str) -> str:
+    if attr.sqlalchemy_type == "column_types.UUIDBlob":
+        return f"converters.uuid_to_blob({value})"
+    if attr.sqlalchemy_type == "column_types.EpochMillis":
+        return f"converters.datetime_to_epoch_ms({value})"
+    if attr.base_type == "uuid":
+        return f"converters.uuid_to_text({value})"
+    if attr.base_type in ("datetime", "timestamp"):
+        return f"converters.datetime_to_text({value})"
+    if attr.base_type == "decimal":
+        return f"converters.decimal_to_float({value})"
+    return value
+
+
+def _decoder(attr: AttributeDefinition, value: str) -> str:
+    if attr.sqlalchemy_type == "column_types.UUIDBlob":
+        return f"converters.blob_to_uuid({value})"
+    if attr.sqlalchemy_type == "column_types.EpochMillis":
+        return f"converters.epoch_ms_to_datetime({value})"
+    if attr.enum:
+        if attr.nullable:
+            return f"None if {value} is None else enums.{attr.enum}({value})"
+        return f"enums.{attr.enum}({value})"
+    if attr.base_type == "uuid":
+        return f"converters.text_to_uuid({value})"
+    if attr.base_type in ("datetime", "timestamp"):
+        return f"converters.text_to_datetime({value})"
+    if attr.base_type == "decimal":
+        return f"converters.number_to_decimal({value})"
+    if attr.base_type == "bool":
+        return f"converters.int_to_bool({value})"
+    return value
+
+
+def _annotation(attr: AttributeDefinition) -> str:
+    annotation = f"enums.{attr.enum}" if attr.enum else attr.python_type
+    return f"Optional[{annotation}]" if attr.nullable else annotation
+
+
+def _row_value(attr: AttributeDefinition) -> str:
+    required = not attr.nullable and attr.default is None and not attr.autoincrement
+    if required:
+        return f'row["{attr.name}"]'
+    if attr.default is not None:
+        return f'row.get("{attr.name}", {attr.default})'
+    return f'row.get("{attr.name}")'
+
+
+def _conflict_clause(
+    columns: Tuple[str, ...], where: Optional[str], updates: List[str]
+) -> str:
+    target = f"ON CONFLICT ({', '.join(_quote(c) for c in columns)})"
+    if where:
+        target += f" WHERE {where}"
+    if not updates:
+        return f"{target} DO NOTHING"
+    return f"{target} DO UPDATE SET {', '.join(updates)}"
+
+
+def repository_spec(entity: EntityDefinition) -> RepositorySpec:
+    """Precompute statements and codecs for ``entity``'s repository module."""
+    columns = tuple(attr.name for attr in entity.attributes)
+    primary_key = tuple(attr.name for attr in entity.primary_key)
+    quoted = ", ".join(_quote(c) for c in columns)
+    table = _quote(entity.table)
+    insert_sql = (
+        f"INSERT INTO {table} ({quoted}) VALUES ({', '.join('?' for _ in columns)})"
+    )
+
+    updates = [
+        f"{_quote(c)} = excluded.{_quote(c)}" for c in columns if c not in primary_key
+    ]
+    targets: List[Tuple[Tuple[str, ...], Optional[str]]] = []
+    if primary_key:
+        targets.append((primary_key, None))
+    targets.extend((idx.columns, idx.where) for idx in entity.indexes if idx.unique)
+    upsert_sql = (
+        " ".join(
+            [insert_sql]
+            + [_conflict_clause(cols, where, updates) for cols, where in targets]
+        )
+        if targets
+        else ""
+    )
+
+    by_name = {attr.name: attr for attr in entity.attributes}
+    if len(primary_key) == 1:
+        key_filter = f" WHERE {_quote(primary_key[0])} IN ({{}})"
+        key_placeholder = "?"
+        key_params: Tuple[str, ...] = (_encoder(by_name[primary_key[0]], "key"),)
+    else:
+        key_filter = f" WHERE ({', '.join(_quote(c) for c in primary_key)}) IN (VALUES {{}})"
+        key_placeholder = f"({', '.join('?' for _ in primary_key)})"
+        key_params = tuple(
+            _encoder(by_name[name], f"key[{position}]")
+            for position, name in enumerate(primary_key)
+        )
+
+    params = tuple(_encoder(attr, _row_value(attr)) for attr in entity.attributes)
+    fields = tuple((attr.name, _annotation(attr)) for attr in entity.attributes)
+    decoders = tuple(
+        _decoder(attr, f"row[{position}]") for position, attr in enumerate(entity.attributes)
+    )
+    code = " ".join(params + decoders + tuple(annotation for _, annotation in fields))
+    imports = tuple(module for module in ("converters", "enums") if f"{module}." in code)
+
+    return RepositorySpec(
+        columns=columns,
+        primary_key=primary_key,
+        insert_sql=insert_sql,
+        upsert_sql=upsert_sql,
+        select_sql=f"SELECT {quoted} FROM {table}",
+        delete_sql=f"DELETE FROM {table}",
+        key_filter=key_filter,
+        key_placeholder=key_placeholder,
+        params=params,
+        primary_key_literal=_tuple_literal([_quote(c) for c in primary_key]),
+        key_literal=_tuple_literal(key_params) if primary_key else "",
+        # Each key binds one parameter per key column.
+        chunk_size=min(CHUNK_SIZE, MAX_VARIABLES // max(len(primary_key), 1)),
+        fields=fields,
+        decoders=decoders,
+        imports=imports,
+    )
+
+
+__all__ = ["CHUNK_SIZE", "MAX_VARIABLES", "RepositorySpec", "repository_spec"]
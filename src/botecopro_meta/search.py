@@ -0,0 +1,213 @@
+"""Full-text search over ``searchable`` attributes with SQLite FTS5.
+
+Text attributes flagged ``searchable: true`` are indexed by one
+external-content FTS5 table per entity, ``<table>_search``::
+
+    Product:
+      search:                 # optional
+        tokenize: unicode61 remove_diacritics 2
+        prefix: [2, 3]
+      attributes:
+        name:
+          type: string
+          searchable: true
+
+The index stores only the tokens; the text is read back from the entity
+table by its integer primary key, which is why a searchable entity needs
+one. Insert, update and delete triggers keep the index in step, and the
+update trigger only fires when an indexed column actually changes, so
+stock or sync bookkeeping never touches it. ``prefix`` adds prefix indexes
+for the given lengths, which is what keeps type-ahead queries (``cerv*``)
+as cheap as whole-word ones.
+
+The generated ``search`` module builds safe prefix queries from user input
+and ranks the hits with bm25. Ranking reads the size of every matching row,
+so a broad prefix such as ``ca`` ranks only the newest ``candidates``
+matches (1000 by default), which bounds the cost of a keystroke whatever
+the size of the catalogue. :func:`reindex` adds the index to a database
+created before the flag was set and rebuilds it from the entity table.
+"""
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .metamodel import DomainDefinition, EntityDefinition, SearchDefinition
+
+DEFAULT_TOKENIZE = "unicode61 remove_diacritics 2"
+DEFAULT_PREFIX = (2, 3)
+SUFFIX = "_search"
+
+
+def resolve_search(entity: EntityDefinition, details: Dict) -> Optional[SearchDefinition]:
+    """Index over the ``searchable`` attributes of ``entity``, if it has any."""
+    attributes = details.get("attributes", {})
+    columns = tuple(
+        attr.name
+        for attr in entity.attributes
+        if (attributes.get(attr.name) or {}).get("searchable")
+    )
+    if not columns:
+        return None
+    for name in columns:
+        attr = next(attr for attr in entity.attributes if attr.name == name)
+        if attr.base_type not in ("string", "text") or attr.enum_values:
+            raise ValueError(f"{entity.name}.{name}: only text attributes can be searchable")
+    key = entity.primary_key
+    if len(key) != 1 or key[0].base_type != "int":
+        raise ValueError(f"{entity.name}: searchable entities need a single integer primary key")
+    options = details.get("search") or {}
+    prefix = options.get("prefix", DEFAULT_PREFIX)
+    if not isinstance(prefix, (list, tuple)) or not all(
+        isinstance(length, int) and not isinstance(length, bool) and length > 0
+        for length in prefix
+    ):
+        raise ValueError(f"{entity.name}: search.prefix must be a list of positive lengths")
+    return SearchDefinition(
+        table=entity.table + SUFFIX,
+        content=entity.table,
+        key=key[0].name,
+        columns=columns,
+        tokenize=str(options.get("tokenize", DEFAULT_TOKENIZE)),
+        prefix=tuple(sorted(set(prefix))),
+    )
+
+
+def search_tables(entity: EntityDefinition) -> List[str]:
+    """``CREATE VIRTUAL TABLE`` statement of ``entity``'s index, if it has one."""
+    search = entity.search
+    if search is None:
+        return []
+    options = [
+        *(f'"{column}"' for column in search.columns),
+        f"content='{search.content}'",
+        f"content_rowid='{search.key}'",
+        f"tokenize='{search.tokenize}'",
+    ]
+    if search.prefix:
+        options.append(f"prefix='{' '.join(map(str, search.prefix))}'")
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{search.table}" USING fts5({", ".join(options)});'
+    ]
+
+
+def _index_row(search: SearchDefinition, row: str, delete: bool = False) -> str:
+    table = f'"{search.table}"'
+    names = ", ".join(f'"{column}"' for column in search.columns)
+    values = ", ".join(f'{row}."{column}"' for column in search.columns)
+    if delete:
+        return (
+            f"  INSERT INTO {table}({table}, rowid, {names})"
+            f" VALUES ('delete', {row}.\"{search.key}\", {values});"
+        )
+    return f'  INSERT INTO {table}(rowid, {names}) VALUES ({row}."{search.key}", {values});'
+
+
+def search_triggers(entity: EntityDefinition) -> List[Tuple[str, str]]:
+    """``(name, CREATE TRIGGER statement)`` pairs keeping ``entity``'s index in step."""
+    search = entity.search
+    if search is None:
+        return []
+    name = f"trg_{search.table}"
+    on = f'ON "{entity.table}"'
+    watched = (search.key, *search.columns)
+    quoted = ", ".join(f'"{column}"' for column in watched)
+    changed = " OR ".join(f'OLD."{column}" IS NOT NEW."{column}"' for column in watched)
+    return [
+        (
+            f"{name}_insert",
+            f"CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT {on}\n"
+            f"BEGIN\n{_index_row(search, 'NEW')}\nEND;",
+        ),
+        (
+            f"{name}_update",
+            f"CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {quoted} {on}\n"
+            f"WHEN {changed}\n"
+            f"BEGIN\n{_index_row(search, 'OLD', delete=True)}\n{_index_row(search, 'NEW')}\nEND;",
+        ),
+        (
+            f"{name}_delete",
+            f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE {on}\n"
+            f"BEGIN\n{_index_row(search, 'OLD', delete=True)}\nEND;",
+        ),
+    ]
+
+
+@dataclass(frozen=True, slots=True)
+class SearchSpec:
+    """Statements of one index in the generated ``search`` module."""
+
+    table: str
+    index: str
+    key: str
+    columns: Tuple[str, ...]
+    search_sql: str
+    rebuild_sql: str
+    check_sql: str
+
+
+def search_spec(entity: EntityDefinition) -> SearchSpec:
+    """Query, rebuild and integrity-check statements of ``entity``'s index."""
+    search = entity.search
+    table = f'"{search.table}"'
+    columns = ", ".join(f'"{column}"' for column in search.columns)
+    return SearchSpec(
+        table=entity.table,
+        index=search.table,
+        key=search.key,
+        columns=search.columns,
+        # bm25 costs a docsize read per match, so only the newest :candidates
+        # matches are ranked; the rowid bound is applied inside the index.
+        search_sql=(
+            f"SELECT rowid, {columns} FROM {table} WHERE {table} MATCH :query"
+            f" AND rowid >= COALESCE((SELECT rowid FROM {table} WHERE {table} MATCH :query"
+            " ORDER BY rowid DESC LIMIT 1 OFFSET :candidates - 1), 0)"
+            " ORDER BY rank LIMIT :limit"
+        ),
+        rebuild_sql=f"INSERT INTO {table}({table}) VALUES ('rebuild')",
+        # rank = 1 also compares the index with the content table.
+        check_sql=f"INSERT INTO {table}({table}, rank) VALUES ('integrity-check', 1)",
+    )
+
+
+def reindex(
+    conn: sqlite3.Connection,
+    domain: DomainDefinition,
+    entities: Optional[Iterable[str]] = None,
+) -> Dict[str, int]:
+    """Create any missing index of ``entities`` (all searchable ones) and rebuild it.
+
+    Returns the rows indexed per table. Tables and triggers are created with
+    ``IF NOT EXISTS``, so this also brings a database created before the
+    ``searchable`` flags up to date; the caller owns the transaction.
+    """
+    if entities is None:
+        selected = [entity for entity in domain.fk_order() if entity.search]
+    else:
+        selected = [domain.entity(name) for name in entities]
+        plain = [entity.name for entity in selected if entity.search is None]
+        if plain:
+            raise ValueError(f"not searchable: {', '.join(plain)}")
+    indexed = {}
+    for entity in selected:
+        for statement in search_tables(entity):
+            conn.execute(statement)
+        for _, statement in search_triggers(entity):
+            conn.execute(statement)
+        conn.execute(search_spec(entity).rebuild_sql)
+        count = conn.execute(f'SELECT COUNT(*) FROM "{entity.table}"').fetchone()
+        indexed[entity.table] = count[0]
+    return indexed
+
+
+__all__ = [
+    "DEFAULT_PREFIX",
+    "DEFAULT_TOKENIZE",
+    "SearchSpec",
+    "reindex",
+    "resolve_search",
+    "search_spec",
+    "search_tables",
+    "search_triggers",
+]
@@ -0,0 +1,350 @@
+"""Synthetic rows for load testing, streamed into SQLite in foreign key order.
+
+Each entity gets ``scale`` times its ``seed.weight`` rows (default weight 1;
+``0`` leaves the table empty, as the event store does), at least one when
+the weight is positive::
+
+    OrderItem:
+      seed: { weight: 6 }   # six items per comanda at weight 1
+
+Row ``n`` of a table always has the same key: ``n + 1`` for integers, a
+per-table permutation of ``n`` for UUIDs and ``<column>-<n>`` for text. A
+relation can therefore point at any row of its parent by index, including
+parents seeded later through a deferred reference, without reading keys
+back. Composite keys made only of relations walk the parents' combinations
+in mixed radix, so they never repeat, and the table is capped at the number
+of combinations. Every other column gets a value of its type:
+
+* enums pick from their ``CHECK`` values, earlier values more often;
+* ``money_cents`` is log-normal around R$ 11, other integers are small counts;
+* timestamps advance through a 30 day window with row number, with jitter;
+* nullable columns are ``NULL`` one time in ten; booleans defaulting to true
+  are true nine times in ten, the others one time in ten.
+
+Rows are produced lazily and written with ``executemany`` in batches of
+``batch_size``, one transaction per table, so memory stays flat whatever
+the scale. Tables joined by a foreign key cycle share one transaction, from
+the table holding the deferred reference to the parent it points at, so
+the reference is checked at its ``COMMIT``. Derived columns are left to
+their triggers.
+"""
+from __future__ import annotations
+
+import math
+import random
+import sqlite3
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .metamodel import AttributeDefinition, DomainDefinition, EntityDefinition
+
+BATCH_SIZE = 50_000
+
+_START = datetime(2024, 1, 1, 18, 0)
+_WINDOW = timedelta(days=30)
+_UNIX = datetime(1970, 1, 1)
+# Odd multiplier: n -> n * _MIX mod 2**128 is a bijection, so keys never collide.
+_MIX = 0x9E3779B97F4A7C15F39CC0605CEDC835
+_MASK = (1 << 128) - 1
+
+Value = Callable[[int], object]
+
+
+def seed_weight(entity_raw: Dict) -> float:
+    """``seed.weight`` of an entity definition (1 when absent)."""
+    weight = (entity_raw.get("seed") or {}).get("weight", 1)
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+        raise ValueError(f"seed.weight must be a non-negative number, got {weight!r}")
+    return float(weight)
+
+
+def row_counts(
+    domain: DomainDefinition, scale: int, *, weighted: bool = True
+) -> Dict[str, int]:
+    """Rows to seed per entity: ``scale`` times its weight, or ``scale`` for all."""
+    counts = {}
+    for entity in domain.fk_order():
+        weight = entity.seed_weight if weighted else 1.0
+        counts[entity.name] = max(1, round(scale * weight)) if weight > 0 else 0
+    for entity in domain.fk_order():
+        radix = _radix(entity)
+        if radix:
+            combinations = 1
+            for attr in radix:
+                combinations *= counts[domain.entity_for_table(attr.relation[0]).name]
+            counts[entity.name] = min(counts[entity.name], combinations)
+    return counts
+
+
+def _radix(entity: EntityDefinition) -> List[AttributeDefinition]:
+    """Key columns to enumerate together when no key column can be unique on its own."""
+    key = entity.primary_key
+    if len(key) > 1 and all(attr.relation for attr in key):
+        return list(key)
+    return []
+
+
+def _coprime(total: int) -> int:
+    """A multiplier near ``total`` times the golden ratio sharing no factor with it."""
+    step = max(int(total * 0.618), 1)
+    while math.gcd(step, total) != 1:
+        step += 1
+    return step
+
+
+def _stored_uuid(value: uuid.UUID, domain: DomainDefinition) -> object:
+    return value.bytes if domain.storage.uuid == "blob" else str(value)
+
+
+def _stored_time(moment: datetime, domain: DomainDefinition) -> object:
+    if domain.storage.datetime == "epoch":
+        return (moment - _UNIX) // timedelta(milliseconds=1)
+    return moment.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def unique_value(
+    entity: EntityDefinition, attr: AttributeDefinition, domain: DomainDefinition
+) -> Optional[Value]:
+    """Value of ``attr`` for row ``n`` that no other row of ``entity`` shares."""
+    base = attr.base_type
+    if attr.enum or base == "bool":
+        return None
+    if base == "int":
+        return lambda n: n + 1
+    if base == "uuid":
+        salt = zlib.crc32(entity.table.encode()) << 64
+        return lambda n: _stored_uuid(uuid.UUID(int=(n * _MIX + salt) & _MASK), domain)
+    if base in ("datetime", "timestamp"):
+        return lambda n: _stored_time(_START + timedelta(milliseconds=n), domain)
+    if base in ("float", "decimal"):
+        return float
+    return lambda n: f"{attr.name}-{n}"
+
+
+def _unique_columns(entity: EntityDefinition) -> set:
+    """One column per key and unique index that makes each row distinct."""
+    keys = [tuple(attr.name for attr in entity.primary_key)]
+    keys += [index.columns for index in entity.indexes if index.unique and not index.where]
+    by_name = {attr.name: attr for attr in entity.attributes}
+    chosen = set()
+    for columns in keys:
+        candidates = [
+            name
+            for name in columns
+            if name in by_name
+            and not by_name[name].relation
+            and not by_name[name].enum
+            and by_name[name].base_type != "bool"
+        ]
+        if candidates and not chosen & set(columns):
+            chosen.add(candidates[0])
+    return chosen
+
+
+def _value(
+    entity: EntityDefinition,
+    attr: AttributeDefinition,
+    domain: DomainDefinition,
+    counts: Dict[str, int],
+    rng: random.Random,
+) -> Value:
+    if attr.enum_values:
+        values = attr.enum_values
+        cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(values))))
+        choose = lambda n: rng.choices(values, cum_weights=cum_weights)[0]  # noqa: E731
+        nullable = attr.nullable
+    else:
+        choose = _random_value(attr, domain, counts[entity.name], rng)
+        nullable = attr.nullable and attr.raw.get("default") is None
+    if not nullable:
+        return choose
+    return lambda n: None if rng.random() < 0.1 else choose(n)
+
+
+def _random_value(
+    attr: AttributeDefinition, domain: DomainDefinition, rows: int, rng: random.Random
+) -> Value:
+    base = attr.base_type
+    if attr.raw.get("type") == "money_cents":
+        return lambda n: int(rng.lognormvariate(7.0, 0.9))
+    if base == "int":
+        return lambda n: 1 + int(rng.expovariate(0.7))
+    if base == "bool":
+        share = 0.9 if attr.raw.get("default") is True else 0.1
+        return lambda n: int(rng.random() < share)
+    if base == "uuid":
+        return lambda n: _stored_uuid(uuid.UUID(int=rng.getrandbits(128), version=4), domain)
+    if base in ("datetime", "timestamp"):
+        step = _WINDOW / max(rows, 1)
+        return lambda n: _stored_time(
+            _START + step * n + timedelta(seconds=rng.gauss(0, 900)), domain
+        )
+    if base == "float":
+        return lambda n: round(rng.lognormvariate(1.0, 0.8), 3)
+    if base == "decimal":
+        return lambda n: round(rng.uniform(0, 1000), attr.scale or 2)
+    if base == "text":
+        return lambda n: f"{attr.name} {n}: " + "lorem ipsum " * rng.randint(1, 8)
+    return lambda n: f"{attr.name} {n}"
+
+
+def _reference(
+    entity: EntityDefinition,
+    attr: AttributeDefinition,
+    domain: DomainDefinition,
+    counts: Dict[str, int],
+    rng: random.Random,
+    position: Optional[Value],
+) -> Value:
+    parent = domain.entity_for_table(attr.relation[0])
+    target = domain.attribute(parent.name, attr.relation[1])
+    key = unique_value(parent, target, domain)
+    if key is None or target.name not in _unique_columns(parent):
+        raise ValueError(
+            f"{entity.name}.{attr.name}: cannot seed a reference to {parent.name}.{target.name}"
+        )
+    available = counts[parent.name]
+    if position is not None:
+        return lambda n: key(position(n) % available)
+    if not available:
+        if attr.nullable:
+            return lambda n: None
+        raise ValueError(f"{entity.name}.{attr.name} needs rows of {parent.name}; raise its weight")
+    if parent.name == entity.name:
+        # Self references point back at an earlier row.
+        return lambda n: key(rng.randrange(n)) if n else (None if attr.nullable else key(0))
+    pick = lambda n: key(rng.randrange(available))  # noqa: E731
+    if not attr.nullable:
+        return pick
+    return lambda n: None if rng.random() < 0.1 else pick(n)
+
+
+def table_rows(
+    entity: EntityDefinition,
+    domain: DomainDefinition,
+    counts: Dict[str, int],
+    rng: random.Random,
+) -> Iterator[tuple]:
+    """Lazily generated rows of ``entity`` in :func:`insert_sql` column order."""
+    positions: Dict[str, Value] = {}
+    radix = _radix(entity)
+    if radix:
+        sizes = [counts[domain.entity_for_table(attr.relation[0]).name] for attr in radix]
+        combinations = 1
+        for size in sizes:
+            combinations *= size
+        # Row n takes combination n * step, a permutation of all of them, so a
+        # partial table still spreads over every parent instead of the first.
+        step = _coprime(combinations)
+        stride = 1
+        for attr, size in zip(radix, sizes):
+            positions[attr.name] = (
+                lambda n, stride=stride: (n * step % combinations) // stride
+            )
+            stride *= size
+    unique = _unique_columns(entity)
+    values = []
+    for attr in _columns(entity):
+        if attr.relation:
+            values.append(
+                _reference(entity, attr, domain, counts, rng, positions.get(attr.name))
+            )
+        elif attr.name in unique:
+            values.append(unique_value(entity, attr, domain))
+        else:
+            values.append(_value(entity, attr, domain, counts, rng))
+    return (tuple(value(n) for value in values) for n in range(counts[entity.name]))
+
+
+def _columns(entity: EntityDefinition) -> List[AttributeDefinition]:
+    derived = {column.column for column in entity.derived}
+    return [attr for attr in entity.attributes if attr.name not in derived]
+
+
+def insert_sql(entity: EntityDefinition) -> str:
+    """``INSERT`` taking the rows of :func:`table_rows`."""
+    names = [f'"{attr.name}"' for attr in _columns(entity)]
+    return (
+        f'INSERT INTO "{entity.table}" ({", ".join(names)})'
+        f' VALUES ({", ".join("?" * len(names))})'
+    )
+
+
+def _transactions(domain: DomainDefinition) -> List[List[EntityDefinition]]:
+    """:meth:`~DomainDefinition.fk_order` split into the tables each transaction writes.
+
+    A deferred reference points at a table seeded later, so the transaction
+    writing its table stays open until that table is written too.
+    """
+    order = domain.fk_order()
+    position = {entity.name: index for index, entity in enumerate(order)}
+    closes = {index: index for index in range(len(order))}
+    for reference in domain.deferred_references():
+        start = position[reference.entity]
+        closes[start] = max(closes[start], position[reference.target])
+    groups: List[List[EntityDefinition]] = []
+    end = -1
+    for index, entity in enumerate(order):
+        if index > end:
+            groups.append([])
+        groups[-1].append(entity)
+        end = max(end, closes[index])
+    return groups
+
+
+def seed(
+    conn: sqlite3.Connection,
+    domain: DomainDefinition,
+    scale: int,
+    *,
+    weighted: bool = True,
+    batch_size: int = BATCH_SIZE,
+    random_seed: int = 0,
+    progress: Optional[Callable[[EntityDefinition, int], None]] = None,
+) -> Dict[str, int]:
+    """Insert the synthetic rows of every table; returns the rows written per table.
+
+    ``conn`` must not be inside a transaction: each table is written in its
+    own, committed before the next one starts, except for the tables of a
+    foreign key cycle, which are committed together. ``progress`` is called
+    with the entity and its running row count after every batch.
+    """
+    rng = random.Random(random_seed)
+    counts = row_counts(domain, scale, weighted=weighted)
+    written = {}
+    cursor = conn.cursor()
+    for entities in _transactions(domain):
+        conn.execute("BEGIN")
+        try:
+            for entity in entities:
+                rows = table_rows(entity, domain, counts, rng)
+                sql = insert_sql(entity)
+                total = 0
+                while True:
+                    batch = list(islice(rows, batch_size))
+                    if not batch:
+                        break
+                    cursor.executemany(sql, batch)
+                    total += len(batch)
+                    if progress is not None:
+                        progress(entity, total)
+                written[entity.table] = total
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    return written
+
+
+__all__ = [
+    "BATCH_SIZE",
+    "insert_sql",
+    "row_counts",
+    "seed",
+    "seed_weight",
+    "table_rows",
+    "unique_value",
+]
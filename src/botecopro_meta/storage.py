@@ -0,0 +1,148 @@
+"""SQLite physical storage profiles for the SQL target.
+
+A profile decides how tables are declared and how logical types are stored:
+
+* ``default`` - rowid tables with the loose affinities of the plan
+  (``BOOLEAN``, ``DATETIME``, ``NUMERIC(p,s)``, UUIDs as text).
+* ``strict`` - ``STRICT`` tables using only the strict storage classes, and
+  ``WITHOUT ROWID`` for tables keyed by a composite primary key.
+* ``compact`` - ``strict`` plus UUIDs as 16-byte blobs and datetimes as
+  integer milliseconds since the Unix epoch.
+
+Select one with ``targets.sql.storage`` in the domain (a profile name or a
+mapping such as ``{profile: strict, uuid: blob}``) or ``--storage-profile``.
+
+Connection PRAGMAs for the generated ``engine.py`` come from
+``targets.python.pragmas``, layered over :data:`DEFAULT_PRAGMAS`; a ``null``
+value drops a default.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Union
+
+UUID_STORAGE = ("text", "blob")
+DATETIME_STORAGE = ("text", "epoch")
+
+STRICT_SQLITE_TYPES = {
+    "int": "INTEGER",
+    "float": "REAL",
+    "bool": "INTEGER",
+    "string": "TEXT",
+    "text": "TEXT",
+    "uuid": "TEXT",
+    "datetime": "TEXT",
+    "timestamp": "TEXT",
+    "decimal": "REAL",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class StorageProfile:
+    """How the SQL target lays tables and values out on disk."""
+
+    name: str = "default"
+    strict: bool = False
+    without_rowid: bool = False
+    uuid: str = "text"
+    datetime: str = "text"
+
+    def sqlite_type(self, base_type: str) -> Optional[str]:
+        """Storage class for ``base_type``; ``None`` keeps the default mapping."""
+        if base_type == "uuid" and self.uuid == "blob":
+            return "BLOB"
+        if base_type in ("datetime", "timestamp") and self.datetime == "epoch":
+            return "INTEGER"
+        if self.strict:
+            return STRICT_SQLITE_TYPES.get(base_type, "TEXT")
+        return None
+
+    def sqlalchemy_type(self, base_type: str) -> Optional[str]:
+        """Column type backing ``base_type`` in the models; ``None`` keeps the default."""
+        if base_type == "uuid" and self.uuid == "blob":
+            return "column_types.UUIDBlob"
+        if base_type in ("datetime", "timestamp") and self.datetime == "epoch":
+            return "column_types.EpochMillis"
+        return None
+
+
+PROFILES = {
+    "default": StorageProfile(),
+    "strict": StorageProfile(name="strict", strict=True, without_rowid=True),
+    "compact": StorageProfile(
+        name="compact", strict=True, without_rowid=True, uuid="blob", datetime="epoch"
+    ),
+}
+
+
+DEFAULT_PRAGMAS: Dict[str, Union[int, str]] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "cache_size": -65536,  # KiB when negative: 64 MiB of page cache
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+_PRAGMA_NAME = re.compile(r"[a-z_]+")
+_PRAGMA_WORD = re.compile(r"[A-Za-z0-9_]+")
+
+
+def resolve_pragmas(setting: object) -> Dict[str, Union[int, str]]:
+    """Connection PRAGMAs for ``targets.python.pragmas`` merged over the defaults."""
+    pragmas = dict(DEFAULT_PRAGMAS)
+    if setting is None:
+        return pragmas
+    if not isinstance(setting, dict):
+        raise ValueError(f"pragmas must be a mapping, got {setting!r}")
+    for name, value in setting.items():
+        if not isinstance(name, str) or not _PRAGMA_NAME.fullmatch(name):
+            raise ValueError(f"Invalid PRAGMA name {name!r}")
+        if value is None:
+            pragmas.pop(name, None)
+        elif isinstance(value, bool):
+            pragmas[name] = "ON" if value else "OFF"
+        elif isinstance(value, int) or (
+            isinstance(value, str) and _PRAGMA_WORD.fullmatch(value)
+        ):
+            pragmas[name] = value
+        else:
+            raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+    return pragmas
+
+
+def resolve_profile(setting: object) -> StorageProfile:
+    """Turn a profile name or mapping from the domain or CLI into a profile."""
+    if setting is None:
+        return PROFILES["default"]
+    if isinstance(setting, StorageProfile):
+        return setting
+    if isinstance(setting, str):
+        if setting not in PROFILES:
+            raise ValueError(
+                f"Unknown storage profile {setting!r}; expected one of {', '.join(PROFILES)}"
+            )
+        return PROFILES[setting]
+    if isinstance(setting, dict):
+        options = dict(setting)
+        profile = resolve_profile(options.pop("profile", "default"))
+        unknown = set(options) - {"strict", "without_rowid", "uuid", "datetime"}
+        if unknown:
+            raise ValueError(f"Unknown storage options: {', '.join(sorted(unknown))}")
+        if options.get("uuid", profile.uuid) not in UUID_STORAGE:
+            raise ValueError(f"storage uuid must be one of {UUID_STORAGE}")
+        if options.get("datetime", profile.datetime) not in DATETIME_STORAGE:
+            raise ValueError(f"storage datetime must be one of {DATETIME_STORAGE}")
+        return replace(profile, name="custom", **options) if options else profile
+    raise ValueError(f"storage must be a profile name or a mapping, got {setting!r}")
+
+
+__all__ = [
+    "DEFAULT_PRAGMAS",
+    "PROFILES",
+    "StorageProfile",
+    "resolve_pragmas",
+    "resolve_profile",
+]
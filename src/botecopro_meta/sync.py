@@ -0,0 +1,170 @@
+"""Offline-first sync: change-tracking triggers and the generated sync module.
+
+With ``metadata.offline_first`` set, every entity carrying the domain
+``sync_fields`` gets a :class:`SyncDefinition`: the datetime field is the
+modification stamp, the boolean field the dirty flag and any other field
+the origin device. An entity opts out with ``sync: false``; entities
+without a stamp or a primary key are never synced.
+
+Two triggers keep the stamp and flag current. A local insert or update
+that leaves the stamp alone (or clears it) stamps the row with the current
+time; one that sets the stamp keeps it. Either way the row is flagged
+dirty. Rows applied from a peer are marked explicitly: the generated
+``apply_changes`` writes ``APPLIED`` into the dirty flag, which the
+triggers turn into a clean row, so applying a batch never queues it to be
+sent back. Writes that only change the dirty flag (acknowledgements) do not
+fire the update trigger. Entities without a dirty flag cannot be marked
+that way, and treat a write that sets the stamp as coming from a peer.
+Derived columns (see :mod:`.derived`) are recomputed on each device from
+the rows that feed them: they never travel and updating them does not
+restamp the row.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .metamodel import EntityDefinition, SyncDefinition
+
+BATCH_SIZE = 500
+# Dirty flag value of rows written by ``apply_changes``; never stored.
+APPLIED = -1
+
+# Current time in the stamp column's storage format (see ``converters``).
+NOW_TEXT = "strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'"
+NOW_EPOCH_MS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+
+def resolve_sync(
+    entity: EntityDefinition, entity_raw: Dict, metadata: Dict, *, epoch: bool = False
+) -> Optional[SyncDefinition]:
+    """Sync columns of ``entity``, or ``None`` when it does not take part."""
+    if not metadata.get("offline_first") or entity_raw.get("sync", True) is False:
+        return None
+    if not entity.primary_key:
+        return None
+    by_name = {attr.name: attr for attr in entity.attributes}
+    fields = [by_name[name] for name in metadata.get("sync_fields", []) if name in by_name]
+    stamp = next((attr.name for attr in fields if attr.base_type == "datetime"), None)
+    if stamp is None:
+        return None
+    dirty = next((attr.name for attr in fields if attr.base_type == "bool"), None)
+    origin = next((attr.name for attr in fields if attr.name not in (stamp, dirty)), None)
+    return SyncDefinition(stamp=stamp, dirty=dirty, origin=origin, epoch=epoch)
+
+
+def _row_match(entity: EntityDefinition) -> str:
+    return " AND ".join(f'"{attr.name}" = NEW."{attr.name}"' for attr in entity.primary_key)
+
+
+def sync_triggers(entity: EntityDefinition) -> List[Tuple[str, str]]:
+    """``(name, CREATE TRIGGER statement)`` pairs maintaining the stamp and dirty flag."""
+    sync = entity.sync
+    if sync is None:
+        return []
+    table = entity.table
+    stamp = f'"{sync.stamp}"'
+    now = NOW_EPOCH_MS if sync.epoch else NOW_TEXT
+    untouched = f"(NEW.{stamp} IS OLD.{stamp} OR NEW.{stamp} IS NULL)"
+    # Derived columns are recomputed locally, and the dirty flag alone
+    # changes on acknowledgements; neither makes the row a local edit.
+    bookkeeping = {column.column for column in entity.derived}
+    if sync.dirty:
+        bookkeeping.add(sync.dirty)
+    updated = "UPDATE"
+    if bookkeeping:
+        updated += " OF " + ", ".join(
+            f'"{attr.name}"' for attr in entity.attributes if attr.name not in bookkeeping
+        )
+    where = _row_match(entity)
+    if sync.dirty:
+        dirty = f'"{sync.dirty}"'
+        local_write = f"NEW.{dirty} IS NOT {APPLIED}"
+        # Setting a missing stamp fires the update trigger, which flags the
+        # row; the flag alone is outside its column list.
+        inserted = (
+            f'  UPDATE "{table}" SET {dirty} = {local_write} WHERE {where};\n'
+            f'  UPDATE "{table}" SET {stamp} = {now} WHERE {where} AND {stamp} IS NULL;'
+        )
+        changed = (
+            f'  UPDATE "{table}" SET {stamp} = CASE WHEN {untouched} THEN {now}'
+            f" ELSE NEW.{stamp} END, {dirty} = {local_write} WHERE {where};"
+        )
+        insert_when = update_when = ""
+    else:
+        inserted = changed = f'  UPDATE "{table}" SET {stamp} = {now} WHERE {where};'
+        insert_when = f"WHEN NEW.{stamp} IS NULL\n"
+        update_when = f"WHEN {untouched}\n"
+    insert, update = f"trg_{table}_sync_insert", f"trg_{table}_sync_update"
+    return [
+        (
+            insert,
+            f'CREATE TRIGGER IF NOT EXISTS {insert} AFTER INSERT ON "{table}"\n'
+            f"{insert_when}BEGIN\n{inserted}\nEND;",
+        ),
+        (
+            update,
+            f'CREATE TRIGGER IF NOT EXISTS {update} AFTER {updated} ON "{table}"\n'
+            f"{update_when}BEGIN\n{changed}\nEND;",
+        ),
+    ]
+
+
+@dataclass(frozen=True)
+class SyncSpec:
+    """Column layout and SQL of one table in the generated ``sync`` module."""
+
+    columns: Tuple[str, ...]
+    key: Tuple[int, ...]
+    select_sql: str
+    pending_filter: Optional[str]
+    since_filter: str
+    after_filter: str
+    clean_sql: Optional[str]
+    upsert_sql: str
+
+
+def sync_spec(entity: EntityDefinition) -> SyncSpec:
+    """Wire layout and SQL for syncing ``entity`` (which must have ``sync``)."""
+    sync = entity.sync
+    table = entity.table
+    # The dirty flag and derived columns are local bookkeeping; they never travel.
+    local = {sync.dirty, *(column.column for column in entity.derived)}
+    columns = tuple(attr.name for attr in entity.attributes if attr.name not in local)
+    pk = [attr.name for attr in entity.primary_key]
+    order = [sync.stamp, *pk]
+    quoted = ", ".join(f'"{name}"' for name in columns)
+    order_by = ", ".join(f'"{name}"' for name in order)
+    key_match = " AND ".join(f'"{name}" = ?' for name in pk)
+    updates = [f'"{name}" = excluded."{name}"' for name in columns if name not in pk]
+    inserted = [f'"{name}"' for name in columns]
+    values = ["?"] * len(columns)
+    if sync.dirty:
+        # Marks the write as applied from a peer; the triggers store it clean.
+        updates.append(f'"{sync.dirty}" = {APPLIED}')
+        inserted.append(f'"{sync.dirty}"')
+        values.append(str(APPLIED))
+    conflict = ", ".join(f'"{name}"' for name in pk)
+    stamp = f'"{table}"."{sync.stamp}"'
+    return SyncSpec(
+        columns=columns,
+        key=tuple(columns.index(name) for name in order),
+        select_sql=f'SELECT {quoted} FROM "{table}" WHERE {{}} ORDER BY {order_by} LIMIT ?',
+        pending_filter=f'"{sync.dirty}" = 1' if sync.dirty else None,
+        since_filter=f'"{sync.stamp}" > ?',
+        after_filter=f"({order_by}) > ({', '.join('?' * len(order))})",
+        clean_sql=(
+            f'UPDATE "{table}" SET "{sync.dirty}" = 0 WHERE {key_match} AND "{sync.stamp}" IS ?'
+            if sync.dirty
+            else None
+        ),
+        upsert_sql=(
+            f'INSERT INTO "{table}" ({", ".join(inserted)}) VALUES ({", ".join(values)})'
+            f" ON CONFLICT ({conflict})"
+            f' DO UPDATE SET {", ".join(updates)}'
+            f' WHERE excluded."{sync.stamp}" > {stamp} OR {stamp} IS NULL'
+        ),
+    )
+
+
+__all__ = ["APPLIED", "BATCH_SIZE", "SyncSpec", "resolve_sync", "sync_spec", "sync_triggers"]
@@ -0,0 +1,139 @@
+"""Column checks for the generated validators, and imports straight from a domain.
+
+``validators/<table>.py`` lists the insertable columns of an entity (all but
+derived ones, which their triggers maintain) as ``validation.Column`` entries
+picked here from the :class:`AttributeDefinition`:
+
+* enums check membership in their values, booleans accept ``true``/``1``/``yes``;
+* decimals check ``precision`` and ``scale`` (``NUMERIC(12, 2)`` by default);
+* UUIDs and datetimes are stored as text, or as blobs and epoch milliseconds
+  under the compact profile;
+* columns that are neither nullable, defaulted nor autoincremented are required.
+
+The runtime those modules import is the generated ``validation.py``.
+:func:`load_validator` runs the same generated code without writing the
+package to disk, which is how ``botecopro-meta import`` validates a file.
+"""
+from __future__ import annotations
+
+import sqlite3
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import Optional, Tuple, Union
+
+from .metamodel import AttributeDefinition, DomainDefinition, EntityDefinition
+from .seeding import insert_sql
+
+DEFAULT_PRECISION = 12
+DEFAULT_SCALE = 2
+
+
+@dataclass(frozen=True, slots=True)
+class ValidatorSpec:
+    """``Column`` expressions and the insert statement of a validator module."""
+
+    columns: Tuple[str, ...]
+    insert_sql: str
+
+
+def column_check(attr: AttributeDefinition) -> str:
+    """Expression of the ``validation`` check for values of ``attr``."""
+    if attr.enum_values:
+        return f"validation.choice({tuple(attr.enum_values)!r})"
+    if attr.sqlalchemy_type == "column_types.UUIDBlob":
+        return "validation.uuid_blob"
+    if attr.sqlalchemy_type == "column_types.EpochMillis":
+        return "validation.datetime_epoch"
+    base = attr.base_type
+    if base == "uuid":
+        return "validation.uuid_text"
+    if base in ("datetime", "timestamp"):
+        return "validation.datetime_text"
+    if base == "decimal":
+        precision = attr.precision or DEFAULT_PRECISION
+        scale = attr.scale or DEFAULT_SCALE
+        return f"validation.decimal({precision}, {scale})"
+    return {
+        "int": "validation.integer",
+        "float": "validation.number",
+        "bool": "validation.boolean",
+    }.get(base, "validation.text")
+
+
+def _column(attr: AttributeDefinition) -> str:
+    options = ""
+    if not attr.nullable and attr.default is None and not attr.autoincrement:
+        options = ", required=True"
+    elif attr.default is not None:
+        options = f", default={attr.default}"
+    return f'validation.Column("{attr.name}", {column_check(attr)}{options})'
+
+
+def validator_spec(entity: EntityDefinition) -> ValidatorSpec:
+    """Precompute the columns and statement of ``entity``'s validator module."""
+    derived = {column.column for column in entity.derived}
+    return ValidatorSpec(
+        columns=tuple(_column(attr) for attr in entity.attributes if attr.name not in derived),
+        insert_sql=insert_sql(entity),
+    )
+
+
+def _module(name: str, source: Optional[str] = None) -> ModuleType:
+    module = ModuleType(name)
+    if source is None:
+        module.__path__ = []
+    else:
+        module.__package__ = name.rpartition(".")[0]
+    sys.modules[name] = module
+    if source is not None:
+        exec(compile(source, f"<generated {name}>", "exec"), module.__dict__)
+    return module
+
+
+def load_validator(domain: DomainDefinition, entity: str) -> ModuleType:
+    """``validators/<table>.py`` of ``entity``, executed from its rendered source.
+
+    The runtime modules it imports are rendered too and registered under a
+    private package name, so nothing is written to disk.
+    """
+    from .generator import (
+        render_converters_content,
+        render_validation_content,
+        render_validator_content,
+    )
+
+    definition = domain.entity(entity)
+    package = f"_botecopro_validators_{definition.table}"
+    _module(package)
+    _module(f"{package}.converters", render_converters_content())
+    _module(f"{package}.validation", render_validation_content())
+    _module(f"{package}.validators")
+    return _module(f"{package}.validators.{definition.table}", render_validator_content(definition))
+
+
+def import_file(
+    conn: sqlite3.Connection,
+    domain: DomainDefinition,
+    entity: str,
+    path: Union[str, Path],
+    *,
+    rejects_path: Optional[Union[str, Path]] = None,
+    chunk_size: Optional[int] = None,
+    format: Optional[str] = None,
+) -> tuple:
+    """Validate ``path`` against ``entity`` and insert its valid rows through ``conn``.
+
+    Returns the ``ImportResult`` (rows read, inserted, rejected) of the
+    generated ``validation.import_file``; ``conn`` must not be inside a
+    transaction.
+    """
+    validator = load_validator(domain, entity)
+    options = {} if chunk_size is None else {"chunk_size": chunk_size}
+    return validator.validation.import_file(
+        conn, validator, path, rejects_path=rejects_path, format=format, **options
+    )
+
+
+__all__ = ["ValidatorSpec", "column_check", "import_file", "load_validator", "validator_spec"]
@@ -0,0 +1,176 @@
+"""Long-lived watch mode that regenerates only the entities an edit affects."""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .generator import (
+    DomainDefinition,
+    DomainLoader,
+    DomainSource,
+    Generator,
+    render_artifacts,
+)
+from .manifest import Manifest, fingerprint, package_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def reverse_dependencies(domain: DomainDefinition) -> Dict[str, Set[str]]:
+    """Map each entity name to the entities whose relations resolve to it."""
+    return {
+        entity.name: {ref.entity for ref in domain.referenced_by(entity.name)}
+        for entity in domain.entities
+    }
+
+
+@dataclass
+class WatchResult:
+    """Outcome of one regeneration triggered by a domain edit."""
+
+    changed: List[str] = field(default_factory=list)
+    regenerated: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    written: List[str] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+
+class Watcher:
+    """Keep the domain and compiled templates in memory and react to edits.
+
+    Each change reloads the domain, diffs the per-entity hashes against the
+    previous state and regenerates the changed entities plus every entity
+    whose relations point at them.
+    """
+
+    def __init__(
+        self,
+        domain_path: DomainSource,
+        output_dir: Path,
+        *,
+        jobs: Optional[int] = 1,
+        interval: float = 0.1,
+        storage: Optional[str] = None,
+    ):
+        self.loader = DomainLoader(domain_path, cache=False, storage=storage)
+        self.storage = storage
+        self.output_dir = output_dir
+        self.jobs = jobs
+        self.interval = interval
+        self.generator = Generator(Path(__file__).parent / "templates")
+        self.domain: Optional[DomainDefinition] = None
+        self.manifest = Manifest()
+        self._stamp: Tuple = ()
+
+    def _source_stamp(self) -> Tuple:
+        stamp = []
+        for path in self.loader.sources():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            stamp.append((str(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp)
+
+    def _new_manifest(self, domain: DomainDefinition) -> Manifest:
+        return Manifest(
+            domain=self.loader.source_hash(),
+            generator=fingerprint(package_fingerprint(), self.generator.templated),
+            options=fingerprint({"storage": self.storage}),
+            templates=self.generator.template_hashes(),
+            entities={entity.name: fingerprint(entity) for entity in domain.entities},
+        )
+
+    def start(self) -> WatchResult:
+        """Load the domain and bring the output directory up to date."""
+        started = time.perf_counter()
+        self._stamp = self._source_stamp()
+        domain = self.loader.load()
+        manifest = self._new_manifest(domain)
+        previous = Manifest.load(self.output_dir)
+        written = render_artifacts(
+            domain, self.output_dir, self.generator, manifest, previous, jobs=self.jobs
+        )
+        manifest.save(self.output_dir)
+        self.domain, self.manifest = domain, manifest
+        return WatchResult(
+            regenerated=[entity.name for entity in domain.entities],
+            written=written,
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    def poll(self) -> Optional[WatchResult]:
+        """Regenerate if a source changed since the last call; ``None`` otherwise."""
+        stamp = self._source_stamp()
+        if stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        started = time.perf_counter()
+        domain = self.loader.load()
+        manifest = self._new_manifest(domain)
+
+        previous_hashes = self.manifest.entities
+        changed = sorted(
+            name for name, digest in manifest.entities.items() if previous_hashes.get(name) != digest
+        )
+        removed = sorted(previous_hashes.keys() - manifest.entities.keys())
+
+        reverse = reverse_dependencies(domain)
+        if self.domain is not None:
+            for name, dependents in reverse_dependencies(self.domain).items():
+                reverse.setdefault(name, set()).update(
+                    dependent for dependent in dependents if dependent in manifest.entities
+                )
+        affected: Set[str] = set(changed)
+        for name in changed + removed:
+            affected.update(reverse.get(name, ()))
+
+        written = render_artifacts(
+            domain,
+            self.output_dir,
+            self.generator,
+            manifest,
+            self.manifest,
+            jobs=self.jobs,
+            entities=affected,
+        )
+        manifest.save(self.output_dir)
+        self.domain, self.manifest = domain, manifest
+        return WatchResult(
+            changed=changed,
+            regenerated=sorted(affected),
+            removed=removed,
+            written=written,
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    def run(self) -> None:
+        """Poll forever, logging each regeneration; stop with Ctrl+C."""
+        result = self.start()
+        logger.info(
+            "generated %d entities in %.1f ms", len(result.regenerated), result.elapsed_ms
+        )
+        try:
+            while True:
+                time.sleep(self.interval)
+                try:
+                    result = self.poll()
+                except Exception as exc:  # keep watching through half-saved edits
+                    logger.error("regeneration failed: %s", exc)
+                    continue
+                if result is not None:
+                    logger.info(
+                        "%d changed, %d regenerated, %d files written in %.1f ms",
+                        len(result.changed) + len(result.removed),
+                        len(result.regenerated),
+                        len(result.written),
+                        result.elapsed_ms,
+                    )
+        except KeyboardInterrupt:
+            pass
+
+
+__all__ = ["WatchResult", "Watcher", "reverse_dependencies"]
@@ -1,8 +1,67 @@
+import importlib.util
 import sys
 from pathlib import Path
 
+import pytest
+import yaml
+
 DIST_PACKAGES = Path("/usr/lib/python3/dist-packages")
 if DIST_PACKAGES.exists():
     sys.path.insert(0, str(DIST_PACKAGES))
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+TESTS_DIR = Path(__file__).resolve().parent
+DOMAIN_PATH = TESTS_DIR.parent / "db-meta" / "tables" / "001_domain.yaml"
+EDGE_PATH = TESTS_DIR / "fixtures" / "edge_domain.yaml"
+CYCLIC_PATH = TESTS_DIR / "fixtures" / "cyclic_domain.yaml"
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _isolated_cache_dir(tmp_path_factory: pytest.TempPathFactory):
+    """Keep template and domain caches out of the developer's home directory."""
+    mp = pytest.MonkeyPatch()
+    mp.setenv("BOTECOPRO_META_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+    yield
+    mp.undo()
+
+
+@pytest.fixture
+def import_generated():
+    """Import a generated ``python`` output directory as a throwaway package."""
+    pytest.importorskip("sqlalchemy")
+    imported = []
+
+    def _import(python_dir: Path, name: str = "generated_models"):
+        spec = importlib.util.spec_from_file_location(
+            name, python_dir / "__init__.py", submodule_search_locations=[str(python_dir)]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        imported.append(name)
+        spec.loader.exec_module(module)
+        return module
+
+    yield _import
+    for name in imported:
+        for module_name in [m for m in sys.modules if m == name or m.startswith(name + ".")]:
+            del sys.modules[module_name]
+
+
+@pytest.fixture
+def edited_domain(tmp_path: Path):
+    """Write an edited copy of a domain file to ``tmp_path/<name>.yaml``.
+
+    ``edit`` receives the domain mapping (the document's single top-level
+    value) and changes it in place; without it the copy is unchanged.
+    """
+
+    def _edit(edit=None, *, source: Path = DOMAIN_PATH, name: str = "domain") -> Path:
+        data = yaml.safe_load(source.read_text())
+        if edit is not None:
+            edit(next(iter(data.values())))
+        path = tmp_path / f"{name}.yaml"
+        path.write_text(yaml.safe_dump(data, sort_keys=False))
+        return path
+
+    return _edit
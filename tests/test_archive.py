@@ -0,0 +1,201 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+import importlib
+import sqlite3
+import uuid
+
+import pytest
+
+from botecopro_meta.archive import load_archive
+from botecopro_meta.cli import main
+from botecopro_meta.generator import (
+    DomainLoader,
+    deferred_columns,
+    generate,
+    render_schema_content,
+)
+
+from conftest import DOMAIN_PATH
+NOW = datetime(2024, 6, 1, 12, 0)
+SYNCED = ("comanda", "order", "order_item")
+
+
+def _database(domain, path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.executescript(
+        render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+    )
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("INSERT INTO product (id, name) VALUES (1, 'Chopp')")
+    conn.execute("INSERT INTO item (id, name, item_type) VALUES (1, 'Chopp', 'drink')")
+    return conn
+
+
+def _comanda(conn, status: str, closed_days_ago, *, compact: bool = False):
+    """A comanda with one order, item, payment, kitchen ticket and stock movement."""
+    key = uuid.uuid4()
+    closed_at = None
+    if closed_days_ago is not None:
+        moment = NOW - timedelta(days=closed_days_ago)
+        closed_at = int((moment - datetime(1970, 1, 1)).total_seconds() * 1000) if compact else (
+            moment.strftime("%Y-%m-%d %H:%M:%S.%f")
+        )
+    key = key.bytes if compact else str(key)
+    conn.execute(
+        "INSERT INTO comanda (id, status, closed_at) VALUES (?, ?, ?)", (key, status, closed_at)
+    )
+    order = conn.execute(
+        "INSERT INTO \"order\" (comanda_id, origin, status) VALUES (?, 'table', 'delivered')",
+        (key,),
+    ).lastrowid
+    item = conn.execute(
+        "INSERT INTO order_item (order_id, item_id, quantity, unit_price_cents)"
+        " VALUES (?, 1, 2, 900)",
+        (order,),
+    ).lastrowid
+    conn.execute(
+        "INSERT INTO payment (comanda_id, method, amount_cents) VALUES (?, 'pix', 1800)", (key,)
+    )
+    ticket = conn.execute(
+        "INSERT INTO kitchen_ticket (order_id, status) VALUES (?, 'delivered')", (order,)
+    ).lastrowid
+    conn.execute(
+        "INSERT INTO kitchen_ticket_item (ticket_id, order_item_id) VALUES (?, ?)", (ticket, item)
+    )
+    conn.execute(
+        "INSERT INTO stock_movement (product_id, quantity, movement_type, related_order_item)"
+        " VALUES (1, 2, 'out', ?)",
+        (item,),
+    )
+    return key, item
+
+
+def _synced(conn) -> None:
+    for table in SYNCED:
+        conn.execute(f'UPDATE "{table}" SET dirty = 0 WHERE dirty = 1')
+
+
+def _count(conn, table: str, schema: str = "main") -> int:
+    return conn.execute(f'SELECT COUNT(*) FROM {schema}."{table}"').fetchone()[0]
+
+
+def test_archive_moves_whole_graphs(tmp_path: Path, import_generated) -> None:
+    generate(DOMAIN_PATH, tmp_path / "out", incremental=False)
+    models = import_generated(tmp_path / "out" / "python")
+    archive = importlib.import_module(f"{models.__name__}.archive")
+    assert archive.JOBS["Comanda"].days == 90
+
+    conn = _database(DomainLoader(DOMAIN_PATH).load(), tmp_path / "hot.db")
+    closed, closed_item = _comanda(conn, "closed", 200)
+    cancelled, _ = _comanda(conn, "cancelled", 120)
+    unsynced, _ = _comanda(conn, "closed", 150)
+    recent, _ = _comanda(conn, "closed", 10)
+    still_open, _ = _comanda(conn, "open", None)
+    _synced(conn)
+    conn.execute(
+        'UPDATE order_item SET notes = \'sem gelo\' WHERE order_id IN'
+        ' (SELECT id FROM "order" WHERE comanda_id = ?)',
+        (unsynced,),
+    )
+    stock = conn.execute("SELECT stock_current FROM product").fetchone()
+    archive.attach(conn, tmp_path / "cold.db")
+
+    moved = archive.archive(conn, now=NOW, batch_size=1)
+    assert moved == {
+        "comanda": 2,
+        "order": 2,
+        "order_item": 2,
+        "invoice": 0,
+        "payment": 2,
+        "payment_split": 0,
+        "kitchen_ticket": 2,
+        "kitchen_ticket_item": 2,
+    }
+    hot = {row[0] for row in conn.execute("SELECT id FROM comanda")}
+    assert hot == {unsynced, recent, still_open}
+    assert {row[0] for row in conn.execute("SELECT id FROM archive.comanda")} == {
+        closed,
+        cancelled,
+    }
+    assert _count(conn, "order_item") == 3 and _count(conn, "order_item", "archive") == 2
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    # Stock history stays hot, detached from the archived order items.
+    assert _count(conn, "stock_movement") == 5
+    assert conn.execute(
+        "SELECT related_order_item FROM stock_movement WHERE id = 1"
+    ).fetchone() == (None,)
+    assert conn.execute("SELECT stock_current FROM product").fetchone() == stock
+    assert closed_item not in {row[0] for row in conn.execute("SELECT id FROM order_item")}
+    # The union views report over both.
+    assert _count(conn, "comanda_all", "temp") == 5
+    assert conn.execute(
+        "SELECT SUM(amount_cents) FROM payment_all WHERE comanda_id = ?", (closed,)
+    ).fetchone() == (1800,)
+
+    # The unsynced graph is skipped, not retried forever.
+    assert not any(archive.archive(conn, now=NOW).values())
+    _synced(conn)
+    assert archive.archive(conn, now=NOW)["comanda"] == 1
+    assert archive.archive(conn, now=NOW + timedelta(days=100))["comanda"] == 1
+    assert hot - {row[0] for row in conn.execute("SELECT id FROM comanda")} == {
+        unsynced,
+        recent,
+    }
+
+
+def test_archive_overwrites_copies_left_by_an_interrupted_run(tmp_path: Path) -> None:
+    domain = DomainLoader(DOMAIN_PATH, storage="compact").load()
+    archive = load_archive(domain)
+    assert archive.JOBS["Comanda"].epoch
+    conn = _database(domain, tmp_path / "hot.db")
+    key, _ = _comanda(conn, "closed", 100, compact=True)
+    _synced(conn)
+    archive.attach(conn, tmp_path / "cold.db")
+    conn.execute(
+        "INSERT INTO archive.comanda (id, status, notes) VALUES (?, 'open', 'stale')", (key,)
+    )
+
+    assert archive.archive(conn, now=NOW)["comanda"] == 1
+    assert conn.execute("SELECT status, notes FROM archive.comanda").fetchall() == [
+        ("closed", None)
+    ]
+    assert _count(conn, "comanda") == 0
+    # Epoch cutoffs measure from the same UTC instant as text ones.
+    job = archive.JOBS["Comanda"]
+    assert archive.cutoff(job, NOW) == 1709467200000
+
+
+@pytest.mark.parametrize(
+    "retention, message",
+    [
+        ({"Comanda": {"where": "status = 'closed'"}}, "StockMovement feeds product.stock_current"),
+        ({"Order": {"where": "1", "detach": ["KitchenTicket"]}}, "must be nullable"),
+        ({"Comanda": {"age": "status", "days": 30}}, "must be a datetime column"),
+        ({"Comanda": {"age": "closed_at"}}, "age and days go together"),
+        ({"DomainEvent": {"where": "1"}}, "append-only"),
+        ({"Comanda": {"where": "1", "detach": ["Supplier"]}}, "does not reference"),
+        ({"Tab": {"where": "1"}}, "unknown entity 'Tab'"),
+    ],
+)
+def test_unsafe_retention_rules_are_rejected(edited_domain, retention, message) -> None:
+    with pytest.raises(ValueError, match=message):
+        DomainLoader(edited_domain(lambda domain: domain.update(retention=retention))).load()
+
+
+def test_archive_command(tmp_path: Path, capsys) -> None:
+    domain = DomainLoader(DOMAIN_PATH).load()
+    conn = _database(domain, tmp_path / "hot.db")
+    _comanda(conn, "closed", 400)
+    _synced(conn)
+    conn.close()
+    arguments = ["--input", str(DOMAIN_PATH), "--database", str(tmp_path / "hot.db")]
+
+    main(["archive", *arguments, "--archive", str(tmp_path / "cold.db")])
+    report = capsys.readouterr().out
+    assert "comanda                            1" in report
+    assert "6 row(s) archived" in report
+    conn = sqlite3.connect(tmp_path / "cold.db")
+    assert _count(conn, "kitchen_ticket_item") == 1
+
+    with pytest.raises(SystemExit, match="no retention rule for 'Order'"):
+        main(["archive", *arguments, "--archive", str(tmp_path / "cold.db"), "--entity", "Order"])
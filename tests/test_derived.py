@@ -0,0 +1,165 @@
+from pathlib import Path
+import importlib
+import sqlite3
+
+import pytest
+
+from botecopro_meta.generator import DomainLoader, generate
+
+from conftest import DOMAIN_PATH
+
+
+def _database(tmp_path: Path, domain_path: Path = DOMAIN_PATH, import_generated=None):
+    output_dir = tmp_path / "generated"
+    generate(domain_path, output_dir)
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.executescript((output_dir / "sql" / "schema.sql").read_text())
+    if import_generated is None:
+        return conn
+    models = import_generated(output_dir / "python")
+    return conn, importlib.import_module(f"{models.__name__}.derived")
+
+
+def _order(conn: sqlite3.Connection, comanda: str, status: str = "open") -> int:
+    return conn.execute(
+        'INSERT INTO "order" ("comanda_id", "origin", "status") VALUES (?, \'table\', ?)',
+        (comanda, status),
+    ).lastrowid
+
+
+def _item(conn: sqlite3.Connection, order_id: int, quantity: int, price: int) -> int:
+    return conn.execute(
+        'INSERT INTO "order_item" ("order_id", "item_id", "quantity", "unit_price_cents")'
+        " VALUES (?, 1, ?, ?)",
+        (order_id, quantity, price),
+    ).lastrowid
+
+
+def _value(conn: sqlite3.Connection, table: str, column: str, key) -> object:
+    return conn.execute(f'SELECT "{column}" FROM "{table}" WHERE "id" = ?', (key,)).fetchone()[0]
+
+
+def test_derived_columns_are_resolved_and_checked(edited_domain) -> None:
+    domain = DomainLoader(DOMAIN_PATH).load()
+    (stock,) = domain.entity("Product").derived
+    assert (stock.function, stock.source_table, stock.via, stock.key) == (
+        "sum",
+        "stock_movement",
+        "product_id",
+        "id",
+    )
+    assert domain.entity("StockMovement").feeds == (stock,)
+    assert [d.column for d in domain.entity("Order").feeds] == ["subtotal_cents"]
+
+    def order_total(**changes):
+        return lambda d: d["entities"]["Order"]["attributes"]["total_cents"]["derived"].update(
+            changes
+        )
+
+    for edit, message in (
+        (order_total(count=True), "one of"),
+        (order_total(**{"from": "Tab"}), "Tab"),
+        (order_total(via="item_id"), "set via"),
+        (
+            lambda d: d["entities"]["Order"]["attributes"]["comanda_id"].update(
+                derived={"count": True, "from": "OrderItem"}
+            ),
+            "key columns",
+        ),
+    ):
+        with pytest.raises(ValueError, match=message):
+            DomainLoader(edited_domain(edit), cache=False).load()
+
+
+def test_triggers_keep_chained_totals(tmp_path: Path) -> None:
+    conn = _database(tmp_path)
+    conn.executemany(
+        'INSERT INTO "comanda" ("id", "status") VALUES (?, \'open\')', [("c1",), ("c2",)]
+    )
+    first, second = _order(conn, "c1"), _order(conn, "c1")
+    line = _item(conn, first, 2, 450)
+    _item(conn, first, 1, 1200)
+    _item(conn, second, 3, 100)
+    assert _value(conn, "order", "total_cents", first) == 2100
+    assert _value(conn, "comanda", "subtotal_cents", "c1") == 2400
+
+    conn.execute('UPDATE "order_item" SET "quantity" = 4 WHERE "id" = ?', (line,))
+    conn.execute('UPDATE "order_item" SET "total_cents" = 1000 WHERE "order_id" = ?', (second,))
+    assert _value(conn, "comanda", "subtotal_cents", "c1") == 4000
+
+    conn.execute('UPDATE "order" SET "status" = \'cancelled\' WHERE "id" = ?', (second,))
+    assert _value(conn, "comanda", "subtotal_cents", "c1") == 3000
+    conn.execute('UPDATE "order" SET "comanda_id" = \'c2\' WHERE "id" = ?', (first,))
+    assert _value(conn, "comanda", "subtotal_cents", "c1") == 0
+    assert _value(conn, "comanda", "subtotal_cents", "c2") == 3000
+    conn.execute('DELETE FROM "order_item" WHERE "id" = ?', (line,))
+    assert _value(conn, "order", "total_cents", first) == 1200
+    assert _value(conn, "comanda", "subtotal_cents", "c2") == 1200
+
+    conn.execute('INSERT INTO "product" ("name") VALUES (\'Lime\')')
+    movement = (
+        'INSERT INTO "stock_movement" ("product_id", "quantity", "movement_type") VALUES (1, ?, ?)'
+    )
+    conn.executemany(movement, [(10, "in"), (2.5, "out"), (-1, "adjustment")])
+    assert _value(conn, "product", "stock_current", 1) == 6.5
+
+    # Trigger-maintained updates are not local edits: the sync stamp stays put.
+    conn.execute('UPDATE "product" SET "last_modified" = \'2024-01-01 00:00:00.000000\'')
+    conn.execute(movement, (1, "in"))
+    assert _value(conn, "product", "last_modified", 1) == "2024-01-01 00:00:00.000000"
+
+
+def test_count_and_latest(tmp_path: Path, edited_domain) -> None:
+    def add_columns(domain: dict) -> None:
+        attributes = domain["entities"]["Comanda"]["attributes"]
+        attributes["order_count"] = {"type": "int", "derived": {"count": True, "from": "Order"}}
+        attributes["last_status"] = {
+            "type": "string",
+            "nullable": True,
+            "derived": {"latest": "status", "from": "Order", "where": "status <> 'cancelled'"},
+        }
+
+    conn = _database(tmp_path, edited_domain(add_columns))
+    conn.execute('INSERT INTO "comanda" ("id", "status") VALUES (\'c1\', \'open\')')
+    first = _order(conn, "c1", "delivered")
+    second = _order(conn, "c1", "preparing")
+    assert conn.execute('SELECT "order_count", "last_status" FROM "comanda"').fetchone() == (
+        2,
+        "preparing",
+    )
+    conn.execute('UPDATE "order" SET "status" = \'cancelled\' WHERE "id" = ?', (second,))
+    assert _value(conn, "comanda", "last_status", "c1") == "delivered"
+    conn.execute('DELETE FROM "order" WHERE "id" = ?', (first,))
+    assert conn.execute('SELECT "order_count", "last_status" FROM "comanda"').fetchone() == (
+        1,
+        None,
+    )
+
+
+def test_verify_and_rebuild(tmp_path: Path, import_generated) -> None:
+    conn, derived = _database(tmp_path, import_generated=import_generated)
+    assert list(derived.COLUMNS) == [
+        "order.total_cents",
+        "comanda.subtotal_cents",
+        "product.stock_current",
+    ]
+    conn.execute('INSERT INTO "comanda" ("id", "status") VALUES (\'c1\', \'open\')')
+    order = _order(conn, "c1")
+    _item(conn, order, 2, 300)
+    assert set(derived.verify(conn).values()) == {0}
+
+    # Rows loaded with the triggers out of the way leave the totals behind.
+    conn.execute('DROP TRIGGER "trg_order_total_cents_insert"')
+    _item(conn, order, 1, 50)
+    conn.execute('UPDATE "comanda" SET "subtotal_cents" = 1')
+    assert derived.verify(conn) == {
+        **dict.fromkeys(derived.COLUMNS, 0),
+        "order.total_cents": 1,
+        "comanda.subtotal_cents": 1,
+    }
+    assert derived.rebuild(conn)["order.total_cents"] == 1
+    assert _value(conn, "order", "total_cents", order) == 650
+    assert _value(conn, "comanda", "subtotal_cents", "c1") == 650
+    assert set(derived.verify(conn).values()) == {0}
+    with pytest.raises(KeyError, match="order.notes"):
+        derived.verify(conn, ["order.notes"])
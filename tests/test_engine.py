@@ -0,0 +1,110 @@
+from pathlib import Path
+import importlib
+import sqlite3
+import threading
+
+import pytest
+
+from botecopro_meta.generator import DomainLoader, generate
+from botecopro_meta.storage import DEFAULT_PRAGMAS, resolve_pragmas
+
+from conftest import DOMAIN_PATH
+
+
+def _engine_module(tmp_path: Path, import_generated, domain_path: Path = DOMAIN_PATH):
+    output_dir = tmp_path / "generated"
+    generate(domain_path, output_dir)
+    models = import_generated(output_dir / "python")
+    database = tmp_path / "boteco.db"
+    conn = sqlite3.connect(database)
+    conn.executescript((output_dir / "sql" / "schema.sql").read_text())
+    conn.close()
+    return importlib.import_module(f"{models.__name__}.engine"), database
+
+
+def test_pragmas_come_from_python_target(edited_domain) -> None:
+    def configure(domain: dict) -> None:
+        domain["targets"]["python"]["pragmas"] = {
+            "cache_size": -2000,
+            "mmap_size": None,
+            "recursive_triggers": True,
+        }
+
+    domain_path = edited_domain(configure)
+
+    pragmas = DomainLoader(domain_path).load().pragmas
+
+    assert pragmas["cache_size"] == -2000
+    assert pragmas["recursive_triggers"] == "ON"
+    assert "mmap_size" not in pragmas
+    assert pragmas["journal_mode"] == DEFAULT_PRAGMAS["journal_mode"]
+
+
+@pytest.mark.parametrize(
+    "setting",
+    [["WAL"], {"journal_mode; DROP TABLE x": "WAL"}, {"journal_mode": "WAL; --"}, {"x": 1.5}],
+)
+def test_resolve_pragmas_rejects_invalid_settings(setting) -> None:
+    with pytest.raises(ValueError):
+        resolve_pragmas(setting)
+
+
+def test_engine_applies_pragmas_to_every_connection(tmp_path: Path, import_generated) -> None:
+    from sqlalchemy import text
+
+    engine_module, database = _engine_module(tmp_path, import_generated)
+    engine = engine_module.create_engine(database)
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert connection.execute(text("PRAGMA temp_store")).scalar() == 2
+    engine.dispose()
+
+    Session = engine_module.session_factory(engine)
+    with Session() as session:
+        assert session.execute(text("PRAGMA cache_size")).scalar() == -65536
+
+
+def test_pool_serializes_writers_and_shares_readers(tmp_path: Path, import_generated) -> None:
+    engine_module, database = _engine_module(tmp_path, import_generated)
+
+    with engine_module.ConnectionPool(database, readers=2) as pool:
+
+        def terminal(number: int) -> None:
+            for n in range(25):
+                with pool.writer() as conn:
+                    conn.execute(
+                        'INSERT INTO "category" ("name") VALUES (?)', (f"t{number}-{n}",)
+                    )
+                with pool.reader() as conn:
+                    conn.execute('SELECT COUNT(*) FROM "category"').fetchone()
+
+        threads = [threading.Thread(target=terminal, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with pool.reader() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM "category"').fetchone() == (100,)
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute('DELETE FROM "category"')
+        assert len(pool._opened) <= 2
+
+
+def test_transaction_rolls_back_on_error(tmp_path: Path, import_generated) -> None:
+    engine_module, database = _engine_module(tmp_path, import_generated)
+    conn = engine_module.connect(database)
+
+    with pytest.raises(RuntimeError):
+        with engine_module.transaction(conn):
+            conn.execute('INSERT INTO "category" ("name") VALUES (?)', ("lost",))
+            raise RuntimeError("terminal went offline")
+    with engine_module.transaction(conn):
+        conn.execute('INSERT INTO "category" ("name") VALUES (?)', ("kept",))
+
+    assert conn.execute('SELECT "name" FROM "category"').fetchall() == [("kept",)]
+    assert conn.execute("PRAGMA foreign_keys").fetchone() == (1,)
+    conn.close()
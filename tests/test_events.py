@@ -0,0 +1,137 @@
+from pathlib import Path
+from uuid import uuid4
+import importlib
+import sqlite3
+
+import pytest
+
+from botecopro_meta.generator import DomainLoader, generate
+
+from conftest import DOMAIN_PATH
+
+
+def _events_module(tmp_path: Path, import_generated, storage=None):
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir, storage=storage)
+    models = import_generated(output_dir / "python")
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.executescript((output_dir / "sql" / "schema.sql").read_text())
+    return importlib.import_module(f"{models.__name__}.events"), conn
+
+
+def test_events_are_resolved_with_the_event_store(edited_domain) -> None:
+    domain = DomainLoader(DOMAIN_PATH).load()
+    events = {event.name: event for event in domain.events}
+    assert list(events) == [
+        "OrderOpened",
+        "ItemAdded",
+        "ItemStatusChanged",
+        "OrderClosed",
+        "PaymentReceived",
+        "StockConsumed",
+    ]
+    assert events["ItemAdded"].aggregate_key == "order_id"
+    assert events["ItemStatusChanged"].aggregate_key == "order_item_id"
+    assert events["StockConsumed"].aggregate_key is None
+    assert [attr.python_type for attr in events["OrderOpened"].payload] == [
+        "int",
+        "UUID",
+        "int",
+        "int",
+    ]
+    store = domain.entity("DomainEvent")
+    assert store.table == "domain_event" and store.append_only
+    assert domain.entity("ProjectionCheckpoint").primary_key[0].name == "projection"
+
+    def without_store(domain: dict) -> None:
+        domain["metadata"]["event_store"] = False
+
+    domain_path = edited_domain(without_store)
+    names = {entity.name for entity in DomainLoader(domain_path, cache=False).load().entities}
+    assert "DomainEvent" not in names
+
+    def unknown_aggregate(domain: dict) -> None:
+        domain["events"]["OrderClosed"]["aggregate"] = "Tab"
+
+    with pytest.raises(ValueError, match="Tab"):
+        DomainLoader(edited_domain(unknown_aggregate), cache=False).load()
+
+
+@pytest.mark.parametrize("storage", [None, "compact"])
+def test_appended_events_read_back_in_order(tmp_path: Path, import_generated, storage) -> None:
+    events, conn = _events_module(tmp_path, import_generated, storage)
+    comanda = uuid4()
+    statements = []
+    conn.set_trace_callback(statements.append)
+
+    last = events.append_events(
+        conn,
+        [events.OrderOpened(1, comanda, 4, 2)]
+        + [events.ItemAdded(n, 1 + n % 2, 7, 1) for n in range(1, 6)]
+        + [events.ItemStatusChanged(3, "new", "cooking")],
+        batch_size=3,
+    )
+    conn.set_trace_callback(None)
+    assert last == 7
+    assert statements.count("BEGIN IMMEDIATE") == statements.count("COMMIT") == 3
+
+    batches = list(events.read_events(conn, batch_size=4))
+    assert [len(batch) for batch in batches] == [4, 3]
+    stored = [item for batch in batches for item in batch]
+    assert [item.sequence for item in stored] == list(range(1, 8))
+    assert stored[0].event == events.OrderOpened(1, comanda, 4, 2)
+    assert stored[-1].event.from_ == "new" and stored[-1].aggregate_id == "3"
+    assert len({item.event_id for item in stored}) == 7
+
+    first_order = events.read_events(conn, aggregate_id="1", types=[events.ItemAdded])
+    assert [item.event.order_item_id for batch in first_order for item in batch] == [2, 4]
+
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        conn.execute('UPDATE "domain_event" SET "event_type" = \'OrderClosed\'')
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        conn.execute('DELETE FROM "domain_event"')
+
+
+def test_replay_resumes_from_the_checkpoint(tmp_path: Path, import_generated) -> None:
+    events, conn = _events_module(tmp_path, import_generated)
+    conn.execute("CREATE TABLE order_size (order_id INTEGER PRIMARY KEY, items INTEGER)")
+
+    class OrderSizes(events.Projection):
+        name = "order_sizes"
+
+        def __init__(self):
+            self.seen = 0
+
+        def on_ItemAdded(self, conn, stored):
+            conn.execute(
+                "INSERT INTO order_size VALUES (?, ?) ON CONFLICT (order_id)"
+                " DO UPDATE SET items = items + excluded.items",
+                (stored.event.order_id, stored.event.quantity),
+            )
+            self.seen += 1
+
+        def reset(self, conn):
+            conn.execute("DELETE FROM order_size")
+            self.seen = 0
+
+        def snapshot(self):
+            return {"seen": self.seen}
+
+        def restore(self, state):
+            self.seen = state["seen"]
+
+    events.append_events(conn, [events.ItemAdded(n, n % 3, 7, 2) for n in range(10)])
+    events.append_events(conn, [events.OrderClosed(1, 900)])
+    assert events.replay(conn, OrderSizes(), batch_size=4) == 10
+    assert events.checkpoint(conn, "order_sizes") == (10, {"seen": 10})
+
+    events.append_events(conn, [events.ItemAdded(10, 0, 7, 5), events.OrderClosed(0, 100)])
+    resumed = OrderSizes()
+    assert events.replay(conn, resumed) == 1
+    assert resumed.seen == 11
+    assert conn.execute("SELECT items FROM order_size WHERE order_id = 0").fetchone() == (13,)
+
+    rebuilt = OrderSizes()
+    assert events.replay(conn, rebuilt, rebuild=True) == 11
+    assert conn.execute("SELECT SUM(items) FROM order_size").fetchone() == (25,)
+    assert events.checkpoint(conn, "order_sizes") == (12, {"seen": 11})
@@ -2,15 +2,18 @@ from pathlib import Path
 import py_compile
 import sqlite3
 
+import pytest
+
 from botecopro_meta.generator import generate
 from botecopro_meta.generator import DomainLoader
 
+from conftest import CYCLIC_PATH, DOMAIN_PATH, EDGE_PATH, TESTS_DIR
+
 
 def test_generate_outputs(tmp_path: Path) -> None:
-    domain_path = Path(__file__).resolve().parent.parent / "db-meta" / "tables" / "001_domain.yaml"
     output_dir = tmp_path / "generated"
 
-    generate(domain_path, output_dir)
+    generate(DOMAIN_PATH, output_dir)
 
     python_dir = output_dir / "python"
     sql_dir = output_dir / "sql"
@@ -28,8 +31,7 @@ def test_generate_outputs(tmp_path: Path) -> None:
     # SQLite DDL can be applied
     conn = sqlite3.connect(":memory:")
     conn.execute("PRAGMA foreign_keys=ON;")
-    for sql_file in sorted(sql_dir.glob("*.sql")):
-        conn.executescript(sql_file.read_text())
+    conn.executescript((sql_dir / "schema.sql").read_text())
 
     tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table';")}
     assert "category" in tables
@@ -46,13 +48,10 @@ def test_generate_outputs(tmp_path: Path) -> None:
 
 
 def test_custom_datetime_base_type_mapping() -> None:
-    domain_path = Path(__file__).resolve().parent.parent / "db-meta" / "tables" / "001_domain.yaml"
-
-    loader = DomainLoader(domain_path)
+    loader = DomainLoader(DOMAIN_PATH)
     domain = loader.load()
 
-    product = next(entity for entity in domain.entities if entity.name == "Product")
-    last_modified = next(attr for attr in product.attributes if attr.name == "last_modified")
+    last_modified = domain.attribute("Product", "last_modified")
 
     assert last_modified.base_type == "datetime"
     assert last_modified.python_type == "datetime"
@@ -61,17 +60,147 @@ def test_custom_datetime_base_type_mapping() -> None:
 
 
 def test_domain_methods_are_loaded_and_rendered(tmp_path: Path) -> None:
-    domain_path = Path(__file__).resolve().parent.parent / "db-meta" / "tables" / "001_domain.yaml"
-
-    loader = DomainLoader(domain_path)
+    loader = DomainLoader(DOMAIN_PATH)
     domain = loader.load()
 
-    product = next(entity for entity in domain.entities if entity.name == "Product")
-    assert "calculate_stock_value" in product.methods
+    assert "calculate_stock_value" in domain.entity("Product").methods
 
     output_dir = tmp_path / "generated"
-    generate(domain_path, output_dir)
+    generate(DOMAIN_PATH, output_dir)
 
     product_model = (output_dir / "python" / "product.py").read_text()
     assert "def calculate_stock_value(self)" in product_model
     assert "raise NotImplementedError" in product_model
+
+
+def test_parallel_generation_matches_serial(tmp_path: Path) -> None:
+    serial_dir = tmp_path / "serial"
+    parallel_dir = tmp_path / "parallel"
+    generate(DOMAIN_PATH, serial_dir)
+    generate(DOMAIN_PATH, parallel_dir, jobs=2)
+
+    serial_files = sorted(p.relative_to(serial_dir) for p in serial_dir.rglob("*.*"))
+    parallel_files = sorted(p.relative_to(parallel_dir) for p in parallel_dir.rglob("*.*"))
+    assert serial_files == parallel_files
+    for relative in serial_files:
+        if relative.name.startswith("."):
+            continue
+        assert (serial_dir / relative).read_bytes() == (parallel_dir / relative).read_bytes()
+
+
+def test_fallback_renderers_match_templates() -> None:
+    from botecopro_meta.archive import retained_entities
+    from botecopro_meta.generator import (
+        Generator,
+        deferred_columns,
+        render_archive_content,
+        render_archive_sql_content,
+        render_base_content,
+        render_column_types_content,
+        render_converters_content,
+        render_derived_content,
+        render_engine_content,
+        render_enums_content,
+        render_events_content,
+        render_init_content,
+        render_instrumentation_content,
+        render_python_model_content,
+        render_repositories_init_content,
+        render_repository_content,
+        render_schema_content,
+        render_schema_module_content,
+        render_search_content,
+        render_sql_content,
+        render_sync_content,
+        render_testing_content,
+        render_validation_content,
+        render_validator_content,
+        render_validators_init_content,
+    )
+
+    pytest.importorskip("jinja2")
+    generator = Generator(TESTS_DIR.parent / "src" / "botecopro_meta" / "templates")
+
+    assert generator.render_converters() == render_converters_content()
+    assert generator.render_column_types() == render_column_types_content()
+    assert generator.render_validation() == render_validation_content()
+    assert generator.render_testing() == render_testing_content()
+    for domain_path, storage in (
+        (DOMAIN_PATH, None),
+        (DOMAIN_PATH, "compact"),
+        (
+            [
+                DOMAIN_PATH,
+                TESTS_DIR.parent / "db-meta" / "relations.yaml",
+            ],
+            None,
+        ),
+        (EDGE_PATH, None),
+        (EDGE_PATH, "strict"),
+        (CYCLIC_PATH, None),
+    ):
+        domain = DomainLoader(domain_path, storage=storage).load()
+        assert generator.render_base() == render_base_content()
+        assert generator.render_engine(domain.pragmas) == render_engine_content(domain.pragmas)
+        assert generator.render_enums(domain.enums) == render_enums_content(domain.enums)
+        for lazy in (False, True):
+            assert generator.render_init(domain.entities, lazy) == render_init_content(
+                domain.entities, lazy
+            )
+        assert generator.render_repositories(domain.entities) == render_repositories_init_content(
+            domain.entities
+        )
+        assert generator.render_validators(domain.entities) == render_validators_init_content(
+            domain.entities
+        )
+        assert generator.render_instrumentation(
+            domain.entities
+        ) == render_instrumentation_content(domain.entities)
+        deferred = deferred_columns(domain)
+        schema_args = (domain.name, domain.fk_order(), deferred)
+        assert generator.render_schema(*schema_args) == render_schema_content(*schema_args)
+        assert generator.render_schema_module(*schema_args) == render_schema_module_content(
+            *schema_args
+        )
+        synced = [entity for entity in domain.fk_order() if entity.sync]
+        assert generator.render_sync(synced) == render_sync_content(synced)
+        involved = [entity for entity in domain.fk_order() if entity.derived or entity.feeds]
+        assert generator.render_derived(involved) == render_derived_content(involved)
+        searchable = [entity for entity in domain.fk_order() if entity.search]
+        assert generator.render_search(searchable) == render_search_content(searchable)
+        if domain.retention:
+            archive_args = (domain.name, domain.retention, retained_entities(domain))
+            assert generator.render_archive_sql(*archive_args) == render_archive_sql_content(
+                *archive_args
+            )
+            assert generator.render_archive(*archive_args) == render_archive_content(
+                *archive_args
+            )
+        if domain.events:
+            events_args = (
+                domain.events,
+                domain.entity("DomainEvent"),
+                domain.entity("ProjectionCheckpoint"),
+            )
+            assert generator.render_events(*events_args) == render_events_content(*events_args)
+        for entity in domain.entities:
+            assert generator.render_python(entity, domain.enums) == render_python_model_content(entity)
+            entity_deferred = deferred.get(entity.name, ())
+            assert generator.render_sql(entity, entity_deferred) == render_sql_content(
+                entity, entity_deferred
+            )
+            assert generator.render_repository(entity) == render_repository_content(entity)
+            assert generator.render_validator(entity) == render_validator_content(entity)
+
+
+def test_templates_are_cached_as_bytecode(tmp_path: Path, monkeypatch) -> None:
+    from botecopro_meta import generator as generator_module
+
+    monkeypatch.setenv("BOTECOPRO_META_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(generator_module, "_ENVIRONMENTS", {})
+    pytest.importorskip("jinja2")
+
+    generate(DOMAIN_PATH, tmp_path / "generated")
+
+    cached = list((tmp_path / "cache" / "templates").glob("__jinja2_*.cache"))
+    assert len(cached) == len(generator_module.Generator.TEMPLATES)
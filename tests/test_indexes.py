@@ -0,0 +1,59 @@
+from pathlib import Path
+import sqlite3
+
+from botecopro_meta.generator import DomainLoader, generate
+
+from conftest import DOMAIN_PATH, EDGE_PATH
+
+
+def _indexes(domain, entity):
+    return {idx.name: (idx.columns, idx.where, idx.origin) for idx in domain.entity(entity).indexes}
+
+
+def test_foreign_keys_and_sync_fields_are_indexed() -> None:
+    domain = DomainLoader(DOMAIN_PATH, cache=False).load()
+
+    assert _indexes(domain, "OrderItem") == {
+        "idx_order_item_order_id": (("order_id",), None, "foreign_key"),
+        "idx_order_item_item_id": (("item_id",), None, "foreign_key"),
+        "idx_order_item_last_modified": (("last_modified", "id"), None, "sync"),
+        "idx_order_item_dirty": (("last_modified", "id"), '"dirty" = 1', "sync"),
+    }
+    # item_id leads the composite primary key, so only product_id needs an index.
+    assert _indexes(domain, "ItemProduct") == {
+        "idx_item_product_product_id": (("product_id",), None, "foreign_key"),
+    }
+    assert "idx_stock_movement_product_id" in _indexes(domain, "StockMovement")
+    assert "idx_payment_comanda_id" in _indexes(domain, "Payment")
+
+
+def test_declared_indexes_win_and_rules_are_per_entity() -> None:
+    domain = DomainLoader(EDGE_PATH, cache=False).load()
+
+    shelf = _indexes(domain, "Shelf")
+    assert list(shelf)[:2] == ["idx_shelf_1", "idx_shelf_2"]
+    assert shelf["idx_shelf_stale"] == (("updated_at", "id"), '"stale" = 1', "sync")
+
+    # shelf_id leads the primary key, moved_from leads a declared index and
+    # the sync rule is switched off for Bin.
+    assert _indexes(domain, "Bin") == {"idx_bin_1": (("moved_from", "slot"), None, "declared")}
+
+
+def test_sync_sweep_uses_partial_index(tmp_path: Path, import_generated) -> None:
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir)
+
+    conn = sqlite3.connect(":memory:")
+    conn.executescript((output_dir / "sql" / "schema.sql").read_text())
+    plan = conn.execute(
+        'EXPLAIN QUERY PLAN SELECT id FROM "order_item" WHERE "dirty" = 1 '
+        'ORDER BY "last_modified", "id"'
+    ).fetchall()
+    assert "idx_order_item_dirty" in plan[0][3]
+
+    models = import_generated(output_dir / "python")
+    table = models.Base.metadata.tables["order_item"]
+    assert {index.name for index in table.indexes} >= {
+        "idx_order_item_order_id",
+        "idx_order_item_dirty",
+    }
@@ -0,0 +1,105 @@
+from pathlib import Path
+import importlib
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from botecopro_meta.generator import DomainLoader, generate
+
+from conftest import DOMAIN_PATH, EDGE_PATH
+
+
+@pytest.fixture
+def instrumented(tmp_path: Path, import_generated):
+    output_dir = tmp_path / "out"
+    generate(DOMAIN_PATH, output_dir, incremental=False)
+    models = import_generated(output_dir / "python", "instrumented_models")
+    database = tmp_path / "boteco.db"
+    sqlite3.connect(database).executescript((output_dir / "sql" / "schema.sql").read_text())
+    engine_module = importlib.import_module(f"{models.__name__}.engine")
+    instrumentation = importlib.import_module(f"{models.__name__}.instrumentation")
+    engine = engine_module.create_engine(database)
+    stats = instrumentation.instrument(engine)
+    yield models, engine_module.session_factory(engine), stats, database, instrumentation
+    stats.detach()
+    engine.dispose()
+
+
+def test_statements_are_aggregated_per_entity_and_kind(instrumented) -> None:
+    from sqlalchemy import select, update
+
+    models, Session, stats, _, _ = instrumented
+    with Session() as session:
+        session.add_all(models.Category(name=f"c{n}") for n in range(5))
+        session.commit()
+        session.execute(
+            update(models.Category).values(name=models.Category.name + "!"),
+            execution_options={"synchronize_session": False},
+        )
+        session.commit()
+    with Session() as session:
+        categories = session.scalars(select(models.Category)).all()
+        assert session.get(models.Category, 1) in categories  # from the identity map
+
+    snapshot = stats.snapshot()
+    category = snapshot["Category"]
+    assert category["insert"]["count"] == category["insert"]["rows"] == 5
+    assert category["update"] == {**category["update"], "count": 1, "rows": 5}
+    assert category["select"]["count"] == 1 and category["select"]["rows"] == 5
+    assert 0 < category["select"]["p95_ms"] and category["select"]["total_ms"] > 0
+    assert set(category) == {"insert", "update", "select"}
+
+    document = json.loads(stats.dump(reset=True))
+    assert document["entities"]["Category"]["update"]["rows"] == 5
+    assert stats.snapshot() == {}
+
+
+def test_lock_wait_is_measured_apart_from_latency(instrumented) -> None:
+    models, Session, stats, database, _ = instrumented
+    with Session() as session:
+        session.get(models.Category, 1)  # open the pooled connection first
+    holder = sqlite3.connect(database, isolation_level=None, check_same_thread=False)
+    holder.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.2, holder.execute, ("COMMIT",))
+    started = time.perf_counter()
+    release.start()
+    with Session() as session:
+        session.add(models.Category(name="late"))
+        session.commit()
+    release.join()
+    holder.close()
+
+    insert = stats.snapshot()["Category"]["insert"]
+    assert insert["lock_wait_ms"] >= 150
+    assert insert["total_ms"] < 150 <= (time.perf_counter() - started) * 1000
+
+
+def test_histogram_buckets_bound_latencies_within_a_quarter(instrumented) -> None:
+    *_, instrumentation = instrumented
+    for micros in list(range(1, 5000)) + [10**6, 10**9]:
+        bucket = instrumentation._bucket(micros)
+        upper = instrumentation._upper(bucket)
+        assert micros < upper <= max(micros + 1, micros * 1.25)
+    assert instrumentation._bucket(10**15) == instrumentation.BUCKETS - 1
+
+    stats = instrumentation.Stats()
+    for micros in [100] * 95 + [20000] * 5:
+        stats.histogram[instrumentation._bucket(micros)] += 1
+        stats.count += 1
+    assert stats.percentile(0.95) == pytest.approx(112e-6)
+    assert stats.percentile(0.99) == pytest.approx(20480e-6)
+
+
+def test_instrumentation_is_optional(tmp_path: Path, edited_domain) -> None:
+    generate(EDGE_PATH, tmp_path / "out", incremental=False)
+    assert not (tmp_path / "out" / "python" / "instrumentation.py").exists()
+
+    domain = edited_domain(
+        lambda domain: domain.update(targets={"python": {"instrumentation": "on"}}),
+        source=EDGE_PATH,
+    )
+    with pytest.raises(ValueError, match="instrumentation must be true or false"):
+        DomainLoader(domain, cache=False).load()
@@ -0,0 +1,72 @@
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+from botecopro_meta.generator import DomainLoader, generate
+
+from conftest import EDGE_PATH, TESTS_DIR
+SRC_DIR = TESTS_DIR.parent / "src"
+
+
+def _loaded(name: str) -> set:
+    return {module.rpartition(".")[2] for module in sys.modules if module.startswith(name + ".")}
+
+
+def test_lazy_package_imports_models_on_first_access(
+    tmp_path: Path, import_generated, edited_domain
+) -> None:
+    domain_path = edited_domain(
+        lambda domain: domain["targets"]["python"].update(lazy_imports=True)
+    )
+    generate(domain_path, tmp_path / "out", incremental=False)
+    models = import_generated(tmp_path / "out" / "python", "lazy_models")
+    assert _loaded("lazy_models") == set()
+    assert {"Base", "Comanda", "load_models", "MODELS"} <= set(dir(models))
+
+    # A model brings along the models its foreign keys point at, transitively.
+    assert models.Payment.__tablename__ == "payment"
+    assert _loaded("lazy_models") >= {"payment", "comanda", "dining_table", "base"}
+    assert "order_item" not in _loaded("lazy_models")
+    assert "payment" in models.Base.metadata.tables
+    assert "Payment" in vars(models)
+
+    base = models.load_models()
+    assert set(base.metadata.tables) == set(models.MODELS.values())
+    assert models.enums.__name__ == "lazy_models.enums"
+    with pytest.raises(AttributeError, match="has no attribute 'Bogus'"):
+        models.Bogus
+
+
+def test_eager_package_is_the_default(tmp_path: Path, import_generated) -> None:
+    generate(EDGE_PATH, tmp_path / "out", incremental=False)
+    source = (tmp_path / "out" / "python" / "__init__.py").read_text()
+    assert "__getattr__" not in source
+    models = import_generated(tmp_path / "out" / "python", "eager_models")
+    assert {"shelf", "bin"} <= _loaded("eager_models")
+    assert set(models.Base.metadata.tables) == {"shelf", "bin"}
+
+
+def test_lazy_imports_must_be_a_boolean(edited_domain) -> None:
+    domain = edited_domain(
+        lambda domain: domain.update(targets={"python": {"lazy_imports": "yes"}}),
+        source=EDGE_PATH,
+    )
+    with pytest.raises(ValueError, match="lazy_imports must be true or false"):
+        DomainLoader(domain, cache=False).load()
+
+
+def test_generator_import_defers_yaml_and_jinja() -> None:
+    probe = (
+        "import sys, botecopro_meta.generator;"
+        "print(sorted({'yaml', 'jinja2', 'concurrent.futures'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={"PYTHONPATH": str(SRC_DIR)},
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+import yaml
+
+from botecopro_meta import generator as generator_module
+from botecopro_meta.generator import DomainLoader
+
+from conftest import DOMAIN_PATH
+
+
+def test_loaded_domain_is_served_from_cache(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("BOTECOPRO_META_CACHE_DIR", str(tmp_path / "cache"))
+    domain = DomainLoader(DOMAIN_PATH).load()
+    assert list((tmp_path / "cache" / "domains").glob("*.pickle"))
+
+    def fail(content: bytes) -> dict:
+        raise AssertionError("domain was parsed again")
+
+    monkeypatch.setattr(generator_module, "_parse_yaml", fail)
+    assert DomainLoader(DOMAIN_PATH).load() == domain
+
+    with pytest.raises(AssertionError):
+        DomainLoader(DOMAIN_PATH, cache=False).load()
+
+
+def test_directory_of_fragments_matches_single_file(tmp_path: Path) -> None:
+    data = yaml.safe_load(DOMAIN_PATH.read_text())["botecopro_domain"]
+    tables = tmp_path / "tables"
+    tables.mkdir()
+    (tables / "000_domain.yaml").write_text(
+        yaml.safe_dump(
+            {"botecopro_domain": {"types": data["types"], "metadata": data["metadata"]}}
+        )
+    )
+    (tables / "999_events.yaml").write_text(
+        yaml.safe_dump({"events": data["events"]}, sort_keys=False)
+    )
+    for index, (name, details) in enumerate(data["entities"].items(), start=1):
+        (tables / f"{index:03d}_{name}.yaml").write_text(
+            yaml.safe_dump({"entities": {name: details}}, sort_keys=False)
+        )
+    enums_path = tmp_path / "enums.yaml"
+    enums_path.write_text(yaml.safe_dump(data["enums"], sort_keys=False))
+
+    merged = DomainLoader([enums_path, tables], cache=False).load()
+    single = DomainLoader(DOMAIN_PATH, cache=False).load()
+
+    assert merged.name == "botecopro_domain"
+    assert merged.enums == single.enums
+    assert merged.entities == single.entities
+    assert merged.events == single.events
+
+
+def test_conflicting_fragments_are_rejected(tmp_path: Path) -> None:
+    (tmp_path / "a.yaml").write_text("enums:\n  Level: [low, high]\n")
+    (tmp_path / "b.yaml").write_text("Level: [low]\n")
+
+    with pytest.raises(ValueError, match="Level"):
+        DomainLoader(tmp_path, cache=False).load()
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+from botecopro_meta.generator import generate
+from botecopro_meta.manifest import MANIFEST_NAME, Manifest
+
+from conftest import DOMAIN_PATH
+
+
+def _mtimes(output_dir: Path) -> dict:
+    return {
+        str(path.relative_to(output_dir)): path.stat().st_mtime_ns
+        for path in output_dir.rglob("*")
+        if path.is_file() and path.name != MANIFEST_NAME
+    }
+
+
+def test_noop_regeneration_keeps_outputs_untouched(tmp_path: Path) -> None:
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir)
+
+    manifest = Manifest.load(output_dir)
+    assert "python/order_item.py" in manifest.outputs
+    assert "OrderItem" in manifest.entities
+
+    before = _mtimes(output_dir)
+    generate(DOMAIN_PATH, output_dir)
+    assert _mtimes(output_dir) == before
+
+
+def test_only_affected_outputs_are_rewritten(tmp_path: Path, edited_domain) -> None:
+    domain_path = edited_domain()
+    output_dir = tmp_path / "generated"
+    generate(domain_path, output_dir)
+    before = _mtimes(output_dir)
+
+    def rename_order_table(domain: dict) -> None:
+        domain["entities"]["Order"]["storage"]["table"] = "orders"
+
+    edited_domain(rename_order_table)
+    generate(domain_path, output_dir)
+    after = _mtimes(output_dir)
+
+    changed = {name for name in after if before.get(name) != after[name]}
+    # Order itself, the entities resolving a relation to it, the package inits,
+    # the instrumentation table map, the schema bundle, and the sync, derived and
+    # archive modules.
+    # Repositories and validators do not mention relation targets, so theirs are
+    # rendered but unchanged.
+    assert changed == {
+        "python/orders.py",
+        "python/repositories/orders.py",
+        "python/validators/orders.py",
+        "sql/orders.sql",
+        "python/order_item.py",
+        "sql/order_item.sql",
+        "python/kitchen_ticket.py",
+        "sql/kitchen_ticket.sql",
+        "python/__init__.py",
+        "python/repositories/__init__.py",
+        "python/validators/__init__.py",
+        "python/instrumentation.py",
+        "python/schema.py",
+        "python/sync.py",
+        "python/derived.py",
+        "python/archive.py",
+        "sql/archive.sql",
+        "sql/schema.sql",
+    }
+    assert not (output_dir / "python" / "order.py").exists()
+    assert not (output_dir / "python" / "repositories" / "order.py").exists()
+    assert not (output_dir / "sql" / "order.sql").exists()
+
+
+def test_missing_output_is_regenerated(tmp_path: Path) -> None:
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir)
+
+    (output_dir / "sql" / "payment.sql").unlink()
+    generate(DOMAIN_PATH, output_dir)
+
+    assert (output_dir / "sql" / "payment.sql").exists()
@@ -0,0 +1,77 @@
+from pathlib import Path
+import dataclasses
+import pickle
+
+import pytest
+
+from botecopro_meta.generator import DomainLoader
+from botecopro_meta.metamodel import Reference
+
+from conftest import DOMAIN_PATH
+
+
+@pytest.fixture(scope="module")
+def domain():
+    return DomainLoader(DOMAIN_PATH, cache=False).load()
+
+
+def test_lookups_by_name_table_and_attribute(domain) -> None:
+    assert domain.entity("OrderItem").table == "order_item"
+    assert domain.entity_for_table("order").name == "Order"
+    assert domain.attribute("Order", "status").enum == "OrderStatus"
+    assert [attr.name for attr in domain.primary_key("ItemProduct")] == ["item_id", "product_id"]
+
+    with pytest.raises(KeyError):
+        domain.entity("Missing")
+
+
+def test_reverse_relation_index(domain) -> None:
+    assert set(domain.referenced_by("Order", "id")) == {
+        Reference("OrderItem", "order_id", "Order", "id"),
+        Reference("KitchenTicket", "order_id", "Order", "id"),
+    }
+    assert domain.referenced_by("Invoice") == ()
+    assert [ref.target for ref in domain.references("StockMovement")] == ["Product", "OrderItem"]
+
+
+def test_fk_order_puts_targets_first(domain) -> None:
+    order = [entity.name for entity in domain.fk_order()]
+    position = {name: index for index, name in enumerate(order)}
+
+    assert sorted(order) == sorted(entity.name for entity in domain.entities)
+    for entity in domain.entities:
+        for ref in domain.references(entity.name):
+            assert position[ref.target] < position[entity.name]
+    assert domain.deferred_references() == ()
+
+
+def test_fk_order_breaks_cycles_with_deferred_references(tmp_path: Path) -> None:
+    domain_path = tmp_path / "cycle.yaml"
+    domain_path.write_text(
+        """
+entities:
+  A:
+    attributes:
+      id: {type: int, primary_key: true}
+      b_id: {type: relation, target: B, nullable: true}
+  B:
+    attributes:
+      id: {type: int, primary_key: true}
+      a_id: {type: relation, target: A, nullable: true}
+      parent_id: {type: relation, target: B, nullable: true}
+"""
+    )
+    domain = DomainLoader(domain_path, cache=False).load()
+
+    assert [entity.name for entity in domain.fk_order()] == ["A", "B"]
+    assert domain.deferred_references() == (Reference("A", "b_id", "B", "id"),)
+
+
+def test_definitions_are_frozen_and_picklable(domain) -> None:
+    attr = domain.attribute("Product", "name")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        attr.nullable = True
+    assert not hasattr(attr, "__dict__")
+
+    domain.entity("Product")  # build the index before pickling
+    assert pickle.loads(pickle.dumps(domain)) == domain
@@ -0,0 +1,136 @@
+from pathlib import Path
+import sqlite3
+
+import pytest
+
+from botecopro_meta.cli import main
+from botecopro_meta.ddl import create_triggers
+from botecopro_meta.generator import DomainLoader, deferred_columns, render_schema_content
+from botecopro_meta.migrate import domain_schema, plan_migration, read_schema
+
+from conftest import DOMAIN_PATH
+
+
+def _load(path: Path):
+    return DomainLoader(path, cache=False).load()
+
+
+def _device(path: Path) -> sqlite3.Connection:
+    domain = _load(DOMAIN_PATH)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(
+        render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+    )
+    with conn:
+        conn.execute('INSERT INTO "category" ("name") VALUES (\'Drinks\')')
+        conn.execute(
+            'INSERT INTO "comanda" ("id", "status", "total_cents") VALUES (\'c-1\', \'open\', 1500)'
+        )
+        conn.execute(
+            'INSERT INTO "order" ("comanda_id", "origin", "status")'
+            " VALUES ('c-1', 'table', 'open')"
+        )
+    return conn
+
+
+def test_new_nullable_column_is_added_in_place(tmp_path: Path, edited_domain) -> None:
+    def add_slug(domain):
+        domain["entities"]["Category"]["attributes"]["slug"] = {"type": "string", "nullable": True}
+
+    conn = _device(tmp_path / "device.db")
+    migration = plan_migration(read_schema(conn), _load(edited_domain(add_slug)))
+
+    assert [change.action for change in migration.tables] == ["alter"]
+    assert migration.tables[0].statements == ['ALTER TABLE "category" ADD COLUMN "slug" TEXT;']
+    assert not migration.rebuilds and not migration.drop_indexes and not migration.create_indexes
+
+    migration.apply(conn)
+    assert conn.execute('SELECT "name", "slug" FROM "category"').fetchall() == [("Drinks", None)]
+
+
+def test_enum_change_rebuilds_table_and_keeps_rows(tmp_path: Path, edited_domain) -> None:
+    def add_status(domain):
+        domain["enums"]["ComandaStatus"].append("disputed")
+
+    conn = _device(tmp_path / "device.db")
+    target = _load(edited_domain(add_status))
+    migration = plan_migration(read_schema(conn), target)
+
+    assert [(change.table, change.action) for change in migration.tables] == [
+        ("comanda", "rebuild")
+    ]
+    assert "comanda" in migration.script() and "PRAGMA foreign_keys = OFF;" in migration.script()
+    migration.apply(conn)
+
+    assert conn.execute('SELECT "id", "total_cents" FROM "comanda"').fetchall() == [("c-1", 1500)]
+    conn.execute('UPDATE "comanda" SET "status" = \'disputed\'')
+    assert conn.execute("PRAGMA foreign_keys").fetchone() == (1,)
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    assert not plan_migration(read_schema(conn), target)
+
+
+def test_index_changes_do_not_touch_tables(edited_domain) -> None:
+    def index_name(domain):
+        domain["entities"]["Product"]["indexes"] = [{"columns": ["name"]}]
+        domain["entities"]["OrderItem"]["auto_indexes"] = {"sync": False}
+
+    old = _load(DOMAIN_PATH)
+    migration = plan_migration(domain_schema(old), _load(edited_domain(index_name)))
+
+    assert migration.tables == []
+    assert migration.drop_indexes == [
+        'DROP INDEX IF EXISTS "idx_order_item_last_modified";',
+        'DROP INDEX IF EXISTS "idx_order_item_dirty";',
+    ]
+    assert migration.create_indexes == [
+        'CREATE INDEX IF NOT EXISTS idx_product_1 ON "product" ("name");'
+    ]
+
+
+def test_trigger_changes_are_planned_by_name(tmp_path: Path, edited_domain) -> None:
+    def stop_syncing(domain):
+        domain["entities"]["Product"]["sync"] = False
+
+    old = _load(DOMAIN_PATH)
+    names = {name for entity in old.fk_order() for name, _ in create_triggers(entity)}
+    conn = _device(tmp_path / "device.db")
+    assert names == {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    }
+
+    new = _load(edited_domain(stop_syncing))
+    migration = plan_migration(read_schema(conn), new)
+    assert migration.drop_triggers == [
+        'DROP TRIGGER IF EXISTS "trg_product_sync_insert";',
+        'DROP TRIGGER IF EXISTS "trg_product_sync_update";',
+    ]
+    assert not migration.create_triggers
+    product = dict(create_triggers(old.entity("Product")))
+    assert plan_migration(domain_schema(new), old).create_triggers == [
+        product["trg_product_sync_insert"],
+        product["trg_product_sync_update"],
+    ]
+
+
+def test_required_column_without_default_is_refused(edited_domain) -> None:
+    def add_code(domain):
+        domain["entities"]["Comanda"]["attributes"]["code"] = {"type": "string", "required": True}
+
+    with pytest.raises(ValueError, match="comanda.code"):
+        plan_migration(domain_schema(_load(DOMAIN_PATH)), _load(edited_domain(add_code)))
+
+
+def test_cli_diffs_domains_and_migrates_databases(tmp_path: Path, edited_domain, capsys) -> None:
+    def drop_notes(domain):
+        del domain["entities"]["Comanda"]["attributes"]["notes"]
+
+    new = edited_domain(drop_notes)
+    main(["migrate", "--from", str(DOMAIN_PATH), "--to", str(new)])
+    assert 'ALTER TABLE "comanda" DROP COLUMN "notes";' in capsys.readouterr().out
+
+    database = tmp_path / "device.db"
+    _device(database).close()
+    main(["migrate", "--database", str(database), "--to", str(new), "--apply"])
+    main(["migrate", "--database", str(database), "--to", str(new)])
+    assert capsys.readouterr().out == "-- Schema is up to date\n"
@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+
+from botecopro_meta.cli import main
+from botecopro_meta.generator import DomainLoader
+from botecopro_meta.plans import check_plans, explain, table_scans
+
+from conftest import DOMAIN_PATH
+
+
+@pytest.mark.parametrize("storage", [None, "compact"])
+def test_generated_schema_answers_the_workload_from_indexes(storage) -> None:
+    domain = DomainLoader(DOMAIN_PATH, storage=storage).load()
+    results = check_plans(domain, rows=200, repeat=1)
+    assert [(r.query.entity, r.query.name) for r in results if r.failed] == []
+
+    by_name = {(r.query.entity, r.query.kind, r.query.name): r for r in results}
+    assert by_name[("Order", "pk", "pk")].rows == 1
+    assert by_name[("OrderItem", "join", "order_id")].rows >= 1
+    assert "idx_order_item_order_id" in " ".join(by_name[("OrderItem", "join", "order_id")].plan)
+    assert "dirty" in " ".join(by_name[("Product", "sync", "sweep")].plan)
+    assert by_name[("Comanda", "enum", "status")].scans
+    assert not by_name[("Comanda", "enum", "status")].failed
+    queue = by_name[("KitchenTicket", "declared", "queue")]
+    assert queue.plan == ("SEARCH kitchen_ticket USING INDEX idx_kitchen_ticket_queue (status=?)",)
+
+
+def test_declared_queries_that_scan_fail(edited_domain, capsys) -> None:
+    def declare(domain: dict) -> None:
+        domain["entities"]["Payment"]["queries"] = {
+            "by_method": 'SELECT * FROM "payment" WHERE "method" = :method',
+            "report": {"sql": 'SELECT SUM("amount_cents") FROM "payment"', "scan": True},
+        }
+
+    domain_path = edited_domain(declare)
+    results = check_plans(DomainLoader(domain_path, cache=False).load(), rows=50, repeat=1)
+    failed = [result for result in results if result.failed]
+    assert [result.query.name for result in failed] == ["by_method"]
+    assert failed[0].scans == ("SCAN payment",)
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(["plans", "--input", str(domain_path), "--rows", "50", "--entity", "Payment"])
+    assert exit_info.value.code == 1
+    report = capsys.readouterr().out
+    assert "Payment.by_method" in report and "FAIL" in report and "    SCAN payment" in report
+
+    def unbound(domain: dict) -> None:
+        domain["entities"]["Payment"]["queries"] = {
+            "x": 'SELECT * FROM "payment" WHERE "id" = :ident'
+        }
+
+    with pytest.raises(ValueError, match=":ident"):
+        check_plans(DomainLoader(edited_domain(unbound), cache=False).load(), rows=5)
+
+
+def test_table_scans_ignore_index_steps() -> None:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (a INTEGER PRIMARY KEY, b TEXT)")
+    conn.execute("CREATE INDEX t_b ON t (b)")
+    assert table_scans(explain(conn, "SELECT * FROM t WHERE a = ?", (1,))) == ()
+    assert table_scans(explain(conn, "SELECT b FROM t ORDER BY b")) == ()
+    assert table_scans(explain(conn, "SELECT * FROM t WHERE b LIKE '%x'")) == ("SCAN t",)
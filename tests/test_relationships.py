@@ -0,0 +1,170 @@
+from pathlib import Path
+import importlib
+import sqlite3
+import uuid
+
+import pytest
+import yaml
+
+from botecopro_meta.generator import DomainLoader, generate
+
+from conftest import DOMAIN_PATH, EDGE_PATH, TESTS_DIR
+RELATIONS_PATH = TESTS_DIR.parent / "db-meta" / "relations.yaml"
+
+
+def _fill(database: Path, orders: int) -> str:
+    """One comanda with ``orders`` orders of two items, each sent to the kitchen."""
+    conn = sqlite3.connect(database, isolation_level=None)
+    conn.execute("BEGIN")
+    conn.execute("INSERT INTO item (id, name, item_type) VALUES (1, 'Chopp', 'drink')")
+    conn.execute("INSERT INTO item (id, name, item_type) VALUES (2, 'Pastel', 'dish')")
+    key = str(uuid.uuid4())
+    conn.execute("INSERT INTO comanda (id, status) VALUES (?, 'open')", (key,))
+    payment = conn.execute(
+        "INSERT INTO payment (comanda_id, method, amount_cents) VALUES (?, 'pix', 1800)", (key,)
+    ).lastrowid
+    conn.execute(
+        "INSERT INTO payment_split (payment_id, amount_cents) VALUES (?, 900)", (payment,)
+    )
+    for _ in range(orders):
+        order = conn.execute(
+            "INSERT INTO \"order\" (comanda_id, origin, status) VALUES (?, 'table', 'open')",
+            (key,),
+        ).lastrowid
+        ticket = conn.execute(
+            "INSERT INTO kitchen_ticket (order_id, status) VALUES (?, 'new')", (order,)
+        ).lastrowid
+        for item in (1, 2):
+            order_item = conn.execute(
+                "INSERT INTO order_item (order_id, item_id, quantity, unit_price_cents)"
+                " VALUES (?, ?, 1, 900)",
+                (order, item),
+            ).lastrowid
+            conn.execute(
+                "INSERT INTO kitchen_ticket_item (ticket_id, order_item_id) VALUES (?, ?)",
+                (ticket, order_item),
+            )
+    conn.execute("COMMIT")
+    conn.close()
+    return key
+
+
+@pytest.fixture
+def screen(tmp_path: Path, import_generated):
+    """Generate ``sources`` and return the statements the order screen costs."""
+
+    def _screen(sources, orders: int, *, names=("items", "items", "splits")) -> int:
+        output_dir = tmp_path / f"out-{orders}-{len(sources)}"
+        generate(sources, output_dir, incremental=False)
+        models = import_generated(output_dir / "python", f"screen_{orders}_{len(sources)}")
+        engine_module = importlib.import_module(f"{models.__name__}.engine")
+        testing = importlib.import_module(f"{models.__name__}.testing")
+        database = output_dir / "boteco.db"
+        sqlite3.connect(database).executescript((output_dir / "sql" / "schema.sql").read_text())
+        key = _fill(database, orders)
+
+        engine = engine_module.create_engine(database)
+        order_items, ticket_items, splits = names
+        with engine_module.session_factory(engine)() as session:
+            session.get(models.Item, 1)  # configure the mappers outside the count
+            session.expunge_all()
+            with testing.count_statements(session) as log:
+                comanda = session.get(models.Comanda, key)
+                lines = [
+                    (line.item.name, line.quantity)
+                    for order in comanda.orders
+                    for line in getattr(order, order_items)
+                ]
+                sent = [
+                    line.order_item_id
+                    for order in comanda.orders
+                    for ticket in order.kitchen_tickets
+                    for line in getattr(ticket, ticket_items)
+                ]
+                paid = [
+                    split.amount_cents
+                    for payment in comanda.payments
+                    for split in getattr(payment, splits)
+                ]
+        engine.dispose()
+        assert len(lines) == len(sent) == 2 * orders and paid == [900]
+        return len(log)
+
+    return _screen
+
+
+def test_order_screen_costs_the_same_statements_for_any_number_of_orders(screen) -> None:
+    sources = [DOMAIN_PATH, RELATIONS_PATH]
+    # comanda, then one selectin each for orders, items (joined to their menu
+    # item), kitchen tickets, ticket items, payments and splits.
+    assert screen(sources, 2) == screen(sources, 8) == 7
+
+
+def test_default_lazy_loading_issues_a_statement_per_row(screen) -> None:
+    names = ("order_items", "kitchen_ticket_items", "payment_splits")
+    assert screen([DOMAIN_PATH], 8, names=names) > screen([DOMAIN_PATH], 2, names=names)
+
+
+def test_generated_relationships(tmp_path: Path, import_generated) -> None:
+    from sqlalchemy import inspect
+
+    generate([DOMAIN_PATH, RELATIONS_PATH], tmp_path / "out", incremental=False)
+    models = import_generated(tmp_path / "out" / "python", "related_models")
+    mapper = inspect(models.Order)
+    assert mapper.relationships["items"].lazy == "selectin"
+    assert mapper.relationships["comanda"].lazy == "select"
+    assert inspect(models.Product).relationships["stock_movements"].lazy == "write_only"
+    assert inspect(models.OrderItem).relationships["item"].lazy == "joined"
+    # The only way to walk a ``raise`` collection is an explicit loader option.
+    assert inspect(models.OrderItem).relationships["kitchen_ticket_items"].lazy == "raise"
+
+
+def test_lazy_package_resolves_relationships_on_configure(
+    tmp_path: Path, import_generated, edited_domain
+) -> None:
+    from sqlalchemy.orm import configure_mappers
+
+    domain_path = edited_domain(
+        lambda domain: domain["targets"]["python"].update(lazy_imports=True)
+    )
+    generate([domain_path, RELATIONS_PATH], tmp_path / "out", incremental=False)
+    models = import_generated(tmp_path / "out" / "python", "lazy_related")
+    models.Payment
+    assert "order_item" not in models.Base.metadata.tables
+    # Configuring the mappers imports the models the relationships name.
+    configure_mappers()
+    assert "order_item" in models.Base.metadata.tables
+    assert models.Payment.comanda.property.mapper.class_ is models.Comanda
+
+
+def test_ambiguous_relations_name_their_foreign_keys(tmp_path: Path, import_generated) -> None:
+    from sqlalchemy import inspect
+
+    generate(EDGE_PATH, tmp_path / "out", incremental=False)
+    models = import_generated(tmp_path / "out" / "python", "edge_related")
+    relationships = inspect(models.Shelf).relationships
+    assert set(relationships.keys()) == {"shelf_bins", "moved_from_shelf_bins"}
+    pairs = relationships["moved_from_shelf_bins"].local_remote_pairs
+    assert [(local.name, remote.name) for local, remote in pairs] == [("id", "moved_from")]
+
+
+def _with_relations(tmp_path: Path, relations) -> Path:
+    path = tmp_path / "relations.yaml"
+    path.write_text(yaml.safe_dump({"relations": relations}))
+    return path
+
+
+@pytest.mark.parametrize(
+    "relations, message",
+    [
+        ({"Order.comanda_id": {"lazy": "eager"}}, "must be one of select, selectin"),
+        ({"Order.comanda_id": {"lazy": "write_only"}}, "must be one of"),
+        ({"Order.comanda_id": {"back": "items"}}, "unknown option 'back'"),
+        ({"Order.status": {"lazy": "joined"}}, "'Order.status' is not a relation attribute"),
+        ({"OrderItem.order_id": {"name": "quantity"}}, "OrderItem.quantity is already taken"),
+        ({"Invoice.comanda_id": {"back_populates": "orders"}}, "Comanda.orders is already taken"),
+    ],
+)
+def test_invalid_relations_are_rejected(tmp_path: Path, relations, message) -> None:
+    with pytest.raises(ValueError, match=message):
+        DomainLoader([DOMAIN_PATH, _with_relations(tmp_path, relations)], cache=False).load()
@@ -0,0 +1,157 @@
+from datetime import datetime
+from decimal import Decimal
+import importlib
+from pathlib import Path
+import sqlite3
+import uuid
+
+import pytest
+
+from botecopro_meta.generator import generate
+
+from conftest import DOMAIN_PATH, EDGE_PATH
+
+
+def _database(output_dir: Path, path: str = ":memory:") -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript((output_dir / "sql" / "schema.sql").read_text())
+    return conn
+
+
+def _repositories(models):
+    return importlib.import_module(f"{models.__name__}.repositories")
+
+
+def test_order_items_round_trip(tmp_path: Path, import_generated) -> None:
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir)
+    models = import_generated(output_dir / "python")
+    repo = _repositories(models).order_item
+    conn = _database(output_dir)
+
+    rows = [
+        {"order_id": 1, "item_id": n % 7 + 1, "quantity": 1, "unit_price_cents": 100 * n}
+        for n in range(1, 1201)
+    ]
+    assert repo.insert_many(conn, rows) == 1200
+
+    found = repo.get_many(conn, range(1, 1201))
+    assert len(found) == 1200
+    assert isinstance(found[9], repo.OrderItemRecord)
+    assert found[9].unit_price_cents == 1000
+    assert found[9].dirty is True  # the sync trigger flags local inserts
+
+    changed = [found[0]._replace(quantity=5)._asdict(), found[1]._replace(quantity=6)._asdict()]
+    assert repo.upsert_many(conn, changed) == 2
+    assert [row.quantity for row in repo.get_many(conn, [1, 2])] == [5, 6]
+    assert conn.execute("SELECT COUNT(*) FROM order_item").fetchone() == (1200,)
+
+    assert repo.delete_many(conn, range(1, 1001)) == 1000
+    assert repo.get_many(conn, [1, 1100]) == [found[1099]]
+
+
+def test_composite_keys_and_unique_upsert(tmp_path: Path, import_generated) -> None:
+    output_dir = tmp_path / "generated"
+    generate(EDGE_PATH, output_dir)
+    models = import_generated(output_dir / "python", "edge_models")
+    conn = _database(output_dir)
+
+    shelf_id = uuid.uuid4()
+    repositories = _repositories(models)
+    shelves = repositories.shelf
+    shelves.insert_many(conn, [{"id": shelf_id, "level": "low", "weight": Decimal("1.250")}])
+    # Same (level, label) under a new id resolves through the unique index.
+    shelves.upsert_many(conn, [{"id": uuid.uuid4(), "level": "low", "ratio": 0.75}])
+    (shelf,) = shelves.get_many(conn, [shelf_id])
+    assert shelf.id == shelf_id
+    assert shelf.level is models.enums.Level.LOW
+    assert shelf.label == "main"
+    assert shelf.ratio == 0.75
+    assert shelf.weight is None
+
+    bins = repositories.bin
+    bins.insert_many(conn, [{"shelf_id": shelf_id, "slot": slot} for slot in range(3)])
+    assert [row.slot for row in bins.get_many(conn, [(shelf_id, 2), (shelf_id, 9)])] == [2]
+    assert bins.delete_many(conn, [(shelf_id, 0), (shelf_id, 1)]) == 2
+    # Two key columns bind two parameters per key; chunks stay under the
+    # 999 variables of SQLite builds before 3.32.
+    conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    assert bins.CHUNK_SIZE == 499
+    bins.insert_many(conn, [{"shelf_id": shelf_id, "slot": slot} for slot in range(3, 1203)])
+    keys = [(shelf_id, slot) for slot in range(2, 1203)]
+    assert len(bins.get_many(conn, keys)) == 1201
+    assert bins.delete_many(conn, keys) == 1201
+    assert bins.PRIMARY_KEY == ("shelf_id", "slot")
+
+
+def test_repository_rows_load_through_the_orm(tmp_path: Path, import_generated) -> None:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir, storage="compact")
+    models = import_generated(output_dir / "python", "compact_models")
+    database = tmp_path / "boteco.db"
+    conn = _database(output_dir, str(database))
+
+    comanda_id = uuid.uuid4()
+    opened_at = datetime(2024, 5, 17, 21, 30, 15, 250000)
+    comandas = _repositories(models).comanda
+    with conn:
+        comandas.insert_many(
+            conn, [{"id": comanda_id, "status": "open", "opened_at": opened_at}]
+        )
+    (row,) = comandas.get_many(conn, [comanda_id])
+    assert row.id == comanda_id
+    assert row.opened_at == opened_at
+    assert row.status is models.enums.ComandaStatus.OPEN
+    conn.close()
+
+    with Session(create_engine(f"sqlite:///{database}")) as session:
+        comanda = session.get(models.Comanda, comanda_id)
+        assert comanda.status is models.enums.ComandaStatus.OPEN
+        assert comanda.opened_at == opened_at
+
+
+def test_required_columns_are_enforced(tmp_path: Path, import_generated) -> None:
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir)
+    models = import_generated(output_dir / "python")
+
+    with pytest.raises(KeyError):
+        _repositories(models).order_item.insert_many(_database(output_dir), [{"order_id": 1}])
+
+
+def test_records_from_row_factory(tmp_path: Path, import_generated) -> None:
+    output_dir = tmp_path / "generated"
+    generate(EDGE_PATH, output_dir)
+    models = import_generated(output_dir / "python", "edge_models")
+    shelves = _repositories(models).shelf
+    conn = _database(output_dir)
+
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "label": f"s{n}",
+            "level": "high" if n % 2 else "low",
+            "weight": Decimal("0.125"),
+            "stale": bool(n % 2),
+        }
+        for n in range(6)
+    ]
+    shelves.insert_many(conn, rows)
+
+    stale = shelves.fetch_all(conn, '"stale" = ? ORDER BY "label"', (1,))
+    assert [record.label for record in stale] == ["s1", "s3", "s5"]
+    assert all(record.level is models.enums.Level.HIGH for record in stale)
+    assert stale[0].weight == Decimal("0.125")
+    assert stale[0].stale is True
+    assert len(shelves.fetch_all(conn)) == 6
+    assert shelves.ShelfRecord._fields == shelves.COLUMNS
+
+    cursor = conn.cursor()
+    cursor.row_factory = shelves.row_factory
+    record = cursor.execute(shelves.SELECT_SQL + ' WHERE "label" = ?', ("s0",)).fetchone()
+    assert isinstance(record.id, uuid.UUID)
+    with pytest.raises(AttributeError):
+        record.label = "other"
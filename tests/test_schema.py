@@ -0,0 +1,115 @@
+from pathlib import Path
+import importlib
+import sqlite3
+
+import pytest
+
+from botecopro_meta.generator import DomainLoader, generate
+
+from conftest import CYCLIC_PATH, DOMAIN_PATH
+
+CYCLE_DOMAIN = """
+entities:
+  Shift:
+    attributes:
+      id: {type: int, primary_key: true}
+      closing_count_id: {type: relation, target: CashCount, nullable: true}
+  CashCount:
+    attributes:
+      id: {type: int, primary_key: true}
+      shift_id: {type: relation, target: Shift}
+"""
+
+
+def test_schema_bundle_follows_foreign_key_order(tmp_path: Path) -> None:
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir)
+    schema = (output_dir / "sql" / "schema.sql").read_text()
+
+    lines = schema.splitlines()
+    assert lines[3] == "BEGIN;" and lines[-1] == "COMMIT;"
+    tables = [
+        line.split('"')[1] for line in lines if line.startswith("CREATE TABLE IF NOT EXISTS")
+    ]
+    domain = DomainLoader(DOMAIN_PATH).load()
+    assert tables == [entity.table for entity in domain.fk_order()]
+    assert schema.index("-- Indexes") > schema.rindex("CREATE TABLE")
+
+
+def test_apply_schema_provisions_in_one_transaction(tmp_path: Path, import_generated) -> None:
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir)
+    models = import_generated(output_dir / "python")
+    schema = importlib.import_module(f"{models.__name__}.schema")
+
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON")
+    statements = []
+    conn.set_trace_callback(statements.append)
+    schema.apply_schema(conn)
+    conn.set_trace_callback(None)
+
+    # The tracer reports each statement with the comment lines preceding it.
+    statements = [statement.strip().splitlines()[-1] for statement in statements]
+    assert statements[0] == "BEGIN;" and statements[-1] == "COMMIT;"
+    assert statements.count("BEGIN;") == statements.count("COMMIT;") == 1
+    created = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    assert set(schema.TABLES) <= created
+    schema.apply_schema(conn)  # idempotent
+    conn.close()
+
+
+def test_cycles_use_deferred_foreign_keys(tmp_path: Path, import_generated) -> None:
+    domain_path = tmp_path / "cycle.yaml"
+    domain_path.write_text(CYCLE_DOMAIN)
+    output_dir = tmp_path / "generated"
+    generate(domain_path, output_dir)
+    models = import_generated(output_dir / "python")
+    schema = importlib.import_module(f"{models.__name__}.schema")
+
+    assert schema.TABLES == ("shift", "cashcount")
+    assert "DEFERRABLE INITIALLY DEFERRED" in (output_dir / "sql" / "shift.sql").read_text()
+    assert "DEFERRABLE" not in (output_dir / "sql" / "cashcount.sql").read_text()
+
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON")
+    schema.apply_schema(conn)
+    conn.execute("BEGIN")
+    conn.execute('INSERT INTO "shift" (id, closing_count_id) VALUES (1, 10)')
+    conn.execute('INSERT INTO "cashcount" (id, shift_id) VALUES (10, 1)')
+    conn.execute("COMMIT")
+
+    conn.execute("BEGIN")
+    conn.execute('INSERT INTO "shift" (id, closing_count_id) VALUES (2, 99)')
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("COMMIT")
+    conn.close()
+
+
+def test_schema_bundle_defers_every_reference_closing_a_cycle(tmp_path: Path) -> None:
+    output_dir = tmp_path / "generated"
+    generate(CYCLIC_PATH, output_dir)
+    schema = (output_dir / "sql" / "schema.sql").read_text()
+    assert schema.count(") DEFERRABLE INITIALLY DEFERRED") == 2  # owner_id and plan_id
+
+    conn = sqlite3.connect(tmp_path / "cyclic.db", isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(schema)
+    conn.execute("BEGIN")
+    conn.execute(
+        'INSERT INTO "account" (id, name, owner_id, plan_id) VALUES (1, \'Bar\', 10, 20)'
+    )
+    conn.execute('INSERT INTO "member" (id, account_id, email) VALUES (10, 1, \'a@b.c\')')
+    conn.execute('INSERT INTO "plan" (id, account_id, price_cents) VALUES (20, 1, 900)')
+    conn.execute("COMMIT")
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+
+    conn.execute("BEGIN")
+    conn.execute(
+        'INSERT INTO "account" (id, name, owner_id, plan_id) VALUES (2, \'Café\', 10, 99)'
+    )
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("COMMIT")
+    conn.close()
@@ -0,0 +1,157 @@
+from pathlib import Path
+import importlib
+import sqlite3
+
+import pytest
+
+from botecopro_meta.cli import main
+from botecopro_meta.generator import (
+    DomainLoader,
+    deferred_columns,
+    generate,
+    render_schema_content,
+)
+from botecopro_meta.migrate import plan_migration, read_schema
+
+from conftest import DOMAIN_PATH, EDGE_PATH
+
+
+def _unsearchable(domain: dict) -> None:
+    """Drop the ``searchable`` flags of every attribute."""
+    for entity in domain["entities"].values():
+        for attr in entity.get("attributes", {}).values():
+            attr.pop("searchable", None)
+
+
+def _database(domain, path=":memory:") -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.executescript(
+        render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+    )
+    return conn
+
+
+def _products(conn: sqlite3.Connection, names) -> None:
+    conn.executemany("INSERT INTO product (name) VALUES (?)", [(name,) for name in names])
+
+
+def test_search_module_follows_the_table(tmp_path: Path, import_generated) -> None:
+    generate(DOMAIN_PATH, tmp_path / "out", incremental=False)
+    models = import_generated(tmp_path / "out" / "python")
+    search = importlib.import_module(f"{models.__name__}.search")
+    assert set(search.INDEXES) == {"product", "supplier", "item", "customer"}
+
+    conn = _database(DomainLoader(DOMAIN_PATH).load())
+    _products(conn, ["Cachaça Artesanal", "Cerveja Pilsen", "Cerveja IPA", "Pão de queijo"])
+    conn.execute("UPDATE product SET description = 'cerveja de trigo' WHERE id = 4")
+
+    assert search.search(conn, "product", "cach") == [(1, "Cachaça Artesanal", None)]
+    assert [row[0] for row in search.search(conn, "product", "CERV pil")] == [2]
+    # Matches in the name and the description, best (shortest) match first.
+    assert [row[0] for row in search.search(conn, "product", "cerveja")] == [2, 3, 4]
+    assert search.search(conn, "product", "cerveja", limit=1)[0][0] == 2
+    assert search.search(conn, "product", "cerv", prefix=False) == []
+    assert search.search(conn, "product", ' ":* ') == []
+
+    conn.execute("UPDATE product SET name = 'Chopp Pilsen' WHERE id = 2")
+    conn.execute("UPDATE product SET active = 0 WHERE id = 3")
+    conn.execute("DELETE FROM product WHERE id = 1")
+    assert [row[0] for row in search.search(conn, "product", "pilsen")] == [2]
+    assert search.search(conn, "product", "cachaca") == []
+    assert search.verify(conn) == {"product": True, "supplier": True, "item": True, "customer": True}
+
+    # Broad matches rank only the newest candidates.
+    _products(conn, [f"Cerveja Lata {n}" for n in range(30)])
+    newest = [row[0] for row in search.search(conn, "product", "cerveja lata", candidates=5)]
+    assert len(newest) == 20 and min(newest) == 15
+    assert min(row[0] for row in search.search(conn, "product", "lata", limit=3, candidates=5)) >= 30
+
+    # Rows written behind the triggers' back show up in verify until a rebuild.
+    conn.execute("DROP TRIGGER trg_product_search_insert")
+    _products(conn, ["Caipirinha"])
+    assert search.verify(conn, ["product"]) == {"product": False}
+    search.rebuild(conn, ["product"])
+    assert search.verify(conn, ["product"]) == {"product": True}
+    assert search.search(conn, "product", "caip")[0][1] == "Caipirinha"
+    with pytest.raises(KeyError, match="not searchable: order"):
+        search.verify(conn, ["order"])
+
+
+def test_match_query_quotes_words() -> None:
+    namespace: dict = {}
+    from botecopro_meta.generator import render_search_content
+
+    exec(render_search_content([]), namespace)
+    match_query = namespace["match_query"]
+    assert match_query("cerv pil") == '"cerv"* "pil"*'
+    assert match_query('pão AND "de" OR -queijo', prefix=False) == '"pão" "AND" "de" "OR" "queijo"'
+    assert match_query("  --  ") is None
+
+
+@pytest.mark.parametrize(
+    ("entity", "attribute", "message"),
+    [
+        ("Shelf", "label", "searchable entities need a single integer primary key"),
+        ("Bin", "slot", "only text attributes can be searchable"),
+        # ``text`` columns are searchable; Bin then fails on its composite key.
+        ("Bin", "notes", "searchable entities need a single integer primary key"),
+    ],
+)
+def test_searchable_needs_text_and_an_integer_key(
+    edited_domain, entity: str, attribute: str, message: str
+) -> None:
+    def searchable(domain: dict) -> None:
+        domain["entities"][entity]["attributes"][attribute]["searchable"] = True
+
+    path = edited_domain(searchable, source=EDGE_PATH, name="edge")
+    with pytest.raises(ValueError, match=message):
+        DomainLoader(path, cache=False).load()
+
+
+def test_migration_adds_and_fills_the_indexes(edited_domain) -> None:
+    conn = _database(DomainLoader(edited_domain(_unsearchable, name="plain")).load())
+    _products(conn, ["Cerveja Pilsen", "Vinho Tinto"])
+    domain = DomainLoader(DOMAIN_PATH).load()
+
+    migration = plan_migration(read_schema(conn), domain)
+    assert not migration.tables
+    assert "-- Full-text search" in migration.script()
+    migration.apply(conn)
+    assert conn.execute(
+        "SELECT rowid FROM product_search WHERE product_search MATCH 'vinh*'"
+    ).fetchall() == [(2,)]
+    _products(conn, ["Vinho Branco"])
+    assert len(conn.execute("SELECT * FROM product_search('vinho')").fetchall()) == 2
+    # Shadow tables are not mistaken for domain tables.
+    assert not plan_migration(read_schema(conn), domain)
+
+    plain = DomainLoader(edited_domain(_unsearchable, name="plain")).load()
+    plan_migration(read_schema(conn), plain).apply(conn)
+    assert "product_search" not in {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master")
+    }
+    _products(conn, ["Água"])
+
+
+def test_reindex_command(tmp_path: Path, edited_domain, capsys) -> None:
+    database = tmp_path / "boteco.db"
+    conn = _database(DomainLoader(edited_domain(_unsearchable, name="plain")).load(), database)
+    _products(conn, ["Cerveja Pilsen", "Vinho Tinto", "Cachaça"])
+    conn.close()
+    arguments = ["--input", str(DOMAIN_PATH), "--database", str(database)]
+
+    main(["reindex", *arguments, "--entity", "Product"])
+    assert "product" in capsys.readouterr().out
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT rowid FROM product_search('cach*')").fetchall() == [(3,)]
+    conn.execute("INSERT INTO product (name) VALUES ('Cachaça Ouro')")
+    assert len(conn.execute("SELECT rowid FROM product_search('cachaca')").fetchall()) == 2
+    conn.close()
+
+    main(["reindex", *arguments])
+    report = capsys.readouterr().out
+    assert "4 index(es) rebuilt" in report
+    with pytest.raises(SystemExit, match="not searchable: Category"):
+        main(["reindex", *arguments, "--entity", "Category"])
+    with pytest.raises(SystemExit, match="unknown entity 'Produce'"):
+        main(["reindex", *arguments, "--entity", "Produce"])
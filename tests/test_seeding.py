@@ -0,0 +1,124 @@
+from pathlib import Path
+import sqlite3
+
+import pytest
+
+from botecopro_meta.cli import main
+from botecopro_meta.generator import DomainLoader, deferred_columns, render_schema_content
+from botecopro_meta.seeding import row_counts, seed
+
+from conftest import CYCLIC_PATH, DOMAIN_PATH
+
+
+def _seeded(storage, scale: int, **options):
+    domain = DomainLoader(DOMAIN_PATH, storage=storage).load()
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.executescript(
+        render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+    )
+    return domain, conn, seed(conn, domain, scale, **options)
+
+
+@pytest.mark.parametrize("storage", [None, "compact"])
+def test_seeded_rows_follow_weights_and_keep_the_schema_valid(storage) -> None:
+    batches = []
+    domain, conn, written = _seeded(
+        storage, 300, batch_size=100, progress=lambda entity, rows: batches.append(rows)
+    )
+    assert list(written) == [entity.table for entity in domain.fk_order()]
+    assert written["comanda"] == 300
+    assert written["order_item"] == 1800
+    assert written["category"] == 3
+    assert written["domain_event"] == 0
+    assert max(batches) <= 1800 and 100 in batches
+    for table, rows in written.items():
+        assert conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] == rows
+
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    statuses = {row[0] for row in conn.execute('SELECT DISTINCT "status" FROM "comanda"')}
+    assert statuses <= set(domain.attribute("Comanda", "status").enum_values)
+    assert len(statuses) > 1
+    # Every product appears in some supplier pair, so no parent is left out.
+    assert conn.execute(
+        'SELECT COUNT(DISTINCT "product_id") FROM "supplier_product"'
+    ).fetchone()[0] == written["product"]
+    # Derived columns were maintained by their triggers while seeding.
+    (subtotal,) = conn.execute('SELECT SUM("subtotal_cents") FROM "comanda"').fetchone()
+    (lines,) = conn.execute(
+        'SELECT SUM(COALESCE(i."total_cents", i."quantity" * i."unit_price_cents"))'
+        ' FROM "order_item" i JOIN "order" o ON o."id" = i."order_id"'
+        " WHERE o.\"status\" <> 'cancelled'"
+    ).fetchone()
+    assert subtotal == lines
+
+
+def test_seeding_is_deterministic_and_composite_keys_are_capped() -> None:
+    first = _seeded(None, 40, random_seed=7)[1]
+    second = _seeded(None, 40, random_seed=7)[1]
+    # last_modified is stamped by the sync triggers with the wall clock.
+    query = 'SELECT "order_id", "item_id", "quantity", "notes" FROM "order_item" ORDER BY "id"'
+    assert first.execute(query).fetchall() == second.execute(query).fetchall()
+
+    domain = DomainLoader(DOMAIN_PATH).load()
+    counts = row_counts(domain, 2)
+    assert counts["Category"] == 1
+    assert counts["SupplierProduct"] == counts["Supplier"] * counts["Product"]
+    assert set(row_counts(domain, 5, weighted=False).values()) == {5}
+
+
+def test_foreign_key_cycles_are_seeded_in_one_transaction() -> None:
+    domain = DomainLoader(CYCLIC_PATH, cache=False).load()
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(
+        render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+    )
+    batches = []
+    written = seed(conn, domain, 50, progress=lambda entity, rows: batches.append(entity.name))
+    assert written == {"account": 50, "member": 50, "plan": 50}
+    assert batches == ["Account", "Member", "Plan"]
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    assert conn.execute(
+        'SELECT COUNT(*) FROM "account" a JOIN "member" m ON m."id" = a."owner_id"'
+    ).fetchone()[0] == 50
+
+
+def test_seed_weights_are_validated(edited_domain) -> None:
+    def weigh(**weights):
+        def edit(domain: dict) -> None:
+            for name, weight in weights.items():
+                domain["entities"][name]["seed"] = {"weight": weight}
+
+        return edit
+
+    with pytest.raises(ValueError, match="seed.weight"):
+        DomainLoader(edited_domain(weigh(Customer="many")), cache=False).load()
+
+    domain = DomainLoader(edited_domain(weigh(Customer=1, Category=0)), cache=False).load()
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    with pytest.raises(ValueError, match="needs rows of Category"):
+        seed(conn, domain, 10)
+
+
+def test_seed_command_writes_a_database(tmp_path: Path, capsys) -> None:
+    database = tmp_path / "load.db"
+    main(
+        [
+            "seed",
+            "--input",
+            str(DOMAIN_PATH),
+            "--database",
+            str(database),
+            "--scale",
+            "50",
+            "--storage-profile",
+            "compact",
+        ]
+    )
+    report = capsys.readouterr().out
+    assert "order_item" in report and "rows/s" in report
+    conn = sqlite3.connect(database)
+    assert conn.execute('SELECT COUNT(*) FROM "order"').fetchone()[0] == 100
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    conn.close()
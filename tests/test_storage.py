@@ -0,0 +1,106 @@
+from datetime import datetime
+from pathlib import Path
+import sqlite3
+import uuid
+
+import pytest
+
+from botecopro_meta.generator import DomainLoader, generate
+from botecopro_meta.storage import PROFILES, resolve_profile
+
+from conftest import DOMAIN_PATH
+
+
+def _apply_sql(conn: sqlite3.Connection, sql_dir: Path) -> None:
+    conn.executescript((sql_dir / "schema.sql").read_text())
+
+
+def test_compact_profile_types_and_table_options() -> None:
+    domain = DomainLoader(DOMAIN_PATH, storage="compact").load()
+
+    assert domain.storage == PROFILES["compact"]
+    assert domain.attribute("Comanda", "id").sqlite_type == "BLOB"
+    assert domain.attribute("Comanda", "opened_at").sqlite_type == "INTEGER"
+    assert domain.attribute("Comanda", "opened_at").sqlalchemy_type == "column_types.EpochMillis"
+
+    item_product = domain.entity("ItemProduct")
+    assert item_product.strict and item_product.without_rowid
+    comanda = domain.entity("Comanda")
+    assert comanda.strict and not comanda.without_rowid
+
+
+def test_storage_profile_from_domain_targets(edited_domain) -> None:
+    def strict_storage(domain: dict) -> None:
+        domain["targets"]["sql"]["storage"] = {"profile": "strict", "uuid": "blob"}
+
+    domain_path = edited_domain(strict_storage)
+
+    domain = DomainLoader(domain_path).load()
+
+    assert domain.storage.strict and domain.storage.uuid == "blob"
+    assert domain.storage.datetime == "text"
+    assert domain.attribute("Comanda", "id").sqlite_type == "BLOB"
+    assert domain.attribute("Comanda", "opened_at").sqlite_type == "TEXT"
+
+
+@pytest.mark.parametrize(
+    "setting",
+    ["tiny", {"profile": "compact", "uuid": "base64"}, {"pages": 4}, 3],
+)
+def test_resolve_profile_rejects_invalid_settings(setting) -> None:
+    with pytest.raises(ValueError):
+        resolve_profile(setting)
+
+
+def test_strict_tables_reject_mistyped_values(tmp_path: Path) -> None:
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir, storage="compact")
+
+    conn = sqlite3.connect(":memory:")
+    _apply_sql(conn, output_dir / "sql")
+    options = dict(conn.execute("SELECT name, wr FROM pragma_table_list").fetchall())
+    assert options["item_product"] == 1
+    assert options["comanda"] == 0
+
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute(
+            "INSERT INTO comanda (id, status, opened_at) VALUES (?, 'open', 'yesterday')",
+            (uuid.uuid4().bytes,),
+        )
+
+
+def test_changing_profile_regenerates_outputs(tmp_path: Path) -> None:
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir)
+    assert ") STRICT;" not in (output_dir / "sql" / "comanda.sql").read_text()
+
+    generate(DOMAIN_PATH, output_dir, storage="strict")
+    assert ") STRICT;" in (output_dir / "sql" / "comanda.sql").read_text()
+
+
+def test_compact_models_round_trip(tmp_path: Path, import_generated) -> None:
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import Session
+
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir, storage="compact")
+    models = import_generated(output_dir / "python", "compact_models")
+
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    comanda_id = uuid.uuid4()
+    opened_at = datetime(2024, 5, 17, 21, 30, 15, 250000)
+    with Session(engine) as session:
+        session.add(
+            models.Comanda(
+                id=comanda_id, status=models.enums.ComandaStatus.OPEN, opened_at=opened_at
+            )
+        )
+        session.commit()
+
+    with Session(engine) as session:
+        loaded = session.get(models.Comanda, comanda_id)
+        assert loaded.id == comanda_id
+        assert loaded.opened_at == opened_at
+        raw = session.execute(text("SELECT id, opened_at FROM comanda")).one()
+    assert raw == (comanda_id.bytes, 1715981415250)
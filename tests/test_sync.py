@@ -0,0 +1,159 @@
+from pathlib import Path
+import importlib
+import sqlite3
+import time
+
+from botecopro_meta.generator import DomainLoader, generate
+from botecopro_meta.migrate import plan_migration, read_schema
+
+from conftest import DOMAIN_PATH
+
+
+def _sync_module(tmp_path: Path, import_generated, storage=None):
+    output_dir = tmp_path / "generated"
+    generate(DOMAIN_PATH, output_dir, storage=storage)
+    models = import_generated(output_dir / "python")
+    return importlib.import_module(f"{models.__name__}.sync"), output_dir / "sql" / "schema.sql"
+
+
+def _device(schema: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.executescript(schema.read_text())
+    return conn
+
+
+def _product(conn: sqlite3.Connection, product_id: int) -> tuple:
+    return conn.execute(
+        'SELECT "name", "last_modified", "dirty" FROM "product" WHERE "id" = ?', (product_id,)
+    ).fetchone()
+
+
+def test_sync_columns_follow_metadata(edited_domain) -> None:
+    domain = DomainLoader(DOMAIN_PATH).load()
+    synced = {entity.name for entity in domain.entities if entity.sync}
+    assert synced == {"Product", "Item", "Comanda", "Order", "OrderItem"}
+    sync = domain.entity("Comanda").sync
+    assert (sync.stamp, sync.dirty, sync.origin, sync.epoch) == (
+        "last_modified",
+        "dirty",
+        "origin_device",
+        False,
+    )
+
+    def unsynced_item(domain: dict) -> None:
+        domain["entities"]["Item"]["sync"] = False
+        domain["metadata"]["offline_first"] = True
+
+    domain_path = edited_domain(unsynced_item)
+    assert DomainLoader(domain_path, cache=False).load().entity("Item").sync is None
+    assert DomainLoader(DOMAIN_PATH, storage="compact").load().entity("Order").sync.epoch
+
+
+def test_triggers_stamp_local_writes_only(tmp_path: Path, import_generated) -> None:
+    sync, schema = _sync_module(tmp_path, import_generated)
+    conn = _device(schema)
+
+    conn.execute('INSERT INTO "product" ("name") VALUES (\'Lime\')')
+    name, stamp, dirty = _product(conn, 1)
+    assert stamp is not None and len(stamp) == 26 and dirty == 1
+
+    (batch,) = list(sync.changes(conn, "product"))
+    assert sync.acknowledge(conn, "product", batch) == 1
+    assert _product(conn, 1) == ("Lime", stamp, 0)
+
+    time.sleep(0.002)  # stamps have millisecond resolution
+    conn.execute('UPDATE "product" SET "name" = \'Key lime\' WHERE "id" = 1')
+    name, restamped, dirty = _product(conn, 1)
+    assert (name, dirty) == ("Key lime", 1) and restamped > stamp
+
+    # Changed again after being sent: the acknowledgement must not clear it.
+    (batch,) = list(sync.changes(conn, "product"))
+    time.sleep(0.002)
+    conn.execute('UPDATE "product" SET "name" = \'Lime\' WHERE "id" = 1')
+    assert sync.acknowledge(conn, "product", batch) == 0
+    assert _product(conn, 1)[2] == 1
+
+
+def test_local_writes_that_set_the_stamp_are_dirty(tmp_path: Path, import_generated) -> None:
+    sync, schema = _sync_module(tmp_path, import_generated)
+    conn = _device(schema)
+
+    conn.execute(
+        'INSERT INTO "product" ("name", "last_modified") VALUES (?, ?)',
+        ("Lime", "2024-01-01 10:00:00.000000"),
+    )
+    assert _product(conn, 1) == ("Lime", "2024-01-01 10:00:00.000000", 1)
+    (batch,) = list(sync.changes(conn, "product"))
+    sync.acknowledge(conn, "product", batch)
+
+    conn.execute(
+        'UPDATE "product" SET "name" = ?, "last_modified" = ? WHERE "id" = 1',
+        ("Key lime", "2024-01-02 10:00:00.000000"),
+    )
+    assert _product(conn, 1) == ("Key lime", "2024-01-02 10:00:00.000000", 1)
+    assert [row[1] for row in next(sync.changes(conn, "product"))] == ["Key lime"]
+
+
+def test_changes_are_keyset_batches(tmp_path: Path, import_generated) -> None:
+    sync, schema = _sync_module(tmp_path, import_generated)
+    conn = _device(schema)
+    conn.executemany(
+        'INSERT INTO "product" ("name", "last_modified") VALUES (?, ?)',
+        [(f"p{n}", f"2024-01-01 10:00:{n % 60:02d}.000000") for n in range(1200)],
+    )
+    conn.execute('UPDATE "product" SET "dirty" = 1')
+
+    batches = list(sync.changes(conn, "product", batch_size=500))
+    assert [len(batch) for batch in batches] == [500, 500, 200]
+    stamp, key = sync.TABLES["product"].key
+    keys = [(row[stamp], row[key]) for batch in batches for row in batch]
+    assert keys == sorted(keys) and len(set(keys)) == 1200
+    assert "dirty" not in sync.TABLES["product"].columns
+
+    since = list(sync.changes(conn, "product", since="2024-01-01 10:00:58.000000"))
+    assert sum(map(len, since)) == 20
+
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN " + sync.TABLES["product"].select_sql.format(
+            f'{sync.TABLES["product"].pending_filter} AND {sync.TABLES["product"].after_filter}'
+        ),
+        ("2024", 0, 500),
+    ).fetchall()
+    assert "idx_product_dirty" in plan[0][3]
+
+
+def test_apply_changes_keeps_the_newest_stamp(tmp_path: Path, import_generated) -> None:
+    sync, schema = _sync_module(tmp_path, import_generated)
+    tablet, counter = _device(schema), _device(schema)
+
+    tablet.execute('INSERT INTO "product" ("id", "name") VALUES (1, \'Lime\'), (2, \'Mint\')')
+    (batch,) = list(sync.changes(tablet, "product"))
+    assert sync.apply_changes(counter, "product", batch) == 2
+    assert list(sync.changes(counter, "product")) == []  # applied rows are stored clean
+
+    time.sleep(0.002)
+    counter.execute('UPDATE "product" SET "name" = \'Lemon\' WHERE "id" = 1')
+    (newer,) = list(sync.changes(counter, "product"))
+    stale = [row for row in batch if row[0] == 1]
+    assert sync.apply_changes(counter, "product", stale) == 0
+    assert _product(counter, 1)[0] == "Lemon"
+
+    assert sync.apply_changes(tablet, "product", newer) == 1
+    assert _product(tablet, 1)[0] == "Lemon"
+
+
+def test_rebuild_migration_restores_triggers(
+    tmp_path: Path, import_generated, edited_domain
+) -> None:
+    _, schema = _sync_module(tmp_path, import_generated)
+    conn = _device(schema)
+    domain_path = edited_domain(
+        lambda domain: domain["entities"]["Product"]["attributes"]["unit"].update(default="kg")
+    )
+
+    migration = plan_migration(read_schema(conn), DomainLoader(domain_path, cache=False).load())
+    assert [change.action for change in migration.tables] == ["rebuild"]
+    migration.apply(conn)
+
+    conn.execute('INSERT INTO "product" ("name") VALUES (\'Lime\')')
+    assert _product(conn, 1)[2] == 1
@@ -0,0 +1,151 @@
+from pathlib import Path
+import importlib
+import json
+import sqlite3
+import sys
+import uuid
+
+import pytest
+
+from botecopro_meta.cli import main
+from botecopro_meta.generator import (
+    DomainLoader,
+    deferred_columns,
+    generate,
+    render_schema_content,
+)
+from botecopro_meta.validation import import_file, load_validator
+
+from conftest import DOMAIN_PATH, EDGE_PATH
+SHELF_ID = "0b6f3a52-3e1f-4c8e-9a55-1d2c3b4a5f60"
+
+
+def _database(domain) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.executescript(
+        render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+    )
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+@pytest.mark.parametrize("storage", [None, "compact"])
+def test_validators_check_types_enums_and_precision(storage) -> None:
+    shelf = load_validator(DomainLoader(EDGE_PATH, storage=storage).load(), "Shelf")
+    rows = [
+        {"id": SHELF_ID, "level": "high", "weight": "12345.678", "opened_at": "2024-03-01T20:15:00"},
+        {"id": SHELF_ID, "level": "medium", "weight": "1.2345", "stale": "maybe"},
+        {"level": "low", "weight": "123456", "ratio": "x"},
+        {"id": "not-a-uuid", "level": "low", "opened_at": "yesterday", "colour": "red"},
+        {"id": SHELF_ID, "level": "extra-high", "stale": "true", "label": ""},
+    ]
+    valid, errors = shelf.validate(rows)
+
+    assert errors == {
+        1: [
+            "level: 'medium' is not one of low, high, extra-high",
+            "weight: '1.2345' has more than 3 decimal places",
+            "stale: expected a boolean, got 'maybe'",
+        ],
+        2: [
+            "id: required",
+            "weight: '123456' does not fit NUMERIC(8,3)",
+            "ratio: expected a number, got 'x'",
+        ],
+        3: [
+            "colour: unknown column",
+            "id: expected a UUID, got 'not-a-uuid'",
+            "opened_at: expected an ISO 8601 datetime, got 'yesterday'",
+        ],
+    }
+    columns = [column.name for column in shelf.COLUMNS]
+    first, last = (dict(zip(columns, values)) for values in valid)
+    if storage == "compact":
+        assert first["id"] == uuid.UUID(SHELF_ID).bytes
+        assert first["opened_at"] == 1709324100000
+    else:
+        assert first["id"] == SHELF_ID
+        assert first["opened_at"] == "2024-03-01 20:15:00.000000"
+    assert first["weight"] == 12345.678
+    # Missing and empty values take the column default.
+    assert (first["label"], first["ratio"], first["stale"]) == ("main", 0.5, False)
+    assert (last["label"], last["stale"]) == ("main", 1)
+
+
+def test_import_file_streams_chunks_and_writes_rejects(tmp_path: Path) -> None:
+    domain = DomainLoader(DOMAIN_PATH).load()
+    conn = _database(domain)
+    categories = tmp_path / "categories.jsonl"
+    categories.write_text(
+        '{"id": 1, "name": "Bebidas"}\n'
+        '{"id": 1, "name": "Repetida"}\n'
+        "not json\n"
+        "\n"
+        '{"id": 2, "name": "Petiscos"}\n'
+    )
+    result = import_file(conn, domain, "Category", categories, chunk_size=2)
+    assert tuple(result) == (4, 2, 2)
+    assert conn.execute('SELECT "name" FROM "category" ORDER BY "id"').fetchall() == [
+        ("Bebidas",),
+        ("Petiscos",),
+    ]
+    rejects = [
+        json.loads(line)
+        for line in (tmp_path / "categories.jsonl.rejected.jsonl").read_text().splitlines()
+    ]
+    assert rejects == [
+        {
+            "line": 2,
+            "row": {"id": 1, "name": "Repetida"},
+            "errors": ["UNIQUE constraint failed: category.id"],
+        },
+        {"line": 3, "row": "not json", "errors": ["not a JSON object"]},
+    ]
+
+    subcategories = tmp_path / "subcategories.csv"
+    subcategories.write_text("name,category_id\nCervejas,1\nVinhos,9\n")
+    result = import_file(conn, domain, "Subcategory", subcategories)
+    assert tuple(result) == (2, 1, 1)
+    assert "FOREIGN KEY" in (tmp_path / "subcategories.csv.rejected.jsonl").read_text()
+
+    clean = tmp_path / "clean.csv"
+    clean.write_text("name,category_id\nSucos,1\n")
+    assert tuple(import_file(conn, domain, "Subcategory", clean)) == (1, 1, 0)
+    assert not (tmp_path / "clean.csv.rejected.jsonl").exists()
+
+
+def test_generated_package_ships_the_validators(tmp_path: Path) -> None:
+    generate(EDGE_PATH, tmp_path / "out", incremental=False, storage="compact")
+    (tmp_path / "out" / "__init__.py").write_text("")
+    sys.path.insert(0, str(tmp_path))
+    try:
+        validators = importlib.import_module("out.python.validators")
+        valid, errors = validators.shelf.validate([{"id": SHELF_ID, "level": "low"}])
+    finally:
+        sys.path.remove(str(tmp_path))
+        for name in [name for name in sys.modules if name == "out" or name.startswith("out.")]:
+            del sys.modules[name]
+    assert errors == {}
+    assert valid[0][0] == uuid.UUID(SHELF_ID).bytes
+    assert validators.bin.COLUMNS[0].required
+
+
+def test_import_command(tmp_path: Path, capsys) -> None:
+    domain = DomainLoader(DOMAIN_PATH).load()
+    database = tmp_path / "boteco.db"
+    conn = sqlite3.connect(database)
+    conn.executescript(
+        render_schema_content(domain.name, domain.fk_order(), deferred_columns(domain))
+    )
+    conn.close()
+    products = tmp_path / "products.csv"
+    products.write_text("name,cost_price_cents,active\nCerveja,450,true\nCachaça,abc,yes\n")
+    arguments = ["--input", str(DOMAIN_PATH), "--database", str(database)]
+
+    main(["import", "Product", str(products), *arguments, "--rejects", str(tmp_path / "bad.jsonl")])
+    report = capsys.readouterr().out
+    assert "2 rows read, 1 inserted, 1 rejected" in report
+    assert "cost_price_cents: expected an integer" in (tmp_path / "bad.jsonl").read_text()
+
+    with pytest.raises(SystemExit, match="unknown entity 'Produce'"):
+        main(["import", "Produce", str(products), *arguments])
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+from botecopro_meta.cli import build_parser
+from botecopro_meta.generator import DomainLoader
+from botecopro_meta.watch import Watcher, reverse_dependencies
+
+from conftest import DOMAIN_PATH
+
+
+def test_reverse_dependencies_follow_relations() -> None:
+    domain = DomainLoader(DOMAIN_PATH).load()
+    reverse = reverse_dependencies(domain)
+
+    assert reverse["Order"] == {"OrderItem", "KitchenTicket"}
+    assert reverse["Category"] == {"Subcategory", "Item"}
+    assert reverse["Invoice"] == set()
+
+
+def test_watcher_regenerates_edited_entity_and_its_dependents(
+    tmp_path: Path, edited_domain
+) -> None:
+    domain_path = edited_domain()
+    output_dir = tmp_path / "generated"
+
+    watcher = Watcher(domain_path, output_dir)
+    watcher.start()
+    assert watcher.poll() is None
+
+    def add_slug(domain: dict) -> None:
+        domain["entities"]["Category"]["attributes"]["slug"] = {
+            "type": "string",
+            "nullable": True,
+        }
+
+    edited_domain(add_slug, source=domain_path)
+
+    result = watcher.poll()
+    assert result is not None
+    assert result.changed == ["Category"]
+    assert result.regenerated == ["Category", "Item", "Subcategory"]
+    assert result.written == [
+        "python/category.py",
+        "python/repositories/category.py",
+        "python/schema.py",
+        "python/validators/category.py",
+        "sql/category.sql",
+        "sql/schema.sql",
+    ]
+    assert '"slug" TEXT' in (output_dir / "sql" / "category.sql").read_text()
+
+    edited_domain(lambda domain: domain["entities"].pop("Invoice"), source=domain_path)
+
+    result = watcher.poll()
+    assert result.removed == ["Invoice"]
+    assert not (output_dir / "python" / "invoice.py").exists()
+    assert "Invoice" not in (output_dir / "python" / "__init__.py").read_text()
+
+
+def test_cli_exposes_watch_command() -> None:
+    args = build_parser().parse_args(["watch", "-i", "domain.yaml", "-o", "out"])
+    assert args.command == "watch"
+    assert args.interval == 0.1